@@ -38,14 +38,36 @@ API RESTful para gestion de reservas de cine.
 - **GET /reporte/ocupacion**: Reporte de ocupacion por pelicula
 - **POST /reservas**: Crear una reserva
 - **GET /reservas/{dni}**: Listar reservas por DNI
+- **GET /admin/consultas-lentas**: Ultimas consultas lentas del proceso
+- **GET /metrics** (fuera de /api/v1): Metricas en formato Prometheus
         ''',
         doc='/swagger/',
         prefix='/api/v1'
     )
     
+    # Serializar las respuestas JSON con el encoder rapido (orjson si esta instalado)
+    from app.utils.fast_json import output_json
+    api.representations['application/json'] = output_json
+    
+    # Medir las requests y exponer GET /metrics (antes de la compresion para incluirla en la latencia)
+    from app.metrics import register_metrics
+    register_metrics(app)
+    
+    # Perfilar con cProfile las requests marcadas con X-Profile o sorteadas (si PROFILING_ENABLED)
+    from app.profiling import register_profiling
+    register_profiling(app)
+    
+    # Comprimir las respuestas grandes segun Accept-Encoding (gzip o brotli)
+    from app.utils.compression import register_compression
+    register_compression(app)
+    
     # Registrar controladores
     from app.controllers import register_controllers
     register_controllers(api)
     
+    # Registrar comandos de mantenimiento (flask resumen-ocupacion ...)
+    from app.cli import register_commands
+    register_commands(app)
+    
     return app
 
@@ -0,0 +1,188 @@
+"""
+Aplicacion ASGI - Endpoints asincronicos de precios, reservas y reportes
+Expone un subconjunto de las rutas de la API Flask (/api/v1/...) sobre Starlette y los servicios asincronicos,
+con los mismos parametros y respuestas, reutilizando los schemas Pydantic y los modelos flask-restx para validar
+y serializar. Las rutas que no estan aca (reservas en lote, exportacion del reporte, lista de precios, mapa de
+butacas y administracion) solo las sirve la API Flask
+
+Se ejecuta con un servidor ASGI, por ejemplo:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from pydantic import ValidationError as PydanticValidationError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app.async_database import init_async_db, close_async_pool
+from app.config import Config
+from app.controllers.precio_controller import precio_response_model
+from app.controllers.reserva_controller import reserva_response_model, reserva_list_model
+from app.controllers.reporte_controller import (
+    _parse_ids_pelicula, reporte_peliculas_response_model, reporte_response_model
+)
+from app.schemas.reserva import ReservaCreate
+from app.services.async_services import AsyncPrecioService, AsyncReservaService, AsyncReporteService
+from app.utils.exceptions import AppException, ValidationError
+from app.utils.fast_json import dumps, fast_marshal
+
+config = Config()
+
+precio_service = AsyncPrecioService()
+reserva_service = AsyncReservaService()
+reporte_service = AsyncReporteService()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada con el encoder rapido de la API Flask (orjson si esta instalado)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def _error(status_code: int, message: str) -> JSONResponse:
+    """Respuesta de error con el mismo formato que ns.abort de flask-restx"""
+    return FastJSONResponse({'message': message}, status_code=status_code)
+
+
+async def get_precio(request: Request) -> JSONResponse:
+    """GET /precios/{id_funcion} - Obtener precio calculado de una funcion"""
+    try:
+        result = await precio_service.obtener_precio_async(request.path_params['id_funcion'])
+        return FastJSONResponse(fast_marshal(result, precio_response_model), status_code=200)
+    except AppException as e:
+        return _error(e.status_code, e.message)
+    except Exception as e:
+        return _error(500, f"Error interno del servidor: {str(e)}")
+
+
+async def post_reserva(request: Request) -> JSONResponse:
+    """POST /reservas - Crear una nueva reserva"""
+    try:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise ValidationError("Datos invalidos: el cuerpo debe ser JSON")
+        # Validación automática con Pydantic - ver PYDANTIC.md para más detalles
+        data = ReservaCreate(**payload)
+        result, replayed = await reserva_service.crear_reserva_idempotente_async(
+            idempotency_key=request.headers.get('Idempotency-Key'),
+            id_funcion=data.id_funcion,
+            id_butaca=data.id_butaca,
+            dni=data.dni
+        )
+        headers = {'Idempotent-Replayed': 'true'} if replayed else None
+        return FastJSONResponse(fast_marshal(result, reserva_response_model), status_code=201, headers=headers)
+    except PydanticValidationError as e:
+        return _error(400, f"Datos invalidos: {str(e)}")
+    except AppException as e:
+        return _error(e.status_code, e.message)
+    except Exception as e:
+        return _error(500, f"Error interno del servidor: {str(e)}")
+
+
+def _int_param(request: Request, name: str, default=None):
+    """Leer un query param entero con la misma tolerancia que request.args.get(type=int)"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+async def get_reservas_por_dni(request: Request) -> JSONResponse:
+    """GET /reservas/{dni} - Listar reservas de un cliente por DNI"""
+    try:
+        result = await reserva_service.listar_reservas_por_dni_async(
+            request.path_params['dni'],
+            _int_param(request, 'page', 1),
+            _int_param(request, 'per_page', 10),
+            cursor=request.query_params.get('cursor'),
+            total=request.query_params.get('total', 'exact')
+        )
+        return FastJSONResponse(fast_marshal(result, reserva_list_model), status_code=200)
+    except AppException as e:
+        return _error(e.status_code, e.message)
+    except Exception as e:
+        return _error(500, f"Error interno del servidor: {str(e)}")
+
+
+async def get_reporte_ocupacion(request: Request) -> JSONResponse:
+    """GET /reporte/ocupacion - Reporte de ocupacion por pelicula (o de varias peliculas con subtotales)"""
+    try:
+        id_pelicula_str = (request.query_params.get('idPelicula') or '').strip()
+        fecha_inicio_str = request.query_params.get('fechaInicio')
+        fecha_fin_str = request.query_params.get('fechaFin')
+
+        if not id_pelicula_str:
+            raise ValidationError("El parametro idPelicula es requerido")
+        if not fecha_inicio_str:
+            raise ValidationError("El parametro fechaInicio es requerido")
+        if not fecha_fin_str:
+            raise ValidationError("El parametro fechaFin es requerido")
+
+        try:
+            fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError("Formato de fecha invalido. Use YYYY-MM-DD")
+
+        # Varias peliculas (lista o all): reporte con subtotales, sin paginar
+        if not id_pelicula_str.isdigit():
+            result = await reporte_service.generar_reporte_ocupacion_peliculas_async(
+                _parse_ids_pelicula(id_pelicula_str), fecha_inicio, fecha_fin
+            )
+            return FastJSONResponse(fast_marshal(result, reporte_peliculas_response_model), status_code=200)
+
+        id_pelicula = int(id_pelicula_str)
+        if not id_pelicula:
+            raise ValidationError("El parametro idPelicula es requerido")
+        result = await reporte_service.generar_reporte_ocupacion_async(
+            id_pelicula=id_pelicula,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            page=_int_param(request, 'page', 1),
+            per_page=_int_param(request, 'per_page', 10),
+            cursor=request.query_params.get('cursor'),
+            total=request.query_params.get('total', 'exact')
+        )
+        return FastJSONResponse(fast_marshal(result, reporte_response_model), status_code=200)
+    except AppException as e:
+        return _error(e.status_code, e.message)
+    except Exception as e:
+        return _error(500, f"Error interno del servidor: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Crear el pool asincronico al iniciar y cerrarlo al apagar"""
+    await init_async_db()
+    print("Conexion asincronica a la base de datos establecida correctamente")
+    yield
+    await close_async_pool()
+
+
+def create_asgi_app() -> Starlette:
+    """Factory function para crear la aplicacion ASGI"""
+    routes = [
+        Mount('/api/v1', routes=[
+            Route('/precios/{id_funcion:int}', get_precio, methods=['GET']),
+            Route('/reservas', post_reserva, methods=['POST']),
+            Route('/reservas/{dni:str}', get_reservas_por_dni, methods=['GET']),
+            Route('/reporte/ocupacion', get_reporte_ocupacion, methods=['GET']),
+        ])
+    ]
+    # Misma compresion que la API Flask (solo gzip: Starlette no negocia brotli)
+    middleware = []
+    if config.COMPRESSION_ENABLED:
+        middleware.append(Middleware(
+            GZipMiddleware,
+            minimum_size=config.COMPRESSION_MIN_SIZE,
+            compresslevel=config.COMPRESSION_GZIP_LEVEL
+        ))
+    return Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
@@ -0,0 +1,186 @@
+"""
+Modulo para manejo asincronico de conexiones a la base de datos y stored procedures
+Variante asyncio de app.database sobre un pool de aiomysql
+Y asi, un solo proceso puede mantener miles de requests en vuelo mientras esperan a MySQL
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import aiomysql
+from pymysql.constants import CLIENT
+
+from app.database import config
+from app.utils.exceptions import ServiceUnavailableError
+
+# Pools asincronicos del proceso (se crean dentro del event loop que los va a usar). Como en app.database, solo el
+# pool de call_sp_with_out_params_async habilita multi-statements (clave True)
+_async_pools: Dict[bool, aiomysql.Pool] = {}
+_async_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool(multi_statements: bool = False) -> aiomysql.Pool:
+    """Obtener (o crear) el pool asincronico de conexiones (multi_statements: el del lote CALL + SELECT de los OUT)"""
+    if config.DATABASE_BACKEND != 'mysql':
+        # El motor en memoria es sincronico: solo lo usa la aplicacion WSGI (app/database.py)
+        raise RuntimeError(f"La aplicacion ASGI solo soporta DATABASE_BACKEND=mysql ({config.DATABASE_BACKEND})")
+    pool = _async_pools.get(multi_statements)
+    if pool is None:
+        async with _async_pool_lock:
+            pool = _async_pools.get(multi_statements)
+            if pool is None:
+                pool = await aiomysql.create_pool(
+                    host=config.DATABASE_HOST,
+                    port=config.DATABASE_PORT,
+                    user=config.DATABASE_USER,
+                    password=config.DATABASE_PASSWORD,
+                    db=config.DATABASE_NAME,
+                    minsize=0 if multi_statements else config.DATABASE_POOL_MIN_SIZE,
+                    maxsize=config.DATABASE_SP_POOL_MAX_SIZE if multi_statements else config.DATABASE_POOL_MAX_SIZE,
+                    pool_recycle=int(config.DATABASE_POOL_MAX_LIFETIME),
+                    cursorclass=aiomysql.DictCursor,
+                    autocommit=False,
+                    client_flag=CLIENT.MULTI_STATEMENTS if multi_statements else 0
+                )
+                _async_pools[multi_statements] = pool
+    return pool
+
+
+async def close_async_pool():
+    """Cerrar los pools asincronicos (al apagar la aplicacion ASGI)"""
+    while _async_pools:
+        _, pool = _async_pools.popitem()
+        pool.close()
+        await pool.wait_closed()
+
+
+@asynccontextmanager
+async def get_async_db(multi_statements: bool = False):
+    """Context manager asincronico con la misma semantica de commit/rollback que app.database.get_db"""
+    pool = await get_async_pool(multi_statements)
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=config.DATABASE_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ServiceUnavailableError("No hay conexiones disponibles a la base de datos, intente nuevamente")
+    try:
+        yield conn
+        # Si todo va bien, commiteamos la transaccion
+        await conn.commit()
+    except Exception:
+        # Si hay un error, rollbackamos la transaccion (si la conexion se corto, el pool la descarta)
+        try:
+            await conn.rollback()
+        except Exception:
+            conn.close()
+        raise
+    finally:
+        pool.release(conn)
+
+
+async def init_async_db():
+    """Crear el pool asincronico y verificar la conectividad con la base de datos"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT 1")
+
+
+# Equivalente asincronico de app.database.execute_query (solo lecturas)
+async def execute_query_async(query: str, params: Optional[Tuple] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ejecutar una consulta SQL de forma asincronica
+
+    Args:
+        query: Consulta SQL
+        params: Tupla con los parametros de la consulta
+
+    Returns:
+        Filas de la consulta como lista de diccionarios o None si no hay filas
+    """
+    async with get_async_db() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params or None)
+            results = await cursor.fetchall()
+            return list(results) if results else None
+
+
+# Equivalente asincronico de app.database.call_stored_procedure
+async def call_stored_procedure_async(
+    procedure_name: str,
+    params: Optional[Tuple] = None,
+    fetch: bool = True
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ejecutar un stored procedure de forma asincronica
+
+    Args:
+        procedure_name: Nombre del stored procedure
+        params: Tupla con los parametros del stored procedure
+        fetch: Si True, retorna los resultados. Si False, solo ejecuta.
+
+    Returns:
+        Primer result set como lista de diccionarios o None
+    """
+    async with get_async_db() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.callproc(procedure_name, params or ())
+            if not fetch:
+                return None
+            results = await cursor.fetchall()
+            all_results = [results] if results else []
+            # Consumimos el resto de los result sets para dejar la conexion limpia
+            while await cursor.nextset():
+                more_results = await cursor.fetchall()
+                if more_results:
+                    all_results.append(more_results)
+            return list(all_results[0]) if all_results else None
+
+
+# Equivalente asincronico de app.database.call_sp_with_out_params_single_trip
+async def call_sp_with_out_params_async(
+    procedure_name: str,
+    in_params: Tuple,
+    out_param_count: int
+) -> Tuple[Optional[List[Dict[str, Any]]], Tuple]:
+    """
+    Ejecutar un stored procedure con parametros OUT de forma asincronica
+
+    Con DATABASE_SP_SINGLE_ROUND_TRIP envia CALL + SELECT de los OUT en un solo lote;
+    si no, usa callproc y un SELECT adicional como app.database.call_sp_with_out_params.
+
+    Returns:
+        Tupla con (resultados del SELECT si hay, tupla de valores OUT)
+    """
+    out_param_names = [
+        f"@_{procedure_name}_{i}"
+        for i in range(len(in_params), len(in_params) + out_param_count)
+    ]
+
+    async with get_async_db(multi_statements=config.DATABASE_SP_SINGLE_ROUND_TRIP) as conn:
+        async with conn.cursor() as cursor:
+            result_sets = []
+            if config.DATABASE_SP_SINGLE_ROUND_TRIP:
+                call_args = ', '.join(['%s'] * len(in_params) + out_param_names)
+                query = f"CALL {procedure_name}({call_args})"
+                if out_param_names:
+                    query += f"; SELECT {', '.join(out_param_names)}"
+                await cursor.execute(query, tuple(in_params))
+            else:
+                await cursor.callproc(procedure_name, list(in_params) + [None] * out_param_count)
+
+            while True:
+                if cursor.description:
+                    result_sets.append(await cursor.fetchall())
+                if not await cursor.nextset():
+                    break
+
+            if out_param_names and not config.DATABASE_SP_SINGLE_ROUND_TRIP:
+                await cursor.execute(f"SELECT {', '.join(out_param_names)}")
+                result_sets.append(await cursor.fetchall())
+
+            out_values = ()
+            if out_param_names:
+                out_rows = result_sets.pop() if result_sets else None
+                out_values = tuple(out_rows[0].values()) if out_rows else tuple([None] * out_param_count)
+
+            results = result_sets[0] if result_sets else None
+            return list(results) if results else None, out_values
@@ -0,0 +1,37 @@
+"""
+Comandos de mantenimiento (Flask CLI)
+Nos permite verificar y reconstruir el resumen de ocupacion por funcion desde la linea de comandos:
+    flask --app wsgi resumen-ocupacion verificar
+    flask --app wsgi resumen-ocupacion reconstruir
+"""
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from app.repositories.reporte_repository import ReporteRepository
+
+resumen_ocupacion_cli = AppGroup('resumen-ocupacion', help='Mantenimiento de ResumenOcupacionFunciones')
+
+
+@resumen_ocupacion_cli.command('verificar')
+def verificar_resumen_ocupacion():
+    """Comparar el resumen con las reservas activas y pagadas (exit 1 si hay desvios)"""
+    desvios = ReporteRepository.verificar_resumen_ocupacion()
+    if not desvios:
+        click.echo("OK: el resumen de ocupacion coincide con las reservas")
+        return
+    click.echo(f"Desvios en {len(desvios)} funciones:")
+    for fila in desvios:
+        click.echo(f"  funcion {fila['IdFuncion']}: resumen={fila['ButacasResumen']} reales={fila['ButacasReales']}")
+    raise SystemExit(1)
+
+
+@resumen_ocupacion_cli.command('reconstruir')
+def reconstruir_resumen_ocupacion():
+    """Recalcular el resumen completo desde Reservas"""
+    funciones = ReporteRepository.reconstruir_resumen_ocupacion()
+    click.echo(f"Resumen reconstruido: {funciones} funciones con reservas")
+
+
+def register_commands(app: Flask) -> None:
+    """Registrar los comandos de mantenimiento en la aplicacion"""
+    app.cli.add_command(resumen_ocupacion_cli)
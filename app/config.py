@@ -19,6 +19,18 @@ class Config(BaseSettings):
     FLASK_PORT: int = 5000
     SECRET_KEY: str = "dev-secret-key"
     
+    # Servidor de produccion (gunicorn pre-fork, ver gunicorn.conf.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_WORKERS: int = 0  # 0 = (2 x CPUs) + 1
+    SERVER_THREADS: int = 4
+    SERVER_BACKLOG: int = 2048
+    SERVER_TIMEOUT: int = 30
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_KEEPALIVE: int = 5
+    SERVER_MAX_REQUESTS: int = 10000  # Reciclar cada worker tras N requests (0 = nunca)
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_WARMUP: bool = True
+    
     # Base de datos
     DATABASE_HOST: str = "localhost"
     DATABASE_PORT: int = 3306
@@ -26,6 +38,125 @@ class Config(BaseSettings):
     DATABASE_USER: str = "app_user"
     DATABASE_PASSWORD: str = "app_password"
     
+    # Pool de conexiones a la base de datos (tiempos en segundos)
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    DATABASE_POOL_TIMEOUT: float = 5.0
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_POOL_PING_INTERVAL: float = 5.0
+    DATABASE_POOL_MAX_LIFETIME: float = 1800.0
+    DATABASE_POOL_IDLE_TIMEOUT: float = 300.0
+    
+    # Ejecutar SPs con parametros OUT en un solo viaje de red (CALL + SELECT multi-statement). Solo las conexiones
+    # de un pool aparte de hasta DATABASE_SP_POOL_MAX_SIZE conexiones habilitan multi-statements
+    DATABASE_SP_SINGLE_ROUND_TRIP: bool = True
+    DATABASE_SP_POOL_MAX_SIZE: int = 4
+    
+    # Motor de datos: "mysql" (servidor MySQL con los stored procedures de init_db.sql) o "memory" (motor local
+    # en proceso que reproduce tablas, stored procedures y consultas; para pruebas de carga y perfilado sin servidor).
+    # El motor en memoria carga DATABASE_MEMORY_SEED (vacio = tablas vacias), agrega DATABASE_MEMORY_EXTRA_FUNCIONES
+    # funciones sinteticas con DATABASE_MEMORY_EXTRA_OCUPACION de butacas reservadas, simula
+    # DATABASE_MEMORY_LATENCY_MS de red por viaje y espera bloqueos hasta DATABASE_MEMORY_LOCK_WAIT_TIMEOUT segundos
+    DATABASE_BACKEND: str = "mysql"
+    DATABASE_MEMORY_SEED: str = "seed_db.sql"
+    DATABASE_MEMORY_EXTRA_FUNCIONES: int = 0
+    DATABASE_MEMORY_EXTRA_OCUPACION: float = 0.3
+    DATABASE_MEMORY_LATENCY_MS: float = 0.0
+    DATABASE_MEMORY_LOCK_WAIT_TIMEOUT: float = 50.0
+    
+    # Serializacion de respuestas con proyecciones precompiladas de los modelos y orjson (si esta instalado)
+    JSON_FAST_PATH_ENABLED: bool = True
+    
+    # Metricas en GET /metrics (requests por ruta, stored procedures, pool de conexiones)
+    METRICS_ENABLED: bool = True
+    # Con gunicorn, directorio donde cada worker deja sus metricas para sumarlas en /metrics
+    # (vacio = un directorio temporal creado al arrancar) y cada cuantos segundos las actualiza
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_MULTIPROC_INTERVAL: float = 5.0
+    
+    # Trazas de stored procedures y consultas: las que superan SQL_SLOW_QUERY_MS (milisegundos) se escriben en el log
+    # y se guardan las ultimas SQL_SLOW_LOG_SIZE; EXPLAIN de las primeras SQL_SLOW_EXPLAIN_MAX consultas lentas
+    SQL_TRACE_ENABLED: bool = True
+    SQL_SLOW_QUERY_MS: float = 500.0
+    SQL_SLOW_LOG_PARAMS: bool = False
+    SQL_SLOW_LOG_SIZE: int = 200
+    SQL_SLOW_EXPLAIN_MAX: int = 10
+    
+    # Perfilado de CPU por request con cProfile (apagado = costo cero): requests con el header PROFILING_HEADER
+    # (y X-Admin-Token, que requiere ADMIN_TOKEN configurado) o una fraccion PROFILING_SAMPLE_RATE (0.0 a 1.0) al azar;
+    # se guardan en PROFILING_DIR los ultimos PROFILING_MAX_FILES perfiles
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 200
+    
+    # Token para los endpoints /admin (header X-Admin-Token); vacio = endpoints /admin deshabilitados (404)
+    ADMIN_TOKEN: str = ""
+    
+    # Compresion de respuestas (gzip / brotli segun Accept-Encoding): tamano minimo en bytes y niveles
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    
+    # ETags en los GET de precios, reservas por DNI y reporte de ocupacion (If-None-Match -> 304)
+    ETAGS_ENABLED: bool = True
+    
+    # Cache de precios por funcion (TTL en segundos)
+    PRECIO_CACHE_ENABLED: bool = True
+    PRECIO_CACHE_MAX_SIZE: int = 10000
+    PRECIO_CACHE_TTL: float = 60.0
+    PRECIO_CACHE_NEGATIVE_TTL: float = 5.0
+    
+    # Cantidad maxima de funciones por request en GET /precios?ids=...
+    PRECIO_BATCH_MAX_IDS: int = 100
+    
+    # Idempotency-Key en POST /reservas (TTL, lease y espera en segundos). IDEMPOTENCY_BACKEND: "database" (tabla
+    # ClavesIdempotencia, compartida por todos los workers) o "memory" (por proceso: solo con un unico worker).
+    # IDEMPOTENCY_MAX_KEYS aplica solo a "memory"; IDEMPOTENCY_LEASE es cuanto reserva la clave una ejecucion en curso
+    IDEMPOTENCY_BACKEND: str = "database"
+    IDEMPOTENCY_TTL: float = 3600.0
+    IDEMPOTENCY_MAX_KEYS: int = 10000
+    IDEMPOTENCY_LEASE: float = 60.0
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+    
+    # Rechazo rapido (sin ir a la base) de reservas sobre butacas ya confirmadas como ocupadas
+    RESERVA_ADMISION_ENABLED: bool = True
+    RESERVA_ADMISION_TTL: float = 10.0
+    RESERVA_ADMISION_WAIT_TIMEOUT: float = 2.0
+    RESERVA_ADMISION_MAX_FUNCIONES: int = 1000
+    
+    # Group commit de reservas: un hilo escritor aplica las reservas concurrentes en lotes (espera en segundos)
+    RESERVA_GROUP_COMMIT_ENABLED: bool = False
+    RESERVA_GROUP_COMMIT_MAX_BATCH: int = 50
+    RESERVA_GROUP_COMMIT_MAX_WAIT: float = 0.002
+    
+    # Cantidad maxima de butacas por request en POST /reservas/lote (nunca mas que el limite de 4 reservas por DNI
+    # y fecha: un lote mas grande se rechaza con 400)
+    RESERVA_LOTE_MAX_BUTACAS: int = 4
+    
+    # Reporte de ocupacion de varias peliculas: maximo de peliculas por request y de consultas en paralelo
+    # por proceso (debe quedar por debajo de DATABASE_POOL_MAX_SIZE para no dejar sin conexiones a las reservas)
+    REPORTE_MAX_PELICULAS: int = 50
+    REPORTE_MAX_CONCURRENCIA: int = 4
+    
+    # Cache del reporte de ocupacion de varias peliculas por (pelicula, dia): hoy y futuros vencen a TTL_HOY
+    # y los dias pasados a TTL_PASADO (sus funciones pueden seguir vendiendo en otros procesos)
+    REPORTE_CACHE_ENABLED: bool = True
+    REPORTE_CACHE_MAX_DIAS: int = 20000
+    REPORTE_CACHE_TTL_HOY: float = 30.0
+    REPORTE_CACHE_TTL_PASADO: float = 300.0
+    # Periodos mas largos (en dias) se consultan directo en la base, sin pasar por el cache
+    REPORTE_CACHE_MAX_DIAS_PERIODO: int = 366
+    
+    # Exportacion del reporte de ocupacion: filas leidas de la base y escritas en la respuesta por vez
+    REPORTE_EXPORT_CHUNK_ROWS: int = 500
+    
+    # Mapa de butacas en memoria por funcion (TTL en segundos)
+    BUTACAS_MAPA_TTL: float = 30.0
+    BUTACAS_MAPA_MAX_FUNCIONES: int = 1000
+    
     # MySQL (variables para Docker Compose)
     MYSQL_ROOT_PASSWORD: str = "rootpassword"
     MYSQL_DATABASE: str = "cine_db"
@@ -6,6 +6,8 @@ Segun arquitectura Controller-Service-Repository
 from app.controllers.precio_controller import ns as precio_ns
 from app.controllers.reserva_controller import ns as reserva_ns
 from app.controllers.reporte_controller import ns as reporte_ns
+from app.controllers.funcion_controller import ns as funcion_ns
+from app.controllers.admin_controller import ns as admin_ns
 
 
 def register_controllers(api):
@@ -13,4 +15,6 @@ def register_controllers(api):
     api.add_namespace(precio_ns, path='/precios')
     api.add_namespace(reserva_ns, path='/reservas')
     api.add_namespace(reporte_ns, path='/reporte')
+    api.add_namespace(funcion_ns, path='/funciones')
+    api.add_namespace(admin_ns, path='/admin')
 
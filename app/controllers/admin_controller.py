@@ -0,0 +1,100 @@
+"""
+Controlador de Administracion - Endpoints de diagnostico (consultas lentas)
+"""
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from app.services.admin_service import AdminService
+from app.utils.exceptions import AppException
+from app.utils.fast_json import fast_marshal_with
+
+ns = Namespace('admin', description='Diagnostico del proceso (requiere X-Admin-Token; sin ADMIN_TOKEN responde 404)')
+
+consulta_lenta_model = ns.model('ConsultaLenta', {
+    'timestamp': fields.String(description='Fecha y hora de fin de la llamada (ISO 8601)'),
+    'kind': fields.String(description='Tipo de acceso: procedure, query o function'),
+    'name': fields.String(description='Nombre del SP / funcion, o funcion del repositorio que ejecuto la consulta'),
+    'query': fields.String(description='Texto SQL (solo consultas)'),
+    'params': fields.Raw(description='Parametros enviados (null si SQL_SLOW_LOG_PARAMS esta apagado)'),
+    'rows': fields.Integer(description='Filas devueltas'),
+    'connect_ms': fields.Float(description='Espera de una conexion del pool (ms)'),
+    'execute_ms': fields.Float(description='Ejecucion en el servidor hasta el primer resultado (ms)'),
+    'fetch_ms': fields.Float(description='Lectura de las filas (ms)'),
+    'total_ms': fields.Float(description='Duracion total, incluido el commit (ms)'),
+    'error': fields.String(description='Error de la llamada, si fallo'),
+    'explain': fields.Raw(description='Filas de EXPLAIN (primeras consultas SELECT lentas del proceso)')
+})
+
+consultas_lentas_estado_model = ns.model('ConsultasLentasEstado', {
+    'guardadas': fields.Integer(description='Consultas en el buffer'),
+    'capacidad': fields.Integer(description='Tamano del buffer (SQL_SLOW_LOG_SIZE)'),
+    'total': fields.Integer(description='Consultas lentas registradas desde que inicio el proceso'),
+    'explains_restantes': fields.Integer(description='EXPLAIN que todavia se pueden capturar')
+})
+
+consultas_lentas_model = ns.model('ConsultasLentasResponse', {
+    'umbral_ms': fields.Float(description='Umbral de consulta lenta (SQL_SLOW_QUERY_MS)'),
+    'estado': fields.Nested(consultas_lentas_estado_model),
+    'data': fields.List(fields.Nested(consulta_lenta_model))
+})
+
+limpiar_response_model = ns.model('ConsultasLentasLimpiarResponse', {
+    'eliminadas': fields.Integer(description='Consultas quitadas del buffer')
+})
+
+error_model = ns.model('ErrorResponse', {
+    'success': fields.Boolean(default=False),
+    'message': fields.String(description='Mensaje de error'),
+    'error': fields.String(description='Tipo de error')
+})
+
+admin_service = AdminService()
+
+
+@ns.route('/consultas-lentas')
+@ns.param('X-Admin-Token', 'Token de administracion (ADMIN_TOKEN)', _in='header')
+class ConsultasLentas(Resource):
+    """Endpoint para ver las ultimas consultas lentas del proceso"""
+
+    @ns.doc('get_consultas_lentas')
+    @ns.param('limit', 'Cantidad maxima de consultas (default: todas)', type=int, _in='query')
+    @fast_marshal_with(ns, consultas_lentas_model)
+    @ns.response(200, 'Consultas lentas del proceso (de la mas reciente a la mas antigua)')
+    @ns.response(400, 'Parametro limit invalido', error_model)
+    @ns.response(401, 'Token de administracion invalido', error_model)
+    @ns.response(404, 'ADMIN_TOKEN no configurado', error_model)
+    @ns.response(500, 'Error del servidor', error_model)
+    def get(self):
+        """
+        Obtener las ultimas consultas lentas registradas por este proceso
+
+        Cada stored procedure, funcion o consulta que supera SQL_SLOW_QUERY_MS se guarda con sus
+        parametros, las filas devueltas y el tiempo de cada fase (conexion, ejecucion, lectura).
+        Las metricas son por proceso: con varios workers cada uno tiene su propio buffer.
+        """
+        try:
+            admin_service.verificar_token(request.headers.get('X-Admin-Token'))
+            result = admin_service.listar_consultas_lentas(request.args.get('limit', type=int))
+            return result, 200
+
+        except AppException as e:
+            ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            ns.abort(500, message=f"Error interno del servidor: {str(e)}")
+
+    @ns.doc('delete_consultas_lentas')
+    @fast_marshal_with(ns, limpiar_response_model)
+    @ns.response(200, 'Buffer de consultas lentas vaciado')
+    @ns.response(401, 'Token de administracion invalido', error_model)
+    @ns.response(404, 'ADMIN_TOKEN no configurado', error_model)
+    @ns.response(500, 'Error del servidor', error_model)
+    def delete(self):
+        """Vaciar el buffer de consultas lentas de este proceso"""
+        try:
+            admin_service.verificar_token(request.headers.get('X-Admin-Token'))
+            result = admin_service.limpiar_consultas_lentas()
+            return result, 200
+
+        except AppException as e:
+            ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            ns.abort(500, message=f"Error interno del servidor: {str(e)}")
@@ -0,0 +1,64 @@
+"""
+Controlador de Funciones - Endpoints de consulta de funciones (mapa de butacas)
+"""
+from flask_restx import Namespace, Resource, fields
+from app.services.butaca_service import ButacaService
+from app.utils.exceptions import AppException
+from app.utils.fast_json import fast_marshal_with
+
+ns = Namespace('funciones', description='Operaciones de funciones')
+
+butaca_model = ns.model('ButacaFuncion', {
+    'IdButaca': fields.Integer(description='ID de la butaca'),
+    'NroButaca': fields.Integer(description='Numero de butaca dentro de la sala'),
+    'Fila': fields.Integer(description='Fila de la butaca'),
+    'Columna': fields.Integer(description='Columna de la butaca'),
+    'Ocupada': fields.Boolean(description='Indica si la butaca tiene una reserva activa')
+})
+
+mapa_butacas_model = ns.model('MapaButacas', {
+    'id_funcion': fields.Integer(description='ID de la funcion'),
+    'id_sala': fields.Integer(description='ID de la sala'),
+    'reservable': fields.Boolean(description='La funcion esta activa y no finalizada'),
+    'total_butacas': fields.Integer(description='Total de butacas de la sala'),
+    'butacas_ocupadas': fields.Integer(description='Butacas con reserva activa'),
+    'butacas_libres': fields.Integer(description='Butacas disponibles'),
+    'butacas': fields.List(fields.Nested(butaca_model))
+})
+
+error_model = ns.model('ErrorResponse', {
+    'success': fields.Boolean(default=False),
+    'message': fields.String(description='Mensaje de error'),
+    'error': fields.String(description='Tipo de error')
+})
+
+butaca_service = ButacaService()
+
+
+@ns.route('/<int:id_funcion>/butacas')
+@ns.param('id_funcion', 'ID de la funcion')
+class MapaButacasResource(Resource):
+    """Endpoint para obtener el mapa de butacas de una funcion"""
+    
+    @ns.doc('get_mapa_butacas')
+    @fast_marshal_with(ns, mapa_butacas_model)
+    @ns.response(200, 'Mapa de butacas obtenido')
+    @ns.response(404, 'Funcion no encontrada', error_model)
+    @ns.response(500, 'Error del servidor', error_model)
+    def get(self, id_funcion):
+        """
+        Obtener el mapa de butacas de una funcion con su ocupacion
+        
+        Devuelve la grilla de la sala (Fila/Columna/NroButaca) indicando que butacas
+        tienen una reserva activa. Se sirve desde memoria: el mapa se construye con una
+        sola consulta y se actualiza con cada reserva confirmada por esta instancia
+        (se reconstruye cada BUTACAS_MAPA_TTL segundos).
+        """
+        try:
+            result = butaca_service.obtener_mapa(id_funcion)
+            return result, 200
+            
+        except AppException as e:
+            ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            ns.abort(500, message=f"Error interno del servidor: {str(e)}")
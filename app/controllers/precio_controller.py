@@ -4,9 +4,12 @@ Controlador de Precios - Endpoints para calcular precios
 Para más información sobre cómo y por qué usamos Pydantic en este repositorio,
 consulta el archivo PYDANTIC.md en la raíz del proyecto.
 """
+from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services.precio_service import PrecioService
-from app.utils.exceptions import AppException
+from app.utils.exceptions import AppException, ValidationError
+from app.utils.etag import cabeceras_etag, etag_coincide, etag_de, respuesta_no_modificada
+from app.utils.fast_json import fast_marshal_with
 
 ns = Namespace('precios', description='Operaciones de precios de funciones')
 
@@ -16,6 +19,18 @@ precio_response_model = ns.model('PrecioResponse', {
     'mensaje': fields.String(required=True, description='Mensaje del calculo')
 })
 
+precio_lote_item_model = ns.model('PrecioLoteItem', {
+    'id_funcion': fields.Integer(required=True, description='ID de la funcion'),
+    'success': fields.Boolean(required=True, description='Indica si se pudo calcular el precio'),
+    'status_code': fields.Integer(required=True, description='Codigo HTTP equivalente para esta funcion'),
+    'precio_final': fields.String(description='Precio final calculado (null si hubo error)'),
+    'mensaje': fields.String(required=True, description='Mensaje del calculo o del error')
+})
+
+precio_lote_response_model = ns.model('PrecioLoteResponse', {
+    'data': fields.List(fields.Nested(precio_lote_item_model))
+})
+
 error_model = ns.model('ErrorResponse', {
     'success': fields.Boolean(default=False),
     'message': fields.String(description='Mensaje de error'),
@@ -43,8 +58,10 @@ class PrecioResource(Resource):
     """Endpoint para obtener precio de una funcion"""
     
     @ns.doc('get_precio')
-    @ns.marshal_with(precio_response_model)
+    @fast_marshal_with(ns, precio_response_model)
+    @ns.param('If-None-Match', 'ETag de una respuesta anterior (responde 304 si el precio no cambio)', _in='header')
     @ns.response(200, 'Precio calculado exitosamente')
+    @ns.response(304, 'El precio no cambio desde el ETag enviado')
     @ns.response(400, 'Funcion inactiva o finalizada', error_model)
     @ns.response(404, 'Funcion no encontrada', error_model)
     @ns.response(500, 'Error del servidor', error_model)
@@ -60,11 +77,56 @@ class PrecioResource(Resource):
         - Sala VIP (IdSala=1): +5%
         """
         try:
+            # El resultado sale del cache de precios: sus valores son la version del recurso
             result = precio_service.obtener_precio(id_funcion)
-            return result, 200
+            etag = etag_de(lambda: result)
+            if etag_coincide(etag):
+                return respuesta_no_modificada(etag)
+            return result, 200, cabeceras_etag(etag)
             
         except AppException as e:
             ns.abort(e.status_code, message=e.message)
         except Exception as e:
             ns.abort(500, message=f"Error interno del servidor: {str(e)}")
 
+
+@ns.route('')
+class PrecioList(Resource):
+    """Endpoint para obtener precios de varias funciones en un solo request"""
+    
+    @ns.doc('get_precios')
+    @ns.param('ids', 'IDs de las funciones separados por coma (ej: 1,2,3)', type=str, _in='query', required=True)
+    @fast_marshal_with(ns, precio_lote_response_model)
+    @ns.param('If-None-Match', 'ETag de una respuesta anterior (responde 304 si los precios no cambiaron)',
+              _in='header')
+    @ns.response(200, 'Precios calculados (cada funcion informa su propio resultado)')
+    @ns.response(304, 'Los precios no cambiaron desde el ETag enviado')
+    @ns.response(400, 'Parametros invalidos', error_model)
+    @ns.response(500, 'Error del servidor', error_model)
+    def get(self):
+        """
+        Obtener precios calculados de varias funciones
+        
+        Calcula todos los precios con una sola consulta que aplica las mismas reglas
+        que SP_DeterminarPrecioEntrada. Las funciones inexistentes, inactivas o finalizadas
+        se informan por funcion (success=false) sin cortar el resto del lote.
+        """
+        try:
+            ids_str = request.args.get('ids', '')
+            try:
+                ids = [int(valor) for valor in ids_str.split(',') if valor.strip()]
+            except ValueError:
+                raise ValidationError("El parametro ids debe ser una lista de enteros separados por coma")
+            if any(id_funcion <= 0 for id_funcion in ids):
+                raise ValidationError("Los IDs de funcion deben ser mayores que 0")
+            
+            result = precio_service.obtener_precios(ids)
+            etag = etag_de(lambda: result)
+            if etag_coincide(etag):
+                return respuesta_no_modificada(etag)
+            return result, 200, cabeceras_etag(etag)
+            
+        except AppException as e:
+            ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            ns.abort(500, message=f"Error interno del servidor: {str(e)}")
@@ -1,11 +1,15 @@
 """
 Controlador de Reportes - Endpoints para generar reportes
 """
-from flask import request
+from flask import Response, request
 from flask_restx import Namespace, Resource, fields
 from datetime import datetime
+from typing import List, Optional
 from app.services.reporte_service import ReporteService
 from app.utils.exceptions import AppException, ValidationError
+from app.utils.etag import cabeceras_etag, etag_coincide, etag_de, respuesta_no_modificada
+from app.utils.export import MIMETYPES
+from app.utils.fast_json import fast_marshal
 
 ns = Namespace('reporte', description='Operaciones de reportes')
 
@@ -19,12 +23,13 @@ reporte_item_model = ns.model('ReporteOcupacionItem', {
 })
 
 pagination_model = ns.model('Pagination', {
-    'page': fields.Integer(description='Pagina actual'),
+    'page': fields.Integer(description='Pagina actual (null si se pagino por cursor)'),
     'per_page': fields.Integer(description='Elementos por pagina'),
-    'total': fields.Integer(description='Total de elementos'),
-    'total_pages': fields.Integer(description='Total de paginas'),
+    'total': fields.Integer(description='Total de elementos (estimado con total=estimate, null con total=none)'),
+    'total_pages': fields.Integer(description='Total de paginas (null con total=none)'),
     'has_next': fields.Boolean(description='Hay pagina siguiente'),
-    'has_prev': fields.Boolean(description='Hay pagina anterior')
+    'has_prev': fields.Boolean(description='Hay pagina anterior'),
+    'next_cursor': fields.String(description='Cursor para pedir la pagina siguiente (null si es la ultima)')
 })
 
 reporte_response_model = ns.model('ReporteOcupacionResponse', {
@@ -32,6 +37,27 @@ reporte_response_model = ns.model('ReporteOcupacionResponse', {
     'pagination': fields.Nested(pagination_model)
 })
 
+reporte_totales_model = ns.model('ReporteOcupacionTotales', {
+    'TotalPeliculas': fields.Integer(description='Cantidad de peliculas del reporte'),
+    'TotalFunciones': fields.Integer(description='Cantidad de funciones'),
+    'TotalButacasVendidas': fields.Integer(description='Total de butacas vendidas'),
+    'TotalIngresosRecaudados': fields.String(description='Total de ingresos recaudados (Decimal como string)')
+})
+
+reporte_pelicula_model = ns.model('ReporteOcupacionPelicula', {
+    'IdPelicula': fields.Integer(description='ID de la pelicula'),
+    'Pelicula': fields.String(description='Nombre de la pelicula'),
+    'TotalFunciones': fields.Integer(description='Cantidad de funciones de la pelicula en el periodo'),
+    'TotalButacasVendidas': fields.Integer(description='Subtotal de butacas vendidas'),
+    'TotalIngresosRecaudados': fields.String(description='Subtotal de ingresos recaudados (Decimal como string)'),
+    'funciones': fields.List(fields.Nested(reporte_item_model))
+})
+
+reporte_peliculas_response_model = ns.model('ReporteOcupacionPeliculasResponse', {
+    'peliculas': fields.List(fields.Nested(reporte_pelicula_model)),
+    'totales': fields.Nested(reporte_totales_model)
+})
+
 error_model = ns.model('ErrorResponse', {
     'success': fields.Boolean(default=False),
     'message': fields.String(description='Mensaje de error'),
@@ -40,6 +66,16 @@ error_model = ns.model('ErrorResponse', {
 
 reporte_service = ReporteService()
 
+
+def _parse_ids_pelicula(valor: str) -> Optional[List[int]]:
+    """Convertir idPelicula=1,2,3 en lista de IDs (None si es 'all' = todas las peliculas activas)"""
+    if valor.strip().lower() == 'all':
+        return None
+    try:
+        return [int(parte) for parte in valor.split(',') if parte.strip()]
+    except ValueError:
+        raise ValidationError("idPelicula debe ser un ID, una lista de IDs separados por coma o 'all'")
+
 # Comentario sobre decoradores (@):
 # En Flask y Flask-RESTx, los decoradores como @ns.route, @ns.param, @ns.doc, @ns.response y @ns.marshal_with
 # se utilizan para agregar metadata, definir rutas, documentar o modificar el comportamiento de las funciones
@@ -52,20 +88,29 @@ class ReporteOcupacion(Resource):
     """Endpoint para reporte de ocupacion por pelicula"""
     
     @ns.doc('get_reporte_ocupacion')
-    @ns.param('idPelicula', 'ID de la pelicula (requerido)', type=int, _in='query', required=True)
+    @ns.param('idPelicula', 'ID de la pelicula, lista de IDs separados por coma o all (requerido)', type=str,
+              _in='query', required=True)
     @ns.param('fechaInicio', 'Fecha inicio del periodo (YYYY-MM-DD, requerido)', type=str, _in='query', required=True)
     @ns.param('fechaFin', 'Fecha fin del periodo (YYYY-MM-DD, requerido)', type=str, _in='query', required=True)
     @ns.param('page', 'Numero de pagina (default: 1)', type=int, _in='query')
     @ns.param('per_page', 'Elementos por pagina (default: 10, max: 100)', type=int, _in='query')
-    @ns.marshal_with(reporte_response_model)
-    @ns.response(200, 'Reporte generado exitosamente')
+    @ns.param('cursor', 'Cursor next_cursor de la pagina anterior (reemplaza a page)', _in='query')
+    @ns.param('total', 'Calculo del total: exact (default), estimate o none', _in='query',
+              enum=['exact', 'estimate', 'none'])
+    @ns.param('If-None-Match', 'ETag de una respuesta anterior (responde 304 si el reporte no cambio)', _in='header')
+    @ns.response(200, 'Reporte generado exitosamente (ReporteOcupacionPeliculasResponse con varias peliculas)',
+                 reporte_response_model)
+    @ns.response(304, 'El reporte no cambio desde el ETag enviado')
     @ns.response(400, 'Parametros invalidos', error_model)
+    @ns.response(404, 'Pelicula no encontrada (varias peliculas)', error_model)
     @ns.response(500, 'Error del servidor', error_model)
     def get(self):
         """
         Generar reporte de ocupacion por pelicula
         
-        Utiliza el SP SP_ReporteOcupacionPorPelicula para generar el reporte.
+        Aplica el mismo calculo que el SP SP_ReporteOcupacionPorPelicula, paginado en la base de datos:
+        se filtran las funciones por un rango semiabierto de FechaInicio (usa el indice
+        IDX_Funciones_IdPelicula_Estado_FechaInicio) y solo se cuentan las reservas de la pagina pedida.
         
         El reporte muestra para cada funcion:
         - Fecha y hora de inicio
@@ -73,26 +118,54 @@ class ReporteOcupacion(Resource):
         - Total de butacas vendidas (reservas activas y pagadas)
         - Total de ingresos recaudados
         
-        Soporta paginacion con los parametros page y per_page.
+        Soporta paginacion con page y per_page, o por cursor enviando el next_cursor de la pagina anterior.
+        Con total=estimate o total=none se evita contar las funciones del periodo.
+        
+        Con varias peliculas (idPelicula=1,2,3 o idPelicula=all para todas las activas) no se pagina:
+        cada pelicula se consulta en paralelo (a lo sumo REPORTE_MAX_CONCURRENCIA consultas a la vez por proceso)
+        y se devuelven sus funciones con subtotales por pelicula y totales generales.
+        
+        La respuesta lleva un ETag calculado con un checksum de las funciones del periodo y de sus butacas
+        vendidas (ResumenOcupacionFunciones); con If-None-Match y el mismo ETag se responde 304 sin armar el reporte.
+        El reporte de varias peliculas no lleva ETag con REPORTE_CACHE_ENABLED (se arma con el cache del proceso).
         """
         try:
-            id_pelicula = request.args.get('idPelicula', type=int)
+            id_pelicula_str = (request.args.get('idPelicula') or '').strip()
             fecha_inicio_str = request.args.get('fechaInicio')
             fecha_fin_str = request.args.get('fechaFin')
             
-            if not id_pelicula:
-                ns.abort(400, message="El parametro idPelicula es requerido")
+            # Lanzamos ValidationError (no ns.abort) para que el except Exception no lo convierta en 500
+            if not id_pelicula_str:
+                raise ValidationError("El parametro idPelicula es requerido")
             if not fecha_inicio_str:
-                ns.abort(400, message="El parametro fechaInicio es requerido")
+                raise ValidationError("El parametro fechaInicio es requerido")
             if not fecha_fin_str:
-                ns.abort(400, message="El parametro fechaFin es requerido")
+                raise ValidationError("El parametro fechaFin es requerido")
             
             try:
                 fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
                 fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date()
             except ValueError:
-                ns.abort(400, message="Formato de fecha invalido. Use YYYY-MM-DD")
+                raise ValidationError("Formato de fecha invalido. Use YYYY-MM-DD")
+            
+            # Varias peliculas (lista o all): reporte con subtotales, sin paginar
+            if not id_pelicula_str.isdigit():
+                ids_pelicula = _parse_ids_pelicula(id_pelicula_str)
+                # Sin ETag si el reporte se arma con los dias cacheados del proceso (version None)
+                etag = etag_de(
+                    lambda: reporte_service.version_reporte_ocupacion_peliculas(ids_pelicula, fecha_inicio, fecha_fin)
+                )
+                if etag_coincide(etag):
+                    return respuesta_no_modificada(etag)
+                result = reporte_service.generar_reporte_ocupacion_peliculas(ids_pelicula, fecha_inicio, fecha_fin)
+                return fast_marshal(result, reporte_peliculas_response_model), 200, cabeceras_etag(etag)
             
+            id_pelicula = int(id_pelicula_str)
+            if not id_pelicula:
+                raise ValidationError("El parametro idPelicula es requerido")
+            etag = etag_de(lambda: reporte_service.version_reporte_ocupacion([id_pelicula], fecha_inicio, fecha_fin))
+            if etag_coincide(etag):
+                return respuesta_no_modificada(etag)
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
             
@@ -101,12 +174,66 @@ class ReporteOcupacion(Resource):
                 fecha_inicio=fecha_inicio,
                 fecha_fin=fecha_fin,
                 page=page,
-                per_page=per_page
+                per_page=per_page,
+                cursor=request.args.get('cursor'),
+                total=request.args.get('total', 'exact')
             )
-            return result, 200
+            return fast_marshal(result, reporte_response_model), 200, cabeceras_etag(etag)
             
         except AppException as e:
             ns.abort(e.status_code, message=e.message)
         except Exception as e:
             ns.abort(500, message=f"Error interno del servidor: {str(e)}")
 
+
+@ns.route('/ocupacion/export')
+class ReporteOcupacionExport(Resource):
+    """Endpoint para exportar el reporte de ocupacion completo"""
+    
+    @ns.doc('export_reporte_ocupacion')
+    @ns.param('format', 'Formato de salida: csv (default) o ndjson', _in='query', enum=list(MIMETYPES))
+    @ns.param('idPelicula', 'ID de la pelicula (si se omite, se exportan todas las peliculas)', type=int, _in='query')
+    @ns.param('fechaInicio', 'Fecha inicio del periodo (YYYY-MM-DD, requerido)', type=str, _in='query', required=True)
+    @ns.param('fechaFin', 'Fecha fin del periodo (YYYY-MM-DD, requerido)', type=str, _in='query', required=True)
+    @ns.produces(list(MIMETYPES.values()))
+    @ns.response(200, 'Reporte exportado (respuesta en streaming)')
+    @ns.response(400, 'Parametros invalidos', error_model)
+    @ns.response(500, 'Error del servidor', error_model)
+    def get(self):
+        """
+        Exportar el reporte de ocupacion del periodo en CSV o NDJSON
+        
+        A diferencia de GET /reporte/ocupacion no se pagina: las filas se leen de la base con un cursor
+        sin buffer y se escriben en la respuesta a medida que llegan (transfer-encoding chunked),
+        por lo que la memoria usada no depende de la cantidad de funciones.
+        TotalIngresosRecaudados se exporta como texto con la precision del Decimal.
+        """
+        try:
+            formato = request.args.get('format', 'csv')
+            id_pelicula = request.args.get('idPelicula', type=int)
+            fecha_inicio_str = request.args.get('fechaInicio')
+            fecha_fin_str = request.args.get('fechaFin')
+            
+            if not fecha_inicio_str:
+                raise ValidationError("El parametro fechaInicio es requerido")
+            if not fecha_fin_str:
+                raise ValidationError("El parametro fechaFin es requerido")
+            
+            try:
+                fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d').date()
+                fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValidationError("Formato de fecha invalido. Use YYYY-MM-DD")
+            
+            partes = reporte_service.exportar_reporte_ocupacion(id_pelicula, fecha_inicio, fecha_fin, formato)
+            nombre = f"ocupacion_{id_pelicula or 'todas'}_{fecha_inicio_str}_{fecha_fin_str}.{formato}"
+            return Response(
+                partes,
+                content_type=MIMETYPES[formato],
+                headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+            )
+            
+        except AppException as e:
+            ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            ns.abort(500, message=f"Error interno del servidor: {str(e)}")
@@ -4,8 +4,10 @@ Controlador de Reservas - Endpoints para crear y listar reservas
 from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services.reserva_service import ReservaService
-from app.schemas.reserva import ReservaCreate
+from app.schemas.reserva import ReservaCreate, ReservaLoteCreate
 from app.utils.exceptions import AppException, ValidationError
+from app.utils.etag import cabeceras_etag, etag_coincide, etag_de, respuesta_no_modificada
+from app.utils.fast_json import fast_marshal_with
 from pydantic import ValidationError as PydanticValidationError
 
 
@@ -22,6 +24,31 @@ reserva_response_model = ns.model('ReservaResponse', {
     'mensaje': fields.String(required=True, description='Mensaje de resultado')
 })
 
+reserva_lote_create_model = ns.model('ReservaLoteCreate', {
+    'id_funcion': fields.Integer(required=True, description='ID de la funcion'),
+    'ids_butaca': fields.List(fields.Integer, required=True, description='IDs de las butacas (sin repetidos)'),
+    'dni': fields.String(required=True, description='DNI del cliente (7-11 caracteres)')
+})
+
+reserva_lote_resultado_model = ns.model('ReservaLoteResultado', {
+    'id_butaca': fields.Integer(description='ID de la butaca'),
+    'reservada': fields.Boolean(description='Indica si la butaca quedo reservada'),
+    'mensaje': fields.String(
+        description='Resultado de la validacion (OK, mensaje del sp o butaca valida de un lote rechazado)'
+    )
+})
+
+reserva_lote_response_model = ns.model('ReservaLoteResponse', {
+    'success': fields.Boolean(required=True, description='Indica si fue exitoso'),
+    'mensaje': fields.String(required=True, description='Mensaje de resultado'),
+    'resultados': fields.List(fields.Nested(reserva_lote_resultado_model))
+})
+
+reserva_lote_error_model = ns.model('ReservaLoteErrorResponse', {
+    'message': fields.String(description='Mensaje de error (primera butaca rechazada)'),
+    'details': fields.List(fields.Nested(reserva_lote_resultado_model))
+})
+
 reserva_detalle_model = ns.model('ReservaDetalle', {
     'IdReserva': fields.Integer(description='ID de la reserva'),
     'DNI': fields.String(description='DNI del cliente'),
@@ -34,13 +61,14 @@ reserva_detalle_model = ns.model('ReservaDetalle', {
     'FechaBaja': fields.DateTime(description='Fecha de baja')
 })
 
-pagination_model = ns.model('Pagination', {
-    'page': fields.Integer(description='Pagina actual'),
+pagination_model = ns.model('ReservaPagination', {
+    'page': fields.Integer(description='Pagina actual (null si se pagino por cursor)'),
     'per_page': fields.Integer(description='Elementos por pagina'),
-    'total': fields.Integer(description='Total de elementos'),
-    'total_pages': fields.Integer(description='Total de paginas'),
+    'total': fields.Integer(description='Total de elementos (estimado con total=estimate, null con total=none)'),
+    'total_pages': fields.Integer(description='Total de paginas (null con total=none)'),
     'has_next': fields.Boolean(description='Hay pagina siguiente'),
-    'has_prev': fields.Boolean(description='Hay pagina anterior')
+    'has_prev': fields.Boolean(description='Hay pagina anterior'),
+    'next_cursor': fields.String(description='Cursor para pedir la pagina siguiente (null si es la ultima)')
 })
 
 reserva_list_model = ns.model('ReservaListResponse', {
@@ -71,8 +99,10 @@ class ReservaList(Resource):
     """Endpoint para crear reservas"""
     
     @ns.doc('create_reserva')
+    @ns.param('Idempotency-Key', 'Clave unica por intento de reserva (opcional); los reintentos con la misma '
+              'clave y el mismo contenido reciben la respuesta original', _in='header')
     @ns.expect(reserva_create_model)
-    @ns.marshal_with(reserva_response_model, code=201)
+    @fast_marshal_with(ns, reserva_response_model, code=201)
     @ns.response(201, 'Reserva creada exitosamente')
     @ns.response(400, 'Datos invalidos o funcion inactiva', error_model)
     @ns.response(404, 'Funcion o butaca no encontrada', error_model)
@@ -89,16 +119,22 @@ class ReservaList(Resource):
         - Butaca debe existir y pertenecer a la sala de la funcion
         - Butaca no debe estar ya reservada para esa funcion
         - DNI no puede tener mas de 4 reservas activas y pagadas en la misma fecha
+        
+        Con el header Idempotency-Key, los reintentos con la misma clave y el mismo contenido se
+        responden con el resultado original (header Idempotent-Replayed: true) sin ejecutar el SP.
         """
         try:
             # Validación automática con Pydantic - ver PYDANTIC.md para más detalles
             data = ReservaCreate(**request.json)
             
-            result = reserva_service.crear_reserva(
+            result, replayed = reserva_service.crear_reserva_idempotente(
+                idempotency_key=request.headers.get('Idempotency-Key'),
                 id_funcion=data.id_funcion,
                 id_butaca=data.id_butaca,
                 dni=data.dni
             )
+            if replayed:
+                return result, 201, {'Idempotent-Replayed': 'true'}
             return result, 201
             
         except PydanticValidationError as e:
@@ -110,6 +146,49 @@ class ReservaList(Resource):
             ns.abort(500, message=f"Error interno del servidor: {str(e)}")
 
 
+@ns.route('/lote')
+class ReservaLote(Resource):
+    """Endpoint para crear varias reservas en una sola transaccion"""
+    
+    @ns.doc('create_reservas_lote')
+    @ns.expect(reserva_lote_create_model)
+    @fast_marshal_with(ns, reserva_lote_response_model, code=201)
+    @ns.response(201, 'Reservas creadas exitosamente')
+    @ns.response(400, 'Datos invalidos o funcion inactiva', reserva_lote_error_model)
+    @ns.response(404, 'Funcion o butaca no encontrada', reserva_lote_error_model)
+    @ns.response(409, 'Conflicto - butaca ocupada o limite DNI excedido', reserva_lote_error_model)
+    @ns.response(500, 'Error del servidor', error_model)
+    def post(self):
+        """
+        Crear varias reservas de una misma funcion y DNI (todas o ninguna)
+        
+        Aplica las mismas validaciones que SP_ReservarButacaConValidacionDNI, pero valida la funcion una
+        sola vez y todas las butacas y el limite del DNI en conjunto, e inserta todas las reservas en una
+        unica transaccion. Si alguna butaca no se puede reservar no se crea ninguna y el detalle por
+        butaca se devuelve en details.
+        """
+        try:
+            # Validación automática con Pydantic - ver PYDANTIC.md para más detalles
+            data = ReservaLoteCreate(**request.json)
+            
+            result = reserva_service.crear_reservas_lote(
+                id_funcion=data.id_funcion,
+                ids_butaca=data.ids_butaca,
+                dni=data.dni
+            )
+            return result, 201
+            
+        except PydanticValidationError as e:
+            # Error de validación de Pydantic - ver PYDANTIC.md para más detalles
+            ns.abort(400, message=f"Datos invalidos: {str(e)}")
+        except AppException as e:
+            if e.details is not None:
+                ns.abort(e.status_code, message=e.message, details=e.details)
+            ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            ns.abort(500, message=f"Error interno del servidor: {str(e)}")
+
+
 @ns.route('/<string:dni>')
 @ns.param('dni', 'DNI del cliente')
 class ReservaPorDNI(Resource):
@@ -118,22 +197,39 @@ class ReservaPorDNI(Resource):
     @ns.doc('get_reservas_por_dni')
     @ns.param('page', 'Numero de pagina (default: 1)', type=int, _in='query')
     @ns.param('per_page', 'Elementos por pagina (default: 10, max: 100)', type=int, _in='query')
-    @ns.marshal_with(reserva_list_model)
+    @ns.param('cursor', 'Cursor next_cursor de la pagina anterior (reemplaza a page)', _in='query')
+    @ns.param('total', 'Calculo del total: exact (default), estimate o none', _in='query',
+              enum=['exact', 'estimate', 'none'])
+    @fast_marshal_with(ns, reserva_list_model)
+    @ns.param('If-None-Match', 'ETag de una respuesta anterior (responde 304 si no cambio nada)', _in='header')
     @ns.response(200, 'Lista de reservas obtenida')
+    @ns.response(304, 'Las reservas no cambiaron desde el ETag enviado')
+    @ns.response(400, 'Cursor o parametro total invalido', error_model)
     @ns.response(500, 'Error del servidor', error_model)
     def get(self, dni):
         """
         Obtener reservas de un cliente por DNI
         
-        Utiliza el SP SP_ReservasPorDNI para obtener las reservas.
-        Soporta paginacion con los parametros page y per_page.
+        Devuelve las mismas columnas que el SP SP_ReservasPorDNI, ordenadas por (FechaInicio, IdReserva),
+        leyendo de la base solo la pagina pedida.
+        Soporta paginacion con page y per_page, o por cursor enviando el next_cursor de la pagina anterior.
+        Con total=estimate o total=none se evita contar todas las reservas del DNI.
+        
+        La respuesta lleva un ETag calculado con un checksum de las reservas del DNI en la base;
+        con If-None-Match y el mismo ETag se responde 304 sin leer ni serializar la pagina.
         """
         try:
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
+            cursor = request.args.get('cursor')
+            total = request.args.get('total', 'exact')
+            
+            etag = etag_de(lambda: reserva_service.version_reservas_por_dni(dni))
+            if etag_coincide(etag):
+                return respuesta_no_modificada(etag)
             
-            result = reserva_service.listar_reservas_por_dni(dni, page, per_page)
-            return result, 200
+            result = reserva_service.listar_reservas_por_dni(dni, page, per_page, cursor=cursor, total=total)
+            return result, 200, cabeceras_etag(etag)
             
         except AppException as e:
             ns.abort(e.status_code, message=e.message)
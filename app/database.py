@@ -3,16 +3,58 @@ Modulo para manejo de conexiones a la base de datos y stored procedures
 Nos permite conectar la aplicacion con MySQL y ejecutar stored procedures
 Y asi, tener un acceso a la base de datos de manera uniforme y facil de usar en todos los controladores
 """
+import os
+import sys
+import threading
+import time
 import pymysql
+from pymysql.constants import CLIENT
 from contextlib import contextmanager
-from typing import Dict, List, Any, Optional, Tuple
+from functools import partial, wraps
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
 from app.config import Config
+from app import sql_trace
+from app.memory_db import get_memory_connection
+from app.pool import ConnectionPool
+from app.utils.metrics import registro
 
 config = Config()
 
+# Pool de conexiones del proceso (se crea en el primer uso y se recrea si el proceso fue forkeado)
+_pool: Optional[ConnectionPool] = None
+# Pool aparte con multi-statements, solo para call_sp_with_out_params_single_trip: las demas conexiones no aceptan
+# varias sentencias por llamada (un error de inyeccion no puede encadenar consultas)
+_pool_multi: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
 
-def get_db_connection():
-    """Obtener una conexion a la base de datos"""
+# Errores que indican que la conexion quedo inutilizable y no debe volver al pool
+_DISCARD_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+# Metricas de acceso a datos (GET /metrics): kind = procedure, query, function, stream o transaction;
+# name = nombre del SP o de la funcion del repositorio que ejecuto la consulta
+db_duracion = registro.histograma(
+    'db_call_duration_seconds', 'Duracion de stored procedures y consultas (incluye esperar conexion del pool)',
+    ('kind', 'name')
+)
+db_errores = registro.contador('db_call_errors_total', 'Stored procedures y consultas que fallaron', ('kind', 'name'))
+db_filas = registro.contador('db_call_rows_total', 'Filas devueltas por stored procedures y consultas', ('kind', 'name'))
+
+
+# Motores de datos soportados (DATABASE_BACKEND)
+BACKENDS = ('mysql', 'memory')
+
+
+def get_db_connection(multi_statements: bool = False):
+    """
+    Obtener una conexion a la base de datos (MySQL o el motor en memoria segun DATABASE_BACKEND)
+
+    Args:
+        multi_statements: Habilitar varias sentencias por llamada (solo para el lote CALL + SELECT de los OUT)
+    """
+    if config.DATABASE_BACKEND == 'memory':
+        return get_memory_connection()
+    if config.DATABASE_BACKEND != 'mysql':
+        raise ValueError(f"DATABASE_BACKEND invalido: {config.DATABASE_BACKEND} (opciones: {', '.join(BACKENDS)})")
     return pymysql.connect(
         host=config.DATABASE_HOST,
         port=config.DATABASE_PORT,
@@ -20,27 +62,229 @@ def get_db_connection():
         password=config.DATABASE_PASSWORD,
         database=config.DATABASE_NAME,
         cursorclass=pymysql.cursors.DictCursor,
-        autocommit=False
+        autocommit=False,
+        # Multi-statements permite enviar CALL + SELECT de parametros OUT en un solo viaje de red
+        client_flag=CLIENT.MULTI_STATEMENTS if multi_statements else 0
+    )
+
+
+# Funcion que abre las conexiones de los pools (se reemplaza con set_connection_creator, ej: conexiones simuladas)
+_creator: Callable[[], Any] = get_db_connection
+
+
+def set_connection_creator(creator: Optional[Callable[[], Any]] = None) -> None:
+    """
+    Reemplazar la funcion que abre las conexiones de los pools y cerrar los pools actuales
+
+    Args:
+        creator: Funcion sin argumentos que devuelve una conexion DB-API con cursores de diccionarios
+                 (None = pymysql con la configuracion del .env; se usa para los dos pools)
+    """
+    global _creator
+    close_pool()
+    _creator = creator or get_db_connection
+
+
+def _crear_pool(multi_statements: bool) -> ConnectionPool:
+    creator = _creator
+    if multi_statements and creator is get_db_connection:
+        creator = partial(get_db_connection, multi_statements=True)
+    return ConnectionPool(
+        creator=creator,
+        min_size=0 if multi_statements else config.DATABASE_POOL_MIN_SIZE,
+        max_size=config.DATABASE_SP_POOL_MAX_SIZE if multi_statements else config.DATABASE_POOL_MAX_SIZE,
+        timeout=config.DATABASE_POOL_TIMEOUT,
+        pre_ping=config.DATABASE_POOL_PRE_PING,
+        ping_interval=config.DATABASE_POOL_PING_INTERVAL,
+        max_lifetime=config.DATABASE_POOL_MAX_LIFETIME,
+        idle_timeout=config.DATABASE_POOL_IDLE_TIMEOUT
     )
 
 
+def get_pool(multi_statements: bool = False) -> ConnectionPool:
+    """
+    Obtener el pool de conexiones del proceso actual
+
+    Args:
+        multi_statements: Pool de conexiones con multi-statements (solo para call_sp_with_out_params_single_trip)
+    """
+    global _pool, _pool_multi
+    pool = _pool_multi if multi_statements else _pool
+    # Un proceso hijo (fork) no debe reutilizar los sockets del padre, por eso comparamos el PID
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if multi_statements:
+                if _pool_multi is None or _pool_multi.pid != os.getpid():
+                    _pool_multi = _crear_pool(True)
+                pool = _pool_multi
+            else:
+                if _pool is None or _pool.pid != os.getpid():
+                    _pool = _crear_pool(False)
+                pool = _pool
+    return pool
+
+
+def close_pool():
+    """Cerrar los pools de conexiones del proceso actual (ej: al apagar la aplicacion)"""
+    global _pool, _pool_multi
+    with _pool_lock:
+        for pool in (_pool, _pool_multi):
+            if pool is not None and pool.pid == os.getpid():
+                pool.close()
+        _pool = None
+        _pool_multi = None
+
+
+def _estado_pool() -> Optional[Dict[str, Any]]:
+    """Estado del pool del proceso actual sin crearlo (None si todavia no se uso)"""
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        return None
+    return pool.stats()
+
+
+def _metrica_pool(*claves: str, etiqueta: Optional[str] = None):
+    """Funcion para MetricaCallback que lee claves de pool.stats() (una muestra por clave si hay etiqueta)"""
+    def leer():
+        estado = _estado_pool()
+        if estado is None:
+            return []
+        return [({etiqueta: clave} if etiqueta else {}, estado[clave]) for clave in claves]
+    return leer
+
+
+registro.callback('db_pool_connections', 'Conexiones abiertas del pool por estado', 'gauge',
+                  _metrica_pool('idle', 'in_use', etiqueta='state'))
+registro.callback('db_pool_max_size', 'Maximo de conexiones del pool', 'gauge', _metrica_pool('max_size'))
+registro.callback('db_pool_waiting', 'Hilos esperando una conexion libre', 'gauge', _metrica_pool('waiting'))
+registro.callback('db_pool_created_total', 'Conexiones abiertas por el pool', 'counter', _metrica_pool('created'))
+registro.callback('db_pool_recycled_total', 'Conexiones recicladas por vencidas o rotas', 'counter',
+                  _metrica_pool('recycled'))
+registro.callback('db_pool_timeouts_total', 'Esperas de conexion que superaron DATABASE_POOL_TIMEOUT', 'counter',
+                  _metrica_pool('timeouts'))
+
+
+def _filas_resultado(resultado: Any) -> int:
+    """Filas de un resultado: lista de filas, una fila (dict) o (filas, valores OUT)"""
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 1 if isinstance(resultado, dict) else 0
+
+
+def _registrar_llamada(kind: str, name: str, inicio: float, filas: int, error: bool) -> None:
+    """Registrar duracion, filas y error de un acceso a la base"""
+    db_duracion.labels(kind, name).observe(time.perf_counter() - inicio)
+    if error:
+        db_errores.labels(kind, name).inc()
+    elif filas:
+        db_filas.labels(kind, name).inc(filas)
+
+
+def _parametros_llamada(args: Tuple, kwargs: Dict[str, Any]) -> Any:
+    """Parametros de la llamada (segundo argumento de las funciones de acceso a datos)"""
+    if len(args) > 1:
+        return args[1]
+    return kwargs.get('params', kwargs.get('in_params'))
+
+
+def _explicar(query: str, params: Any) -> List[Dict[str, Any]]:
+    """Plan de ejecucion de una consulta lenta (en otra conexion del pool, sin trazar)"""
+    with get_db() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {query}", params or None)
+            return list(cursor.fetchall())
+
+
+def _medido(kind: str, por_nombre: bool = True):
+    """
+    Decorador que mide una funcion de acceso a datos (metricas y traza de consultas lentas)
+
+    Args:
+        kind: Tipo de acceso (etiqueta kind)
+        por_nombre: True = la etiqueta name es el primer argumento (nombre del SP o funcion);
+                    False = la funcion del repositorio que la llamo (las consultas sueltas no tienen nombre)
+                    y el primer argumento es el texto SQL
+    """
+    def decorador(funcion: Callable) -> Callable:
+        @wraps(funcion)
+        def medida(*args, **kwargs):
+            metricas = config.METRICS_ENABLED
+            trazar = config.SQL_TRACE_ENABLED
+            if not (metricas or trazar):
+                return funcion(*args, **kwargs)
+            name = args[0] if por_nombre else sys._getframe(1).f_code.co_name
+            inicio = time.perf_counter()
+            traza = token = None
+            if trazar:
+                traza, token = sql_trace.iniciar(
+                    kind, name, None if por_nombre else args[0], _parametros_llamada(args, kwargs)
+                )
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception as e:
+                if metricas:
+                    _registrar_llamada(kind, name, inicio, 0, True)
+                if traza is not None:
+                    sql_trace.finalizar(traza, token, 0, error=e)
+                raise
+            except BaseException:
+                if traza is not None:
+                    sql_trace.descartar(token)
+                raise
+            filas = _filas_resultado(resultado)
+            if metricas:
+                _registrar_llamada(kind, name, inicio, filas, False)
+            if traza is not None:
+                sql_trace.finalizar(traza, token, filas, explicar=_explicar)
+            return resultado
+        return medida
+    return decorador
+
+
 @contextmanager
-def get_db():
+def medir(kind: str, name: str):
+    """Medir un bloque de acceso a datos que no pasa por las funciones de este modulo (ej: transacciones con get_db)"""
+    if not config.METRICS_ENABLED:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _registrar_llamada(kind, name, inicio, 0, True)
+        raise
+    _registrar_llamada(kind, name, inicio, 0, False)
+
+
+@contextmanager
+def get_db(multi_statements: bool = False):
     """Context manager para manejar conexiones a la base de datos con manejo de errores y commits/rollbacks"""
-    conn = None
+    pool = get_pool(multi_statements)
+    conn = pool.acquire()
+    sql_trace.marcar('conexion')
+    discard = False
     try:
-        conn = get_db_connection()
         yield conn  # Yield es como un return, pero para context managers
         # Si todo va bien, commiteamos la transaccion
         conn.commit()
     except Exception as e:
-        if conn:
+        # Si la conexion se corto no tiene sentido reutilizarla
+        discard = isinstance(e, _DISCARD_ERRORS)
+        try:
             # Si hay un error, rollbackamos la transaccion
             conn.rollback()
+        except Exception:
+            discard = True
         raise e
+    except BaseException:
+        # Interrupciones (ej: GeneratorExit): la transaccion queda a medias, no la devolvemos al pool
+        discard = True
+        raise
     finally:
-        if conn:
-            conn.close()
+        # En lugar de cerrar la conexion, la devolvemos al pool
+        pool.release(conn, discard=discard)
 
 # Esta función es la que usaremos en el inicio de la aplicación para verificar la conectividad con la base de datos
 def init_db():
@@ -55,6 +299,7 @@ def init_db():
         raise
 
 # Esta función es la que usaremos en los servicios para ejecutar stored procedures
+@_medido('procedure')
 def call_stored_procedure(
     procedure_name: str,
     params: Optional[Tuple] = None,
@@ -81,6 +326,7 @@ def call_stored_procedure(
                     cursor.callproc(procedure_name, params)
                 else:
                     cursor.callproc(procedure_name)
+                sql_trace.marcar('ejecucion')
                 if fetch:
                     # pymysql: usar fetchall() directamente despues de callproc
                     results = cursor.fetchall()
@@ -90,6 +336,7 @@ def call_stored_procedure(
                         more_results = cursor.fetchall()
                         if more_results:
                             all_results.append(more_results)
+                    sql_trace.marcar('lectura')
                     # Retornar el primer result set (comportamiento mas comun)
                     return all_results[0] if all_results else None
                 else:
@@ -98,6 +345,7 @@ def call_stored_procedure(
         raise
 
 # Esta función es la que usaremos en los repositorios para ejecutar funciones de MySQL
+@_medido('function')
 def call_function(
     function_name: str,
     params: Optional[Tuple] = None
@@ -125,12 +373,15 @@ def call_function(
                 else:
                     query = f"SELECT {function_name}() AS result"
                     cursor.execute(query)
+                sql_trace.marcar('ejecucion')
                 result = cursor.fetchone()
+                sql_trace.marcar('lectura')
                 return result['result'] if result else None
     except Exception as e:
         raise
 
 # Esta función es la que usaremos en los repositorios para ejecutar consultas SQL personalizadas
+@_medido('query', por_nombre=False)
 def execute_query(
     query: str,
     params: Optional[Tuple] = None,
@@ -158,18 +409,71 @@ def execute_query(
                     cursor.execute(query, params)
                 else:
                     cursor.execute(query)
+                sql_trace.marcar('ejecucion')
                 if fetch:
                     results = cursor.fetchall()
+                    sql_trace.marcar('lectura')
                     return results if results else None
                 elif fetch_one:
                     result = cursor.fetchone()
+                    sql_trace.marcar('lectura')
                     return result if result else None
                 else:
                     return None
     except Exception as e:
         raise
 
+# Esta función es la que usaremos en los repositorios para exportaciones grandes (filas de a una, sin cargarlas en memoria)
+def stream_query(
+    query: str,
+    params: Optional[Tuple] = None,
+    batch_size: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """
+    Ejecutar una consulta con un cursor sin buffer del lado del servidor (SSDictCursor) y devolver las filas de a una
+    
+    La conexion queda tomada del pool mientras se recorre el generador. Si el generador se cierra antes de
+    terminar (ej: el cliente corto la descarga), la conexion se descarta porque quedan filas sin leer en el socket.
+    
+    Args:
+        query: Consulta SQL
+        params: Tupla con los parametros de la consulta
+        batch_size: Filas que se leen del socket por vez
+    
+    Returns:
+        Generador de filas como diccionarios (se mide desde que se crea hasta que se termina o se cierra)
+    """
+    # La etiqueta name es la funcion del repositorio que pidio la exportacion
+    return _stream_query(query, params, batch_size, sys._getframe(1).f_code.co_name)
+
+
+def _stream_query(query: str, params: Optional[Tuple], batch_size: int, name: str) -> Iterator[Dict[str, Any]]:
+    inicio = time.perf_counter()
+    filas_leidas = 0
+    error = False
+    try:
+        with get_db() as conn:
+            # Sin 'with' en el cursor: SSDictCursor.close() lee y descarta las filas pendientes, asi
+            # que si el cliente corta la descarga (GeneratorExit) no lo cerramos y get_db descarta
+            # la conexion entera en lugar de drenar el resto del resultado
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute(query, params)
+            while True:
+                filas = cursor.fetchmany(batch_size)
+                if not filas:
+                    break
+                filas_leidas += len(filas)
+                yield from filas
+            cursor.close()
+    except Exception:
+        error = True
+        raise
+    finally:
+        if config.METRICS_ENABLED:
+            _registrar_llamada('stream', name, inicio, filas_leidas, error)
+
 # Esta función es la que usaremos en los repositorios para ejecutar stored procedures con parámetros OUT (salida de datos)
+@_medido('procedure')
 def call_sp_with_out_params(
     procedure_name: str,
     in_params: Tuple,
@@ -203,6 +507,7 @@ def call_sp_with_out_params(
             with conn.cursor() as cursor:
                 all_params = list(in_params) + [None] * out_param_count
                 cursor.callproc(procedure_name, all_params)
+                sql_trace.marcar('ejecucion')
                 results = cursor.fetchall()
 
                 out_param_names = [
@@ -216,7 +521,70 @@ def call_sp_with_out_params(
                     out_values = tuple(out_result.values()) if out_result else tuple([None] * out_param_count)
                 else:
                     out_values = ()
+                sql_trace.marcar('lectura')
 
                 return results if results else None, out_values
     except Exception as e:
         raise
+
+# Esta función es la que usaremos en los repositorios para ejecutar stored procedures con parámetros OUT en un solo viaje de red
+@_medido('procedure')
+def call_sp_with_out_params_single_trip(
+    procedure_name: str,
+    in_params: Tuple,
+    out_param_count: int
+) -> Tuple[Optional[List[Dict[str, Any]]], Tuple]:
+    """
+    Ejecutar un stored procedure con parametros OUT en un unico viaje de red (mas el commit)
+
+    A diferencia de call_sp_with_out_params (SET de variables + CALL + SELECT de los OUT = 3 viajes),
+    envia el CALL y el SELECT de las variables OUT como un solo lote multi-statement
+    y lee los valores OUT del ultimo result set. Usa el pool de conexiones con multi-statements (el resto de la
+    aplicacion usa conexiones que solo aceptan una sentencia por llamada).
+    Si DATABASE_SP_SINGLE_ROUND_TRIP esta deshabilitado, delega en call_sp_with_out_params.
+
+    Args:
+        procedure_name: Nombre del stored procedure
+        in_params: Tupla con los parametros IN del stored procedure
+        out_param_count: Numero de parametros OUT
+
+    Returns:
+        Tupla con (resultados del SELECT si hay, tupla de valores OUT)
+
+    Raises:
+        Exception: Si hay un error al ejecutar el stored procedure
+    """
+    if not config.DATABASE_SP_SINGLE_ROUND_TRIP:
+        # Sin el decorador: la llamada ya se mide en esta funcion
+        return call_sp_with_out_params.__wrapped__(procedure_name, in_params, out_param_count)
+
+    out_param_names = [
+        f"@_{procedure_name}_{i}"
+        for i in range(len(in_params), len(in_params) + out_param_count)
+    ]
+    # Los parametros IN se escapan con el driver (placeholders %s), las variables OUT van literales
+    call_args = ', '.join(['%s'] * len(in_params) + out_param_names)
+    query = f"CALL {procedure_name}({call_args})"
+    if out_param_names:
+        query += f"; SELECT {', '.join(out_param_names)}"
+
+    with get_db(multi_statements=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, tuple(in_params))
+            sql_trace.marcar('ejecucion')
+            # Recorremos todos los result sets del lote: primero los del SP, luego el estado del CALL y por ultimo los OUT
+            result_sets = []
+            while True:
+                if cursor.description:
+                    result_sets.append(cursor.fetchall())
+                if not cursor.nextset():
+                    break
+            sql_trace.marcar('lectura')
+
+            out_values = ()
+            if out_param_names:
+                out_rows = result_sets.pop() if result_sets else None
+                out_values = tuple(out_rows[0].values()) if out_rows else tuple([None] * out_param_count)
+
+            results = result_sets[0] if result_sets else None
+            return results if results else None, out_values
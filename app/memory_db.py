@@ -0,0 +1,1100 @@
+"""
+Motor de datos local en memoria (DATABASE_BACKEND=memory)
+Nos permite correr la aplicacion, las pruebas de carga y el perfilado sin un servidor MySQL:
+- Reemplaza a pymysql a nivel de conexion (callproc, execute con CALL + SELECT de los OUT, cursores de diccionarios),
+  asi los repositorios y app/database.py no cambian
+- Reproduce las tablas de init_db.sql, los stored procedures (con los mismos mensajes y redondeos de DECIMAL(12,2)),
+  los triggers del resumen de ocupacion y cada consulta SQL de los repositorios (con indices en memoria)
+- La tabla ClavesIdempotencia se escribe al ejecutar cada sentencia (el repositorio usa transacciones de una sola
+  operacion, asi que el commit no cambia lo que se ve)
+- Carga los datos de seed_db.sql (DATABASE_MEMORY_SEED) y puede agregar funciones sinteticas para pruebas de volumen
+- Transacciones como InnoDB: las reservas insertadas se ven recien despues del commit, SELECT ... FOR UPDATE bloquea
+  las funciones hasta el commit y el INSERT espera esos bloqueos (clave foranea), con timeout de espera
+Las consultas que no reconoce fallan con ProgrammingError para que un cambio en los repositorios no pase desapercibido
+"""
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
+from random import Random
+from typing import Any, Callable, DefaultDict, Dict, List, Optional, Sequence, Set, Tuple
+
+import pymysql
+
+from app.config import Config
+
+config = Config()
+
+# Filas de una consulta o None (sentencia sin filas); DELETE, UPDATE e INSERT IGNORE devuelven las filas afectadas
+ResultSet = Optional[List[Dict[str, Any]]]
+
+# Clave de los indices de funciones y reservas: (FechaInicio, Id)
+ClaveFecha = Tuple[datetime, int]
+
+# Mensajes de los stored procedures (init_db.sql)
+MSG_OK = 'OK'
+MSG_FUNCION_NO_ENCONTRADA = 'Funcion no encontrada'
+MSG_FUNCION_INACTIVA = 'Funcion inactiva o finalizada'
+MSG_BUTACA_INEXISTENTE = 'Butaca inexistente en la sala de la funcion'
+MSG_BUTACA_RESERVADA = 'Butaca ya reservada para esta funcion'
+MSG_LIMITE_DNI = 'Limite de 4 reservas activas y pagadas por fecha superado para este DNI'
+
+LIMITE_RESERVAS_DNI_POR_FECHA = 4
+
+# Reglas de SP_DeterminarPrecioEntrada
+GENEROS_RECARGO = ('estreno', '3d')
+RECARGO_GENERO = Decimal('1.10')
+SALA_VIP = 1
+RECARGO_SALA_VIP = Decimal('1.05')
+_CENTAVOS = Decimal('0.01')
+
+# Errores de MySQL que devuelve el motor (mismos codigos que el servidor)
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_NO_REFERENCED_ROW = 1452
+ER_SP_DOES_NOT_EXIST = 1305
+ER_PARSE_ERROR = 1064
+
+_NOMBRE_CALL = re.compile(r'CALL\s+(\w+)\s*\(')
+_VARIABLES = re.compile(r'@\w+')
+_LISTA_IN = re.compile(r'IN \(((?:%s(?:, )?)+)\)')
+
+# Consultas ya resueltas a su funcion (los repositorios reutilizan los mismos textos)
+_MAX_CONSULTAS_RESUELTAS = 1024
+
+
+def _decimal(valor: Decimal) -> Decimal:
+    """Redondeo de una asignacion a DECIMAL(12,2) (MySQL redondea la mitad hacia arriba)"""
+    return valor.quantize(_CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def _a_datetime(valor: Any) -> datetime:
+    """Parametro DATETIME: las fechas sin hora son la medianoche, como en MySQL"""
+    if isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, date):
+        return datetime.combine(valor, dt_time.min)
+    return datetime.fromisoformat(str(valor))
+
+
+def _a_fecha(valor: Any) -> date:
+    """Parametro DATE: la hora se descarta"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.fromisoformat(str(valor)).date()
+
+
+def _normalizar(sql: str) -> str:
+    return ' '.join(sql.split())
+
+
+def _cantidades_in(texto: str) -> List[int]:
+    """Cantidad de placeholders de cada lista IN (%s, ...) de la consulta, en orden"""
+    return [grupo.count('%s') for grupo in _LISTA_IN.findall(texto)]
+
+
+class _Transaccion:
+    """Estado de la transaccion abierta de una conexion"""
+    __slots__ = ('pendientes', 'bloqueos')
+
+    def __init__(self):
+        # Reservas insertadas: se aplican (y las ven las otras conexiones) recien en el commit
+        self.pendientes: List[Dict[str, Any]] = []
+        # Funciones bloqueadas con SELECT ... FOR UPDATE hasta el commit o rollback
+        self.bloqueos: Set[int] = set()
+
+
+class MotorMemoria:
+    """
+    Base de datos del cine en memoria: tablas, indices, stored procedures y consultas de los repositorios
+
+    Cada statement se ejecuta con el lock del motor; las conexiones solo ven las reservas confirmadas (las propias
+    sin confirmar tampoco: ningun repositorio vuelve a leer lo que inserto en la misma transaccion). Como en InnoDB,
+    las validaciones de SP_ReservarButacaConValidacionDNI son lecturas sin bloqueo, asi que dos transacciones
+    concurrentes pueden reservar la misma butaca si ninguna confirmo todavia
+    """
+
+    def __init__(self, lock_wait_timeout: float = 50.0):
+        self.lock_wait_timeout = lock_wait_timeout
+        self._lock = threading.Lock()
+        self._liberado = threading.Condition(self._lock)
+
+        # Tablas (fila = diccionario con las columnas de init_db.sql)
+        self.generos: Dict[int, Dict[str, Any]] = {}
+        self.salas: Dict[int, Dict[str, Any]] = {}
+        self.peliculas: Dict[int, Dict[str, Any]] = {}
+        self.butacas: Dict[int, Dict[str, Any]] = {}
+        self.funciones: Dict[int, Dict[str, Any]] = {}
+        self.reservas: Dict[int, Dict[str, Any]] = {}
+        self.resumen: Dict[int, Dict[str, Any]] = {}
+        self.claves_idempotencia: Dict[str, Dict[str, Any]] = {}
+        # VersionesReservasDNI y VersionCatalogo (los suben los triggers)
+        self.versiones_dni: DefaultDict[str, int] = defaultdict(int)
+        self.version_catalogo = 0
+        self._siguiente_reserva = 1
+
+        # Indices
+        self._butacas_por_sala: DefaultDict[int, List[Dict[str, Any]]] = defaultdict(list)
+        self._activas: List[ClaveFecha] = []
+        self._activas_por_pelicula: DefaultDict[int, List[ClaveFecha]] = defaultdict(list)
+        self._reservas_por_dni: DefaultDict[str, List[ClaveFecha]] = defaultdict(list)
+        # Reservas activas por (IdFuncion, IdButaca): puede ser mas de 1 si hubo una doble reserva
+        self._ocupadas: DefaultDict[Tuple[int, int], int] = defaultdict(int)
+        # Reservas activas y pagadas por DNI y fecha de la funcion (regla del limite por DNI)
+        self._vendidas_dni: DefaultDict[str, DefaultDict[date, int]] = defaultdict(lambda: defaultdict(int))
+
+        # Bloqueos de filas de Funciones: IdFuncion -> transaccion duena
+        self._bloqueos: Dict[int, _Transaccion] = {}
+
+        self._consultas: Dict[str, Callable[[Tuple], ResultSet]] = {}
+        self._procedimientos: Dict[str, Tuple[Callable, int]] = {
+            'SP_DeterminarPrecioEntrada': (self._sp_precio, 2),
+            'SP_ReservarButacaConValidacionDNI': (self._sp_reservar, 1),
+            'SP_ReporteOcupacionPorPelicula': (self._sp_reporte, 0),
+            'SP_ReservasPorDNI': (self._sp_reservas_por_dni, 0),
+            'SP_VerificarResumenOcupacion': (self._sp_verificar_resumen, 0),
+            'SP_ReconstruirResumenOcupacion': (self._sp_reconstruir_resumen, 0),
+        }
+        self._estadisticas = {'statements': 0, 'commits': 0, 'rollbacks': 0, 'esperas_bloqueo': 0,
+                              'timeouts_bloqueo': 0}
+
+    # ------------------------------------------------------------------
+    # Carga de datos
+    # ------------------------------------------------------------------
+
+    def insertar(self, tabla: str, fila: Dict[str, Any]) -> None:
+        """Insertar una fila confirmada (carga inicial); las reservas disparan el trigger del resumen"""
+        with self._lock:
+            self._insertar(tabla, dict(fila))
+
+    def _insertar(self, tabla: str, fila: Dict[str, Any]) -> None:
+        if tabla in ('Salas', 'Peliculas', 'Funciones'):
+            # TRG_<tabla>_AI_VersionCatalogo
+            self.version_catalogo += 1
+        if tabla == 'Generos':
+            self.generos[fila['IdGenero']] = fila
+        elif tabla == 'Salas':
+            self.salas[fila['IdSala']] = fila
+        elif tabla == 'Peliculas':
+            self.peliculas[fila['IdPelicula']] = fila
+        elif tabla == 'Butacas':
+            self.butacas[fila['IdButaca']] = fila
+            butacas = self._butacas_por_sala[fila['IdSala']]
+            butacas.append(fila)
+            butacas.sort(key=lambda butaca: (butaca['Fila'], butaca['Columna'], butaca['IdButaca']))
+        elif tabla == 'Funciones':
+            for columna in ('FechaProbableInicio', 'FechaProbableFin', 'FechaInicio', 'FechaFin'):
+                if fila.get(columna) is not None:
+                    fila[columna] = _a_datetime(fila[columna])
+            fila['Precio'] = _decimal(Decimal(str(fila['Precio'])))
+            self.funciones[fila['IdFuncion']] = fila
+            if fila['Estado'] == 'A':
+                clave = (fila['FechaInicio'], fila['IdFuncion'])
+                insort(self._activas, clave)
+                insort(self._activas_por_pelicula[fila['IdPelicula']], clave)
+        elif tabla == 'Reservas':
+            for columna in ('FechaAlta', 'FechaBaja'):
+                if fila.get(columna) is not None:
+                    fila[columna] = _a_datetime(fila[columna])
+            fila.setdefault('FechaBaja', None)
+            fila.setdefault('Observaciones', None)
+            if fila.get('IdReserva') is None:
+                fila['IdReserva'] = self._siguiente_reserva
+            self._siguiente_reserva = max(self._siguiente_reserva, fila['IdReserva'] + 1)
+            self._aplicar_reserva(fila)
+        else:
+            raise ValueError(f"Tabla no soportada por el motor en memoria: {tabla}")
+
+    def _aplicar_reserva(self, fila: Dict[str, Any]) -> None:
+        """Agregar una reserva confirmada a la tabla, los indices, el resumen y la version del DNI (triggers AI)"""
+        self.reservas[fila['IdReserva']] = fila
+        self.versiones_dni[fila['DNI']] += 1
+        funcion = self.funciones[fila['IdFuncion']]
+        insort(self._reservas_por_dni[fila['DNI']], (funcion['FechaInicio'], fila['IdReserva']))
+        if fila['FechaBaja'] is not None:
+            return
+        self._ocupadas[(fila['IdFuncion'], fila['IdButaca'])] += 1
+        if fila['EstaPagada'] == 'S':
+            self._vendidas_dni[fila['DNI']][funcion['FechaInicio'].date()] += 1
+            resumen = self.resumen.get(fila['IdFuncion'])
+            if resumen is None:
+                self.resumen[fila['IdFuncion']] = {'ButacasVendidas': 1, 'FechaActualizacion': datetime.now(),
+                                                   'Version': 1}
+            else:
+                resumen['ButacasVendidas'] += 1
+                resumen['FechaActualizacion'] = datetime.now()
+                resumen['Version'] += 1
+
+    def generar_funciones(self, cantidad: int, ocupacion: float = 0.3, semilla: int = 0,
+                          desde: datetime = datetime(2026, 1, 5, 14, 0)) -> None:
+        """
+        Agregar funciones activas sinteticas (con reservas pagadas) para pruebas de volumen
+
+        Args:
+            cantidad: Funciones a agregar, repartidas entre las peliculas activas y las salas con butacas
+            ocupacion: Fraccion de las butacas de cada funcion que quedan reservadas (0.0 a 1.0)
+            semilla: Semilla del generador (mismos datos en cada corrida)
+            desde: Fecha de la primera funcion (cuatro funciones por sala y por dia)
+        """
+        azar = Random(semilla)
+        with self._lock:
+            peliculas = sorted(id_pelicula for id_pelicula, fila in self.peliculas.items() if fila['Estado'] == 'A')
+            salas = sorted(id_sala for id_sala, butacas in self._butacas_por_sala.items() if butacas)
+            if not peliculas or not salas:
+                raise ValueError("Se necesitan peliculas activas y salas con butacas para generar funciones")
+            id_funcion = max(self.funciones, default=0)
+            for i in range(cantidad):
+                id_funcion += 1
+                id_sala = salas[(i // 4) % len(salas)]
+                inicio = desde + timedelta(days=i // (4 * len(salas)), hours=(i % 4) * 3)
+                self._insertar('Funciones', {
+                    'IdFuncion': id_funcion, 'IdPelicula': peliculas[i % len(peliculas)], 'IdSala': id_sala,
+                    'FechaProbableInicio': inicio, 'FechaProbableFin': inicio + timedelta(hours=2, minutes=30),
+                    'FechaInicio': inicio, 'FechaFin': None, 'Precio': Decimal(900 + (i % 10) * 50),
+                    'Estado': 'A', 'Observaciones': 'Sintetica'
+                })
+                butacas = self._butacas_por_sala[id_sala]
+                for butaca in azar.sample(butacas, int(len(butacas) * ocupacion)):
+                    dni = str(azar.randrange(10_000_000, 100_000_000))
+                    if self._vendidas_dni[dni][inicio.date()] >= LIMITE_RESERVAS_DNI_POR_FECHA:
+                        continue
+                    self._insertar('Reservas', {
+                        'IdFuncion': id_funcion, 'IdPelicula': peliculas[i % len(peliculas)], 'IdSala': id_sala,
+                        'IdButaca': butaca['IdButaca'], 'DNI': dni, 'FechaAlta': inicio - timedelta(days=1),
+                        'FechaBaja': None, 'EstaPagada': 'S', 'Observaciones': None
+                    })
+
+    # ------------------------------------------------------------------
+    # Transacciones y bloqueos
+    # ------------------------------------------------------------------
+
+    def confirmar(self, transaccion: _Transaccion) -> None:
+        """Commit: aplicar las reservas insertadas y liberar los bloqueos"""
+        with self._lock:
+            for fila in transaccion.pendientes:
+                self._aplicar_reserva(fila)
+            transaccion.pendientes = []
+            self._estadisticas['commits'] += 1
+            self._liberar(transaccion)
+
+    def descartar(self, transaccion: _Transaccion) -> None:
+        """Rollback: descartar las reservas insertadas y liberar los bloqueos"""
+        with self._lock:
+            transaccion.pendientes = []
+            self._estadisticas['rollbacks'] += 1
+            self._liberar(transaccion)
+
+    def _liberar(self, transaccion: _Transaccion) -> None:
+        if not transaccion.bloqueos:
+            return
+        for id_funcion in transaccion.bloqueos:
+            del self._bloqueos[id_funcion]
+        transaccion.bloqueos.clear()
+        self._liberado.notify_all()
+
+    def _esperar_bloqueo(self, transaccion: _Transaccion, id_funcion: int, tomar: bool) -> None:
+        """
+        Esperar (con el lock del motor tomado) a que otra transaccion libere la funcion
+
+        Args:
+            tomar: True = SELECT ... FOR UPDATE (la funcion queda bloqueada hasta el commit);
+                   False = chequeo de clave foranea del INSERT (solo espera)
+        """
+        duena = self._bloqueos.get(id_funcion)
+        if duena is not None and duena is not transaccion:
+            self._estadisticas['esperas_bloqueo'] += 1
+            limite = time.monotonic() + self.lock_wait_timeout
+            while duena is not None and duena is not transaccion:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._estadisticas['timeouts_bloqueo'] += 1
+                    raise pymysql.err.OperationalError(
+                        ER_LOCK_WAIT_TIMEOUT, 'Lock wait timeout exceeded; try restarting transaction'
+                    )
+                self._liberado.wait(restante)
+                duena = self._bloqueos.get(id_funcion)
+        if tomar:
+            self._bloqueos[id_funcion] = transaccion
+            transaccion.bloqueos.add(id_funcion)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Statements, commits, rollbacks y esperas de bloqueo desde que se creo el motor"""
+        with self._lock:
+            return dict(self._estadisticas, reservas=len(self.reservas), funciones_bloqueadas=len(self._bloqueos))
+
+    # ------------------------------------------------------------------
+    # Ejecucion de statements
+    # ------------------------------------------------------------------
+
+    def cantidad_outs(self, nombre: str) -> int:
+        return self._procedimientos[nombre][1] if nombre in self._procedimientos else 0
+
+    def procedimiento(self, transaccion: _Transaccion, nombre: str, params: Tuple) -> Tuple[List[ResultSet], Tuple]:
+        """Ejecutar un stored procedure: (result sets, valores OUT)"""
+        if nombre not in self._procedimientos:
+            raise pymysql.err.OperationalError(
+                ER_SP_DOES_NOT_EXIST, f"PROCEDURE {config.DATABASE_NAME}.{nombre} does not exist"
+            )
+        funcion = self._procedimientos[nombre][0]
+        with self._lock:
+            self._estadisticas['statements'] += 1
+            return funcion(transaccion, *params)
+
+    def consulta(self, transaccion: _Transaccion, sql: str, params: Optional[Tuple]) -> ResultSet:
+        """Ejecutar una consulta de los repositorios: filas, o None si no devuelve filas (INSERT)"""
+        ejecutar = self._consultas.get(sql)
+        if ejecutar is None:
+            ejecutar = self._resolver(_normalizar(sql))
+            if len(self._consultas) >= _MAX_CONSULTAS_RESUELTAS:
+                self._consultas.clear()
+            self._consultas[sql] = ejecutar
+        with self._lock:
+            self._estadisticas['statements'] += 1
+            return ejecutar(transaccion, tuple(params or ()))
+
+    def _resolver(self, texto: str) -> Callable[[_Transaccion, Tuple], ResultSet]:
+        """Funcion que responde la consulta segun su texto normalizado (misma forma que los SQL de los repositorios)"""
+        if texto.startswith('EXPLAIN '):
+            return partial(self._explain, self._resolver(texto[len('EXPLAIN '):]), texto[len('EXPLAIN '):])
+        if texto == 'SELECT 1':
+            return lambda transaccion, params: [{'1': 1}]
+        if texto.startswith('INSERT INTO Reservas'):
+            return self._insertar_reserva
+        if texto.startswith('SELECT IdFuncion, IdSala, IdPelicula, FechaInicio, Estado, FechaFin FROM Funciones') \
+                and texto.endswith('FOR UPDATE'):
+            return self._funciones_para_actualizar
+        if texto.startswith('SELECT IdButaca, IdSala FROM Butacas WHERE IdButaca IN'):
+            return self._salas_de_butacas
+        if texto.startswith('SELECT IdFuncion, IdButaca FROM Reservas'):
+            return partial(self._butacas_ocupadas, _cantidades_in(texto)[0])
+        if texto.startswith('SELECT r.DNI, DATE(f.FechaInicio) AS Fecha, COUNT(*) AS Cantidad'):
+            return partial(self._vendidas_por_dni_y_fecha, _cantidades_in(texto)[0])
+        if texto.startswith('SELECT IdFuncion, IdButaca, COUNT(*) AS Reservas FROM Reservas'):
+            return self._butacas_duplicadas
+        if texto.startswith('SELECT r.DNI, DATE(f.FechaInicio) AS Fecha, COUNT(*) AS Reservas'):
+            return self._dnis_sobre_limite
+        if 'AS PrecioFinal' in texto:
+            return self._precios_funciones
+        if 'AS Ocupada' in texto:
+            return self._mapa_butacas
+        if texto.startswith('SELECT r.IdReserva, r.DNI'):
+            return partial(self._pagina_reservas, 'r.IdReserva > %s' in texto)
+        if texto == 'SELECT COUNT(*) AS Total FROM Reservas WHERE DNI = %s':
+            return self._contar_reservas
+        if texto == 'SELECT IdReserva FROM Reservas WHERE DNI = %s':
+            return self._ids_reservas
+        if 'FROM VersionesReservasDNI WHERE DNI = %s' in texto:
+            return self._version_reservas
+        if texto.startswith('SELECT pf.IdFuncion'):
+            return partial(self._pagina_reporte, 'f.IdFuncion > %s' in texto)
+        if texto.startswith('SELECT COUNT(*) AS Total FROM Funciones f WHERE'):
+            return partial(self._contar_funciones, 'f.IdPelicula = %s' in texto)
+        if 'SUM(ro.Version)' in texto:
+            todas = "IN (SELECT IdPelicula FROM Peliculas WHERE Estado = 'A')" in texto
+            return partial(self._version_reporte, None if todas else _cantidades_in(texto)[0])
+        if texto.startswith('SELECT f.IdPelicula, f.IdFuncion'):
+            return partial(self._exportar_reporte, 'f.IdPelicula = %s' in texto)
+        if texto == "SELECT IdPelicula, Pelicula FROM Peliculas WHERE Estado = 'A' ORDER BY IdPelicula":
+            return self._peliculas_activas
+        if texto.startswith('SELECT IdPelicula, Pelicula FROM Peliculas WHERE IdPelicula IN'):
+            return self._peliculas_por_id
+        if 'ClavesIdempotencia' in texto:
+            return self._resolver_idempotencia(texto)
+        raise pymysql.err.ProgrammingError(
+            ER_PARSE_ERROR, f"Consulta no soportada por el motor en memoria: {texto[:200]}"
+        )
+
+    # ------------------------------------------------------------------
+    # Stored procedures (init_db.sql)
+    # ------------------------------------------------------------------
+
+    def _funcion_vigente(self, id_funcion: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Funcion y mensaje de error comun a los SP de precio y reserva (None si esta activa y no finalizada)"""
+        funcion = self.funciones.get(int(id_funcion)) if id_funcion is not None else None
+        if funcion is None:
+            return None, MSG_FUNCION_NO_ENCONTRADA
+        if funcion['Estado'] != 'A' or funcion['FechaFin'] is not None:
+            return funcion, MSG_FUNCION_INACTIVA
+        return funcion, None
+
+    def _genero(self, funcion: Dict[str, Any]) -> Optional[str]:
+        """Genero de la pelicula de la funcion (None si falta la pelicula o el genero, como el JOIN)"""
+        pelicula = self.peliculas.get(funcion['IdPelicula'])
+        genero = self.generos.get(pelicula['IdGenero']) if pelicula is not None else None
+        return genero['Genero'] if genero is not None else None
+
+    @staticmethod
+    def _precio_final(funcion: Dict[str, Any], genero: str) -> Decimal:
+        """Reglas de precio de SP_DeterminarPrecioEntrada (cada asignacion redondea a DECIMAL(12,2))"""
+        base = funcion['Precio']
+        precio = base
+        # La comparacion de textos de MySQL (utf8mb4_unicode_ci) no distingue mayusculas
+        if genero.casefold() in GENEROS_RECARGO:
+            precio = _decimal(precio * RECARGO_GENERO)
+        if funcion['IdSala'] == SALA_VIP:
+            precio = _decimal(precio * RECARGO_SALA_VIP)
+        return max(precio, base)
+
+    def _sp_precio(self, transaccion: _Transaccion, id_funcion: Any, *_outs) -> Tuple[List[ResultSet], Tuple]:
+        """SP_DeterminarPrecioEntrada: OUT (precio final, mensaje)"""
+        funcion = self.funciones.get(int(id_funcion)) if id_funcion is not None else None
+        genero = self._genero(funcion) if funcion is not None else None
+        if genero is None:
+            return [], (None, MSG_FUNCION_NO_ENCONTRADA)
+        if funcion['Estado'] != 'A' or funcion['FechaFin'] is not None:
+            return [], (None, MSG_FUNCION_INACTIVA)
+        return [], (self._precio_final(funcion, genero), MSG_OK)
+
+    def _sp_reservar(self, transaccion: _Transaccion, id_funcion: Any, id_butaca: Any, dni: Any,
+                     *_outs) -> Tuple[List[ResultSet], Tuple]:
+        """SP_ReservarButacaConValidacionDNI: OUT (mensaje)"""
+        funcion, error = self._funcion_vigente(id_funcion)
+        if error is not None:
+            return [], (error,)
+        id_butaca = int(id_butaca) if id_butaca is not None else None
+        butaca = self.butacas.get(id_butaca)
+        if butaca is None or butaca['IdSala'] != funcion['IdSala']:
+            return [], (MSG_BUTACA_INEXISTENTE,)
+        # Lecturas sin bloqueo: solo se ven las reservas confirmadas
+        if self._ocupadas.get((funcion['IdFuncion'], id_butaca), 0) > 0:
+            return [], (MSG_BUTACA_RESERVADA,)
+        vendidas = self._vendidas_dni.get(dni)
+        if vendidas is not None and vendidas.get(funcion['FechaInicio'].date(), 0) >= LIMITE_RESERVAS_DNI_POR_FECHA:
+            return [], (MSG_LIMITE_DNI,)
+        self._pendiente(transaccion, funcion['IdFuncion'], funcion['IdPelicula'], funcion['IdSala'], id_butaca, dni)
+        return [], (MSG_OK,)
+
+    def _sp_reporte(self, transaccion: _Transaccion, id_pelicula: Any, fecha_inicio: Any,
+                    fecha_fin: Any) -> Tuple[List[ResultSet], Tuple]:
+        """SP_ReporteOcupacionPorPelicula: funciones activas de la pelicula en [fecha_inicio, fecha_fin + 1 dia)"""
+        desde = _a_datetime(_a_fecha(fecha_inicio))
+        hasta = _a_datetime(_a_fecha(fecha_fin) + timedelta(days=1))
+        claves = self._funciones_periodo(int(id_pelicula), desde, hasta)
+        return [[self._fila_reporte(id_funcion) for _, id_funcion in claves]], ()
+
+    def _sp_reservas_por_dni(self, transaccion: _Transaccion, dni: Any) -> Tuple[List[ResultSet], Tuple]:
+        """SP_ReservasPorDNI: reservas del DNI (activas o no) ordenadas por FechaInicio"""
+        return [[self._fila_reserva(id_reserva) for _, id_reserva in self._reservas_por_dni.get(dni, ())]], ()
+
+    def _vendidas_reales(self) -> Dict[int, int]:
+        """Reservas activas y pagadas por funcion, contadas desde Reservas"""
+        vendidas: DefaultDict[int, int] = defaultdict(int)
+        for reserva in self.reservas.values():
+            if reserva['FechaBaja'] is None and reserva['EstaPagada'] == 'S':
+                vendidas[reserva['IdFuncion']] += 1
+        return vendidas
+
+    def _sp_verificar_resumen(self, transaccion: _Transaccion) -> Tuple[List[ResultSet], Tuple]:
+        """SP_VerificarResumenOcupacion: funciones cuyo resumen no coincide con las reservas"""
+        reales = self._vendidas_reales()
+        desvios = []
+        for id_funcion in sorted(self.funciones):
+            resumen = self.resumen.get(id_funcion)
+            en_resumen = resumen['ButacasVendidas'] if resumen is not None else 0
+            if en_resumen != reales.get(id_funcion, 0):
+                desvios.append({'IdFuncion': id_funcion, 'ButacasResumen': en_resumen,
+                                'ButacasReales': reales.get(id_funcion, 0)})
+        return [desvios], ()
+
+    def _sp_reconstruir_resumen(self, transaccion: _Transaccion) -> Tuple[List[ResultSet], Tuple]:
+        """SP_ReconstruirResumenOcupacion: recalcular el resumen completo desde Reservas"""
+        ahora = datetime.now()
+        self.resumen = {id_funcion: {'ButacasVendidas': cantidad, 'FechaActualizacion': ahora, 'Version': 1}
+                        for id_funcion, cantidad in self._vendidas_reales().items()}
+        self.version_catalogo += 1
+        return [[{'FuncionesResumidas': len(self.resumen)}]], ()
+
+    # ------------------------------------------------------------------
+    # Consultas de los repositorios
+    # ------------------------------------------------------------------
+
+    def _pendiente(self, transaccion: _Transaccion, id_funcion: int, id_pelicula: int, id_sala: int,
+                   id_butaca: int, dni: str) -> int:
+        """INSERT de una reserva pagada: espera los bloqueos de la funcion y queda pendiente hasta el commit"""
+        self._esperar_bloqueo(transaccion, id_funcion, tomar=False)
+        id_reserva = self._siguiente_reserva
+        self._siguiente_reserva += 1
+        transaccion.pendientes.append({
+            'IdReserva': id_reserva, 'IdFuncion': id_funcion, 'IdPelicula': id_pelicula, 'IdSala': id_sala,
+            'IdButaca': id_butaca, 'DNI': dni, 'FechaAlta': datetime.now().replace(microsecond=0),
+            'FechaBaja': None, 'EstaPagada': 'S', 'Observaciones': None
+        })
+        return id_reserva
+
+    def _insertar_reserva(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        id_funcion, id_pelicula, id_sala, id_butaca, dni = params
+        if (int(id_funcion) not in self.funciones or int(id_pelicula) not in self.peliculas
+                or int(id_sala) not in self.salas or int(id_butaca) not in self.butacas):
+            raise pymysql.err.IntegrityError(
+                ER_NO_REFERENCED_ROW, 'Cannot add or update a child row: a foreign key constraint fails'
+            )
+        self._pendiente(transaccion, int(id_funcion), int(id_pelicula), int(id_sala), int(id_butaca), dni)
+        return None
+
+    def _funciones_para_actualizar(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        """SELECT ... FOR UPDATE de las funciones (en orden de IdFuncion, como el indice primario)"""
+        filas = []
+        for id_funcion in sorted({int(valor) for valor in params}):
+            if id_funcion not in self.funciones:
+                continue
+            self._esperar_bloqueo(transaccion, id_funcion, tomar=True)
+            funcion = self.funciones[id_funcion]
+            filas.append({columna: funcion[columna] for columna in
+                          ('IdFuncion', 'IdSala', 'IdPelicula', 'FechaInicio', 'Estado', 'FechaFin')})
+        return filas
+
+    def _salas_de_butacas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'IdButaca': id_butaca, 'IdSala': self.butacas[id_butaca]['IdSala']}
+                for id_butaca in sorted({int(valor) for valor in params}) if id_butaca in self.butacas]
+
+    def _butacas_ocupadas(self, cantidad_funciones: int, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        filas = []
+        for id_funcion in params[:cantidad_funciones]:
+            for id_butaca in params[cantidad_funciones:]:
+                veces = self._ocupadas.get((int(id_funcion), int(id_butaca)), 0)
+                filas.extend({'IdFuncion': int(id_funcion), 'IdButaca': int(id_butaca)} for _ in range(veces))
+        return filas
+
+    def _vendidas_por_dni_y_fecha(self, cantidad_dnis: int, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        desde, hasta = _a_datetime(params[-2]).date(), _a_datetime(params[-1])
+        filas = []
+        for dni in params[:cantidad_dnis]:
+            for fecha, cantidad in sorted(self._vendidas_dni.get(dni, {}).items()):
+                # Fechas de las funciones en [desde, hasta): la funcion empieza en algun momento de la fecha
+                if cantidad and desde <= fecha and _a_datetime(fecha) < hasta:
+                    filas.append({'DNI': dni, 'Fecha': fecha, 'Cantidad': cantidad})
+        return filas
+
+    def _butacas_duplicadas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'IdFuncion': id_funcion, 'IdButaca': id_butaca, 'Reservas': cantidad}
+                for (id_funcion, id_butaca), cantidad in sorted(self._ocupadas.items()) if cantidad > 1]
+
+    def _dnis_sobre_limite(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        limite = int(params[0])
+        return [{'DNI': dni, 'Fecha': fecha, 'Reservas': cantidad}
+                for dni, por_fecha in sorted(self._vendidas_dni.items())
+                for fecha, cantidad in sorted(por_fecha.items()) if cantidad > limite]
+
+    def _precios_funciones(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        filas = []
+        for id_funcion in sorted({int(valor) for valor in params}):
+            funcion = self.funciones.get(id_funcion)
+            genero = self._genero(funcion) if funcion is not None else None
+            if genero is None:
+                continue
+            filas.append({'IdFuncion': id_funcion, 'Estado': funcion['Estado'], 'FechaFin': funcion['FechaFin'],
+                          'PrecioFinal': self._precio_final(funcion, genero)})
+        return filas
+
+    def _mapa_butacas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        funcion = self.funciones.get(int(params[0]))
+        if funcion is None:
+            return []
+        cabecera = {columna: funcion[columna] for columna in ('IdFuncion', 'IdSala', 'Estado', 'FechaFin')}
+        butacas = self._butacas_por_sala.get(funcion['IdSala'])
+        if not butacas:
+            # LEFT JOIN sin butacas: una fila con las columnas de la butaca en NULL
+            return [dict(cabecera, IdButaca=None, NroButaca=None, Fila=None, Columna=None, Ocupada=0)]
+        return [
+            dict(cabecera, IdButaca=butaca['IdButaca'], NroButaca=butaca['NroButaca'], Fila=butaca['Fila'],
+                 Columna=butaca['Columna'],
+                 Ocupada=1 if self._ocupadas.get((funcion['IdFuncion'], butaca['IdButaca']), 0) else 0)
+            for butaca in butacas
+        ]
+
+    def _fila_reserva(self, id_reserva: int) -> Dict[str, Any]:
+        """Columnas de SP_ReservasPorDNI"""
+        reserva = self.reservas[id_reserva]
+        funcion = self.funciones[reserva['IdFuncion']]
+        return {
+            'IdReserva': id_reserva,
+            'DNI': reserva['DNI'],
+            'IdFuncion': funcion['IdFuncion'],
+            'FechaInicio': funcion['FechaInicio'],
+            'Pelicula': self.peliculas[funcion['IdPelicula']]['Pelicula'],
+            'Sala': self.salas[funcion['IdSala']]['Sala'],
+            'EstaPagada': reserva['EstaPagada'],
+            'FechaAlta': reserva['FechaAlta'],
+            'FechaBaja': reserva['FechaBaja']
+        }
+
+    def _pagina_reservas(self, despues_de: bool, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        claves = self._reservas_por_dni.get(params[0], [])
+        inicio = 0
+        if despues_de:
+            inicio = bisect_right(claves, (_a_datetime(params[2]), int(params[3])))
+        limit, offset = int(params[-2]), int(params[-1])
+        return [self._fila_reserva(id_reserva) for _, id_reserva in claves[inicio + offset:inicio + offset + limit]]
+
+    def _contar_reservas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'Total': len(self._reservas_por_dni.get(params[0], ()))}]
+
+    def _ids_reservas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'IdReserva': id_reserva} for _, id_reserva in sorted(
+            self._reservas_por_dni.get(params[0], ()), key=lambda clave: clave[1])]
+
+    def _version_reservas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'Version': self.versiones_dni.get(params[0]), 'VersionCatalogo': self.version_catalogo}]
+
+    def _funciones_periodo(self, id_pelicula: Optional[int], desde: datetime, hasta: datetime,
+                           despues_de: Optional[ClaveFecha] = None) -> List[ClaveFecha]:
+        """Funciones activas (de la pelicula o de todas) con FechaInicio en [desde, hasta), por (FechaInicio, Id)"""
+        claves = self._activas if id_pelicula is None else self._activas_por_pelicula.get(id_pelicula, [])
+        inicio = bisect_left(claves, (desde,))
+        if despues_de is not None:
+            inicio = max(inicio, bisect_right(claves, despues_de))
+        return claves[inicio:bisect_left(claves, (hasta,))]
+
+    def _vendidas(self, id_funcion: int) -> int:
+        resumen = self.resumen.get(id_funcion)
+        return resumen['ButacasVendidas'] if resumen is not None else 0
+
+    def _fila_reporte(self, id_funcion: int) -> Dict[str, Any]:
+        """Columnas de SP_ReporteOcupacionPorPelicula"""
+        funcion = self.funciones[id_funcion]
+        vendidas = self._vendidas(id_funcion)
+        return {
+            'IdFuncion': id_funcion,
+            'FechaInicio': funcion['FechaInicio'],
+            'IdSala': funcion['IdSala'],
+            'Sala': self.salas[funcion['IdSala']]['Sala'],
+            'TotalButacasVendidas': vendidas,
+            'TotalIngresosRecaudados': vendidas * funcion['Precio']
+        }
+
+    def _pagina_reporte(self, despues_de: bool, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        clave = (_a_datetime(params[3]), int(params[5])) if despues_de else None
+        claves = self._funciones_periodo(int(params[0]), _a_datetime(params[1]), _a_datetime(params[2]), clave)
+        limit, offset = int(params[-2]), int(params[-1])
+        return [self._fila_reporte(id_funcion) for _, id_funcion in claves[offset:offset + limit]]
+
+    def _contar_funciones(self, por_pelicula: bool, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        id_pelicula = int(params[0]) if por_pelicula else None
+        return [{'Total': len(self._funciones_periodo(id_pelicula, _a_datetime(params[-2]),
+                                                      _a_datetime(params[-1])))}]
+
+    def _version_reporte(self, cantidad_ids: Optional[int], transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        if cantidad_ids is None:
+            peliculas = [id_pelicula for id_pelicula, fila in self.peliculas.items() if fila['Estado'] == 'A']
+        else:
+            peliculas = {int(valor) for valor in params[:cantidad_ids]}
+        desde, hasta = _a_datetime(params[-2]), _a_datetime(params[-1])
+        total = version = 0
+        for id_pelicula in peliculas:
+            for _, id_funcion in self._funciones_periodo(id_pelicula, desde, hasta):
+                resumen = self.resumen.get(id_funcion)
+                total += 1
+                version += resumen['Version'] if resumen is not None else 0
+        return [{'Total': total, 'Version': version, 'VersionCatalogo': self.version_catalogo}]
+
+    def _exportar_reporte(self, por_pelicula: bool, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        id_pelicula = int(params[0]) if por_pelicula else None
+        claves = self._funciones_periodo(id_pelicula, _a_datetime(params[-2]), _a_datetime(params[-1]))
+        return [dict(self._fila_reporte(id_funcion), IdPelicula=self.funciones[id_funcion]['IdPelicula'])
+                for _, id_funcion in claves]
+
+    def _peliculas_activas(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'IdPelicula': id_pelicula, 'Pelicula': fila['Pelicula']}
+                for id_pelicula, fila in sorted(self.peliculas.items()) if fila['Estado'] == 'A']
+
+    def _peliculas_por_id(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        return [{'IdPelicula': id_pelicula, 'Pelicula': self.peliculas[id_pelicula]['Pelicula']}
+                for id_pelicula in sorted({int(valor) for valor in params}) if id_pelicula in self.peliculas]
+
+    # ------------------------------------------------------------------
+    # Claves de idempotencia (app/repositories/idempotencia_repository.py)
+    # ------------------------------------------------------------------
+
+    def _resolver_idempotencia(self, texto: str) -> Callable[[_Transaccion, Tuple], Any]:
+        if texto.startswith('INSERT IGNORE INTO ClavesIdempotencia'):
+            return self._reclamar_clave
+        if texto.startswith('SELECT Huella, Estado, StatusCode, Respuesta FROM ClavesIdempotencia WHERE Clave = %s'):
+            return self._obtener_clave
+        if texto.startswith('UPDATE ClavesIdempotencia'):
+            return self._completar_clave
+        if texto == 'DELETE FROM ClavesIdempotencia WHERE Clave = %s AND FechaVence <= NOW(6)':
+            return lambda transaccion, params: self._borrar_claves(
+                lambda clave, fila: clave == params[0] and fila['FechaVence'] <= datetime.now())
+        if texto == "DELETE FROM ClavesIdempotencia WHERE Clave = %s AND Estado = 'P'":
+            return lambda transaccion, params: self._borrar_claves(
+                lambda clave, fila: clave == params[0] and fila['Estado'] == 'P')
+        if texto == 'DELETE FROM ClavesIdempotencia WHERE FechaVence <= NOW(6) LIMIT %s':
+            return lambda transaccion, params: self._borrar_claves(
+                lambda clave, fila: fila['FechaVence'] <= datetime.now(), int(params[0]))
+        raise pymysql.err.ProgrammingError(
+            ER_PARSE_ERROR, f"Consulta no soportada por el motor en memoria: {texto[:200]}"
+        )
+
+    def _reclamar_clave(self, transaccion: _Transaccion, params: Tuple) -> int:
+        clave, huella, segundos = params
+        if clave in self.claves_idempotencia:
+            return 0
+        ahora = datetime.now()
+        self.claves_idempotencia[clave] = {
+            'Huella': huella, 'Estado': 'P', 'StatusCode': None, 'Respuesta': None,
+            'FechaAlta': ahora, 'FechaVence': ahora + timedelta(seconds=int(segundos))
+        }
+        return 1
+
+    def _obtener_clave(self, transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        fila = self.claves_idempotencia.get(params[0])
+        if fila is None:
+            return []
+        return [{columna: fila[columna] for columna in ('Huella', 'Estado', 'StatusCode', 'Respuesta')}]
+
+    def _completar_clave(self, transaccion: _Transaccion, params: Tuple) -> int:
+        status_code, respuesta, segundos, clave = params
+        fila = self.claves_idempotencia.get(clave)
+        if fila is None or fila['Estado'] != 'P':
+            return 0
+        fila.update(Estado='C', StatusCode=int(status_code), Respuesta=respuesta,
+                    FechaVence=datetime.now() + timedelta(seconds=int(segundos)))
+        return 1
+
+    def _borrar_claves(self, condicion: Callable[[str, Dict[str, Any]], bool], limite: Optional[int] = None) -> int:
+        borrar = [clave for clave, fila in self.claves_idempotencia.items() if condicion(clave, fila)]
+        for clave in borrar[:limite]:
+            del self.claves_idempotencia[clave]
+        return len(borrar[:limite])
+
+    def _explain(self, ejecutar: Callable[[_Transaccion, Tuple], ResultSet], texto: str,
+                 transaccion: _Transaccion, params: Tuple) -> ResultSet:
+        """EXPLAIN: una fila con las filas que leeria la consulta (el motor no estima, cuenta)"""
+        filas = ejecutar(transaccion, params) or []
+        if texto.startswith('SELECT COUNT(*) AS Total') and filas:
+            leidas = filas[0]['Total']
+        else:
+            leidas = len(filas)
+        return [{'id': 1, 'select_type': 'SIMPLE', 'table': None, 'type': 'ref', 'possible_keys': None,
+                 'key': None, 'rows': leidas, 'filtered': 100.0, 'Extra': 'Motor en memoria'}]
+
+
+class CursorMemoria:
+    """Cursor de diccionarios del motor en memoria (tambien sirve como SSDictCursor)"""
+
+    def __init__(self, connection: 'ConexionMemoria'):
+        self.connection = connection
+        self._result_sets: List[ResultSet] = []
+        self._actual: ResultSet = None
+        self._posicion = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._result_sets = []
+        self._actual = None
+
+    def _cargar(self, result_sets: List[ResultSet]) -> int:
+        self._result_sets = list(result_sets) or [None]
+        self._avanzar()
+        return self.rowcount
+
+    def _avanzar(self) -> None:
+        self._actual = self._result_sets.pop(0)
+        self._posicion = 0
+        if isinstance(self._actual, int):
+            # DELETE / UPDATE / INSERT IGNORE: filas afectadas, sin result set
+            self.rowcount = self._actual
+            self._actual = None
+            self.description = None
+        elif self._actual is None:
+            self.description = None
+            self.rowcount = 0
+        else:
+            columnas = self._actual[0].keys() if self._actual else ()
+            self.description = tuple((columna, None, None, None, None, None, True) for columna in columnas)
+            self.rowcount = len(self._actual)
+
+    def execute(self, query: str, args: Any = None) -> int:
+        conexion = self.connection
+        conexion.esperar()
+        motor = conexion.motor
+        params = tuple(args) if args is not None else None
+        result_sets: List[ResultSet] = []
+        # Multi-statement (CALL + SELECT de los OUT en un solo viaje); ningun SQL de los repositorios tiene ';'
+        partes = [parte for parte in query.split(';') if parte.strip()] if ';' in query else [query]
+        for parte in partes:
+            inicio = parte.lstrip()[:8].upper()
+            if inicio.startswith('CALL'):
+                nombre = _NOMBRE_CALL.match(parte.strip()).group(1)
+                in_params = params or ()
+                sets, outs = motor.procedimiento(conexion.transaccion, nombre, in_params)
+                conexion.guardar_outs(nombre, len(in_params), outs)
+                # Como MySQL: los result sets del SP y luego el estado del CALL
+                result_sets.extend(sets)
+                result_sets.append(None)
+            elif inicio.startswith('SELECT @'):
+                result_sets.append([{variable: conexion.variables.get(variable)
+                                     for variable in _VARIABLES.findall(parte)}])
+            else:
+                result_sets.append(motor.consulta(conexion.transaccion, parte, params))
+        return self._cargar(result_sets)
+
+    def executemany(self, query: str, args: Sequence[Any]) -> int:
+        total = 0
+        for params in args:
+            self.execute(query, params)
+            total += 1
+        self.rowcount = total
+        return total
+
+    def callproc(self, procname: str, args: Sequence[Any] = ()) -> Sequence[Any]:
+        conexion = self.connection
+        conexion.esperar()
+        motor = conexion.motor
+        # pymysql recibe los parametros OUT al final de args (como None)
+        in_params = tuple(args)[:len(args) - motor.cantidad_outs(procname)]
+        sets, outs = motor.procedimiento(conexion.transaccion, procname, in_params)
+        conexion.guardar_outs(procname, len(in_params), outs)
+        self._cargar(list(sets) + [None])
+        return args
+
+    def nextset(self) -> Optional[bool]:
+        if not self._result_sets:
+            return None
+        self._avanzar()
+        return True
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        if self._actual is None:
+            return []
+        filas = self._actual[self._posicion:]
+        self._posicion = len(self._actual)
+        return filas
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        if self._actual is None or self._posicion >= len(self._actual):
+            return None
+        self._posicion += 1
+        return self._actual[self._posicion - 1]
+
+    def fetchmany(self, size: int = 1) -> List[Dict[str, Any]]:
+        if self._actual is None:
+            return []
+        filas = self._actual[self._posicion:self._posicion + size]
+        self._posicion += len(filas)
+        return filas
+
+
+class ConexionMemoria:
+    """Conexion DB-API al motor en memoria (autocommit apagado, como las conexiones de app/database.py)"""
+
+    def __init__(self, motor: MotorMemoria, latencia: float = 0.0):
+        self.motor = motor
+        self.latencia = latencia
+        self.variables: Dict[str, Any] = {}
+        self.transaccion = _Transaccion()
+        self.open = True
+
+    def esperar(self) -> None:
+        """Simular el viaje de red al servidor (DATABASE_MEMORY_LATENCY_MS)"""
+        if not self.open:
+            raise pymysql.err.InterfaceError(0, 'Conexion cerrada')
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def guardar_outs(self, nombre: str, posicion: int, outs: Tuple) -> None:
+        """Dejar los valores OUT en las variables @_<sp>_<n>, como pymysql"""
+        for indice, valor in enumerate(outs, start=posicion):
+            self.variables[f"@_{nombre}_{indice}"] = valor
+
+    def cursor(self, cursorclass: Any = None) -> CursorMemoria:
+        return CursorMemoria(self)
+
+    def commit(self) -> None:
+        self.esperar()
+        self.motor.confirmar(self.transaccion)
+
+    def rollback(self) -> None:
+        if self.open:
+            self.motor.descartar(self.transaccion)
+
+    def ping(self, reconnect: bool = False) -> None:
+        self.esperar()
+
+    def close(self) -> None:
+        # Cerrar con una transaccion abierta la descarta (y libera sus bloqueos), como al cortar la conexion
+        if self.open:
+            self.motor.descartar(self.transaccion)
+            self.open = False
+
+
+# ----------------------------------------------------------------------
+# Carga de seed_db.sql
+# ----------------------------------------------------------------------
+
+_INSERT = re.compile(r'INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES', re.IGNORECASE)
+_BLOQUE_BUTACAS = re.compile(
+    r'SET\s+id_sala\s*=\s*(\d+)\s*;\s*SET\s+i\s*=\s*1\s*;\s*WHILE\s+i\s*<=\s*(\d+)\s+DO\s*'
+    r'SET\s+id_butaca\s*=\s*(?:(\d+)\s*\+\s*)?i\s*;',
+    re.IGNORECASE
+)
+_PROCEDIMIENTOS = re.compile(r'DELIMITER\s+\$\$.*?DELIMITER\s*;', re.IGNORECASE | re.DOTALL)
+_NUMERO = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def _sin_comentarios(sql: str) -> str:
+    """Quitar comentarios -- y /* */ fuera de los textos entre comillas"""
+    resultado = []
+    i = 0
+    while i < len(sql):
+        caracter = sql[i]
+        if caracter == "'":
+            fin = i + 1
+            while fin < len(sql):
+                if sql[fin] == '\\':
+                    fin += 2
+                    continue
+                if sql[fin] == "'":
+                    if sql[fin + 1:fin + 2] == "'":
+                        fin += 2
+                        continue
+                    break
+                fin += 1
+            resultado.append(sql[i:fin + 1])
+            i = fin + 1
+        elif sql.startswith('--', i):
+            fin = sql.find('\n', i)
+            i = len(sql) if fin < 0 else fin
+        elif sql.startswith('/*', i):
+            fin = sql.find('*/', i + 2)
+            i = len(sql) if fin < 0 else fin + 2
+        else:
+            resultado.append(caracter)
+            i += 1
+    return ''.join(resultado)
+
+
+def _valores(sql: str, inicio: int) -> Tuple[List[List[Any]], int]:
+    """Tuplas de literales de un VALUES (...), (...); desde inicio: (filas, posicion del ';')"""
+    filas: List[List[Any]] = []
+    fila: Optional[List[Any]] = None
+    i = inicio
+    while i < len(sql):
+        caracter = sql[i]
+        if caracter.isspace() or caracter == ',':
+            i += 1
+        elif caracter == '(':
+            fila = []
+            i += 1
+        elif caracter == ')':
+            filas.append(fila)
+            fila = None
+            i += 1
+        elif caracter == ';':
+            break
+        elif caracter == "'":
+            partes = []
+            i += 1
+            while sql[i] != "'" or sql[i + 1:i + 2] == "'":
+                if sql[i] == '\\':
+                    partes.append(sql[i + 1])
+                    i += 2
+                elif sql[i] == "'":
+                    partes.append("'")
+                    i += 2
+                else:
+                    partes.append(sql[i])
+                    i += 1
+            fila.append(''.join(partes))
+            i += 1
+        elif sql.startswith('NULL', i) or sql.startswith('null', i):
+            fila.append(None)
+            i += 4
+        else:
+            numero = _NUMERO.match(sql, i)
+            if numero is None:
+                raise ValueError(f"Valor no soportado en el seed: {sql[i:i + 40]!r}")
+            texto = numero.group(0)
+            fila.append(Decimal(texto) if '.' in texto else int(texto))
+            i = numero.end()
+    return filas, i
+
+
+def cargar_seed(motor: MotorMemoria, ruta: str) -> None:
+    """
+    Cargar un script como seed_db.sql: los INSERT INTO ... VALUES y las butacas de GenerarButacas
+    (bloques SET id_sala / WHILE i <= N / SET id_butaca = base + i); el resto de los statements se ignora
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        sql = _sin_comentarios(archivo.read())
+
+    # Las butacas se generan antes de las funciones y reservas que las referencian
+    for sala, cantidad, base in _BLOQUE_BUTACAS.findall(sql):
+        for i in range(1, int(cantidad) + 1):
+            motor.insertar('Butacas', {
+                'IdButaca': int(base or 0) + i, 'IdSala': int(sala), 'NroButaca': i,
+                'Fila': (i - 1) // 10 + 1, 'Columna': (i - 1) % 10 + 1, 'Estado': 'A', 'Observaciones': None
+            })
+
+    # Los INSERT dentro de procedimientos (DELIMITER $$ ... DELIMITER ;) usan variables, no literales
+    sql = _PROCEDIMIENTOS.sub('', sql)
+    posicion = 0
+    while True:
+        insert = _INSERT.search(sql, posicion)
+        if insert is None:
+            break
+        tabla = insert.group(1)
+        columnas = [columna.strip() for columna in insert.group(2).split(',')]
+        filas, posicion = _valores(sql, insert.end())
+        for valores in filas:
+            motor.insertar(tabla, dict(zip(columnas, valores)))
+
+
+def _ruta_seed(ruta: str) -> str:
+    """Rutas relativas: desde el directorio actual o, si no existe, desde la raiz del proyecto"""
+    if os.path.isabs(ruta) or os.path.exists(ruta):
+        return ruta
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ruta)
+
+
+def crear_motor() -> MotorMemoria:
+    """Motor nuevo con los datos de DATABASE_MEMORY_SEED y DATABASE_MEMORY_EXTRA_FUNCIONES"""
+    motor = MotorMemoria(lock_wait_timeout=config.DATABASE_MEMORY_LOCK_WAIT_TIMEOUT)
+    if config.DATABASE_MEMORY_SEED:
+        cargar_seed(motor, _ruta_seed(config.DATABASE_MEMORY_SEED))
+    if config.DATABASE_MEMORY_EXTRA_FUNCIONES > 0:
+        motor.generar_funciones(
+            config.DATABASE_MEMORY_EXTRA_FUNCIONES, ocupacion=config.DATABASE_MEMORY_EXTRA_OCUPACION
+        )
+    return motor
+
+
+# Motor del proceso (se crea en la primera conexion; con varios workers cada proceso tiene sus propios datos)
+_motor: Optional[MotorMemoria] = None
+_motor_lock = threading.Lock()
+
+
+def get_motor() -> MotorMemoria:
+    """Obtener el motor en memoria del proceso"""
+    global _motor
+    if _motor is None:
+        with _motor_lock:
+            if _motor is None:
+                _motor = crear_motor()
+    return _motor
+
+
+def set_motor(motor: Optional[MotorMemoria] = None) -> None:
+    """Reemplazar el motor del proceso (None = se vuelve a crear con el seed en la proxima conexion)"""
+    global _motor
+    with _motor_lock:
+        _motor = motor
+
+
+def get_memory_connection() -> ConexionMemoria:
+    """Abrir una conexion al motor en memoria del proceso (equivalente a pymysql.connect)"""
+    return ConexionMemoria(get_motor(), latencia=config.DATABASE_MEMORY_LATENCY_MS / 1000)
@@ -0,0 +1,85 @@
+"""
+Metricas HTTP de la aplicacion y endpoint GET /metrics
+Nos permite ver donde se va el tiempo sin herramientas externas:
+- Cantidad y latencia de las requests por metodo, ruta (regla de flask-restx, no la URL) y codigo de estado
+- Requests en curso
+- Stored procedures, consultas y pool de conexiones (se registran en app/database.py)
+El texto sigue el formato de exposicion de Prometheus; con gunicorn suma las metricas de todos los workers
+(gunicorn.conf.py activa registro.compartir en cada worker), si no son las del proceso
+"""
+import time
+
+from flask import Flask, Response, request
+
+from app.config import Config
+from app.utils.metrics import CONTENT_TYPE, registro
+
+config = Config()
+
+http_duracion = registro.histograma(
+    'http_request_duration_seconds', 'Duracion de las requests por ruta y codigo de estado',
+    ('method', 'route', 'status')
+)
+http_en_curso = registro.gauge('http_requests_in_flight', 'Requests en curso')
+
+# Etiqueta route de las requests que no coinciden con ninguna ruta (404), para no crear una serie por URL
+RUTA_DESCONOCIDA = 'sin_ruta'
+
+# Clave del environ WSGI donde el hook after_request deja la regla de la ruta
+CLAVE_RUTA = 'app.metricas.ruta'
+
+
+class MedirRequests:
+    """
+    Middleware WSGI que mide cada request: latencia, codigo de estado y requests en curso
+
+    Se mide fuera de Flask (sin before_request/teardown ni accesos a g) para que el costo por request sea
+    minimo; la ruta la anota _anotar_ruta, el unico hook que necesita el contexto de Flask
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        inicio = time.perf_counter()
+        estado = ['500']
+
+        def start_response_medido(status, headers, exc_info=None):
+            estado[0] = status[:3]
+            return start_response(status, headers, exc_info)
+
+        http_en_curso.inc()
+        try:
+            return self.wsgi_app(environ, start_response_medido)
+        finally:
+            http_en_curso.dec()
+            http_duracion.labels(
+                environ.get('REQUEST_METHOD', ''), environ.get(CLAVE_RUTA, RUTA_DESCONOCIDA), estado[0]
+            ).observe(time.perf_counter() - inicio)
+
+
+def _anotar_ruta(response: Response) -> Response:
+    """Hook after_request: guardar la regla de la ruta (no la URL) para la etiqueta route"""
+    req = request._get_current_object()
+    if req.url_rule is not None:
+        req.environ[CLAVE_RUTA] = req.url_rule.rule
+    return response
+
+
+def ver_metricas() -> Response:
+    """GET /metrics: todas las metricas (del proceso o de todos los workers) en formato de texto de Prometheus"""
+    return Response(registro.exponer(), content_type=CONTENT_TYPE)
+
+
+def register_metrics(app: Flask) -> None:
+    """
+    Registrar la medicion de requests y el endpoint /metrics (si METRICS_ENABLED)
+
+    La latencia se mide alrededor de toda la aplicacion WSGI (incluye los hooks y la compresion); en las
+    respuestas en streaming llega hasta que se entrega el iterable, no hasta que se envia el ultimo chunk
+    """
+    if not config.METRICS_ENABLED:
+        return
+    app.wsgi_app = MedirRequests(app.wsgi_app)
+    app.after_request(_anotar_ruta)
+    app.add_url_rule('/metrics', 'metrics', ver_metricas, methods=['GET'])
@@ -0,0 +1,262 @@
+"""
+Pool de conexiones a la base de datos
+Nos permite reutilizar conexiones abiertas a MySQL en lugar de hacer un handshake TCP + autenticacion por cada llamada
+Y asi, reducir la latencia de cada stored procedure y acotar la cantidad de conexiones simultaneas contra el servidor
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict
+
+from app.utils.exceptions import ServiceUnavailableError
+
+
+class _PoolEntry:
+    """Conexion administrada por el pool junto con sus marcas de tiempo"""
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection: Any):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones acotado y seguro para hilos
+
+    - Mantiene entre min_size y max_size conexiones abiertas
+    - Si no hay conexiones libres y se alcanzo max_size, espera hasta timeout segundos
+    - Verifica la conexion (ping) al entregarla si estuvo ociosa mas de ping_interval segundos
+    - Recicla conexiones que superan max_lifetime o que estuvieron ociosas mas de idle_timeout
+    """
+
+    def __init__(
+        self,
+        creator: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        pre_ping: bool = True,
+        ping_interval: float = 5.0,
+        max_lifetime: float = 1800.0,
+        idle_timeout: float = 300.0
+    ):
+        if max_size < 1:
+            raise ValueError("max_size debe ser mayor o igual a 1")
+        self._creator = creator
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+
+        # Conexiones libres: las mas recientes a la derecha (LIFO) para que las viejas queden ociosas y se reciclen
+        self._idle: Deque[_PoolEntry] = deque()
+        # Conexiones entregadas, indexadas por id() de la conexion
+        self._in_use: Dict[int, _PoolEntry] = {}
+        # Conexiones que se estan creando (cuentan para el limite max_size)
+        self._pending = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        # PID del proceso que creo el pool (para detectar forks)
+        self.pid = os.getpid()
+
+        # Contadores para monitoreo
+        self._created = 0
+        self._recycled = 0
+        self._timeouts = 0
+
+    @property
+    def size(self) -> int:
+        """Cantidad total de conexiones abiertas o en creacion"""
+        return len(self._idle) + len(self._in_use) + self._pending
+
+    def _expired(self, entry: _PoolEntry, now: float) -> bool:
+        """Indica si una conexion supero su tiempo de vida maximo"""
+        return self.max_lifetime > 0 and now - entry.created_at >= self.max_lifetime
+
+    def _close_entry(self, entry: _PoolEntry) -> None:
+        """Cerrar una conexion ignorando errores (puede estar ya cortada)"""
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    def _prune_idle(self, now: float) -> list:
+        """
+        Quitar del pool las conexiones ociosas vencidas (debe llamarse con el lock tomado)
+
+        Returns:
+            Lista de entradas a cerrar fuera del lock
+        """
+        to_close = []
+        # Las conexiones mas antiguas en uso estan a la izquierda
+        while self._idle:
+            entry = self._idle[0]
+            idle_for = now - entry.last_used
+            too_idle = self.idle_timeout > 0 and idle_for >= self.idle_timeout and self.size > self.min_size
+            if too_idle or self._expired(entry, now):
+                self._idle.popleft()
+                to_close.append(entry)
+                self._recycled += 1
+            else:
+                break
+        return to_close
+
+    def _create_entry(self) -> _PoolEntry:
+        """Crear una nueva conexion (se llama fuera del lock con _pending ya reservado)"""
+        try:
+            entry = _PoolEntry(self._creator())
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._pending -= 1
+            self._created += 1
+        return entry
+
+    def _healthy(self, entry: _PoolEntry, now: float) -> bool:
+        """Verificar con un ping que la conexion siga viva si estuvo ociosa suficiente tiempo"""
+        if not self.pre_ping or now - entry.last_used < self.ping_interval:
+            return True
+        try:
+            entry.connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self) -> Any:
+        """
+        Obtener una conexion del pool
+
+        Returns:
+            Conexion lista para usar
+
+        Raises:
+            ServiceUnavailableError: Si no se obtuvo una conexion antes del timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = None
+            to_close = []
+            try:
+                with self._cond:
+                    if self._closed:
+                        raise ServiceUnavailableError("El pool de conexiones esta cerrado")
+                    while True:
+                        now = time.monotonic()
+                        to_close.extend(self._prune_idle(now))
+                        if self._idle:
+                            entry = self._idle.pop()
+                            break
+                        if self.size < self.max_size:
+                            # Reservamos el lugar y creamos la conexion fuera del lock
+                            self._pending += 1
+                            break
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise ServiceUnavailableError(
+                                "No hay conexiones disponibles a la base de datos, intente nuevamente"
+                            )
+                        self._waiting += 1
+                        try:
+                            self._cond.wait(remaining)
+                        finally:
+                            self._waiting -= 1
+            finally:
+                # Las conexiones vencidas se cierran tambien si se agoto el timeout (fuera del lock)
+                for stale in to_close:
+                    self._close_entry(stale)
+
+            now = time.monotonic()
+            if entry is None:
+                entry = self._create_entry()
+            elif self._expired(entry, now) or not self._healthy(entry, now):
+                # La conexion no sirve: la descartamos y volvemos a intentar
+                self._close_entry(entry)
+                with self._cond:
+                    self._recycled += 1
+                    self._cond.notify()
+                continue
+
+            entry.last_used = now
+            with self._cond:
+                self._in_use[id(entry.connection)] = entry
+            return entry.connection
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        """
+        Devolver una conexion al pool
+
+        Args:
+            connection: Conexion obtenida con acquire()
+            discard: Si True, la conexion se cierra en lugar de reutilizarse (ej: quedo en estado invalido)
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None:
+                return
+            now = time.monotonic()
+            if discard or self._closed or self._expired(entry, now):
+                self._recycled += 1
+                to_close = [entry]
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+                to_close = self._prune_idle(now)
+            self._cond.notify()
+        for stale in to_close:
+            self._close_entry(stale)
+
+    def prime(self) -> int:
+        """
+        Abrir conexiones hasta alcanzar min_size (precalentamiento)
+
+        Returns:
+            Cantidad de conexiones creadas
+        """
+        created = 0
+        while True:
+            with self._cond:
+                if self._closed or self.size >= self.min_size:
+                    return created
+                self._pending += 1
+            entry = self._create_entry()
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+            created += 1
+
+    def close(self) -> None:
+        """Cerrar el pool y todas las conexiones libres (las entregadas se cierran al devolverse)"""
+        with self._cond:
+            self._closed = True
+            to_close = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for entry in to_close:
+            self._close_entry(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado actual del pool para monitoreo"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'created': self._created,
+                'recycled': self._recycled,
+                'timeouts': self._timeouts
+            }
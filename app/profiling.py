@@ -0,0 +1,257 @@
+"""
+Perfilado de CPU por request (opcional, PROFILING_ENABLED)
+Nos permite ver en que se va el tiempo de una request lenta en produccion sin reproducirla localmente:
+- Se perfila con cProfile toda la request (hooks, controller -> service -> repository, serializacion y compresion)
+  cuando trae el header PROFILING_HEADER o al azar con probabilidad PROFILING_SAMPLE_RATE
+- Cada request perfilada deja en PROFILING_DIR un archivo .pstats (para snakeviz, pstats o gprof2dot) y un .json
+  con el reparto del tiempo entre Python, espera de SQL y serializacion, y las funciones mas costosas
+- Con PROFILING_ENABLED apagado no se registra nada: el costo por request es cero
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymysql
+from flask import Flask
+
+from app import memory_db
+from app.config import Config
+from app.pool import ConnectionPool
+from app.services.admin_service import AdminService
+from app.utils import fast_json
+from app.utils.compression import comprimir_respuesta
+from app.utils.exceptions import NotFoundError, UnauthorizedError
+
+config = Config()
+
+logger = logging.getLogger('app.profiling')
+
+# Clave de una funcion en pstats: (archivo, linea, nombre)
+Clave = Tuple[str, int, str]
+
+# Codigo del driver de MySQL (directorio) y del motor en memoria (archivo): el tiempo dentro de ellos (red incluida)
+# es espera de SQL
+DIRECTORIOS_SQL: Tuple[str, ...] = (os.path.dirname(pymysql.__file__) + os.sep, memory_db.__file__)
+
+# Header con el id de los archivos del perfil (para encontrarlos en PROFILING_DIR)
+HEADER_ID = 'X-Profile-Id'
+
+# Funciones mostradas en el resumen JSON (ordenadas por tiempo propio)
+TOP_FUNCIONES = 30
+
+_NO_ALFANUMERICO = re.compile(r'[^A-Za-z0-9]+')
+_VALORES_ACTIVO = ('1', 'true', 'yes', 'on')
+
+
+def _clave(funcion: Any) -> Clave:
+    codigo = funcion.__code__
+    return codigo.co_filename, codigo.co_firstlineno, codigo.co_name
+
+
+# Serializacion: proyeccion de los modelos, encoder JSON y compresion de la respuesta
+FUNCIONES_SERIALIZACION: Tuple[Clave, ...] = (
+    _clave(fast_json.fast_marshal),
+    _clave(fast_json.output_json),
+    _clave(comprimir_respuesta),
+)
+
+# Espera de una conexion libre del pool (la creacion y el ping de conexiones ya cuentan como driver)
+_ADQUIRIR_CONEXION: Clave = _clave(ConnectionPool.acquire)
+_ESPERA_CONDICION: Clave = _clave(threading.Condition.wait)
+
+
+def _en_driver(clave: Clave) -> bool:
+    return clave[0].startswith(DIRECTORIOS_SQL)
+
+
+def reparto_tiempos(estadisticas: pstats.Stats) -> Dict[str, float]:
+    """
+    Segundos de espera de SQL y de serializacion a partir de las estadisticas de cProfile
+
+    - SQL: tiempo acumulado de las llamadas al driver hechas desde fuera del driver (ejecucion, lectura de filas,
+      commit, conexion) mas la espera de una conexion libre en ConnectionPool.acquire
+    - Serializacion: tiempo acumulado de FUNCIONES_SERIALIZACION (no se llaman entre si ni llaman a la base)
+    """
+    sql = 0.0
+    serializacion = 0.0
+    for clave, (_, _, _, acumulado, llamadores) in estadisticas.stats.items():
+        if _en_driver(clave):
+            # Solo las entradas al driver: las llamadas internas ya estan dentro del acumulado de la entrada
+            sql += sum(datos[3] for llamador, datos in llamadores.items() if not _en_driver(llamador))
+        elif clave == _ESPERA_CONDICION:
+            datos = llamadores.get(_ADQUIRIR_CONEXION)
+            if datos is not None:
+                sql += datos[3]
+        elif clave in FUNCIONES_SERIALIZACION:
+            serializacion += acumulado
+    return {'sql': sql, 'serializacion': serializacion}
+
+
+def _funcion(clave: Clave) -> str:
+    archivo, linea, nombre = clave
+    if archivo == '~':
+        # Funciones de C (builtins)
+        return nombre
+    if archivo.startswith(os.getcwd() + os.sep):
+        archivo = os.path.relpath(archivo)
+    return f"{archivo}:{linea}({nombre})"
+
+
+def top_funciones(estadisticas: pstats.Stats, cantidad: int = TOP_FUNCIONES) -> List[Dict[str, Any]]:
+    """Funciones con mas tiempo propio (sin contar las funciones que llaman)"""
+    filas = sorted(estadisticas.stats.items(), key=lambda item: item[1][2], reverse=True)[:cantidad]
+    return [
+        {
+            'funcion': _funcion(clave),
+            'llamadas': llamadas,
+            'propio_ms': round(propio * 1000, 3),
+            'acumulado_ms': round(acumulado * 1000, 3)
+        }
+        for clave, (_, llamadas, propio, acumulado, _) in filas
+    ]
+
+
+def _rotar(directorio: str, maximo: int) -> None:
+    """Borrar los perfiles mas viejos si hay mas de maximo en el directorio"""
+    if maximo <= 0:
+        return
+    try:
+        perfiles = sorted(
+            (entrada for entrada in os.scandir(directorio) if entrada.name.endswith('.pstats')),
+            key=lambda entrada: entrada.stat().st_mtime
+        )
+        for entrada in perfiles[:max(0, len(perfiles) - maximo)]:
+            base = entrada.path[:-len('.pstats')]
+            for ruta in (entrada.path, base + '.json'):
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+    except OSError as e:
+        logger.warning("No se pudieron rotar los perfiles de %s: %s", directorio, e)
+
+
+class PerfilarRequests:
+    """
+    Middleware WSGI que perfila con cProfile las requests marcadas con el header o sorteadas
+
+    cProfile mide solo el hilo de la request: el trabajo repartido en otros hilos (ej: el reporte de varias
+    peliculas en paralelo) aparece como la espera del hilo principal. Las respuestas en streaming se perfilan
+    hasta que se entrega el iterable (la generacion de los chunks no queda incluida)
+    """
+
+    def __init__(self, wsgi_app, directorio: str, header: str, tasa: float, maximo: int):
+        self.wsgi_app = wsgi_app
+        self.directorio = directorio
+        self.header_environ = 'HTTP_' + header.upper().replace('-', '_')
+        self.tasa = tasa
+        self.maximo = maximo
+        self._contador = 0
+        self._lock = threading.Lock()
+
+    def _perfilar(self, environ) -> Optional[str]:
+        """Motivo para perfilar la request ('header' o 'muestreo'), o None"""
+        if environ.get(self.header_environ, '').strip().lower() in _VALORES_ACTIVO:
+            # Perfilar es caro (y escribe a disco): el header requiere ADMIN_TOKEN configurado y el token
+            try:
+                AdminService.verificar_token(environ.get('HTTP_X_ADMIN_TOKEN'))
+                return 'header'
+            except (NotFoundError, UnauthorizedError):
+                pass
+        if self.tasa > 0 and random.random() < self.tasa:
+            return 'muestreo'
+        return None
+
+    def _id(self, environ) -> str:
+        with self._lock:
+            self._contador += 1
+            contador = self._contador
+        ruta = _NO_ALFANUMERICO.sub('_', environ.get('PATH_INFO', '')).strip('_')[:60] or 'raiz'
+        return f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{contador}-{environ.get('REQUEST_METHOD', '')}-{ruta}"
+
+    def __call__(self, environ, start_response):
+        motivo = self._perfilar(environ)
+        if motivo is None:
+            return self.wsgi_app(environ, start_response)
+
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador activo en el proceso (cProfile de Python 3.12+ admite uno solo a la vez)
+            return self.wsgi_app(environ, start_response)
+
+        id_perfil = self._id(environ)
+        estado = ['500']
+
+        def start_response_perfilado(status, headers, exc_info=None):
+            estado[0] = status[:3]
+            return start_response(status, list(headers) + [(HEADER_ID, id_perfil)], exc_info)
+
+        inicio = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, start_response_perfilado)
+        finally:
+            total = time.perf_counter() - inicio
+            perfil.disable()
+            self._guardar(perfil, id_perfil, environ, estado[0], motivo, total)
+
+    def _guardar(self, perfil: cProfile.Profile, id_perfil: str, environ, estado: str, motivo: str,
+                 total: float) -> None:
+        """Escribir el .pstats y el resumen .json de la request (los errores solo se registran en el log)"""
+        try:
+            estadisticas = pstats.Stats(perfil)
+            reparto = reparto_tiempos(estadisticas)
+            resumen = {
+                'id': id_perfil,
+                'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+                'motivo': motivo,
+                'method': environ.get('REQUEST_METHOD', ''),
+                'path': environ.get('PATH_INFO', ''),
+                'query_string': environ.get('QUERY_STRING', ''),
+                'status': estado,
+                'total_ms': round(total * 1000, 3),
+                'sql_ms': round(reparto['sql'] * 1000, 3),
+                'serializacion_ms': round(reparto['serializacion'] * 1000, 3),
+                'python_ms': round(max(0.0, total - reparto['sql'] - reparto['serializacion']) * 1000, 3),
+                'top': top_funciones(estadisticas)
+            }
+            os.makedirs(self.directorio, exist_ok=True)
+            base = os.path.join(self.directorio, id_perfil)
+            estadisticas.dump_stats(base + '.pstats')
+            with open(base + '.json', 'w', encoding='utf-8') as archivo:
+                json.dump(resumen, archivo, indent=2)
+            _rotar(self.directorio, self.maximo)
+            logger.info(
+                "perfil %s %s %s: total %.1f ms (python %.1f, sql %.1f, serializacion %.1f)",
+                id_perfil, resumen['method'], resumen['path'], resumen['total_ms'],
+                resumen['python_ms'], resumen['sql_ms'], resumen['serializacion_ms']
+            )
+        except Exception as e:
+            logger.warning("No se pudo guardar el perfil %s: %s", id_perfil, e)
+
+
+def register_profiling(app: Flask) -> None:
+    """
+    Registrar el perfilado por request (si PROFILING_ENABLED)
+
+    Se registra despues de las metricas para envolver toda la aplicacion; las requests perfiladas son mas lentas
+    (cProfile agrega costo a cada llamada) y eso tambien se ve en la latencia de /metrics
+    """
+    if not config.PROFILING_ENABLED:
+        return
+    app.wsgi_app = PerfilarRequests(
+        app.wsgi_app,
+        directorio=config.PROFILING_DIR,
+        header=config.PROFILING_HEADER,
+        tasa=config.PROFILING_SAMPLE_RATE,
+        maximo=config.PROFILING_MAX_FILES
+    )
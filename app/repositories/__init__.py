@@ -4,10 +4,14 @@ Capa de Repositorios - Acceso a datos via stored procedures
 from app.repositories.funcion_repository import FuncionRepository
 from app.repositories.reserva_repository import ReservaRepository
 from app.repositories.reporte_repository import ReporteRepository
+from app.repositories.butaca_repository import ButacaRepository
+from app.repositories.idempotencia_repository import IdempotenciaRepository
 
 __all__ = [
     'FuncionRepository',
     'ReservaRepository',
-    'ReporteRepository'
+    'ReporteRepository',
+    'ButacaRepository',
+    'IdempotenciaRepository'
 ]
 
@@ -0,0 +1,145 @@
+"""
+Repositorios asincronicos
+Variante asyncio de los repositorios de funciones, reservas y reportes (mismos stored procedures y consultas)
+Se usan desde la aplicacion ASGI (ver app/asgi.py)
+"""
+from typing import List, Dict, Any, Tuple, Optional
+from datetime import date, datetime
+from decimal import Decimal
+from app.async_database import call_sp_with_out_params_async, call_stored_procedure_async, execute_query_async
+from app.repositories.reporte_repository import (
+    SQL_CONTAR_FUNCIONES_PERIODO,
+    SQL_FILTRO_DESPUES_DE as SQL_FILTRO_FUNCIONES_DESPUES_DE,
+    SQL_FILTRO_FUNCIONES_PERIODO,
+    SQL_OCUPACION_POR_PELICULA,
+    SQL_PELICULAS_ACTIVAS,
+    SQL_PELICULAS_POR_ID,
+    rango_periodo
+)
+from app.repositories.reserva_repository import (
+    SQL_CONTAR_RESERVAS_POR_DNI,
+    SQL_ESTIMAR_RESERVAS_POR_DNI,
+    SQL_FILTRO_DESPUES_DE as SQL_FILTRO_RESERVAS_DESPUES_DE,
+    SQL_RESERVAS_POR_DNI
+)
+
+
+class AsyncFuncionRepository:
+    """Repositorio asincronico para acceso a datos de funciones"""
+
+    @staticmethod
+    async def get_precio_funcion(id_funcion: int) -> Tuple[Optional[Decimal], str]:
+        """Obtener precio calculado de una funcion usando SP_DeterminarPrecioEntrada"""
+        _, out_values = await call_sp_with_out_params_async(
+            'SP_DeterminarPrecioEntrada',
+            in_params=(id_funcion,),
+            out_param_count=2
+        )
+        precio_final, mensaje = out_values
+        if precio_final is not None:
+            precio_final = Decimal(str(precio_final))
+        return precio_final, mensaje or 'Error desconocido'
+
+
+class AsyncReservaRepository:
+    """Repositorio asincronico para acceso a datos de reservas"""
+
+    @staticmethod
+    async def crear_reserva(id_funcion: int, id_butaca: int, dni: str) -> str:
+        """Crear una reserva usando SP_ReservarButacaConValidacionDNI"""
+        _, out_values = await call_sp_with_out_params_async(
+            'SP_ReservarButacaConValidacionDNI',
+            in_params=(id_funcion, id_butaca, dni),
+            out_param_count=1
+        )
+        mensaje = out_values[0] if out_values else 'Error desconocido'
+        return mensaje or 'Error desconocido'
+
+    @staticmethod
+    async def get_reservas_por_dni_pagina(
+        dni: str,
+        limit: int,
+        offset: int = 0,
+        despues_de: Optional[Tuple[datetime, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Obtener una pagina de reservas de un cliente (ver ReservaRepository.get_reservas_por_dni_pagina)"""
+        params: Tuple = (dni,)
+        filtro = ''
+        if despues_de is not None:
+            fecha_inicio, id_reserva = despues_de
+            filtro = SQL_FILTRO_RESERVAS_DESPUES_DE
+            params += (fecha_inicio, fecha_inicio, id_reserva)
+        query = SQL_RESERVAS_POR_DNI.format(filtro=filtro)
+        return await execute_query_async(query, params + (limit, offset)) or []
+
+    @staticmethod
+    async def contar_reservas_por_dni(dni: str) -> int:
+        """Cantidad exacta de reservas de un cliente (solo lee el indice de DNI)"""
+        fila = await execute_query_async(SQL_CONTAR_RESERVAS_POR_DNI, (dni,))
+        return fila[0]['Total'] if fila else 0
+
+    @staticmethod
+    async def estimar_reservas_por_dni(dni: str) -> int:
+        """Cantidad estimada de reservas de un cliente segun las estadisticas del optimizador"""
+        plan = await execute_query_async(SQL_ESTIMAR_RESERVAS_POR_DNI, (dni,))
+        return int(plan[0].get('rows') or 0) if plan else 0
+
+
+class AsyncReporteRepository:
+    """Repositorio asincronico para acceso a datos de reportes"""
+
+    @staticmethod
+    async def get_ocupacion_por_pelicula(
+        id_pelicula: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> List[Dict[str, Any]]:
+        """Obtener reporte de ocupacion por pelicula usando SP_ReporteOcupacionPorPelicula"""
+        results = await call_stored_procedure_async(
+            'SP_ReporteOcupacionPorPelicula',
+            params=(id_pelicula, fecha_inicio, fecha_fin)
+        )
+        return results or []
+
+    @staticmethod
+    async def get_peliculas(ids_pelicula: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Obtener IdPelicula y nombre de las peliculas del reporte (ver ReporteRepository.get_peliculas)"""
+        if ids_pelicula is None:
+            return await execute_query_async(SQL_PELICULAS_ACTIVAS) or []
+        if not ids_pelicula:
+            return []
+        query = SQL_PELICULAS_POR_ID.format(placeholders=', '.join(['%s'] * len(ids_pelicula)))
+        return await execute_query_async(query, tuple(ids_pelicula)) or []
+
+    @staticmethod
+    async def get_ocupacion_por_pelicula_pagina(
+        id_pelicula: int,
+        fecha_inicio: date,
+        fecha_fin: date,
+        limit: int,
+        offset: int = 0,
+        despues_de: Optional[Tuple[datetime, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Obtener una pagina del reporte de ocupacion (ver ReporteRepository.get_ocupacion_por_pelicula_pagina)"""
+        params: Tuple = (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin)
+        filtro_despues_de = ''
+        if despues_de is not None:
+            fecha, id_funcion = despues_de
+            filtro_despues_de = SQL_FILTRO_FUNCIONES_DESPUES_DE
+            params += (fecha, fecha, id_funcion)
+        query = SQL_OCUPACION_POR_PELICULA.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO, despues_de=filtro_despues_de)
+        return await execute_query_async(query, params + (limit, offset)) or []
+
+    @staticmethod
+    async def contar_funciones_periodo(id_pelicula: int, fecha_inicio: date, fecha_fin: date) -> int:
+        """Cantidad de funciones del reporte (se resuelve solo con el indice)"""
+        query = SQL_CONTAR_FUNCIONES_PERIODO.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO)
+        fila = await execute_query_async(query, (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin))
+        return fila[0]['Total'] if fila else 0
+
+    @staticmethod
+    async def estimar_funciones_periodo(id_pelicula: int, fecha_inicio: date, fecha_fin: date) -> int:
+        """Cantidad estimada de funciones del reporte segun las estadisticas del optimizador"""
+        query = "EXPLAIN " + SQL_CONTAR_FUNCIONES_PERIODO.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO)
+        plan = await execute_query_async(query, (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin))
+        return int(plan[0].get('rows') or 0) if plan else 0
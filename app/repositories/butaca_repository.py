@@ -0,0 +1,51 @@
+"""
+Repositorio para butacas
+Nos permite obtener la grilla de butacas de la sala de una funcion junto con su ocupacion
+"""
+from typing import List, Dict, Any
+from app.database import execute_query
+
+# Grilla de butacas de la sala de la funcion y si cada una tiene una reserva activa (una sola consulta)
+# El EXISTS usa el indice IDX_Reservas_IdFuncion_IdButaca
+SQL_MAPA_BUTACAS = """
+    SELECT
+        f.IdFuncion,
+        f.IdSala,
+        f.Estado,
+        f.FechaFin,
+        b.IdButaca,
+        b.NroButaca,
+        b.Fila,
+        b.Columna,
+        EXISTS (
+            SELECT 1
+            FROM Reservas r
+            WHERE r.IdFuncion = f.IdFuncion
+              AND r.IdButaca  = b.IdButaca
+              AND r.FechaBaja IS NULL
+        ) AS Ocupada
+    FROM Funciones f
+    LEFT JOIN Butacas b ON b.IdSala = f.IdSala
+    WHERE f.IdFuncion = %s
+    ORDER BY b.Fila, b.Columna, b.IdButaca
+"""
+
+
+class ButacaRepository:
+    """Repositorio para acceso a datos de butacas"""
+    
+    @staticmethod
+    def get_mapa_butacas(id_funcion: int) -> List[Dict[str, Any]]:
+        """
+        Obtener las butacas de la sala de una funcion con su ocupacion
+        
+        Args:
+            id_funcion: ID de la funcion
+        
+        Returns:
+            Lista de butacas (vacia si la funcion no existe; una fila con IdButaca NULL si la sala no tiene butacas)
+        """
+        # Obtenemos la grilla y la ocupacion con una sola consulta
+        results = execute_query(SQL_MAPA_BUTACAS, (id_funcion,))
+        # Devolvemos las butacas de la funcion
+        return results or []
@@ -2,9 +2,29 @@
 Repositorio para funciones de cine
 Nos permite obtener el precio calculado de una funcion con recargos segun genero y tipo de sala
 """
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from decimal import Decimal
-from app.database import call_sp_with_out_params
+from app.database import call_sp_with_out_params_single_trip, execute_query
+
+# Calculo de precios en lote con las mismas reglas que SP_DeterminarPrecioEntrada:
+# +10% generos Estreno/3D, +5% sala VIP (IdSala = 1), redondeo a DECIMAL(12,2) en cada paso y nunca menor al precio base
+SQL_PRECIOS_FUNCIONES = """
+    SELECT
+        f.IdFuncion,
+        f.Estado,
+        f.FechaFin,
+        GREATEST(
+            CAST(
+                CAST(f.Precio * CASE WHEN g.Genero IN ('Estreno', '3D') THEN 1.10 ELSE 1 END AS DECIMAL(12,2))
+                * CASE WHEN f.IdSala = 1 THEN 1.05 ELSE 1 END
+            AS DECIMAL(12,2)),
+            f.Precio
+        ) AS PrecioFinal
+    FROM Funciones f
+    JOIN Peliculas p ON p.IdPelicula = f.IdPelicula
+    JOIN Generos  g  ON g.IdGenero   = p.IdGenero
+    WHERE f.IdFuncion IN ({placeholders})
+"""
 
 
 class FuncionRepository:
@@ -22,7 +42,7 @@ class FuncionRepository:
             Tupla con (precio_final, mensaje)
         """
         # Obtenemos el precio calculado de una funcion usando el sp SP_DeterminarPrecioEntrada
-        _, out_values = call_sp_with_out_params(
+        _, out_values = call_sp_with_out_params_single_trip(
             'SP_DeterminarPrecioEntrada',
             in_params=(id_funcion,),
             out_param_count=2
@@ -35,4 +55,32 @@ class FuncionRepository:
         
         # Devolvemos el precio calculado de la funcion
         return precio_final, mensaje or 'Error desconocido'
-
+    
+    @staticmethod
+    def get_precios_funciones(ids_funcion: List[int]) -> Dict[int, Tuple[Optional[Decimal], str]]:
+        """
+        Obtener precios calculados de varias funciones con una sola consulta
+        
+        Aplica las mismas reglas y mensajes que SP_DeterminarPrecioEntrada
+        
+        Args:
+            ids_funcion: IDs de las funciones (sin repetidos)
+        
+        Returns:
+            Diccionario id_funcion -> (precio_final, mensaje) con una entrada por cada ID pedido
+        """
+        if not ids_funcion:
+            return {}
+        
+        # Obtenemos todas las funciones pedidas en un solo viaje a la base de datos
+        query = SQL_PRECIOS_FUNCIONES.format(placeholders=', '.join(['%s'] * len(ids_funcion)))
+        filas = execute_query(query, tuple(ids_funcion)) or []
+        
+        # Las funciones que no vinieron en el resultado no existen
+        precios = {id_funcion: (None, 'Funcion no encontrada') for id_funcion in ids_funcion}
+        for fila in filas:
+            if fila['Estado'] != 'A' or fila['FechaFin'] is not None:
+                precios[fila['IdFuncion']] = (None, 'Funcion inactiva o finalizada')
+            else:
+                precios[fila['IdFuncion']] = (Decimal(str(fila['PrecioFinal'])), 'OK')
+        return precios
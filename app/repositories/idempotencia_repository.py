@@ -0,0 +1,76 @@
+"""
+Repositorio de claves de idempotencia
+Nos permite compartir el resultado de cada Idempotency-Key entre todos los workers y procesos de la aplicacion
+(los reintentos de un cliente pueden llegar a cualquier worker)
+"""
+from typing import Any, Dict, Optional
+from app.database import execute_query, get_db, medir
+
+# Estados de una clave: en curso (la ejecucion original todavia no termino) o completada (resultado guardado)
+ESTADO_EN_CURSO = 'P'
+ESTADO_COMPLETADA = 'C'
+
+# Una clave vencida (resultado viejo o ejecucion en curso abandonada) se puede volver a reclamar
+SQL_BORRAR_VENCIDA = "DELETE FROM ClavesIdempotencia WHERE Clave = %s AND FechaVence <= NOW(6)"
+
+# La clave primaria decide quien ejecuta: solo un INSERT por clave agrega la fila
+SQL_RECLAMAR = """
+    INSERT IGNORE INTO ClavesIdempotencia (Clave, Huella, Estado, FechaAlta, FechaVence)
+    VALUES (%s, %s, 'P', NOW(6), NOW(6) + INTERVAL %s SECOND)
+"""
+
+SQL_OBTENER = "SELECT Huella, Estado, StatusCode, Respuesta FROM ClavesIdempotencia WHERE Clave = %s"
+
+SQL_COMPLETAR = """
+    UPDATE ClavesIdempotencia
+    SET Estado = 'C', StatusCode = %s, Respuesta = %s, FechaVence = NOW(6) + INTERVAL %s SECOND
+    WHERE Clave = %s AND Estado = 'P'
+"""
+
+SQL_LIBERAR = "DELETE FROM ClavesIdempotencia WHERE Clave = %s AND Estado = 'P'"
+
+SQL_PURGAR_VENCIDAS = "DELETE FROM ClavesIdempotencia WHERE FechaVence <= NOW(6) LIMIT %s"
+
+
+class IdempotenciaRepository:
+    """Repositorio para las claves de idempotencia (tabla ClavesIdempotencia)"""
+
+    @staticmethod
+    def reclamar(clave: str, huella: str, vence_en: int) -> Optional[Dict[str, Any]]:
+        """
+        Reclamar una clave para ejecutar la operacion (en una transaccion corta y propia)
+
+        Args:
+            clave: Clave de idempotencia
+            huella: Huella del contenido del request
+            vence_en: Segundos que la clave queda reservada si la ejecucion no termina (ej: el worker murio)
+
+        Returns:
+            None si la clave quedo reclamada por el llamador; si no, la fila existente
+            (Huella, Estado, StatusCode, Respuesta)
+        """
+        with medir('transaction', 'reclamar_idempotencia'), get_db() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(SQL_BORRAR_VENCIDA, (clave,))
+                cursor.execute(SQL_RECLAMAR, (clave, huella, vence_en))
+                if cursor.rowcount == 1:
+                    return None
+                cursor.execute(SQL_OBTENER, (clave,))
+                # Puede no estar si el duenio la libero entre el INSERT y el SELECT: se vuelve a intentar
+                return cursor.fetchone() or {'Huella': huella, 'Estado': ESTADO_EN_CURSO,
+                                             'StatusCode': None, 'Respuesta': None}
+
+    @staticmethod
+    def completar(clave: str, status_code: int, respuesta: str, ttl: int) -> None:
+        """Guardar el resultado de la ejecucion (JSON) por ttl segundos"""
+        execute_query(SQL_COMPLETAR, (status_code, respuesta, ttl, clave), fetch=False)
+
+    @staticmethod
+    def liberar(clave: str) -> None:
+        """Borrar una clave en curso cuya ejecucion fallo sin resultado guardable (se puede reintentar)"""
+        execute_query(SQL_LIBERAR, (clave,), fetch=False)
+
+    @staticmethod
+    def purgar_vencidas(limite: int = 1000) -> None:
+        """Borrar hasta limite claves vencidas"""
+        execute_query(SQL_PURGAR_VENCIDAS, (limite,), fetch=False)
@@ -2,9 +2,96 @@
 Repositorio para reportes
 Nos permite obtener el reporte de ocupacion por pelicula
 """
-from typing import List, Dict, Any
-from datetime import date
-from app.database import call_stored_procedure
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from datetime import date, datetime, timedelta
+from app.database import call_stored_procedure, execute_query, stream_query
+
+# Filtro de funciones activas de la pelicula en el periodo [fecha_inicio, fecha_fin + 1 dia)
+# Compara la columna sin funciones (sargable) para usar IDX_Funciones_IdPelicula_Estado_FechaInicio
+SQL_FILTRO_FUNCIONES_PERIODO = """
+    f.IdPelicula = %s
+    AND f.Estado = 'A'
+    AND f.FechaInicio >= %s
+    AND f.FechaInicio <  %s
+"""
+
+# Filtro de funciones activas de todas las peliculas en el periodo (usa IDX_Funciones_FechaInicio)
+SQL_FILTRO_FUNCIONES_PERIODO_TODAS = """
+    f.Estado = 'A'
+    AND f.FechaInicio >= %s
+    AND f.FechaInicio <  %s
+"""
+
+# Pagina del reporte: se pagina sobre Funciones (en el orden del indice) y las butacas vendidas se leen
+# de ResumenOcupacionFunciones (mantenido por triggers), asi el costo depende de las funciones y no de las reservas;
+# mismas columnas que SP_ReporteOcupacionPorPelicula
+SQL_OCUPACION_POR_PELICULA = """
+    SELECT
+        pf.IdFuncion,
+        pf.FechaInicio,
+        pf.IdSala,
+        s.Sala,
+        COALESCE(ro.ButacasVendidas, 0) AS TotalButacasVendidas,
+        COALESCE(ro.ButacasVendidas, 0) * pf.Precio AS TotalIngresosRecaudados
+    FROM (
+        SELECT f.IdFuncion, f.FechaInicio, f.IdSala, f.Precio
+        FROM Funciones f
+        WHERE {filtro}
+        {despues_de}
+        ORDER BY f.FechaInicio, f.IdFuncion
+        LIMIT %s OFFSET %s
+    ) pf
+    JOIN Salas s ON s.IdSala = pf.IdSala
+    LEFT JOIN ResumenOcupacionFunciones ro ON ro.IdFuncion = pf.IdFuncion
+    ORDER BY pf.FechaInicio, pf.IdFuncion
+"""
+
+# Funciones posteriores a la ultima de la pagina anterior (FechaInicio, IdFuncion)
+SQL_FILTRO_DESPUES_DE = "AND (f.FechaInicio > %s OR (f.FechaInicio = %s AND f.IdFuncion > %s))"
+
+SQL_CONTAR_FUNCIONES_PERIODO = "SELECT COUNT(*) AS Total FROM Funciones f WHERE {filtro}"
+
+# Peliculas del reporte de varias peliculas ("all" = todas las activas)
+SQL_PELICULAS_ACTIVAS = "SELECT IdPelicula, Pelicula FROM Peliculas WHERE Estado = 'A' ORDER BY IdPelicula"
+SQL_PELICULAS_POR_ID = "SELECT IdPelicula, Pelicula FROM Peliculas WHERE IdPelicula IN ({placeholders})"
+
+# Version del reporte (para el ETag): suma de las versiones de ResumenOcupacionFunciones (suben con cada butaca
+# vendida o liberada) de las funciones del periodo, mas VersionCatalogo (sube si se agregan o quitan funciones o
+# cambian su precio, sala o fecha, o cambia una pelicula o sala); recorre el indice del reporte sin agregar Salas
+SQL_VERSION_OCUPACION = """
+    SELECT
+        COUNT(*) AS Total,
+        COALESCE(SUM(ro.Version), 0) AS Version,
+        (SELECT Version FROM VersionCatalogo WHERE IdVersion = 1) AS VersionCatalogo
+    FROM Funciones f
+    LEFT JOIN ResumenOcupacionFunciones ro ON ro.IdFuncion = f.IdFuncion
+    WHERE f.IdPelicula IN ({peliculas})
+    AND {filtro}
+"""
+
+# Exportacion completa del periodo (sin paginar): se lee con un cursor sin buffer, fila por fila
+SQL_EXPORTAR_OCUPACION = """
+    SELECT
+        f.IdPelicula,
+        f.IdFuncion,
+        f.FechaInicio,
+        f.IdSala,
+        s.Sala,
+        COALESCE(ro.ButacasVendidas, 0) AS TotalButacasVendidas,
+        COALESCE(ro.ButacasVendidas, 0) * f.Precio AS TotalIngresosRecaudados
+    FROM Funciones f
+    JOIN Salas s ON s.IdSala = f.IdSala
+    LEFT JOIN ResumenOcupacionFunciones ro ON ro.IdFuncion = f.IdFuncion
+    WHERE {filtro}
+    ORDER BY f.FechaInicio, f.IdFuncion
+"""
+
+
+def rango_periodo(fecha_inicio: date, fecha_fin: date) -> Tuple[datetime, datetime]:
+    """Convertir el periodo [fecha_inicio, fecha_fin] en el rango semiabierto de FechaInicio"""
+    desde = datetime.combine(fecha_inicio, datetime.min.time())
+    hasta = datetime.combine(fecha_fin + timedelta(days=1), datetime.min.time())
+    return desde, hasta
 
 
 class ReporteRepository:
@@ -18,6 +105,7 @@ class ReporteRepository:
     ) -> List[Dict[str, Any]]:
         """
         Obtener reporte de ocupacion por pelicula usando SP_ReporteOcupacionPorPelicula
+        (lee las butacas vendidas de ResumenOcupacionFunciones)
         
         Args:
             id_pelicula: ID de la pelicula
@@ -34,4 +122,142 @@ class ReporteRepository:
         )
         # Devolvemos el reporte de ocupacion por pelicula
         return results or []
-
+    
+    @staticmethod
+    def get_peliculas(ids_pelicula: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtener IdPelicula y nombre de las peliculas del reporte
+        
+        Args:
+            ids_pelicula: IDs de las peliculas (None = todas las peliculas activas)
+        
+        Returns:
+            Lista de peliculas encontradas (las inexistentes no aparecen)
+        """
+        if ids_pelicula is None:
+            return execute_query(SQL_PELICULAS_ACTIVAS) or []
+        if not ids_pelicula:
+            return []
+        query = SQL_PELICULAS_POR_ID.format(placeholders=', '.join(['%s'] * len(ids_pelicula)))
+        return execute_query(query, tuple(ids_pelicula)) or []
+    
+    @staticmethod
+    def get_ocupacion_por_pelicula_pagina(
+        id_pelicula: int,
+        fecha_inicio: date,
+        fecha_fin: date,
+        limit: int,
+        offset: int = 0,
+        despues_de: Optional[Tuple[datetime, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtener una pagina del reporte de ocupacion ordenada por (FechaInicio, IdFuncion)
+        
+        Args:
+            id_pelicula: ID de la pelicula
+            fecha_inicio: Fecha de inicio del periodo
+            fecha_fin: Fecha fin del periodo (inclusive)
+            limit: Cantidad maxima de funciones
+            offset: Funciones a saltear (paginacion por numero de pagina)
+            despues_de: (FechaInicio, IdFuncion) de la ultima funcion ya entregada (paginacion por cursor)
+        
+        Returns:
+            Lista de registros de ocupacion (mismas columnas que SP_ReporteOcupacionPorPelicula)
+        """
+        params: Tuple = (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin)
+        filtro_despues_de = ''
+        if despues_de is not None:
+            fecha, id_funcion = despues_de
+            filtro_despues_de = SQL_FILTRO_DESPUES_DE
+            params += (fecha, fecha, id_funcion)
+        query = SQL_OCUPACION_POR_PELICULA.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO, despues_de=filtro_despues_de)
+        return execute_query(query, params + (limit, offset)) or []
+    
+    @staticmethod
+    def contar_funciones_periodo(id_pelicula: int, fecha_inicio: date, fecha_fin: date) -> int:
+        """Cantidad de funciones del reporte (se resuelve solo con el indice)"""
+        query = SQL_CONTAR_FUNCIONES_PERIODO.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO)
+        fila = execute_query(query, (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin))
+        return fila[0]['Total'] if fila else 0
+    
+    @staticmethod
+    def estimar_funciones_periodo(id_pelicula: int, fecha_inicio: date, fecha_fin: date) -> int:
+        """Cantidad estimada de funciones del reporte segun las estadisticas del optimizador"""
+        query = "EXPLAIN " + SQL_CONTAR_FUNCIONES_PERIODO.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO)
+        plan = execute_query(query, (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin))
+        return int(plan[0].get('rows') or 0) if plan else 0
+    
+    @staticmethod
+    def version_ocupacion(
+        ids_pelicula: Optional[List[int]],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple[int, int, int]:
+        """
+        Version del reporte de ocupacion de las peliculas en el periodo (una sola fila de agregados)
+        
+        Args:
+            ids_pelicula: IDs de las peliculas (None = todas las peliculas activas)
+            fecha_inicio: Fecha de inicio del periodo
+            fecha_fin: Fecha fin del periodo (inclusive)
+        
+        Returns:
+            (cantidad de funciones, suma de sus versiones del resumen, version del catalogo)
+        """
+        if ids_pelicula is None:
+            peliculas = "SELECT IdPelicula FROM Peliculas WHERE Estado = 'A'"
+            params: Tuple = ()
+        else:
+            peliculas = ', '.join(['%s'] * len(ids_pelicula))
+            params = tuple(ids_pelicula)
+        query = SQL_VERSION_OCUPACION.format(peliculas=peliculas, filtro=SQL_FILTRO_FUNCIONES_PERIODO_TODAS)
+        fila = execute_query(query, params + rango_periodo(fecha_inicio, fecha_fin))
+        if not fila:
+            return 0, 0, 0
+        return fila[0]['Total'], int(fila[0]['Version'] or 0), int(fila[0]['VersionCatalogo'] or 0)
+    
+    @staticmethod
+    def exportar_ocupacion(
+        id_pelicula: Optional[int],
+        fecha_inicio: date,
+        fecha_fin: date,
+        batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorrer el reporte de ocupacion completo del periodo sin cargarlo en memoria
+        
+        Args:
+            id_pelicula: ID de la pelicula (None = todas las peliculas)
+            fecha_inicio: Fecha de inicio del periodo
+            fecha_fin: Fecha fin del periodo
+            batch_size: Filas leidas de la base por vez
+        
+        Returns:
+            Generador de filas (columnas del reporte mas IdPelicula), ordenadas por FechaInicio
+        """
+        if id_pelicula is None:
+            filtro, params = SQL_FILTRO_FUNCIONES_PERIODO_TODAS, rango_periodo(fecha_inicio, fecha_fin)
+        else:
+            filtro, params = SQL_FILTRO_FUNCIONES_PERIODO, (id_pelicula,) + rango_periodo(fecha_inicio, fecha_fin)
+        return stream_query(SQL_EXPORTAR_OCUPACION.format(filtro=filtro), params, batch_size=batch_size)
+    
+    @staticmethod
+    def verificar_resumen_ocupacion() -> List[Dict[str, Any]]:
+        """
+        Comparar ResumenOcupacionFunciones con las reservas activas y pagadas usando SP_VerificarResumenOcupacion
+        
+        Returns:
+            Funciones con desvio (IdFuncion, ButacasResumen, ButacasReales); vacio si el resumen esta al dia
+        """
+        return call_stored_procedure('SP_VerificarResumenOcupacion') or []
+    
+    @staticmethod
+    def reconstruir_resumen_ocupacion() -> int:
+        """
+        Recalcular ResumenOcupacionFunciones desde Reservas usando SP_ReconstruirResumenOcupacion
+        
+        Returns:
+            Cantidad de funciones con reservas en el resumen
+        """
+        results = call_stored_procedure('SP_ReconstruirResumenOcupacion')
+        return results[0]['FuncionesResumidas'] if results else 0
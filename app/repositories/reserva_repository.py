@@ -2,8 +2,209 @@
 Repositorio para reservas
 Nos permite crear, listar y cancelar reservas
 """
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Any, Tuple, Optional
-from app.database import call_sp_with_out_params, call_stored_procedure
+from app.database import call_sp_with_out_params_single_trip, call_stored_procedure, execute_query, get_db, medir
+
+# Reservas de un DNI con las mismas columnas que SP_ReservasPorDNI, paginadas en la base de datos
+# El orden (FechaInicio, IdReserva) es total, asi la pagina siguiente se pide por posicion (keyset) y no por OFFSET
+SQL_RESERVAS_POR_DNI = """
+    SELECT
+        r.IdReserva,
+        r.DNI,
+        f.IdFuncion,
+        f.FechaInicio,
+        p.Pelicula,
+        s.Sala,
+        r.EstaPagada,
+        r.FechaAlta,
+        r.FechaBaja
+    FROM Reservas r
+    JOIN Funciones f ON f.IdFuncion = r.IdFuncion
+    JOIN Peliculas p ON p.IdPelicula = f.IdPelicula
+    JOIN Salas    s ON s.IdSala     = f.IdSala
+    WHERE r.DNI = %s
+    {filtro}
+    ORDER BY f.FechaInicio, r.IdReserva
+    LIMIT %s OFFSET %s
+"""
+
+# Filas posteriores a la ultima fila de la pagina anterior (FechaInicio, IdReserva)
+SQL_FILTRO_DESPUES_DE = "AND (f.FechaInicio > %s OR (f.FechaInicio = %s AND r.IdReserva > %s))"
+
+SQL_CONTAR_RESERVAS_POR_DNI = "SELECT COUNT(*) AS Total FROM Reservas WHERE DNI = %s"
+
+# Version de las reservas del DNI (para el ETag): contadores que mantienen los triggers (VersionesReservasDNI
+# con cada alta, pago o baja del DNI y VersionCatalogo con cada cambio de pelicula, sala o funcion); dos lecturas
+# por clave primaria, sin recorrer las reservas
+SQL_VERSION_RESERVAS_POR_DNI = """
+    SELECT
+        (SELECT Version FROM VersionesReservasDNI WHERE DNI = %s) AS Version,
+        (SELECT Version FROM VersionCatalogo WHERE IdVersion = 1) AS VersionCatalogo
+"""
+
+# Estimacion del optimizador (filas que leeria por el indice de DNI), sin recorrerlas
+SQL_ESTIMAR_RESERVAS_POR_DNI = "EXPLAIN SELECT IdReserva FROM Reservas WHERE DNI = %s"
+
+# Limite de reservas activas y pagadas por DNI en una misma fecha (misma regla que SP_ReservarButacaConValidacionDNI)
+LIMITE_RESERVAS_DNI_POR_FECHA = 4
+
+# Invariantes de las reservas (diagnostico: recorren toda la tabla). SP_ReservarButacaConValidacionDNI valida con
+# lecturas sin bloqueo y no hay UNIQUE sobre las reservas activas, asi que reservas concurrentes pueden romperlas
+SQL_BUTACAS_DUPLICADAS = """
+    SELECT IdFuncion, IdButaca, COUNT(*) AS Reservas
+    FROM Reservas
+    WHERE FechaBaja IS NULL
+    GROUP BY IdFuncion, IdButaca
+    HAVING COUNT(*) > 1
+    ORDER BY IdFuncion, IdButaca
+"""
+
+SQL_DNIS_SOBRE_LIMITE = """
+    SELECT r.DNI, DATE(f.FechaInicio) AS Fecha, COUNT(*) AS Reservas
+    FROM Reservas r
+    JOIN Funciones f ON f.IdFuncion = r.IdFuncion
+    WHERE r.FechaBaja IS NULL
+      AND r.EstaPagada = 'S'
+    GROUP BY r.DNI, DATE(f.FechaInicio)
+    HAVING COUNT(*) > %s
+    ORDER BY r.DNI, Fecha
+"""
+
+# Mensajes de SP_ReservarButacaConValidacionDNI (se reproducen tal cual en las reservas en lote)
+MSG_OK = 'OK'
+MSG_FUNCION_NO_ENCONTRADA = 'Funcion no encontrada'
+MSG_FUNCION_INACTIVA = 'Funcion inactiva o finalizada'
+MSG_BUTACA_INEXISTENTE = 'Butaca inexistente en la sala de la funcion'
+MSG_BUTACA_RESERVADA = 'Butaca ya reservada para esta funcion'
+MSG_LIMITE_DNI = 'Limite de 4 reservas activas y pagadas por fecha superado para este DNI'
+
+# Solicitud de reserva: (id_funcion, id_butaca, dni)
+Solicitud = Tuple[int, int, str]
+
+
+def _placeholders(cantidad: int) -> str:
+    """Lista de placeholders %s para una clausula IN"""
+    return ', '.join(['%s'] * cantidad)
+
+
+def _evaluar_solicitudes(cursor, solicitudes: List[Solicitud]) -> Tuple[List[str], List[Tuple]]:
+    """
+    Aplicar las reglas de SP_ReservarButacaConValidacionDNI a varias solicitudes dentro de una transaccion
+    
+    Hace una consulta por regla para todo el conjunto (funciones, butacas, ocupacion y limite por DNI)
+    en lugar de repetirlas por cada butaca. Las solicitudes se resuelven en orden, teniendo en cuenta
+    las aceptadas antes en el mismo conjunto (misma butaca o mismo DNI en la misma fecha).
+    
+    Args:
+        cursor: Cursor de una transaccion abierta con get_db()
+        solicitudes: Lista de (id_funcion, id_butaca, dni)
+    
+    Returns:
+        Tupla con (mensaje por solicitud, filas a insertar para las solicitudes aceptadas)
+    """
+    ids_funcion = sorted({id_funcion for id_funcion, _, _ in solicitudes})
+    ids_butaca = sorted({id_butaca for _, id_butaca, _ in solicitudes})
+    dnis = sorted({dni for _, _, dni in solicitudes})
+    
+    # 1) Funciones: bloqueamos las filas para serializar los lotes concurrentes sobre la misma funcion
+    cursor.execute(
+        f"""
+        SELECT IdFuncion, IdSala, IdPelicula, FechaInicio, Estado, FechaFin
+        FROM Funciones
+        WHERE IdFuncion IN ({_placeholders(len(ids_funcion))})
+        FOR UPDATE
+        """,
+        tuple(ids_funcion)
+    )
+    funciones = {fila['IdFuncion']: fila for fila in cursor.fetchall()}
+    
+    # 2) Butacas pedidas y su sala
+    cursor.execute(
+        f"SELECT IdButaca, IdSala FROM Butacas WHERE IdButaca IN ({_placeholders(len(ids_butaca))})",
+        tuple(ids_butaca)
+    )
+    sala_butaca = {fila['IdButaca']: fila['IdSala'] for fila in cursor.fetchall()}
+    
+    # 3) Butacas ya reservadas (activas) en las funciones pedidas
+    cursor.execute(
+        f"""
+        SELECT IdFuncion, IdButaca
+        FROM Reservas
+        WHERE IdFuncion IN ({_placeholders(len(ids_funcion))})
+          AND IdButaca  IN ({_placeholders(len(ids_butaca))})
+          AND FechaBaja IS NULL
+        """,
+        tuple(ids_funcion) + tuple(ids_butaca)
+    )
+    ocupadas = {(fila['IdFuncion'], fila['IdButaca']) for fila in cursor.fetchall()}
+    
+    # 4) Reservas activas y pagadas por DNI y fecha, solo en las fechas de las funciones pedidas
+    fechas = sorted({funcion['FechaInicio'].date() for funcion in funciones.values()})
+    reservas_por_dni: Dict[Tuple[str, date], int] = {}
+    if fechas:
+        cursor.execute(
+            f"""
+            SELECT r.DNI, DATE(f.FechaInicio) AS Fecha, COUNT(*) AS Cantidad
+            FROM Reservas r
+            JOIN Funciones f ON f.IdFuncion = r.IdFuncion
+            WHERE r.DNI IN ({_placeholders(len(dnis))})
+              AND r.FechaBaja IS NULL
+              AND r.EstaPagada = 'S'
+              AND f.FechaInicio >= %s
+              AND f.FechaInicio <  %s
+            GROUP BY r.DNI, DATE(f.FechaInicio)
+            """,
+            tuple(dnis) + (fechas[0], fechas[-1] + timedelta(days=1))
+        )
+        for fila in cursor.fetchall():
+            fecha = fila['Fecha']
+            reservas_por_dni[(fila['DNI'], fecha.date() if hasattr(fecha, 'date') else fecha)] = fila['Cantidad']
+    
+    # 5) Resolvemos cada solicitud en orden con los mismos mensajes que el sp
+    mensajes = []
+    filas_insertar = []
+    for id_funcion, id_butaca, dni in solicitudes:
+        funcion = funciones.get(id_funcion)
+        if funcion is None:
+            mensajes.append(MSG_FUNCION_NO_ENCONTRADA)
+            continue
+        if funcion['Estado'] != 'A' or funcion['FechaFin'] is not None:
+            mensajes.append(MSG_FUNCION_INACTIVA)
+            continue
+        if sala_butaca.get(id_butaca) != funcion['IdSala']:
+            mensajes.append(MSG_BUTACA_INEXISTENTE)
+            continue
+        if (id_funcion, id_butaca) in ocupadas:
+            mensajes.append(MSG_BUTACA_RESERVADA)
+            continue
+        clave_dni = (dni, funcion['FechaInicio'].date())
+        if reservas_por_dni.get(clave_dni, 0) >= LIMITE_RESERVAS_DNI_POR_FECHA:
+            mensajes.append(MSG_LIMITE_DNI)
+            continue
+        
+        # Aceptada: la butaca queda tomada y suma al limite del DNI para las siguientes solicitudes
+        ocupadas.add((id_funcion, id_butaca))
+        reservas_por_dni[clave_dni] = reservas_por_dni.get(clave_dni, 0) + 1
+        filas_insertar.append((id_funcion, funcion['IdPelicula'], funcion['IdSala'], id_butaca, dni))
+        mensajes.append(MSG_OK)
+    
+    return mensajes, filas_insertar
+
+
+def _insertar_reservas(cursor, filas: List[Tuple]) -> None:
+    """Insertar varias reservas (pagadas, como el sp) con un unico INSERT multi-fila"""
+    if not filas:
+        return
+    cursor.executemany(
+        """
+        INSERT INTO Reservas (
+            IdFuncion, IdPelicula, IdSala, IdButaca,
+            DNI, FechaAlta, FechaBaja, EstaPagada, Observaciones
+        ) VALUES (%s, %s, %s, %s, %s, NOW(), NULL, 'S', NULL)
+        """,
+        filas
+    )
 
 
 class ReservaRepository:
@@ -23,7 +224,7 @@ class ReservaRepository:
             Mensaje del stored procedure (OK o error)
         """
         # Creamos una nueva reserva usando el sp SP_ReservarButacaConValidacionDNI
-        _, out_values = call_sp_with_out_params(
+        _, out_values = call_sp_with_out_params_single_trip(
             'SP_ReservarButacaConValidacionDNI',
             in_params=(id_funcion, id_butaca, dni),
             out_param_count=1
@@ -51,4 +252,112 @@ class ReservaRepository:
         )
         # Devolvemos las reservas de un cliente
         return results or []
-
+    
+    @staticmethod
+    def get_reservas_por_dni_pagina(
+        dni: str,
+        limit: int,
+        offset: int = 0,
+        despues_de: Optional[Tuple[datetime, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtener una pagina de reservas de un cliente ordenadas por (FechaInicio, IdReserva)
+        
+        Args:
+            dni: DNI del cliente
+            limit: Cantidad maxima de filas
+            offset: Filas a saltear (paginacion por numero de pagina)
+            despues_de: (FechaInicio, IdReserva) de la ultima fila ya entregada (paginacion por cursor)
+        
+        Returns:
+            Lista de reservas con detalles (mismas columnas que SP_ReservasPorDNI)
+        """
+        params: Tuple = (dni,)
+        filtro = ''
+        if despues_de is not None:
+            fecha_inicio, id_reserva = despues_de
+            filtro = SQL_FILTRO_DESPUES_DE
+            params += (fecha_inicio, fecha_inicio, id_reserva)
+        query = SQL_RESERVAS_POR_DNI.format(filtro=filtro)
+        return execute_query(query, params + (limit, offset)) or []
+    
+    @staticmethod
+    def contar_reservas_por_dni(dni: str) -> int:
+        """Cantidad exacta de reservas de un cliente (solo lee el indice de DNI)"""
+        fila = execute_query(SQL_CONTAR_RESERVAS_POR_DNI, (dni,))
+        return fila[0]['Total'] if fila else 0
+    
+    @staticmethod
+    def estimar_reservas_por_dni(dni: str) -> int:
+        """Cantidad estimada de reservas de un cliente segun las estadisticas del optimizador"""
+        plan = execute_query(SQL_ESTIMAR_RESERVAS_POR_DNI, (dni,))
+        return int(plan[0].get('rows') or 0) if plan else 0
+    
+    @staticmethod
+    def version_reservas_por_dni(dni: str) -> Tuple[int, int]:
+        """(version del DNI, version del catalogo): cambia si cambia algo de lo que se lista"""
+        fila = execute_query(SQL_VERSION_RESERVAS_POR_DNI, (dni,))
+        if not fila:
+            return 0, 0
+        return int(fila[0]['Version'] or 0), int(fila[0]['VersionCatalogo'] or 0)
+    
+    @staticmethod
+    def get_butacas_duplicadas() -> List[Dict[str, Any]]:
+        """Butacas con mas de una reserva activa en la misma funcion (IdFuncion, IdButaca, Reservas)"""
+        return execute_query(SQL_BUTACAS_DUPLICADAS) or []
+    
+    @staticmethod
+    def get_dnis_sobre_limite() -> List[Dict[str, Any]]:
+        """DNIs con mas reservas activas y pagadas que el limite en una misma fecha (DNI, Fecha, Reservas)"""
+        filas = execute_query(SQL_DNIS_SOBRE_LIMITE, (LIMITE_RESERVAS_DNI_POR_FECHA,)) or []
+        for fila in filas:
+            fecha = fila['Fecha']
+            fila['Fecha'] = fecha.date() if isinstance(fecha, datetime) else fecha
+        return filas
+    
+    @staticmethod
+    def crear_reservas_lote(id_funcion: int, ids_butaca: List[int], dni: str) -> Tuple[bool, List[str]]:
+        """
+        Crear varias reservas de una misma funcion y DNI en una unica transaccion (todo o nada)
+        
+        Valida la funcion una sola vez y todas las butacas y el limite del DNI en conjunto,
+        con las mismas reglas y mensajes que SP_ReservarButacaConValidacionDNI.
+        
+        Args:
+            id_funcion: ID de la funcion
+            ids_butaca: IDs de las butacas (sin repetidos)
+            dni: DNI del cliente
+        
+        Returns:
+            Tupla con (True si se insertaron todas, mensaje por butaca en el mismo orden)
+        """
+        solicitudes = [(id_funcion, id_butaca, dni) for id_butaca in ids_butaca]
+        with medir('transaction', 'crear_reservas_lote'), get_db() as conn:
+            with conn.cursor() as cursor:
+                mensajes, filas = _evaluar_solicitudes(cursor, solicitudes)
+                # Si alguna butaca no se puede reservar no insertamos ninguna
+                todas_ok = all(mensaje == MSG_OK for mensaje in mensajes)
+                if todas_ok:
+                    _insertar_reservas(cursor, filas)
+                return todas_ok, mensajes
+    
+    @staticmethod
+    def crear_reservas_agrupadas(solicitudes: List[Solicitud]) -> List[str]:
+        """
+        Aplicar varias solicitudes de reserva independientes en una unica transaccion (group commit)
+        
+        Cada solicitud se resuelve por separado con las reglas y mensajes de SP_ReservarButacaConValidacionDNI
+        (los conflictos por la misma butaca o el mismo DNI dentro del lote se resuelven en orden de llegada);
+        se insertan solo las aceptadas y se hace un unico commit.
+        
+        Args:
+            solicitudes: Lista de (id_funcion, id_butaca, dni)
+        
+        Returns:
+            Mensaje por solicitud, en el mismo orden ('OK' si se inserto)
+        """
+        with medir('transaction', 'crear_reservas_agrupadas'), get_db() as conn:
+            with conn.cursor() as cursor:
+                mensajes, filas = _evaluar_solicitudes(cursor, solicitudes)
+                _insertar_reservas(cursor, filas)
+                return mensajes
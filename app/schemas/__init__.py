@@ -6,7 +6,7 @@ consulta el archivo PYDANTIC.md en la raíz del proyecto.
 """
 from app.schemas.common import ErrorResponse, SuccessResponse, PaginationInfo, PaginatedResponse
 from app.schemas.precio import PrecioResponse
-from app.schemas.reserva import ReservaCreate, ReservaResponse, ReservaDetalle, ReservaListResponse
+from app.schemas.reserva import ReservaCreate, ReservaLoteCreate, ReservaResponse, ReservaDetalle, ReservaListResponse
 from app.schemas.reporte import ReporteOcupacionParams, ReporteOcupacionItem, ReporteOcupacionResponse
 
 __all__ = [
@@ -19,6 +19,7 @@ __all__ = [
     'PrecioResponse',
     # Reserva
     'ReservaCreate',
+    'ReservaLoteCreate',
     'ReservaResponse',
     'ReservaDetalle',
     'ReservaListResponse',
@@ -25,6 +25,22 @@ class ReservaCreate(BaseModel):
         }
 
 
+class ReservaLoteCreate(BaseModel):
+    """Schema para crear varias reservas de una misma funcion y DNI"""
+    id_funcion: int = Field(..., description="ID de la funcion", gt=0)
+    ids_butaca: List[int] = Field(..., description="IDs de las butacas", min_length=1)
+    dni: str = Field(..., description="DNI del cliente", min_length=7, max_length=11)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id_funcion": 1,
+                "ids_butaca": [5, 6, 7],
+                "dni": "12345678"
+            }
+        }
+
+
 class ReservaResponse(BaseModel):
     """Schema de respuesta para creacion de reserva"""
     success: bool = Field(..., description="Indica si la reserva fue exitosa")
@@ -4,10 +4,12 @@ Capa de Servicios - Logica de negocio
 from app.services.precio_service import PrecioService
 from app.services.reserva_service import ReservaService
 from app.services.reporte_service import ReporteService
+from app.services.butaca_service import ButacaService
 
 __all__ = [
     'PrecioService',
     'ReservaService',
-    'ReporteService'
+    'ReporteService',
+    'ButacaService'
 ]
 
@@ -0,0 +1,59 @@
+"""
+Servicio de Administracion - Diagnostico del proceso
+Nos permite consultar las ultimas consultas lentas registradas por app/sql_trace.py
+"""
+import hmac
+from typing import Any, Dict, Optional
+from app.config import Config
+from app.sql_trace import consultas_lentas
+from app.utils.exceptions import NotFoundError, UnauthorizedError, ValidationError
+
+config = Config()
+
+
+class AdminService:
+    """Servicio para los endpoints de administracion"""
+
+    # Validamos el token de administracion (sin ADMIN_TOKEN los endpoints de administracion no existen)
+    @staticmethod
+    def verificar_token(token: Optional[str]) -> None:
+        """
+        Verificar el header X-Admin-Token contra ADMIN_TOKEN
+
+        Raises:
+            NotFoundError: Si ADMIN_TOKEN no esta configurado (no quedan publicos por omision)
+            UnauthorizedError: Si el token no coincide
+        """
+        if not config.ADMIN_TOKEN:
+            raise NotFoundError("Recurso no encontrado")
+        if not hmac.compare_digest((token or '').encode(), config.ADMIN_TOKEN.encode()):
+            raise UnauthorizedError("Token de administracion invalido o faltante")
+
+    # Listamos las consultas lentas del proceso (de la mas reciente a la mas antigua)
+    @staticmethod
+    def listar_consultas_lentas(limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtener las consultas lentas guardadas en el buffer del proceso
+
+        Args:
+            limit: Cantidad maxima de consultas a devolver (None = todas)
+
+        Returns:
+            Diccionario con las consultas y el estado del buffer
+
+        Raises:
+            ValidationError: Si limit no es positivo
+        """
+        if limit is not None and limit < 1:
+            raise ValidationError("El parametro limit debe ser mayor a 0")
+        return {
+            'umbral_ms': config.SQL_SLOW_QUERY_MS,
+            'estado': consultas_lentas.stats(),
+            'data': consultas_lentas.listar(limit)
+        }
+
+    # Vaciamos el buffer de consultas lentas
+    @staticmethod
+    def limpiar_consultas_lentas() -> Dict[str, Any]:
+        """Vaciar el buffer de consultas lentas del proceso"""
+        return {'eliminadas': consultas_lentas.limpiar()}
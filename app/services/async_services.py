@@ -0,0 +1,177 @@
+"""
+Servicios asincronicos
+Reutilizan la logica de negocio de los servicios sincronicos (mapeo de mensajes, validaciones y paginacion)
+sobre los repositorios asincronicos, con las mismas respuestas que la API Flask
+"""
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime
+from anyio import from_thread, to_thread
+from app.repositories.async_repositories import (
+    AsyncFuncionRepository,
+    AsyncReservaRepository,
+    AsyncReporteRepository
+)
+from app.repositories.reserva_repository import MSG_BUTACA_RESERVADA
+from app.services.precio_service import PrecioService, precio_cache, config
+from app.services.reserva_service import (
+    ReservaService, admision_butacas, butaca_confirmada_ocupada, reservas_idempotency
+)
+from app.services.butaca_service import ButacaService
+from app.services.reporte_service import ReporteService
+from app.utils.idempotency import huella_payload
+from app.utils.pagination import TOTAL_EXACT, paginate_query_async
+
+# Consultas en paralelo de los reportes de varias peliculas del proceso (como reportes_fanout en la API Flask)
+reportes_concurrencia = asyncio.Semaphore(config.REPORTE_MAX_CONCURRENCIA)
+
+
+class AsyncPrecioService(PrecioService):
+    """Servicio asincronico de precios"""
+    
+    def __init__(self):
+        self.funcion_repository = AsyncFuncionRepository()
+    
+    async def obtener_precio_async(self, id_funcion: int) -> Dict[str, Any]:
+        """Obtener precio calculado de una funcion (ver PrecioService.obtener_precio), compartiendo el cache de precios"""
+        encontrado, resultado = precio_cache.get(id_funcion) if config.PRECIO_CACHE_ENABLED else (False, None)
+        if not encontrado:
+            resultado = await self.funcion_repository.get_precio_funcion(id_funcion)
+            if config.PRECIO_CACHE_ENABLED:
+                self._guardar_en_cache(id_funcion, resultado)
+        precio_final, mensaje = resultado
+        return self._construir_respuesta(id_funcion, precio_final, mensaje)
+
+
+class AsyncReservaService(ReservaService):
+    """Servicio asincronico de reservas"""
+    
+    def __init__(self):
+        self.reserva_repository = AsyncReservaRepository()
+    
+    async def crear_reserva_async(self, id_funcion: int, id_butaca: int, dni: str) -> Dict[str, Any]:
+        """Crear una nueva reserva (ver ReservaService.crear_reserva)"""
+        # Solo usamos el rechazo rapido: esperar turnos bloquearia el event loop
+        if config.RESERVA_ADMISION_ENABLED and admision_butacas.esta_ocupada(id_funcion, id_butaca):
+            mensaje = MSG_BUTACA_RESERVADA
+        else:
+            mensaje = await self.reserva_repository.crear_reserva(id_funcion, id_butaca, dni)
+            if config.RESERVA_ADMISION_ENABLED and butaca_confirmada_ocupada(mensaje):
+                admision_butacas.marcar_ocupada(id_funcion, id_butaca)
+        resultado = self._construir_respuesta(mensaje)
+        ButacaService.registrar_reserva(id_funcion, id_butaca)
+        ReporteService.invalidar_funcion(id_funcion)
+        return resultado
+    
+    async def crear_reserva_idempotente_async(
+        self,
+        idempotency_key: Optional[str],
+        id_funcion: int,
+        id_butaca: int,
+        dni: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Crear una nueva reserva con soporte de Idempotency-Key (ver ReservaService.crear_reserva_idempotente)"""
+        if idempotency_key is None:
+            return await self.crear_reserva_async(id_funcion, id_butaca, dni), False
+        
+        clave = self._validar_idempotency_key(idempotency_key)
+        huella = huella_payload({'id_funcion': id_funcion, 'id_butaca': id_butaca, 'dni': dni})
+        # El almacen (compartido con la API Flask) espera a los duplicados bloqueando: corre en un hilo
+        # y la reserva vuelve a ejecutarse en el event loop
+        return await to_thread.run_sync(
+            reservas_idempotency.ejecutar,
+            clave,
+            huella,
+            lambda: from_thread.run(self.crear_reserva_async, id_funcion, id_butaca, dni)
+        )
+    
+    async def listar_reservas_por_dni_async(
+        self,
+        dni: str,
+        page: int = 1,
+        per_page: int = 10,
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
+    ) -> Dict[str, Any]:
+        """Listar reservas de un cliente por DNI paginando en la base (ver ReservaService.listar_reservas_por_dni)"""
+        return await paginate_query_async(
+            fetch_page=lambda limit, offset, despues_de: self.reserva_repository.get_reservas_por_dni_pagina(
+                dni,
+                limit,
+                offset=offset,
+                despues_de=(despues_de['fecha_inicio'], despues_de['id_reserva']) if despues_de else None
+            ),
+            cursor_from_row=lambda fila: {'fecha_inicio': fila['FechaInicio'], 'id_reserva': fila['IdReserva']},
+            cursor_keys={'fecha_inicio': datetime, 'id_reserva': int},
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            total=total,
+            count=lambda: self.reserva_repository.contar_reservas_por_dni(dni),
+            estimate=lambda: self.reserva_repository.estimar_reservas_por_dni(dni)
+        )
+
+
+class AsyncReporteService(ReporteService):
+    """Servicio asincronico de reportes"""
+    
+    def __init__(self):
+        self.reporte_repository = AsyncReporteRepository()
+    
+    async def generar_reporte_ocupacion_async(
+        self,
+        id_pelicula: int,
+        fecha_inicio: date,
+        fecha_fin: date,
+        page: int = 1,
+        per_page: int = 10,
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
+    ) -> Dict[str, Any]:
+        """Generar reporte de ocupacion por pelicula (ver ReporteService.generar_reporte_ocupacion)"""
+        self._validar_periodo(fecha_inicio, fecha_fin)
+        return await paginate_query_async(
+            fetch_page=lambda limit, offset, despues_de: self.reporte_repository.get_ocupacion_por_pelicula_pagina(
+                id_pelicula,
+                fecha_inicio,
+                fecha_fin,
+                limit,
+                offset=offset,
+                despues_de=(despues_de['fecha_inicio'], despues_de['id_funcion']) if despues_de else None
+            ),
+            cursor_from_row=lambda fila: {'fecha_inicio': fila['FechaInicio'], 'id_funcion': fila['IdFuncion']},
+            cursor_keys={'fecha_inicio': datetime, 'id_funcion': int},
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            total=total,
+            count=lambda: self.reporte_repository.contar_funciones_periodo(id_pelicula, fecha_inicio, fecha_fin),
+            estimate=lambda: self.reporte_repository.estimar_funciones_periodo(id_pelicula, fecha_inicio, fecha_fin)
+        )
+    
+    async def generar_reporte_ocupacion_peliculas_async(
+        self,
+        ids_pelicula: Optional[List[int]],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Dict[str, Any]:
+        """
+        Generar el reporte de varias peliculas (ver ReporteService.generar_reporte_ocupacion_peliculas)
+        
+        Cada pelicula se consulta con SP_ReporteOcupacionPorPelicula, a lo sumo REPORTE_MAX_CONCURRENCIA a la vez;
+        no usa ocupacion_cache (el cache del proceso Flask)
+        """
+        self._validar_periodo(fecha_inicio, fecha_fin)
+        if ids_pelicula is not None:
+            ids_pelicula = self._validar_ids_pelicula(ids_pelicula)
+        
+        peliculas = self._seleccionar_peliculas(ids_pelicula, await self.reporte_repository.get_peliculas(ids_pelicula))
+        
+        async def ocupacion(pelicula: Dict[str, Any]) -> List[Dict[str, Any]]:
+            async with reportes_concurrencia:
+                return await self.reporte_repository.get_ocupacion_por_pelicula(
+                    pelicula['IdPelicula'], fecha_inicio, fecha_fin
+                )
+        
+        funciones_por_pelicula = await asyncio.gather(*(ocupacion(pelicula) for pelicula in peliculas))
+        return self._armar_reporte_peliculas(peliculas, list(funciones_por_pelicula))
@@ -0,0 +1,160 @@
+"""
+Servicio de Butacas - Logica de negocio para el mapa de butacas de una funcion
+Nos permite servir la ocupacion de una funcion desde memoria sin consultar la tabla Reservas en cada request
+"""
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from app.config import Config
+from app.repositories.butaca_repository import ButacaRepository
+from app.utils.bitset import Bitset
+from app.utils.cache import LRUTTLCache
+from app.utils.exceptions import NotFoundError
+
+config = Config()
+
+
+class MapaButacas:
+    """
+    Mapa de butacas de una funcion en memoria
+
+    La grilla (IdButaca, NroButaca, Fila, Columna) es fija; la ocupacion se guarda en un bitset
+    con un bit por butaca en el mismo orden que la grilla.
+    """
+    __slots__ = ('id_funcion', 'id_sala', 'reservable', 'butacas', '_posiciones', '_ocupadas', '_lock')
+
+    def __init__(self, id_funcion: int, id_sala: int, reservable: bool, butacas: List[Tuple[int, int, int, int]]):
+        self.id_funcion = id_funcion
+        self.id_sala = id_sala
+        self.reservable = reservable
+        self.butacas = butacas
+        self._posiciones = {butaca[0]: posicion for posicion, butaca in enumerate(butacas)}
+        self._ocupadas = Bitset(len(butacas))
+        self._lock = threading.Lock()
+
+    def marcar_ocupada(self, id_butaca: int) -> bool:
+        """
+        Marcar una butaca como ocupada
+
+        Returns:
+            True si la butaca pertenece a la sala de la funcion
+        """
+        posicion = self._posiciones.get(id_butaca)
+        if posicion is None:
+            return False
+        with self._lock:
+            self._ocupadas.set(posicion)
+        return True
+
+    def esta_ocupada(self, id_butaca: int) -> Optional[bool]:
+        """Indicar si una butaca esta ocupada (None si no pertenece a la sala)"""
+        posicion = self._posiciones.get(id_butaca)
+        if posicion is None:
+            return None
+        return self._ocupadas.test(posicion)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir el mapa en la respuesta del servicio"""
+        with self._lock:
+            ocupadas = list(self._ocupadas)
+        total_ocupadas = sum(ocupadas)
+        return {
+            'id_funcion': self.id_funcion,
+            'id_sala': self.id_sala,
+            'reservable': self.reservable,
+            'total_butacas': len(self.butacas),
+            'butacas_ocupadas': total_ocupadas,
+            'butacas_libres': len(self.butacas) - total_ocupadas,
+            'butacas': [
+                {
+                    'IdButaca': id_butaca,
+                    'NroButaca': nro_butaca,
+                    'Fila': fila,
+                    'Columna': columna,
+                    'Ocupada': ocupada
+                }
+                for (id_butaca, nro_butaca, fila, columna), ocupada in zip(self.butacas, ocupadas)
+            ]
+        }
+
+
+# Mapas construidos por funcion, compartidos por todas las instancias del servicio
+# El TTL acota cuanto tarda en verse una reserva hecha por otro proceso o una cancelacion externa
+mapas_cache = LRUTTLCache(max_size=config.BUTACAS_MAPA_MAX_FUNCIONES, ttl=config.BUTACAS_MAPA_TTL)
+
+
+class ButacaService:
+    """Servicio para logica de negocio de butacas"""
+
+    # Inicializamos el repositorio de butacas
+    def __init__(self):
+        self.butaca_repository = ButacaRepository()
+
+    # Obtenemos el mapa de butacas de una funcion desde memoria (o lo construimos con una consulta)
+    def obtener_mapa(self, id_funcion: int) -> Dict[str, Any]:
+        """
+        Obtener el mapa de butacas de una funcion con su ocupacion
+
+        Args:
+            id_funcion: ID de la funcion
+
+        Returns:
+            Diccionario con la grilla de butacas y cuales estan ocupadas
+
+        Raises:
+            NotFoundError: Si la funcion no existe
+        """
+        encontrado, mapa = mapas_cache.get(id_funcion)
+        if not encontrado:
+            mapa = self._construir_mapa(id_funcion)
+            mapas_cache.set(id_funcion, mapa)
+        return mapa.to_dict()
+
+    def _construir_mapa(self, id_funcion: int) -> MapaButacas:
+        """Construir el mapa de una funcion con una sola consulta a la base de datos"""
+        filas = self.butaca_repository.get_mapa_butacas(id_funcion)
+        if not filas:
+            raise NotFoundError('Funcion no encontrada')
+
+        primera = filas[0]
+        # Si la sala no tiene butacas, el LEFT JOIN devuelve una unica fila con IdButaca NULL
+        con_butacas = [fila for fila in filas if fila['IdButaca'] is not None]
+        mapa = MapaButacas(
+            id_funcion=id_funcion,
+            id_sala=primera['IdSala'],
+            reservable=primera['Estado'] == 'A' and primera['FechaFin'] is None,
+            butacas=[
+                (fila['IdButaca'], fila['NroButaca'], fila['Fila'], fila['Columna'])
+                for fila in con_butacas
+            ]
+        )
+        for fila in con_butacas:
+            if fila['Ocupada']:
+                mapa.marcar_ocupada(fila['IdButaca'])
+        return mapa
+
+    # Actualizamos el mapa en memoria cuando se confirma una reserva
+    @staticmethod
+    def registrar_reserva(id_funcion: int, id_butaca: int) -> None:
+        """
+        Marcar una butaca como ocupada en el mapa en memoria de la funcion (si esta construido)
+
+        Args:
+            id_funcion: ID de la funcion
+            id_butaca: ID de la butaca reservada
+        """
+        encontrado, mapa = mapas_cache.get(id_funcion)
+        if encontrado:
+            mapa.marcar_ocupada(id_butaca)
+
+    # Descartamos el mapa de una funcion (ej: cancelacion de reservas o cambio de sala)
+    @staticmethod
+    def invalidar_mapa(id_funcion: Optional[int] = None) -> int:
+        """
+        Descartar el mapa en memoria de una funcion, o de todas si no se indica ninguna
+
+        Returns:
+            Cantidad de mapas descartados
+        """
+        if id_funcion is None:
+            return mapas_cache.clear()
+        return 1 if mapas_cache.invalidate(id_funcion) else 0
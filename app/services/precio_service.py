@@ -3,9 +3,32 @@ Servicio de Precios - Logica de negocio para calcular precios
 Nos permite calcular el precio de una funcion con recargos segun genero y tipo de sala
 """
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from app.config import Config
 from app.repositories.funcion_repository import FuncionRepository
-from app.utils.exceptions import map_sp_message_to_exception
+from app.utils.cache import LRUTTLCache
+from app.utils.exceptions import map_sp_message_to_exception, ValidationError
+from app.utils.metrics import registro
+
+config = Config()
+
+# Mensajes del sp que se guardan en cache por poco tiempo (resultados negativos)
+MENSAJES_CACHE_NEGATIVO = ('Funcion no encontrada', 'Funcion inactiva o finalizada')
+
+# Cache compartido por todas las instancias del servicio: id_funcion -> (precio_final, mensaje)
+# Es de cada proceso y nada lo invalida: un cambio de la funcion en la base se ve al vencer PRECIO_CACHE_TTL
+precio_cache = LRUTTLCache(max_size=config.PRECIO_CACHE_MAX_SIZE, ttl=config.PRECIO_CACHE_TTL)
+
+
+def _metrica_cache(clave: str):
+    """Funcion para MetricaCallback que lee una clave de precio_cache.stats()"""
+    return lambda: [({}, precio_cache.stats()[clave])]
+
+
+registro.callback('precio_cache_hits_total', 'Precios respondidos desde el cache', 'counter', _metrica_cache('hits'))
+registro.callback('precio_cache_misses_total', 'Precios que no estaban en el cache', 'counter',
+                  _metrica_cache('misses'))
+registro.callback('precio_cache_size', 'Funciones guardadas en el cache de precios', 'gauge', _metrica_cache('size'))
 
 
 class PrecioService:
@@ -31,9 +54,103 @@ class PrecioService:
             InactiveResourceError: Si la funcion esta inactiva o finalizada
             AppException: Otros errores
         """
-        # Obtenemos el precio calculado de una funcion usando el sp SP_DeterminarPrecioEntrada
-        precio_final, mensaje = self.funcion_repository.get_precio_funcion(id_funcion)
-
+        # Obtenemos el precio calculado de una funcion (desde el cache o con el sp SP_DeterminarPrecioEntrada)
+        precio_final, mensaje = self._obtener_precio_cacheado(id_funcion)
+        return self._construir_respuesta(id_funcion, precio_final, mensaje)
+    
+    # Obtenemos los precios de varias funciones en una sola consulta
+    def obtener_precios(self, ids_funcion: List[int]) -> Dict[str, Any]:
+        """
+        Obtener precios calculados de varias funciones
+        
+        Los precios que estan en cache no se consultan; el resto se calcula con una sola consulta
+        que aplica las mismas reglas que SP_DeterminarPrecioEntrada.
+        
+        Args:
+            ids_funcion: IDs de las funciones (los repetidos se ignoran)
+        
+        Returns:
+            Diccionario con la lista de resultados por funcion (incluye errores por funcion)
+        
+        Raises:
+            ValidationError: Si no se pidio ninguna funcion o se supero PRECIO_BATCH_MAX_IDS
+        """
+        # Quitamos repetidos conservando el orden pedido
+        ids = list(dict.fromkeys(ids_funcion))
+        if not ids:
+            raise ValidationError("Debe indicar al menos un ID de funcion")
+        if len(ids) > config.PRECIO_BATCH_MAX_IDS:
+            raise ValidationError(f"Se pueden consultar como maximo {config.PRECIO_BATCH_MAX_IDS} funciones por request")
+        
+        # Primero buscamos en el cache y consultamos solo las funciones que faltan
+        resultados: Dict[int, Tuple[Optional[Decimal], str]] = {}
+        faltantes = []
+        for id_funcion in ids:
+            encontrado, resultado = precio_cache.get(id_funcion) if config.PRECIO_CACHE_ENABLED else (False, None)
+            if encontrado:
+                resultados[id_funcion] = resultado
+            else:
+                faltantes.append(id_funcion)
+        
+        if faltantes:
+            consultados = self.funcion_repository.get_precios_funciones(faltantes)
+            for id_funcion, resultado in consultados.items():
+                if config.PRECIO_CACHE_ENABLED:
+                    self._guardar_en_cache(id_funcion, resultado)
+                resultados[id_funcion] = resultado
+        
+        # Armamos un resultado por funcion; los errores no cortan el lote
+        data = []
+        for id_funcion in ids:
+            precio_final, mensaje = resultados[id_funcion]
+            exception = map_sp_message_to_exception(mensaje)
+            data.append({
+                'id_funcion': id_funcion,
+                'success': exception is None,
+                'status_code': exception.status_code if exception else 200,
+                'precio_final': precio_final if exception is None else None,
+                'mensaje': mensaje
+            })
+        return {'data': data}
+    
+    # Consultamos el cache antes de ejecutar el sp
+    def _obtener_precio_cacheado(self, id_funcion: int) -> Tuple[Optional[Decimal], str]:
+        """
+        Obtener (precio_final, mensaje) desde el cache o, si no esta, desde el repositorio
+        
+        Los resultados OK se guardan PRECIO_CACHE_TTL segundos y los negativos
+        (funcion no encontrada / inactiva) PRECIO_CACHE_NEGATIVE_TTL segundos.
+        Otros errores no se guardan.
+        """
+        if not config.PRECIO_CACHE_ENABLED:
+            return self.funcion_repository.get_precio_funcion(id_funcion)
+        
+        encontrado, resultado = precio_cache.get(id_funcion)
+        if encontrado:
+            return resultado
+        
+        resultado = self.funcion_repository.get_precio_funcion(id_funcion)
+        self._guardar_en_cache(id_funcion, resultado)
+        return resultado
+    
+    @staticmethod
+    def _guardar_en_cache(id_funcion: int, resultado: Tuple[Optional[Decimal], str]) -> None:
+        """Guardar un resultado del sp en el cache con el TTL que corresponda a su mensaje"""
+        _, mensaje = resultado
+        if mensaje == 'OK':
+            precio_cache.set(id_funcion, resultado)
+        elif mensaje in MENSAJES_CACHE_NEGATIVO:
+            precio_cache.set(id_funcion, resultado, ttl=config.PRECIO_CACHE_NEGATIVE_TTL)
+    
+    # Armamos la respuesta a partir del resultado del sp (compartido con la variante asincronica)
+    @staticmethod
+    def _construir_respuesta(id_funcion: int, precio_final: Optional[Decimal], mensaje: str) -> Dict[str, Any]:
+        """
+        Convertir el resultado de SP_DeterminarPrecioEntrada en la respuesta del servicio
+        
+        Raises:
+            AppException: Si el mensaje del sp no es 'OK'
+        """
         # Mapeamos el mensaje de la funcion a una excepcion de la aplicacion
         # Si el mensaje es 'OK' o None, no se lanza ninguna excepcion
         exception = map_sp_message_to_exception(mensaje)
@@ -46,4 +163,3 @@ class PrecioService:
             'precio_final': precio_final,
             'mensaje': mensaje
         }
-
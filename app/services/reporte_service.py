@@ -2,10 +2,162 @@
 Servicio de Reportes - Logica de negocio para reportes
 Nos permite generar reportes de ocupacion por pelicula
 """
-from typing import Dict, Any
-from datetime import date
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from app.config import Config
 from app.repositories.reporte_repository import ReporteRepository
-from app.utils.pagination import paginate
+from app.utils.cache import LRUTTLCache
+from app.utils.export import exportar_chunks, validar_formato
+from app.utils.pagination import TOTAL_EXACT, paginate_query
+from app.utils.exceptions import NotFoundError, ValidationError
+from app.utils.fanout import EjecutorAcotado
+
+config = Config()
+
+# Hilos compartidos por todos los reportes de varias peliculas del proceso (acota las conexiones que usan)
+reportes_fanout = EjecutorAcotado(config.REPORTE_MAX_CONCURRENCIA, nombre='reporte')
+
+# Columnas de la exportacion del reporte de ocupacion (en orden)
+COLUMNAS_EXPORTACION = [
+    'IdPelicula',
+    'IdFuncion',
+    'FechaInicio',
+    'IdSala',
+    'Sala',
+    'TotalButacasVendidas',
+    'TotalIngresosRecaudados'
+]
+
+
+class CacheOcupacionDiaria:
+    """
+    Filas del reporte de ocupacion guardadas por (pelicula, dia de FechaInicio)
+
+    - Hoy y los dias futuros vencen a los ttl_hoy segundos (ventas de otros procesos)
+    - Los dias pasados vencen a los ttl_pasado segundos: SP_ReservarButaca no mira la fecha y una
+      funcion sin FechaFin sigue vendiendo, asi que tampoco son inmutables
+    - Una reserva invalida solo el dia de su funcion en este proceso (se recuerda en que dia quedo cada funcion)
+    - Una consulta que empezo antes de una reserva no guarda el dia de esa funcion (los demas dias si)
+    """
+
+    # Invalidaciones recordadas; las consultas que empezaron antes de la mas vieja olvidada no se guardan
+    MAX_INVALIDACIONES = 10000
+
+    def __init__(self, max_dias: int, ttl_hoy: float, ttl_pasado: float):
+        self.ttl_hoy = ttl_hoy
+        self.ttl_pasado = ttl_pasado
+        self._cache = LRUTTLCache(max_size=max_dias, ttl=ttl_hoy, on_remove=self._olvidar_dia)
+        # Reentrante: guardar() tiene el lock cuando el LRU desaloja y llama a _olvidar_dia
+        self._lock = threading.RLock()
+        # IdFuncion -> (IdPelicula, dia) de las funciones guardadas (se borra al salir el dia del cache)
+        self._dia_de_funcion: Dict[int, Tuple[int, date]] = {}
+        # Crece con cada invalidacion; IdFuncion -> generacion de su ultima invalidacion (las mas viejas primero)
+        self._generacion = 0
+        self._invalidada_en: "OrderedDict[int, int]" = OrderedDict()
+        # Generacion de la ultima invalidacion olvidada (o de clear): lo leido antes no se guarda
+        self._generacion_minima = 0
+
+    def generacion(self) -> int:
+        """Generacion actual (se toma antes de consultar la base)"""
+        with self._lock:
+            return self._generacion
+
+    def _vigente(self, filas: List[Dict[str, Any]], generacion: int) -> bool:
+        """Indicar si ninguna funcion de las filas se invalido despues de generacion (con el lock tomado)"""
+        return all(self._invalidada_en.get(fila['IdFuncion'], 0) <= generacion for fila in filas)
+
+    def obtener(self, id_pelicula: int, dias: List[date]) -> Tuple[Dict[date, List[Dict[str, Any]]], List[date]]:
+        """
+        Buscar los dias pedidos de una pelicula
+
+        Returns:
+            Tupla (filas de los dias encontrados, dias faltantes en orden)
+        """
+        encontrados, faltantes = {}, []
+        for dia in dias:
+            encontrado, filas = self._cache.get((id_pelicula, dia))
+            if encontrado:
+                encontrados[dia] = filas
+            else:
+                faltantes.append(dia)
+        return encontrados, faltantes
+
+    def guardar(self, id_pelicula: int, filas_por_dia: Dict[date, List[Dict[str, Any]]], generacion: int) -> None:
+        """Guardar los dias consultados, salvo los que tienen una funcion invalidada desde que se tomo generacion"""
+        hoy = date.today()
+        with self._lock:
+            if generacion < self._generacion_minima:
+                return
+            for dia, filas in filas_por_dia.items():
+                if not self._vigente(filas, generacion):
+                    continue
+                for fila in filas:
+                    self._dia_de_funcion[fila['IdFuncion']] = (id_pelicula, dia)
+                self._cache.set((id_pelicula, dia), filas, ttl=self.ttl_pasado if dia < hoy else self.ttl_hoy)
+
+    def _olvidar_dia(self, clave: Tuple[int, date], filas: List[Dict[str, Any]]) -> None:
+        """Quitar las funciones de un dia desalojado o vencido (si no se volvio a guardar en otro dia)"""
+        with self._lock:
+            for fila in filas:
+                if self._dia_de_funcion.get(fila['IdFuncion']) == clave:
+                    del self._dia_de_funcion[fila['IdFuncion']]
+
+    def invalidar_funcion(self, id_funcion: int) -> bool:
+        """
+        Descartar el dia de la funcion
+
+        Returns:
+            True si el dia estaba guardado
+        """
+        with self._lock:
+            self._generacion += 1
+            self._invalidada_en[id_funcion] = self._generacion
+            self._invalidada_en.move_to_end(id_funcion)
+            if len(self._invalidada_en) > self.MAX_INVALIDACIONES:
+                _, olvidada = self._invalidada_en.popitem(last=False)
+                self._generacion_minima = olvidada
+            clave = self._dia_de_funcion.pop(id_funcion, None)
+        return clave is not None and self._cache.invalidate(clave)
+
+    def clear(self) -> int:
+        """Vaciar el cache (devuelve la cantidad de dias descartados)"""
+        with self._lock:
+            self._generacion += 1
+            self._generacion_minima = self._generacion
+            self._invalidada_en.clear()
+            self._dia_de_funcion.clear()
+        return self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del cache para monitoreo"""
+        return self._cache.stats()
+
+
+# Dias de reporte compartidos por todas las instancias del servicio
+ocupacion_cache = CacheOcupacionDiaria(
+    max_dias=config.REPORTE_CACHE_MAX_DIAS,
+    ttl_hoy=config.REPORTE_CACHE_TTL_HOY,
+    ttl_pasado=config.REPORTE_CACHE_TTL_PASADO
+)
+
+
+def _dias(fecha_inicio: date, fecha_fin: date) -> List[date]:
+    """Dias del periodo [fecha_inicio, fecha_fin]"""
+    return [fecha_inicio + timedelta(days=i) for i in range((fecha_fin - fecha_inicio).days + 1)]
+
+
+def _rangos_contiguos(dias: List[date]) -> List[Tuple[date, date]]:
+    """Agrupar dias ordenados en rangos [desde, hasta] consecutivos (una consulta por rango)"""
+    rangos: List[Tuple[date, date]] = []
+    for dia in dias:
+        if rangos and rangos[-1][1] + timedelta(days=1) == dia:
+            rangos[-1] = (rangos[-1][0], dia)
+        else:
+            rangos.append((dia, dia))
+    return rangos
 
 
 class ReporteService:
@@ -15,34 +167,319 @@ class ReporteService:
     def __init__(self):
         self.reporte_repository = ReporteRepository()
     
-    # Generamos un reporte de ocupacion por pelicula usando el repositorio de reportes
+    # Generamos un reporte de ocupacion por pelicula paginando en la base de datos
     def generar_reporte_ocupacion(
         self,
         id_pelicula: int,
         fecha_inicio: date,
         fecha_fin: date,
         page: int = 1,
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
     ) -> Dict[str, Any]:
         """
         Generar reporte de ocupacion por pelicula
         
+        Solo se calcula la ocupacion de las funciones de la pagina pedida y el total de funciones se cuenta
+        en la base de datos; ocupacion_cache no se usa porque obligaria a leer todo el periodo para una pagina.
+        
         Args:
             id_pelicula: ID de la pelicula
             fecha_inicio: Fecha de inicio del periodo
             fecha_fin: Fecha fin del periodo
-            page: Numero de pagina
+            page: Numero de pagina (se ignora si se indica cursor)
             per_page: Elementos por pagina
+            cursor: Cursor opaco devuelto en next_cursor
+            total: 'exact' (COUNT), 'estimate' (estadisticas del optimizador) o 'none' (no se calcula)
         
         Returns:
             Diccionario con datos paginados del reporte
         """
+        self._validar_periodo(fecha_inicio, fecha_fin)
+        
+        return paginate_query(
+            fetch_page=lambda limit, offset, despues_de: self.reporte_repository.get_ocupacion_por_pelicula_pagina(
+                id_pelicula,
+                fecha_inicio,
+                fecha_fin,
+                limit,
+                offset=offset,
+                despues_de=(despues_de['fecha_inicio'], despues_de['id_funcion']) if despues_de else None
+            ),
+            cursor_from_row=lambda fila: {'fecha_inicio': fila['FechaInicio'], 'id_funcion': fila['IdFuncion']},
+            cursor_keys={'fecha_inicio': datetime, 'id_funcion': int},
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            total=total,
+            count=lambda: self.reporte_repository.contar_funciones_periodo(id_pelicula, fecha_inicio, fecha_fin),
+            estimate=lambda: self.reporte_repository.estimar_funciones_periodo(id_pelicula, fecha_inicio, fecha_fin)
+        )
+    
+    # Generamos el reporte de varias peliculas consultando cada una en paralelo
+    def generar_reporte_ocupacion_peliculas(
+        self,
+        ids_pelicula: Optional[List[int]],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Dict[str, Any]:
+        """
+        Generar el reporte de ocupacion de varias peliculas con subtotales por pelicula
+        
+        Cada pelicula se consulta por separado (SP_ReporteOcupacionPorPelicula, o sus dias en ocupacion_cache)
+        en los hilos de reportes_fanout, que limitan las consultas en paralelo del proceso a REPORTE_MAX_CONCURRENCIA.
+        
+        Args:
+            ids_pelicula: IDs de las peliculas (None = todas las peliculas activas)
+            fecha_inicio: Fecha de inicio del periodo
+            fecha_fin: Fecha fin del periodo
+        
+        Returns:
+            Diccionario con las funciones y subtotales de cada pelicula y los totales generales
+        
+        Raises:
+            ValidationError: Si la lista de peliculas es invalida o hay mas de REPORTE_MAX_PELICULAS activas
+            NotFoundError: Si alguna de las peliculas pedidas no existe
+        """
+        self._validar_periodo(fecha_inicio, fecha_fin)
+        if ids_pelicula is not None:
+            ids_pelicula = self._validar_ids_pelicula(ids_pelicula)
+        
+        peliculas = self._seleccionar_peliculas(ids_pelicula, self.reporte_repository.get_peliculas(ids_pelicula))
+        funciones_por_pelicula = reportes_fanout.map(
+            lambda pelicula: self._ocupacion_periodo(pelicula['IdPelicula'], fecha_inicio, fecha_fin),
+            peliculas
+        )
+        return self._armar_reporte_peliculas(peliculas, funciones_por_pelicula)
+    
+    # Controlamos las peliculas leidas para el reporte (compartido con la variante asincronica)
+    @staticmethod
+    def _seleccionar_peliculas(
+        ids_pelicula: Optional[List[int]],
+        peliculas: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Ordenar las peliculas leidas como se pidieron y controlar las faltantes o el limite de activas
+        
+        Raises:
+            ValidationError: Si idPelicula=all y hay mas de REPORTE_MAX_PELICULAS activas
+            NotFoundError: Si alguna de las peliculas pedidas no existe
+        """
+        if ids_pelicula is None:
+            # idPelicula=all tiene el mismo limite que una lista explicita
+            if len(peliculas) > config.REPORTE_MAX_PELICULAS:
+                raise ValidationError(
+                    f"Hay {len(peliculas)} peliculas activas y se permiten como maximo "
+                    f"{config.REPORTE_MAX_PELICULAS} por request; indique idPelicula=1,2,3 o use /reporte/ocupacion/export"
+                )
+        else:
+            # Respetamos el orden pedido e informamos las peliculas inexistentes
+            por_id = {pelicula['IdPelicula']: pelicula for pelicula in peliculas}
+            faltantes = [str(id_pelicula) for id_pelicula in ids_pelicula if id_pelicula not in por_id]
+            if faltantes:
+                raise NotFoundError(f"Peliculas no encontradas: {', '.join(faltantes)}")
+            peliculas = [por_id[id_pelicula] for id_pelicula in ids_pelicula]
+        return peliculas
+    
+    # Armamos el reporte con subtotales (compartido con la variante asincronica)
+    @staticmethod
+    def _armar_reporte_peliculas(
+        peliculas: List[Dict[str, Any]],
+        funciones_por_pelicula: List[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Agregar a las funciones de cada pelicula sus subtotales y los totales generales"""
+        resultado = []
+        for pelicula, funciones in zip(peliculas, funciones_por_pelicula):
+            resultado.append({
+                'IdPelicula': pelicula['IdPelicula'],
+                'Pelicula': pelicula['Pelicula'],
+                'TotalFunciones': len(funciones),
+                'TotalButacasVendidas': sum(int(f['TotalButacasVendidas'] or 0) for f in funciones),
+                'TotalIngresosRecaudados': sum((Decimal(f['TotalIngresosRecaudados'] or 0) for f in funciones), Decimal('0')),
+                'funciones': funciones
+            })
+        
+        return {
+            'peliculas': resultado,
+            'totales': {
+                'TotalPeliculas': len(resultado),
+                'TotalFunciones': sum(p['TotalFunciones'] for p in resultado),
+                'TotalButacasVendidas': sum(p['TotalButacasVendidas'] for p in resultado),
+                'TotalIngresosRecaudados': sum((p['TotalIngresosRecaudados'] for p in resultado), Decimal('0'))
+            }
+        }
+    
+    # Version del reporte para el ETag (GET /reporte/ocupacion): un agregado en la base, sin armar el reporte
+    def version_reporte_ocupacion(
+        self,
+        ids_pelicula: Optional[List[int]],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple[Any, ...]:
+        """
+        Obtener la version del reporte de ocupacion de una o varias peliculas en el periodo, leida en la base
+        
+        Args:
+            ids_pelicula: IDs de las peliculas (None = todas las peliculas activas)
+            fecha_inicio: Fecha de inicio del periodo
+            fecha_fin: Fecha fin del periodo
+        
+        Returns:
+            Tupla que cambia cuando cambia el contenido del reporte
+        
+        Raises:
+            ValidationError: Si el periodo o la lista de peliculas son invalidos
+        """
+        self._validar_periodo(fecha_inicio, fecha_fin)
+        if ids_pelicula is not None:
+            ids_pelicula = self._validar_ids_pelicula(ids_pelicula)
+        
+        return self.reporte_repository.version_ocupacion(ids_pelicula, fecha_inicio, fecha_fin)
+    
+    # Version del reporte de varias peliculas: solo si se arma con la base y no con ocupacion_cache
+    def version_reporte_ocupacion_peliculas(
+        self,
+        ids_pelicula: Optional[List[int]],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Optional[Tuple[Any, ...]]:
+        """
+        Obtener la version del reporte de varias peliculas (ver version_reporte_ocupacion)
+        
+        Con REPORTE_CACHE_ENABLED el reporte se arma con los dias de ocupacion_cache de este proceso, que
+        pueden estar atrasados respecto de la base hasta su TTL: una version leida en la base daria un ETag
+        nuevo para un cuerpo viejo (y luego 304 sobre ese cuerpo), asi que no hay version.
+        
+        Returns:
+            Tupla que cambia cuando cambia el contenido del reporte, o None si el reporte sale del cache
+        """
+        if self._usa_cache(fecha_inicio, fecha_fin):
+            return None
+        return self.version_reporte_ocupacion(ids_pelicula, fecha_inicio, fecha_fin)
+    
+    # Armamos las filas de un periodo con los dias guardados y consultamos solo los faltantes
+    def _ocupacion_periodo(self, id_pelicula: int, fecha_inicio: date, fecha_fin: date) -> List[Dict[str, Any]]:
+        """
+        Obtener todas las filas del reporte de una pelicula en el periodo, ordenadas por (FechaInicio, IdFuncion)
+        
+        Los dias faltantes se agrupan en rangos consecutivos y cada rango se consulta con
+        SP_ReporteOcupacionPorPelicula; los dias consultados (incluso los que no tienen funciones) se guardan.
+        Los periodos de mas de REPORTE_CACHE_MAX_DIAS_PERIODO dias se consultan directo, sin el cache.
+        """
+        if not self._usa_cache(fecha_inicio, fecha_fin):
+            return self.reporte_repository.get_ocupacion_por_pelicula(id_pelicula, fecha_inicio, fecha_fin)
+        
+        dias = _dias(fecha_inicio, fecha_fin)
+        generacion = ocupacion_cache.generacion()
+        encontrados, faltantes = ocupacion_cache.obtener(id_pelicula, dias)
+        if faltantes:
+            consultados: Dict[date, List[Dict[str, Any]]] = {dia: [] for dia in faltantes}
+            for desde, hasta in _rangos_contiguos(faltantes):
+                for fila in self.reporte_repository.get_ocupacion_por_pelicula(id_pelicula, desde, hasta):
+                    consultados[fila['FechaInicio'].date()].append(fila)
+            ocupacion_cache.guardar(id_pelicula, consultados, generacion)
+            encontrados.update(consultados)
+        
+        filas = [fila for dia in dias for fila in encontrados[dia]]
+        filas.sort(key=lambda fila: (fila['FechaInicio'], fila['IdFuncion']))
+        return filas
+    
+    # Descartamos el dia de una funcion del cache del reporte (se llama al confirmar reservas)
+    @staticmethod
+    def _usa_cache(fecha_inicio: date, fecha_fin: date) -> bool:
+        """
+        Indicar si el periodo se arma con ocupacion_cache
+
+        El cache guarda una entrada por pelicula y dia: un periodo largo costaria una busqueda por dia
+        (CPU sin limite con fechas como 1900-01-01..2100-12-31) y desalojaria los dias mas usados
+        """
+        return config.REPORTE_CACHE_ENABLED and (fecha_fin - fecha_inicio).days < config.REPORTE_CACHE_MAX_DIAS_PERIODO
+    
+    @staticmethod
+    def invalidar_funcion(id_funcion: int) -> bool:
+        """
+        Descartar del cache el dia del reporte donde esta la funcion
+        
+        Returns:
+            True si el dia estaba guardado
+        """
+        return ocupacion_cache.invalidar_funcion(id_funcion)
+    
+    # Validamos la lista de peliculas del reporte de varias peliculas
+    @staticmethod
+    def _validar_ids_pelicula(ids_pelicula: List[int]) -> List[int]:
+        """
+        Validar y quitar duplicados de la lista de peliculas (conserva el orden)
+        
+        Raises:
+            ValidationError: Si la lista esta vacia, tiene IDs invalidos o supera REPORTE_MAX_PELICULAS
+        """
+        ids = list(dict.fromkeys(ids_pelicula))
+        if not ids:
+            raise ValidationError("Debe indicar al menos una pelicula")
+        if any(id_pelicula <= 0 for id_pelicula in ids):
+            raise ValidationError("Los IDs de pelicula deben ser mayores a 0")
+        if len(ids) > config.REPORTE_MAX_PELICULAS:
+            raise ValidationError(f"No se pueden pedir mas de {config.REPORTE_MAX_PELICULAS} peliculas por request")
+        return ids
+    
+    # Exportamos el reporte completo del periodo en streaming (CSV o NDJSON)
+    def exportar_reporte_ocupacion(
+        self,
+        id_pelicula: Optional[int],
+        fecha_inicio: date,
+        fecha_fin: date,
+        formato: str
+    ) -> Iterator[str]:
+        """
+        Exportar el reporte de ocupacion sin paginar, leyendo las filas con un cursor sin buffer
+        
+        La consulta se ejecuta y se lee la primera fila antes de devolver el generador, asi los errores
+        de la base se informan con un codigo HTTP y no a mitad de la descarga.
+        
+        Args:
+            id_pelicula: ID de la pelicula (None = todas las peliculas)
+            fecha_inicio: Fecha de inicio del periodo
+            fecha_fin: Fecha fin del periodo
+            formato: 'csv' o 'ndjson'
+        
+        Returns:
+            Generador de partes de texto en el formato pedido
+        """
+        validar_formato(formato)
+        self._validar_periodo(fecha_inicio, fecha_fin)
+        
+        filas = self.reporte_repository.exportar_ocupacion(
+            id_pelicula,
+            fecha_inicio,
+            fecha_fin,
+            batch_size=config.REPORTE_EXPORT_CHUNK_ROWS
+        )
+        primera = next(filas, None)
+        if primera is not None:
+            filas = self._filas_desde(primera, filas)
+        return exportar_chunks(filas, formato, COLUMNAS_EXPORTACION, config.REPORTE_EXPORT_CHUNK_ROWS)
+    
+    @staticmethod
+    def _filas_desde(primera: Dict[str, Any], filas: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Volver a anteponer la primera fila ya leida (cerrar este generador cierra tambien el de filas)"""
+        yield primera
+        yield from filas
+    
+    # Validamos el periodo del reporte (compartido con la variante asincronica)
+    @staticmethod
+    def _validar_periodo(fecha_inicio: date, fecha_fin: date) -> None:
+        """
+        Validar que el periodo del reporte sea coherente
+        
+        Raises:
+            ValidationError: Si la fecha de inicio es mayor a la fecha fin, o la fecha fin es 9999-12-31
+        """
         # Si la fecha de inicio es mayor a la fecha fin, se lanza una excepcion de validacion
         if fecha_inicio > fecha_fin:
-            from app.utils.exceptions import ValidationError
             raise ValidationError("La fecha de inicio no puede ser mayor a la fecha fin")
-        
-        # Obtenemos los datos del reporte de ocupacion por pelicula usando el sp SP_ReporteOcupacionPorPelicula
-        datos = self.reporte_repository.get_ocupacion_por_pelicula(id_pelicula, fecha_inicio, fecha_fin)
-        return paginate(datos, page, per_page)
-
+        # El periodo se filtra hasta el dia siguiente a la fecha fin (rango_periodo y el SP), que no existe
+        # para la fecha maxima
+        if fecha_fin >= date.max:
+            raise ValidationError(f"La fecha fin debe ser anterior a {date.max.isoformat()}")
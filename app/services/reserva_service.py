@@ -2,10 +2,65 @@
 Servicio de Reservas - Logica de negocio para reservas
 Nos permite crear, listar y cancelar reservas
 """
-from typing import Dict, Any, List
-from app.repositories.reserva_repository import ReservaRepository
-from app.utils.exceptions import map_sp_message_to_exception
-from app.utils.pagination import paginate
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+from app.config import Config
+from app.repositories.idempotencia_repository import IdempotenciaRepository
+from app.repositories.reserva_repository import (
+    ReservaRepository, LIMITE_RESERVAS_DNI_POR_FECHA, MSG_OK, MSG_BUTACA_RESERVADA
+)
+from app.services.butaca_service import ButacaService
+from app.services.reporte_service import ReporteService
+from app.utils.exceptions import ValidationError, map_sp_message_to_exception
+from app.utils.admission import AdmisionButacas, RECHAZAR, TURNO
+from app.utils.group_commit import ColaGroupCommit
+from app.utils.idempotency import IdempotencyStore, IdempotencyStoreCompartido, huella_payload
+from app.utils.pagination import TOTAL_EXACT, paginate_query
+
+config = Config()
+
+# Longitud maxima aceptada para el header Idempotency-Key
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Mensaje de las butacas validas de un lote rechazado (no se reservaron porque el lote es todo o nada)
+MSG_LOTE_RECHAZADO = 'No reservada: otra butaca del lote fue rechazada'
+
+# Resultados de POST /reservas por Idempotency-Key: en la base (compartidos por todos los workers) o en memoria
+# del proceso (un reintento que llega a otro worker ejecutaria el SP otra vez: solo para un unico worker)
+if config.IDEMPOTENCY_BACKEND == 'memory':
+    reservas_idempotency = IdempotencyStore(
+        ttl=config.IDEMPOTENCY_TTL,
+        max_keys=config.IDEMPOTENCY_MAX_KEYS,
+        wait_timeout=config.IDEMPOTENCY_WAIT_TIMEOUT
+    )
+elif config.IDEMPOTENCY_BACKEND == 'database':
+    reservas_idempotency = IdempotencyStoreCompartido(
+        IdempotenciaRepository,
+        ttl=config.IDEMPOTENCY_TTL,
+        lease=config.IDEMPOTENCY_LEASE,
+        wait_timeout=config.IDEMPOTENCY_WAIT_TIMEOUT
+    )
+else:
+    raise ValueError(f"IDEMPOTENCY_BACKEND invalido: {config.IDEMPOTENCY_BACKEND} (opciones: database, memory)")
+
+# Butacas confirmadas como ocupadas y reservas en curso, para rechazar sin ir a la base de datos
+admision_butacas = AdmisionButacas(
+    ttl=config.RESERVA_ADMISION_TTL,
+    max_funciones=config.RESERVA_ADMISION_MAX_FUNCIONES,
+    wait_timeout=config.RESERVA_ADMISION_WAIT_TIMEOUT
+)
+
+# Cola de reservas para el modo group commit (el hilo escritor se crea en el primer uso)
+reservas_group_commit = ColaGroupCommit(
+    ReservaRepository.crear_reservas_agrupadas,
+    max_lote=config.RESERVA_GROUP_COMMIT_MAX_BATCH,
+    max_espera=config.RESERVA_GROUP_COMMIT_MAX_WAIT
+)
+
+
+def butaca_confirmada_ocupada(mensaje: str) -> bool:
+    """Indicar si el mensaje del sp confirma que la butaca quedo (o ya estaba) ocupada"""
+    return mensaje in (MSG_OK, MSG_BUTACA_RESERVADA)
 
 
 class ReservaService:
@@ -34,8 +89,123 @@ class ReservaService:
             AppException: Otros errores
         """
         # Creamos una nueva reserva usando el sp SP_ReservarButacaConValidacionDNI
-        mensaje = self.reserva_repository.crear_reserva(id_funcion, id_butaca, dni)
-
+        if config.RESERVA_ADMISION_ENABLED:
+            mensaje = self._crear_reserva_con_admision(id_funcion, id_butaca, dni)
+        else:
+            mensaje = self._reservar_en_base(id_funcion, id_butaca, dni)
+        resultado = self._construir_respuesta(mensaje)
+        
+        # Si la reserva se confirmo, marcamos la butaca como ocupada en el mapa en memoria
+        # y descartamos el dia de la funcion del cache del reporte de ocupacion
+        ButacaService.registrar_reserva(id_funcion, id_butaca)
+        ReporteService.invalidar_funcion(id_funcion)
+        return resultado
+    
+    # Ejecutamos la reserva en la base, sola o agrupada con otras segun la configuracion
+    def _reservar_en_base(self, id_funcion: int, id_butaca: int, dni: str) -> str:
+        """
+        Reservar la butaca en la base de datos
+        
+        Con RESERVA_GROUP_COMMIT_ENABLED la solicitud se encola y se aplica junto con otras en una sola
+        transaccion; si no, se ejecuta SP_ReservarButacaConValidacionDNI. Ambos caminos devuelven los mismos mensajes.
+        
+        Returns:
+            Mensaje del sp ('OK' si se creo la reserva)
+        """
+        if config.RESERVA_GROUP_COMMIT_ENABLED:
+            return reservas_group_commit.enviar((id_funcion, id_butaca, dni))
+        return self.reserva_repository.crear_reserva(id_funcion, id_butaca, dni)
+    
+    # Pasamos por la admision en memoria antes de ir a la base de datos
+    def _crear_reserva_con_admision(self, id_funcion: int, id_butaca: int, dni: str) -> str:
+        """
+        Ejecutar el sp solo si la butaca no esta confirmada como ocupada
+        
+        Si otra reserva sobre la misma butaca esta en curso, esperamos su resultado: si se confirmo,
+        respondemos igual que el sp ('Butaca ya reservada para esta funcion') sin consultar la base.
+        
+        Returns:
+            Mensaje del sp (o el mensaje de butaca reservada si se rechazo en memoria)
+        """
+        decision = admision_butacas.adquirir(id_funcion, id_butaca)
+        if decision == RECHAZAR:
+            return MSG_BUTACA_RESERVADA
+        
+        ocupada = False
+        try:
+            mensaje = self._reservar_en_base(id_funcion, id_butaca, dni)
+            ocupada = butaca_confirmada_ocupada(mensaje)
+            return mensaje
+        finally:
+            # Liberamos el turno siempre (tambien ante errores) para no bloquear a los demas pedidos
+            if decision == TURNO:
+                admision_butacas.liberar(id_funcion, id_butaca, ocupada)
+            elif ocupada:
+                admision_butacas.marcar_ocupada(id_funcion, id_butaca)
+    
+    # Creamos una reserva respondiendo los reintentos con el resultado de la primera ejecucion
+    def crear_reserva_idempotente(
+        self,
+        idempotency_key: Optional[str],
+        id_funcion: int,
+        id_butaca: int,
+        dni: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Crear una nueva reserva con soporte de Idempotency-Key
+        
+        Sin clave se comporta igual que crear_reserva. Con clave, el primer resultado (exito o error 4xx)
+        se guarda y se devuelve a los reintentos con el mismo contenido sin ejecutar el sp otra vez.
+        
+        Args:
+            idempotency_key: Valor del header Idempotency-Key (o None)
+            id_funcion: ID de la funcion
+            id_butaca: ID de la butaca
+            dni: DNI del cliente
+        
+        Returns:
+            Tupla con (resultado, True si es la respuesta repetida de una solicitud anterior)
+        
+        Raises:
+            ValidationError: Si la clave es invalida
+            ConflictError: Si la clave se uso con otro contenido o la solicitud original sigue en curso
+            AppException: Los mismos errores que crear_reserva
+        """
+        if idempotency_key is None:
+            return self.crear_reserva(id_funcion, id_butaca, dni), False
+        
+        huella = huella_payload({'id_funcion': id_funcion, 'id_butaca': id_butaca, 'dni': dni})
+        return reservas_idempotency.ejecutar(
+            self._validar_idempotency_key(idempotency_key),
+            huella,
+            lambda: self.crear_reserva(id_funcion, id_butaca, dni)
+        )
+    
+    # Validamos el header Idempotency-Key (compartido con la variante asincronica)
+    @staticmethod
+    def _validar_idempotency_key(idempotency_key: str) -> str:
+        """
+        Quitar los espacios de la clave y validar su longitud
+        
+        Raises:
+            ValidationError: Si la clave queda vacia o supera IDEMPOTENCY_KEY_MAX_LENGTH
+        """
+        idempotency_key = idempotency_key.strip()
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValidationError(
+                f"El header Idempotency-Key debe tener entre 1 y {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres"
+            )
+        return idempotency_key
+    
+    # Armamos la respuesta a partir del mensaje del sp (compartido con la variante asincronica)
+    @staticmethod
+    def _construir_respuesta(mensaje: str) -> Dict[str, Any]:
+        """
+        Convertir el mensaje de SP_ReservarButacaConValidacionDNI en la respuesta del servicio
+        
+        Raises:
+            AppException: Si el mensaje del sp no es 'OK'
+        """
         # Mapeamos el mensaje de la reserva a una excepcion de la aplicacion
         # Si el mensaje es 'OK' o None, no se lanza ninguna excepcion
         exception = map_sp_message_to_exception(mensaje)
@@ -48,25 +218,129 @@ class ReservaService:
             'mensaje': 'Reserva creada exitosamente'
         }
     
-    # Listamos las reservas de un cliente por DNI usando el repositorio de reservas
+    # Creamos varias reservas de una misma funcion en una sola transaccion usando el repositorio de reservas
+    def crear_reservas_lote(self, id_funcion: int, ids_butaca: List[int], dni: str) -> Dict[str, Any]:
+        """
+        Crear varias reservas de una misma funcion y DNI (todas o ninguna)
+        
+        Args:
+            id_funcion: ID de la funcion
+            ids_butaca: IDs de las butacas (sin repetidos, maximo RESERVA_LOTE_MAX_BUTACAS)
+            dni: DNI del cliente
+        
+        Returns:
+            Diccionario con success, mensaje y el resultado por butaca
+        
+        Raises:
+            ValidationError: Si la lista de butacas es invalida
+            NotFoundError / ConflictError / InactiveResourceError: Con el primer error encontrado;
+                el resultado por butaca viaja en exception.details
+        """
+        self._validar_lote(ids_butaca)
+        
+        todas_ok, mensajes = self.reserva_repository.crear_reservas_lote(id_funcion, ids_butaca, dni)
+        
+        # Registramos en la admision las butacas que la base confirmo como ocupadas
+        if config.RESERVA_ADMISION_ENABLED:
+            for id_butaca, mensaje in zip(ids_butaca, mensajes):
+                if todas_ok or mensaje == MSG_BUTACA_RESERVADA:
+                    admision_butacas.marcar_ocupada(id_funcion, id_butaca)
+        if not todas_ok:
+            # Mapeamos el primer mensaje de error a una excepcion y adjuntamos el detalle por butaca
+            exception = next(filter(None, (map_sp_message_to_exception(mensaje) for mensaje in mensajes)))
+            exception.details = [
+                {'id_butaca': id_butaca, 'reservada': False,
+                 'mensaje': MSG_LOTE_RECHAZADO if mensaje == MSG_OK else mensaje}
+                for id_butaca, mensaje in zip(ids_butaca, mensajes)
+            ]
+            raise exception
+        resultados = [
+            {'id_butaca': id_butaca, 'reservada': True, 'mensaje': mensaje}
+            for id_butaca, mensaje in zip(ids_butaca, mensajes)
+        ]
+        
+        # Si las reservas se confirmaron, marcamos las butacas como ocupadas en el mapa en memoria
+        for id_butaca in ids_butaca:
+            ButacaService.registrar_reserva(id_funcion, id_butaca)
+        ReporteService.invalidar_funcion(id_funcion)
+        
+        return {
+            'success': True,
+            'mensaje': 'Reservas creadas exitosamente',
+            'resultados': resultados
+        }
+    
+    @staticmethod
+    def _validar_lote(ids_butaca: List[int]) -> None:
+        """
+        Validar la lista de butacas de una reserva en lote
+        
+        Raises:
+            ValidationError: Si esta vacia, tiene repetidos o supera RESERVA_LOTE_MAX_BUTACAS
+                o el limite de reservas por DNI y fecha
+        """
+        if not ids_butaca:
+            raise ValidationError("Debe indicar al menos una butaca")
+        if len(ids_butaca) > LIMITE_RESERVAS_DNI_POR_FECHA:
+            # Un lote mas grande nunca podria confirmarse: todas sus butacas son del mismo DNI y fecha
+            raise ValidationError(
+                f"Se permiten como maximo {LIMITE_RESERVAS_DNI_POR_FECHA} reservas activas por DNI y fecha"
+            )
+        if len(ids_butaca) > config.RESERVA_LOTE_MAX_BUTACAS:
+            raise ValidationError(f"Se permiten como maximo {config.RESERVA_LOTE_MAX_BUTACAS} butacas por reserva")
+        if len(set(ids_butaca)) != len(ids_butaca):
+            raise ValidationError("La lista de butacas tiene elementos repetidos")
+        if any(id_butaca <= 0 for id_butaca in ids_butaca):
+            raise ValidationError("Los IDs de butaca deben ser mayores que 0")
+    
+    # Listamos las reservas de un cliente por DNI paginando en la base de datos
     def listar_reservas_por_dni(
         self, 
         dni: str, 
         page: int = 1, 
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: Optional[str] = None,
+        total: str = TOTAL_EXACT
     ) -> Dict[str, Any]:
         """
-        Listar reservas de un cliente por DNI
+        Listar reservas de un cliente por DNI ordenadas por fecha de la funcion
+        
+        Solo se leen las filas de la pagina pedida. Con cursor (next_cursor de la pagina anterior) la pagina
+        se busca por posicion (keyset) y el costo no depende de cuantas paginas se recorrieron; sin cursor
+        se usa el numero de pagina.
         
         Args:
             dni: DNI del cliente
-            page: Numero de pagina
+            page: Numero de pagina (se ignora si se indica cursor)
             per_page: Elementos por pagina
+            cursor: Cursor opaco devuelto en next_cursor
+            total: 'exact' (COUNT), 'estimate' (estadisticas del optimizador) o 'none' (no se calcula)
         
         Returns:
-            Diccionario con datos paginados
+            Diccionario con datos paginados y next_cursor
+        
+        Raises:
+            ValidationError: Si el cursor o el modo de total son invalidos
         """
-        # Obtenemos las reservas de un cliente por DNI usando el sp SP_ReservasPorDNI
-        reservas = self.reserva_repository.get_reservas_por_dni(dni)
-        return paginate(reservas, page, per_page)
+        return paginate_query(
+            fetch_page=lambda limit, offset, despues_de: self.reserva_repository.get_reservas_por_dni_pagina(
+                dni,
+                limit,
+                offset=offset,
+                despues_de=(despues_de['fecha_inicio'], despues_de['id_reserva']) if despues_de else None
+            ),
+            cursor_from_row=lambda fila: {'fecha_inicio': fila['FechaInicio'], 'id_reserva': fila['IdReserva']},
+            cursor_keys={'fecha_inicio': datetime, 'id_reserva': int},
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            total=total,
+            count=lambda: self.reserva_repository.contar_reservas_por_dni(dni),
+            estimate=lambda: self.reserva_repository.estimar_reservas_por_dni(dni)
+        )
+    
+    # Version de las reservas del DNI para el ETag (GET /reservas/{dni}): un agregado en la base, sin listar
+    def version_reservas_por_dni(self, dni: str) -> Tuple[int, int]:
+        """(cantidad, checksum) de las reservas del DNI: cambia con cada reserva nueva, pago o baja"""
+        return self.reserva_repository.version_reservas_por_dni(dni)
 
@@ -0,0 +1,185 @@
+"""
+Trazas de las llamadas a la base y registro de consultas lentas
+Nos permite saber que stored procedure o consulta (y con que parametros) hizo lento un request:
+- Cada llamada medida por app/database.py lleva una traza con los tiempos de conexion (esperar el pool),
+  ejecucion y lectura de filas, y la cantidad de filas devueltas
+- Las que superan SQL_SLOW_QUERY_MS se escriben como una linea JSON en el logger 'app.sql' y se guardan
+  en un buffer circular (las ultimas SQL_SLOW_LOG_SIZE) que se consulta en GET /api/v1/admin/consultas-lentas
+- Para las consultas SELECT se puede guardar el EXPLAIN de las primeras SQL_SLOW_EXPLAIN_MAX lentas del proceso
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.config import Config
+
+config = Config()
+
+logger = logging.getLogger('app.sql')
+
+# Traza de la llamada en curso (cada hilo o tarea tiene la suya)
+_traza_actual: ContextVar[Optional['Traza']] = ContextVar('traza_sql', default=None)
+
+_ESPACIOS = re.compile(r'\s+')
+
+
+class Traza:
+    """Tiempos de una llamada a la base: se marca el fin de cada fase con marcar()"""
+    __slots__ = ('kind', 'name', 'query', 'params', 'inicio', 'conexion', 'ejecucion', 'lectura')
+
+    def __init__(self, kind: str, name: str, query: Optional[str], params: Any):
+        self.kind = kind
+        self.name = name
+        self.query = query
+        self.params = params
+        self.inicio = time.perf_counter()
+        self.conexion: Optional[float] = None
+        self.ejecucion: Optional[float] = None
+        self.lectura: Optional[float] = None
+
+
+def iniciar(kind: str, name: str, query: Optional[str] = None, params: Any = None):
+    """Iniciar la traza de una llamada (devuelve (traza, token) para finalizar)"""
+    traza = Traza(kind, name, query, params)
+    return traza, _traza_actual.set(traza)
+
+
+def marcar(fase: str) -> None:
+    """Marcar el fin de una fase ('conexion', 'ejecucion' o 'lectura') de la llamada en curso, si hay traza"""
+    traza = _traza_actual.get()
+    if traza is not None:
+        setattr(traza, fase, time.perf_counter())
+
+
+def descartar(token) -> None:
+    """Quitar la traza en curso sin registrarla (la llamada fue interrumpida)"""
+    _traza_actual.reset(token)
+
+
+def _ms(desde: Optional[float], hasta: Optional[float]) -> Optional[float]:
+    if desde is None or hasta is None:
+        return None
+    return round((hasta - desde) * 1000, 3)
+
+
+def _parametros(params: Any) -> Any:
+    """Parametros para el log: valores JSON tal cual y el resto como texto (fechas, Decimal)"""
+    if params is None:
+        return None
+    if not isinstance(params, (list, tuple)):
+        params = [params]
+    return [valor if valor is None or isinstance(valor, (int, float, str, bool)) else str(valor) for valor in params]
+
+
+def es_explicable(query: Optional[str]) -> bool:
+    """Solo se pide EXPLAIN de consultas de lectura (no de EXPLAIN, CALL, INSERT, etc.)"""
+    if not query:
+        return False
+    inicio = query.lstrip()[:6].upper()
+    return inicio == 'SELECT' or inicio.startswith('WITH')
+
+
+class RegistroConsultasLentas:
+    """Buffer circular seguro para hilos con las ultimas consultas lentas del proceso"""
+
+    def __init__(self, max_size: int, max_explains: int):
+        self._consultas: Deque[Dict[str, Any]] = deque(maxlen=max(1, max_size))
+        self._lock = threading.Lock()
+        self._explains_restantes = max_explains
+        self._total = 0
+
+    def agregar(self, registro: Dict[str, Any]) -> None:
+        with self._lock:
+            self._consultas.append(registro)
+            self._total += 1
+
+    def tomar_explain(self) -> bool:
+        """Reservar uno de los EXPLAIN permitidos (False si ya se usaron todos)"""
+        with self._lock:
+            if self._explains_restantes <= 0:
+                return False
+            self._explains_restantes -= 1
+            return True
+
+    def listar(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Consultas lentas guardadas, de la mas reciente a la mas antigua"""
+        with self._lock:
+            consultas = list(reversed(self._consultas))
+        return consultas[:limit] if limit is not None else consultas
+
+    def limpiar(self) -> int:
+        """Vaciar el buffer (devuelve cuantas se quitaron)"""
+        with self._lock:
+            cantidad = len(self._consultas)
+            self._consultas.clear()
+            return cantidad
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'guardadas': len(self._consultas),
+                'capacidad': self._consultas.maxlen,
+                'total': self._total,
+                'explains_restantes': self._explains_restantes
+            }
+
+
+consultas_lentas = RegistroConsultasLentas(config.SQL_SLOW_LOG_SIZE, config.SQL_SLOW_EXPLAIN_MAX)
+
+
+def finalizar(
+    traza: Traza,
+    token,
+    filas: int,
+    error: Optional[BaseException] = None,
+    explicar: Optional[Callable[[str, Any], List[Dict[str, Any]]]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Cerrar la traza y, si la llamada fue lenta, escribirla en el log y guardarla en consultas_lentas
+
+    Args:
+        traza, token: Lo devuelto por iniciar()
+        filas: Filas devueltas por la llamada
+        error: Excepcion de la llamada, si fallo
+        explicar: Funcion (query, params) -> filas del EXPLAIN (se usa en las primeras consultas SELECT lentas)
+
+    Returns:
+        El registro de la consulta lenta, o None si no supero SQL_SLOW_QUERY_MS
+    """
+    fin = time.perf_counter()
+    # La traza deja de ser la actual antes del EXPLAIN (que usa otra conexion y no se traza)
+    _traza_actual.reset(token)
+    total_ms = (fin - traza.inicio) * 1000
+    if total_ms < config.SQL_SLOW_QUERY_MS:
+        return None
+
+    registro = {
+        'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+        'kind': traza.kind,
+        'name': traza.name,
+        'query': _ESPACIOS.sub(' ', traza.query).strip() if traza.query else None,
+        'params': _parametros(traza.params) if config.SQL_SLOW_LOG_PARAMS else None,
+        'rows': filas,
+        'connect_ms': _ms(traza.inicio, traza.conexion),
+        'execute_ms': _ms(traza.conexion, traza.ejecucion),
+        'fetch_ms': _ms(traza.ejecucion, traza.lectura),
+        'total_ms': round(total_ms, 3),
+        'error': f"{type(error).__name__}: {error}" if error is not None else None,
+        'explain': None
+    }
+    if explicar is not None and error is None and es_explicable(traza.query) and consultas_lentas.tomar_explain():
+        try:
+            registro['explain'] = explicar(traza.query, traza.params)
+        except Exception as e:
+            registro['explain'] = [{'error': f"{type(e).__name__}: {e}"}]
+
+    consultas_lentas.agregar(registro)
+    logger.warning("consulta lenta %s", json.dumps(registro, default=str))
+    return registro
+
@@ -2,20 +2,55 @@
 Utilidades de la aplicacion
 """
 from app.utils.pagination import paginate
+from app.utils.cache import LRUTTLCache
+from app.utils.bitset import Bitset
+from app.utils.idempotency import IdempotencyStore, IdempotencyStoreCompartido, huella_payload
+from app.utils.admission import AdmisionButacas
+from app.utils.group_commit import ColaGroupCommit
+from app.utils.export import exportar_chunks, validar_formato
+from app.utils.fanout import EjecutorAcotado
+from app.utils.fast_json import compilar_modelo, fast_marshal, fast_marshal_with
+from app.utils.compression import register_compression
+from app.utils.metrics import RegistroMetricas, registro
+from app.utils.etag import calcular_etag, etag_coincide, etag_de, respuesta_no_modificada
 from app.utils.exceptions import (
     AppException,
     NotFoundError,
     ConflictError,
     ValidationError,
+    ServiceUnavailableError,
+    UnauthorizedError,
     map_sp_message_to_exception
 )
 
 __all__ = [
     'paginate',
+    'LRUTTLCache',
+    'Bitset',
+    'IdempotencyStore',
+    'IdempotencyStoreCompartido',
+    'huella_payload',
+    'AdmisionButacas',
+    'ColaGroupCommit',
+    'exportar_chunks',
+    'validar_formato',
+    'EjecutorAcotado',
+    'compilar_modelo',
+    'fast_marshal',
+    'fast_marshal_with',
+    'RegistroMetricas',
+    'registro',
+    'register_compression',
+    'calcular_etag',
+    'etag_coincide',
+    'etag_de',
+    'respuesta_no_modificada',
     'AppException',
     'NotFoundError',
     'ConflictError',
     'ValidationError',
+    'ServiceUnavailableError',
+    'UnauthorizedError',
     'map_sp_message_to_exception'
 ]
 
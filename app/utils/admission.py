@@ -0,0 +1,138 @@
+"""
+Control de admision en memoria para reservas de butacas
+Nos permite rechazar al instante las reservas sobre butacas que ya sabemos ocupadas, sin ejecutar el sp
+La base de datos sigue siendo la fuente de verdad: solo se rechaza lo que la base confirmo como ocupado
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Decisiones de AdmisionButacas.adquirir
+RECHAZAR = 'rechazar'    # la butaca ya esta ocupada: responder 409 sin ir a la base
+TURNO = 'turno'          # el llamador tiene el turno de la butaca: ir a la base y luego llamar a liberar
+SIN_TURNO = 'sin_turno'  # la reserva en curso tardo demasiado: ir a la base sin turno
+
+
+class _Turno:
+    """Reserva en curso sobre una butaca; los demas pedidos esperan su resultado"""
+    __slots__ = ('evento', 'ocupada')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.ocupada = False
+
+
+class AdmisionButacas:
+    """
+    Butacas ocupadas por funcion (con TTL) y turnos de las reservas en curso
+
+    - Una butaca se marca ocupada solo cuando la base lo confirma (reserva OK o 'Butaca ya reservada')
+    - Mientras una reserva esta en curso, los pedidos sobre la misma butaca esperan su resultado:
+      si se confirmo se rechazan, si fallo (ej: limite de DNI) pasan a la base
+    - El TTL acota cuanto se sigue rechazando una butaca liberada por fuera de la aplicacion
+    """
+
+    def __init__(self, ttl: float = 10.0, max_funciones: int = 1000, wait_timeout: float = 2.0):
+        self.ttl = ttl
+        self.max_funciones = max_funciones
+        self.wait_timeout = wait_timeout
+        # id_funcion -> {id_butaca: instante de vencimiento}
+        self._ocupadas: "OrderedDict[int, Dict[int, float]]" = OrderedDict()
+        self._turnos: Dict[Tuple[int, int], _Turno] = {}
+        self._lock = threading.Lock()
+        self._rechazos = 0
+        self._esperas = 0
+
+    def _esta_ocupada(self, id_funcion: int, id_butaca: int, now: float) -> bool:
+        """Consultar el conjunto de ocupadas (se llama con el lock tomado)"""
+        butacas = self._ocupadas.get(id_funcion)
+        if not butacas:
+            return False
+        vence = butacas.get(id_butaca)
+        if vence is None:
+            return False
+        if vence <= now:
+            del butacas[id_butaca]
+            return False
+        return True
+
+    def esta_ocupada(self, id_funcion: int, id_butaca: int) -> bool:
+        """Indicar si la butaca esta confirmada como ocupada (sin esperar turnos)"""
+        with self._lock:
+            ocupada = self._esta_ocupada(id_funcion, id_butaca, time.monotonic())
+            if ocupada:
+                self._rechazos += 1
+            return ocupada
+
+    def adquirir(self, id_funcion: int, id_butaca: int) -> str:
+        """
+        Decidir si una reserva debe ir a la base de datos
+
+        Returns:
+            RECHAZAR, TURNO (hay que llamar a liberar al terminar) o SIN_TURNO
+        """
+        clave = (id_funcion, id_butaca)
+        while True:
+            with self._lock:
+                if self._esta_ocupada(id_funcion, id_butaca, time.monotonic()):
+                    self._rechazos += 1
+                    return RECHAZAR
+                turno = self._turnos.get(clave)
+                if turno is None:
+                    self._turnos[clave] = _Turno()
+                    return TURNO
+                self._esperas += 1
+
+            # Esperamos el resultado de la reserva en curso sobre la misma butaca
+            if not turno.evento.wait(self.wait_timeout):
+                return SIN_TURNO
+            if turno.ocupada:
+                with self._lock:
+                    self._rechazos += 1
+                return RECHAZAR
+
+    def liberar(self, id_funcion: int, id_butaca: int, ocupada: bool) -> None:
+        """Terminar el turno de una butaca informando si la base la confirmo como ocupada"""
+        with self._lock:
+            turno = self._turnos.pop((id_funcion, id_butaca), None)
+            if ocupada:
+                self._marcar(id_funcion, id_butaca)
+        if turno is not None:
+            turno.ocupada = ocupada
+            turno.evento.set()
+
+    def marcar_ocupada(self, id_funcion: int, id_butaca: int) -> None:
+        """Registrar una butaca confirmada como ocupada por la base de datos"""
+        with self._lock:
+            self._marcar(id_funcion, id_butaca)
+
+    def _marcar(self, id_funcion: int, id_butaca: int) -> None:
+        """Agregar la butaca al conjunto de ocupadas (se llama con el lock tomado)"""
+        butacas = self._ocupadas.get(id_funcion)
+        if butacas is None:
+            butacas = self._ocupadas[id_funcion] = {}
+            while len(self._ocupadas) > self.max_funciones:
+                self._ocupadas.popitem(last=False)
+        else:
+            self._ocupadas.move_to_end(id_funcion)
+        butacas[id_butaca] = time.monotonic() + self.ttl
+
+    def invalidar(self, id_funcion: Optional[int] = None) -> None:
+        """Olvidar las butacas ocupadas de una funcion (o de todas), ej: al cancelar reservas"""
+        with self._lock:
+            if id_funcion is None:
+                self._ocupadas.clear()
+            else:
+                self._ocupadas.pop(id_funcion, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la admision para monitoreo"""
+        with self._lock:
+            return {
+                'funciones': len(self._ocupadas),
+                'butacas_ocupadas': sum(len(butacas) for butacas in self._ocupadas.values()),
+                'turnos_en_curso': len(self._turnos),
+                'rechazos': self._rechazos,
+                'esperas': self._esperas
+            }
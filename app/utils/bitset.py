@@ -0,0 +1,45 @@
+"""
+Bitset compacto sobre un bytearray
+Nos permite guardar un flag por posicion (ej: butaca ocupada / libre) usando 1 bit en lugar de un objeto por elemento
+"""
+from typing import Iterator
+
+
+class Bitset:
+    """Conjunto de bits de tamaño fijo"""
+    __slots__ = ('_size', '_bits')
+
+    def __init__(self, size: int):
+        self._size = size
+        self._bits = bytearray((size + 7) // 8)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _check(self, index: int) -> None:
+        if not 0 <= index < self._size:
+            raise IndexError(f"Posicion fuera de rango: {index}")
+
+    def set(self, index: int) -> None:
+        """Encender el bit de la posicion indicada"""
+        self._check(index)
+        self._bits[index >> 3] |= 1 << (index & 7)
+
+    def clear(self, index: int) -> None:
+        """Apagar el bit de la posicion indicada"""
+        self._check(index)
+        self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def test(self, index: int) -> bool:
+        """Indicar si el bit de la posicion indicada esta encendido"""
+        self._check(index)
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def count(self) -> int:
+        """Cantidad de bits encendidos"""
+        return sum(bin(byte).count('1') for byte in self._bits)
+
+    def __iter__(self) -> Iterator[bool]:
+        bits = self._bits
+        for index in range(self._size):
+            yield bool(bits[index >> 3] & (1 << (index & 7)))
@@ -0,0 +1,126 @@
+"""
+Cache en memoria acotado (LRU) con vencimiento por tiempo (TTL)
+Nos permite evitar llamadas repetidas a la base de datos para datos que cambian poco
+Es seguro para hilos y lleva contadores de aciertos, fallos y desalojos para monitoreo
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class LRUTTLCache:
+    """
+    Cache LRU con TTL por entrada
+
+    - Al superar max_size se desaloja la entrada usada hace mas tiempo
+    - Cada entrada vence a los ttl segundos (se puede indicar un ttl distinto por entrada)
+    - on_remove(clave, valor) se llama, fuera del lock, por cada entrada desalojada o vencida
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 60.0,
+        on_remove: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_remove = on_remove
+        # clave -> (valor, instante de vencimiento)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Buscar una clave en el cache
+
+        Returns:
+            Tupla (encontrado, valor); si no se encontro o vencio, (False, None)
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._misses += 1
+                return False, None
+            value, expires_at = item
+            if expires_at > now:
+                # Marcamos la entrada como usada recientemente
+                self._data.move_to_end(key)
+                self._hits += 1
+                return True, value
+            del self._data[key]
+            self._expirations += 1
+            self._misses += 1
+        self._notificar([(key, value)])
+        return False, None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Guardar un valor con el ttl indicado (o el ttl por defecto del cache)"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        removidas = []
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                clave, (valor, _) = self._data.popitem(last=False)
+                removidas.append((clave, valor))
+                self._evictions += 1
+        self._notificar(removidas)
+
+    def _notificar(self, removidas: List[Tuple[Hashable, Any]]) -> None:
+        """Avisar a on_remove las entradas desalojadas o vencidas"""
+        if self.on_remove is None:
+            return
+        for clave, valor in removidas:
+            self.on_remove(clave, valor)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        Quitar una clave del cache
+
+        Returns:
+            True si la clave estaba en el cache
+        """
+        with self._lock:
+            if self._data.pop(key, None) is None:
+                return False
+            self._invalidations += 1
+            return True
+
+    def clear(self) -> int:
+        """
+        Vaciar el cache
+
+        Returns:
+            Cantidad de entradas quitadas
+        """
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            self._invalidations += count
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del cache para monitoreo"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations
+            }
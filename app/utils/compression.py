@@ -0,0 +1,78 @@
+"""
+Compresion de respuestas negociada con Accept-Encoding
+Nos permite enviar comprimidas (brotli o gzip) las respuestas JSON grandes y repetitivas (reportes, listas de
+reservas) que los clientes piden una y otra vez:
+- Solo se comprimen respuestas 2xx con cuerpo en memoria de al menos COMPRESSION_MIN_SIZE bytes y de un tipo
+  de contenido textual; las respuestas en streaming (exportacion) y los archivos estaticos quedan igual
+- brotli se usa solo si el paquete Brotli esta instalado; si no, gzip
+- El ETag de una respuesta comprimida lleva el sufijo del encoding (-br / -gzip) para distinguirla de la original
+"""
+import gzip
+from typing import Optional
+
+from flask import Flask, Response, request
+
+from app.config import Config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional, sin el solo se ofrece gzip
+    brotli = None
+
+config = Config()
+
+# Encodings soportados en orden de preferencia (ante igual calidad en Accept-Encoding gana el primero)
+ENCODINGS = ['br', 'gzip']
+
+# Tipos de contenido que vale la pena comprimir (ademas de text/*)
+MIMETYPES_COMPRIMIBLES = {
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml'
+}
+
+
+def _elegir_encoding() -> Optional[str]:
+    """Encoding aceptado por el cliente (None si no acepta ninguno de los disponibles)"""
+    disponibles = [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+    return request.accept_encodings.best_match(disponibles)
+
+
+def _comprimir(data: bytes, encoding: str) -> bytes:
+    """Comprimir el cuerpo con el encoding elegido (gzip sin fecha para que el resultado sea determinista)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.COMPRESSION_BROTLI_LEVEL)
+    return gzip.compress(data, compresslevel=config.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def comprimir_respuesta(response: Response) -> Response:
+    """Hook after_request: comprimir la respuesta si el cliente lo acepta y vale la pena"""
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300 or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers):
+        return response
+    if response.mimetype not in MIMETYPES_COMPRIMIBLES and not response.mimetype.startswith('text/'):
+        return response
+
+    # La respuesta depende de Accept-Encoding aunque esta vez no se comprima (caches intermedios)
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < config.COMPRESSION_MIN_SIZE:
+        return response
+    encoding = _elegir_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(_comprimir(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def register_compression(app: Flask) -> None:
+    """Registrar la compresion de respuestas en la aplicacion (si COMPRESSION_ENABLED)"""
+    if config.COMPRESSION_ENABLED:
+        app.after_request(comprimir_respuesta)
@@ -0,0 +1,62 @@
+"""
+ETags fuertes y GET condicionales (If-None-Match -> 304)
+Nos permite que los clientes que consultan periodicamente un recurso no vuelvan a descargarlo si no cambio:
+- El ETag se calcula con la version del recurso (un agregado barato en la base o el valor ya cacheado)
+  y con la URL pedida (query string y mascara X-Fields), no con el cuerpo de la respuesta
+- Si el cliente envia If-None-Match con ese ETag se responde 304 sin armar ni serializar la respuesta
+"""
+import hashlib
+from typing import Any, Callable, Dict, Optional
+
+from flask import Response, current_app, request
+
+from app.config import Config
+from app.utils.compression import ENCODINGS
+
+config = Config()
+
+
+def calcular_etag(*partes: Any) -> str:
+    """ETag fuerte (sin comillas) a partir de valores con repr estable (tuplas, numeros, strings, Decimal)"""
+    return hashlib.blake2b(repr(partes).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def etag_de(obtener_version: Callable[[], Any]) -> Optional[str]:
+    """
+    ETag de la request actual para un recurso con la version que devuelve obtener_version
+
+    Returns:
+        ETag sin comillas, o None si ETAGS_ENABLED esta apagado (no se consulta la version)
+        o si obtener_version devuelve None (el recurso no tiene una version confiable)
+    """
+    if not config.ETAGS_ENABLED:
+        return None
+    version = obtener_version()
+    if version is None:
+        return None
+    mascara = request.headers.get(current_app.config['RESTX_MASK_HEADER'])
+    return calcular_etag(request.full_path, mascara, version)
+
+
+def etag_coincide(etag: Optional[str]) -> bool:
+    """Indicar si el If-None-Match de la request incluye el ETag (o su variante comprimida, o *)"""
+    if etag is None:
+        return False
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    # La compresion agrega el sufijo del encoding al ETag (ver app/utils/compression.py)
+    return any(if_none_match.contains_weak(variante)
+               for variante in [etag] + [f"{etag}-{encoding}" for encoding in ENCODINGS])
+
+
+def respuesta_no_modificada(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo con el ETag del recurso"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def cabeceras_etag(etag: Optional[str]) -> Dict[str, str]:
+    """Header ETag para la respuesta 200 (vacio si no hay ETag)"""
+    return {'ETag': f'"{etag}"'} if etag is not None else {}
@@ -2,14 +2,16 @@
 Excepciones personalizadas y mapeo de errores de la aplicacion
 Definimos las excepciones que usaremos en la aplicacion para manejar errores de manera uniforme
 """
-from typing import Optional
+from typing import Any, Optional
 
 
 class AppException(Exception):
     """Excepcion base de la aplicacion"""
-    def __init__(self, message: str, status_code: int = 500):
+    def __init__(self, message: str, status_code: int = 500, details: Optional[Any] = None):
         self.message = message
         self.status_code = status_code
+        # Informacion adicional para la respuesta de error (ej: resultado por butaca de un lote)
+        self.details = details
         super().__init__(self.message)
 
 
@@ -35,6 +37,18 @@ class InactiveResourceError(AppException):
     def __init__(self, message: str = "Recurso inactivo o finalizado"):
         super().__init__(message, status_code=400)
 
+
+class UnauthorizedError(AppException):
+    """Credenciales faltantes o invalidas (401)"""
+    def __init__(self, message: str = "No autorizado"):
+        super().__init__(message, status_code=401)
+
+
+class ServiceUnavailableError(AppException):
+    """Servicio no disponible temporalmente (503)"""
+    def __init__(self, message: str = "Servicio no disponible temporalmente"):
+        super().__init__(message, status_code=503)
+
 """
 Mapeo de mensajes de stored procedures a excepciones de la aplicacion
 Esto nos permite manejar los errores de manera uniforme y evitar repetir codigo de manejo de errores en cada controlador
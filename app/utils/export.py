@@ -0,0 +1,97 @@
+"""
+Exportacion de filas en formatos de texto (CSV y NDJSON) por partes
+Nos permite armar respuestas HTTP en streaming: cada parte agrupa varias filas ya serializadas,
+asi la memoria usada no depende de la cantidad de filas
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List
+
+from app.utils.exceptions import ValidationError
+
+FORMATO_CSV = 'csv'
+FORMATO_NDJSON = 'ndjson'
+
+# Content-Type de cada formato
+MIMETYPES = {
+    FORMATO_CSV: 'text/csv; charset=utf-8',
+    FORMATO_NDJSON: 'application/x-ndjson'
+}
+
+
+def validar_formato(formato: str) -> str:
+    """Validar el formato de exportacion pedido"""
+    if formato not in MIMETYPES:
+        raise ValidationError(f"Formato invalido. Use uno de: {', '.join(MIMETYPES)}")
+    return formato
+
+
+def _valor(valor: Any) -> Any:
+    """Convertir un valor de la base a texto sin perder precision (Decimal como string, fechas ISO 8601)"""
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def csv_chunks(filas: Iterable[Dict[str, Any]], columnas: List[str], filas_por_parte: int = 500) -> Iterator[str]:
+    """
+    Serializar filas como CSV (con encabezado) en partes de filas_por_parte filas
+
+    Returns:
+        Generador de partes de texto CSV
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columnas)
+    pendientes = 0
+    for fila in filas:
+        writer.writerow([_valor(fila.get(columna)) for columna in columnas])
+        pendientes += 1
+        if pendientes >= filas_por_parte:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(filas: Iterable[Dict[str, Any]], columnas: List[str], filas_por_parte: int = 500) -> Iterator[str]:
+    """
+    Serializar filas como NDJSON (un objeto JSON por linea) en partes de filas_por_parte filas
+
+    Returns:
+        Generador de partes de texto NDJSON
+    """
+    lineas = []
+    for fila in filas:
+        lineas.append(json.dumps({columna: _valor(fila.get(columna)) for columna in columnas}, ensure_ascii=False))
+        if len(lineas) >= filas_por_parte:
+            yield '\n'.join(lineas) + '\n'
+            lineas = []
+    if lineas:
+        yield '\n'.join(lineas) + '\n'
+
+
+def exportar_chunks(filas: Iterable[Dict[str, Any]], formato: str, columnas: List[str],
+                    filas_por_parte: int = 500) -> Iterator[str]:
+    """
+    Serializar filas en el formato pedido (csv o ndjson)
+
+    Si la respuesta se corta antes de terminar (el servidor cierra el generador), tambien se cierra
+    el generador de filas para liberar la conexion a la base
+    """
+    if formato == FORMATO_CSV:
+        partes = csv_chunks(filas, columnas, filas_por_parte)
+    else:
+        partes = ndjson_chunks(filas, columnas, filas_por_parte)
+    try:
+        yield from partes
+    finally:
+        cerrar = getattr(filas, 'close', None)
+        if cerrar is not None:
+            cerrar()
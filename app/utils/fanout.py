@@ -0,0 +1,72 @@
+"""
+Ejecucion concurrente acotada (fan-out)
+Nos permite repartir consultas independientes (ej: una por pelicula) entre un numero fijo de hilos
+compartido por todos los requests del proceso, asi un reporte grande no puede tomar todas las conexiones del pool
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class EjecutorAcotado:
+    """
+    ThreadPoolExecutor de tamanio fijo, creado en el primer uso y recreado si el proceso se forkeo
+
+    Como los hilos se comparten entre requests, max_workers es el maximo de consultas en paralelo
+    de todo el proceso (no por request).
+    """
+
+    def __init__(self, max_workers: int, nombre: str = 'fanout'):
+        self.max_workers = max(1, max_workers)
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._tareas = 0
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        """Executor del proceso actual (los hilos no sobreviven a un fork)"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.nombre)
+                self._pid = os.getpid()
+            return self._executor
+
+    def map(self, funcion: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Aplicar funcion a cada item en paralelo y esperar todos los resultados
+
+        Returns:
+            Resultados en el mismo orden que items
+
+        Raises:
+            La primera excepcion (en el orden de items) lanzada por funcion
+        """
+        items = list(items)
+        if len(items) <= 1:
+            # Sin paralelismo posible: evitamos el salto a otro hilo
+            return [funcion(item) for item in items]
+        executor = self._obtener_executor()
+        futuros = [executor.submit(funcion, item) for item in items]
+        with self._lock:
+            self._tareas += len(futuros)
+        try:
+            return [futuro.result() for futuro in futuros]
+        finally:
+            # Si una tarea fallo, no dejamos encoladas las que todavia no empezaron
+            for futuro in futuros:
+                futuro.cancel()
+
+    def cerrar(self) -> None:
+        """Esperar las tareas en curso y detener los hilos (al apagar el worker)"""
+        with self._lock:
+            executor = self._executor if self._pid == os.getpid() else None
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del ejecutor para monitoreo"""
+        with self._lock:
+            return {'max_workers': self.max_workers, 'tareas': self._tareas}
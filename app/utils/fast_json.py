@@ -0,0 +1,249 @@
+"""
+Serializacion JSON rapida de las respuestas
+Nos permite reemplazar el camino marshal_with de flask-restx (que recorre cada campo de cada fila con objetos
+formateadores y luego serializa con el json de la libreria estandar) por:
+- Proyecciones precompiladas de los modelos flask-restx: por cada modelo se arma una vez la lista de
+  (clave, funcion de conversion) con el mismo resultado que marshal
+- Un encoder basado en orjson (si esta instalado) que maneja datetime de forma nativa y Decimal como string
+Los modelos siguen siendo los de flask-restx, asi la documentacion Swagger no cambia
+"""
+import json
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Tuple
+
+from flask import Response, current_app, has_request_context, make_response, request
+from flask_restx import fields, marshal
+from flask_restx.fields import get_value
+from flask_restx.representations import output_json as restx_output_json
+from flask_restx.utils import merge, unpack
+
+from app.config import Config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional, sin el se usa json de la libreria estandar
+    orjson = None
+
+config = Config()
+
+Proyeccion = Callable[[Any], Any]
+
+# Proyecciones ya compiladas: id(modelo) -> (modelo, proyeccion); guardamos el modelo para que su id no se reutilice
+_proyecciones: Dict[int, Tuple[Any, Proyeccion]] = {}
+_proyecciones_lock = threading.RLock()
+# Proyecciones que se estan compilando en el hilo que tiene el lock (modelos recursivos)
+_en_compilacion: Dict[int, Proyeccion] = {}
+
+
+def _default(valor: Any) -> Any:
+    """Tipos que el encoder no serializa solo: Decimal como string (precision exacta) y fechas en ISO 8601"""
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def dumps(data: Any, indent: bool = False) -> bytes:
+    """Serializar a JSON (orjson si esta disponible, si no json de la libreria estandar)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, default=_default, indent=4 if indent else None).encode('utf-8')
+
+
+def _lector(clave: str, campo: fields.Raw) -> Callable[[Any], Any]:
+    """Funcion que lee el valor del campo de una fila (dict u objeto), igual que get_value de flask-restx"""
+    atributo = clave if campo.attribute is None else campo.attribute
+    if isinstance(atributo, str) and '.' not in atributo:
+        def leer(obj):
+            if isinstance(obj, dict):
+                return obj.get(atributo)
+            return get_value(atributo, obj)
+        return leer
+    return lambda obj: get_value(atributo, obj)
+
+
+def _conversor(campo: fields.Raw) -> Callable[[Any], Any]:
+    """Funcion que formatea un valor no nulo del campo (con atajos para los tipos que ya vienen bien)"""
+    formatear = campo.format
+    if isinstance(campo, fields.Integer):
+        return lambda valor: valor if type(valor) is int else formatear(valor)
+    if isinstance(campo, fields.String):
+        return lambda valor: valor if type(valor) is str else formatear(valor)
+    if isinstance(campo, fields.Boolean):
+        return lambda valor: valor if type(valor) is bool else formatear(valor)
+    if isinstance(campo, fields.DateTime) and campo.dt_format == 'iso8601':
+        if orjson is not None:
+            # orjson escribe el datetime en el mismo formato que isoformat(), sin pasar por Python
+            return lambda valor: valor if type(valor) is datetime else formatear(valor)
+        return lambda valor: valor.isoformat() if type(valor) is datetime else formatear(valor)
+    return formatear
+
+
+def _compilar_campo(clave: str, campo: Any) -> Callable[[Any], Any]:
+    """Funcion (fila -> valor de salida) equivalente a campo.output(clave, fila) de flask-restx"""
+    if isinstance(campo, type):
+        campo = campo()
+    leer = _lector(clave, campo)
+
+    if isinstance(campo, fields.Nested):
+        proyectar = compilar_modelo(campo.model)
+        allow_null, default = campo.allow_null, campo.default
+
+        def nested(obj):
+            valor = leer(obj)
+            if valor is None:
+                if allow_null:
+                    return None
+                if default is not None:
+                    return default
+            return proyectar(valor)
+        return nested
+
+    if isinstance(campo, fields.List):
+        elemento = _compilar_elemento(campo.container)
+        default = campo.default
+
+        def lista(obj):
+            valor = leer(obj)
+            if valor is None:
+                return default() if callable(default) else default
+            if isinstance(valor, dict) or isinstance(valor, str):
+                # Casos raros de flask-restx (un dict como lista de un elemento): delegamos
+                return campo.output(clave, obj)
+            return [elemento(item) for item in valor]
+        return lista
+
+    if type(campo) not in (fields.Raw, fields.Integer, fields.String, fields.Boolean, fields.DateTime) or campo.mask:
+        # Campos que no precompilamos (Float, Arbitrary, Wildcard, con mascara, etc.): usamos flask-restx
+        return lambda obj: campo.output(clave, obj)
+
+    convertir = _conversor(campo)
+    default = campo._v('default')
+    salida_default = campo.format(default) if default else default
+
+    def escalar(obj):
+        valor = leer(obj)
+        return salida_default if valor is None else convertir(valor)
+    return escalar
+
+
+def _compilar_elemento(contenedor: Any) -> Callable[[Any], Any]:
+    """Funcion (elemento -> valor de salida) para los elementos de un fields.List"""
+    if isinstance(contenedor, type):
+        contenedor = contenedor()
+    if isinstance(contenedor, fields.Nested):
+        proyectar = compilar_modelo(contenedor.model)
+        allow_null, default = contenedor.allow_null, contenedor.default
+
+        def nested(item):
+            if item is None:
+                if allow_null:
+                    return None
+                if default is not None:
+                    return default
+            return proyectar(item)
+        return nested
+    if type(contenedor) in (fields.Integer, fields.String, fields.Boolean, fields.DateTime) and not contenedor.mask:
+        convertir = _conversor(contenedor)
+        default = contenedor._v('default')
+        salida_default = contenedor.format(default) if default else default
+        return lambda item: salida_default if item is None else convertir(item)
+    return lambda item: contenedor.output(0, [item])
+
+
+def compilar_modelo(modelo: Any) -> Proyeccion:
+    """
+    Precompilar la proyeccion de un modelo flask-restx (se compila una vez y se reutiliza)
+
+    Returns:
+        Funcion (datos -> dict con las claves del modelo en orden) que, serializada con dumps, da el mismo JSON
+        que marshal(datos, modelo) (con orjson los datetime quedan como datetime y los escribe el encoder);
+        si recibe una lista o tupla devuelve la lista de proyecciones
+    """
+    compilada = _proyecciones.get(id(modelo))
+    if compilada is not None:
+        return compilada[1]
+
+    with _proyecciones_lock:
+        compilada = _proyecciones.get(id(modelo))
+        if compilada is not None:
+            return compilada[1]
+        if id(modelo) in _en_compilacion:
+            return _en_compilacion[id(modelo)]
+
+        pares: List[Tuple[str, Callable[[Any], Any]]] = []
+
+        def proyectar(data):
+            if isinstance(data, (list, tuple)):
+                return [proyectar(item) for item in data]
+            return {clave: extraer(data) for clave, extraer in pares}
+
+        # Armamos los campos antes de publicar la proyeccion (otro hilo no debe verla incompleta);
+        # un modelo que se anida a si mismo se resuelve con la referencia local
+        _en_compilacion[id(modelo)] = proyectar
+        try:
+            pares.extend(
+                (clave, _compilar_campo(clave, campo))
+                for clave, campo in getattr(modelo, 'resolved', modelo).items()
+            )
+        finally:
+            del _en_compilacion[id(modelo)]
+        _proyecciones[id(modelo)] = (modelo, proyectar)
+        return proyectar
+
+
+def fast_marshal(data: Any, modelo: Any) -> Any:
+    """
+    Proyectar datos con un modelo flask-restx (equivalente a marshal(data, modelo))
+
+    Si la request trae el header de mascara de flask-restx (X-Fields) o JSON_FAST_PATH_ENABLED esta apagado,
+    se usa marshal para respetar la mascara
+    """
+    mascara = request.headers.get(current_app.config['RESTX_MASK_HEADER']) if has_request_context() else None
+    if mascara or not config.JSON_FAST_PATH_ENABLED:
+        return marshal(data, modelo, mask=mascara)
+    return compilar_modelo(modelo)(data)
+
+
+def fast_marshal_with(ns, modelo: Any, as_list: bool = False, code: int = HTTPStatus.OK,
+                      description: str = None, **kwargs):
+    """
+    Reemplazo de @ns.marshal_with: documenta la respuesta en Swagger igual que ns.marshal_with
+    y proyecta el resultado con la proyeccion precompilada del modelo
+    """
+    def wrapper(func):
+        doc = {
+            'responses': {
+                str(code): (description, [modelo], kwargs) if as_list else (description, modelo, kwargs)
+            },
+            '__mask__': kwargs.get('mask', True)
+        }
+        func.__apidoc__ = merge(getattr(func, '__apidoc__', {}), doc)
+
+        @wraps(func)
+        def marshalled(*args, **kw):
+            resp = func(*args, **kw)
+            if isinstance(resp, Response):
+                # Respuestas ya armadas (por ejemplo 304 Not Modified) se devuelven tal cual
+                return resp
+            if isinstance(resp, tuple):
+                data, status, headers = unpack(resp)
+                return fast_marshal(data, modelo), status, headers
+            return fast_marshal(resp, modelo)
+        return marshalled
+    return wrapper
+
+
+def output_json(data: Any, code: int, headers: Dict[str, str] = None):
+    """Representacion application/json de flask-restx con el encoder rapido"""
+    if not config.JSON_FAST_PATH_ENABLED:
+        return restx_output_json(data, code, headers)
+    resp = make_response(dumps(data, indent=current_app.debug) + b'\n', code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = 'application/json'
+    return resp
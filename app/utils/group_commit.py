@@ -0,0 +1,117 @@
+"""
+Cola de escritura agrupada (group commit)
+Nos permite aplicar muchas escrituras concurrentes en una sola transaccion: los requests encolan su solicitud,
+un hilo escritor las toma en lotes chicos y devuelve a cada uno su resultado individual
+Asi, en los picos de trafico se hace un commit (y un fsync de InnoDB) por lote en lugar de uno por request
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+# Marca para que el hilo escritor termine
+_FIN = object()
+
+
+class ColaGroupCommit:
+    """
+    Cola con un hilo escritor que procesa las solicitudes en lotes
+
+    procesar_lote recibe la lista de solicitudes y devuelve la lista de resultados en el mismo orden;
+    si lanza una excepcion, todas las solicitudes del lote la reciben.
+    El hilo se crea en el primer uso y se vuelve a crear si el proceso se forkeo (workers de gunicorn).
+    """
+
+    def __init__(self, procesar_lote: Callable[[List[Any]], List[Any]], max_lote: int = 50, max_espera: float = 0.002):
+        self.procesar_lote = procesar_lote
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self._lock = threading.Lock()
+        self._cola: Optional[queue.Queue] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lotes = 0
+        self._solicitudes = 0
+
+    def _asegurar_hilo(self) -> queue.Queue:
+        """Crear la cola y el hilo escritor del proceso actual si hace falta"""
+        with self._lock:
+            if self._pid != os.getpid() or self._hilo is None or not self._hilo.is_alive():
+                self._cola = queue.Queue()
+                self._hilo = threading.Thread(target=self._escritor, args=(self._cola,), name='group-commit', daemon=True)
+                self._pid = os.getpid()
+                self._hilo.start()
+            return self._cola
+
+    def enviar(self, solicitud: Any) -> Any:
+        """
+        Encolar una solicitud y esperar su resultado
+
+        Returns:
+            Resultado de la solicitud devuelto por procesar_lote
+        """
+        futuro: Future = Future()
+        self._asegurar_hilo().put((solicitud, futuro))
+        return futuro.result()
+
+    def _escritor(self, cola: queue.Queue) -> None:
+        """Tomar lotes de la cola y procesarlos hasta recibir la marca de fin"""
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            lote = [item]
+            # Esperamos a lo sumo max_espera a que lleguen mas solicitudes para el mismo lote
+            limite = time.monotonic() + self.max_espera
+            fin = False
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    item = cola.get(timeout=restante) if restante > 0 else cola.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _FIN:
+                    fin = True
+                    break
+                lote.append(item)
+
+            self._procesar(lote)
+            if fin:
+                return
+
+    def _procesar(self, lote: List[Any]) -> None:
+        """Procesar un lote y entregar a cada solicitud su resultado (o la excepcion del lote)"""
+        solicitudes = [solicitud for solicitud, _ in lote]
+        try:
+            resultados = self.procesar_lote(solicitudes)
+        except BaseException as e:
+            for _, futuro in lote:
+                futuro.set_exception(e)
+        else:
+            for (_, futuro), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
+        with self._lock:
+            self._lotes += 1
+            self._solicitudes += len(lote)
+
+    def cerrar(self, timeout: float = 5.0) -> None:
+        """Procesar lo pendiente y detener el hilo escritor (al apagar el worker)"""
+        with self._lock:
+            hilo, cola = self._hilo, self._cola
+            if hilo is None or self._pid != os.getpid():
+                return
+            self._hilo = None
+        cola.put(_FIN)
+        hilo.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la cola para monitoreo"""
+        with self._lock:
+            return {
+                'lotes': self._lotes,
+                'solicitudes': self._solicitudes,
+                'solicitudes_por_lote': round(self._solicitudes / self._lotes, 2) if self._lotes else 0.0,
+                'pendientes': self._cola.qsize() if self._cola is not None else 0
+            }
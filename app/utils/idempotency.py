@@ -0,0 +1,267 @@
+"""
+Almacenes de resultados por Idempotency-Key
+Nos permite responder los reintentos de un cliente con el resultado de la primera ejecucion sin volver a ejecutarla
+Los duplicados concurrentes esperan a que termine la ejecucion original en lugar de competir con ella
+- IdempotencyStore: en memoria del proceso (solo sirve con un unico proceso: con varios workers de gunicorn
+  un reintento puede llegar a otro worker)
+- IdempotencyStoreCompartido: en la base de datos, compartido por todos los workers y procesos
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.utils.exceptions import AppException, ConflictError
+
+logger = logging.getLogger('app.idempotency')
+
+
+class _Entrada:
+    """Ejecucion asociada a una clave: en curso hasta que se completa el evento"""
+    __slots__ = ('huella', 'evento', 'resultado', 'error', 'liberada', 'vence')
+
+    def __init__(self, huella: str, vence: float):
+        self.huella = huella
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        # (status_code, message, details) de un error 4xx guardado
+        self.error: Optional[Tuple[int, str, Any]] = None
+        # True si la ejecucion fallo con un error que no se guarda (la clave se puede reintentar)
+        self.liberada = False
+        self.vence = vence
+
+
+def huella_payload(payload: Dict[str, Any]) -> str:
+    """Huella (sha256) del contenido de un request, independiente del orden de las claves"""
+    canonico = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Resultados por clave de idempotencia con TTL y cantidad maxima de claves (en memoria del proceso)
+
+    - Se guardan los resultados exitosos y los errores 4xx (son deterministas para ese contenido)
+    - Los errores 5xx y las excepciones inesperadas liberan la clave para que el cliente pueda reintentar
+    - Reusar una clave con otro contenido es un conflicto
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_keys: int = 10000, wait_timeout: float = 10.0):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.wait_timeout = wait_timeout
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._replays = 0
+        self._ejecuciones = 0
+
+    def _reclamar(self, clave: Hashable, huella: str) -> Tuple[_Entrada, bool]:
+        """
+        Obtener la entrada de una clave o crearla
+
+        Returns:
+            Tupla (entrada, True si el llamador es quien debe ejecutar)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and (entrada.liberada or entrada.vence <= now):
+                del self._entradas[clave]
+                entrada = None
+            if entrada is not None:
+                if entrada.huella != huella:
+                    raise ConflictError("La Idempotency-Key ya fue usada con un contenido distinto")
+                return entrada, False
+
+            entrada = _Entrada(huella, now + self.ttl)
+            self._entradas[clave] = entrada
+            exceso = len(self._entradas) - self.max_keys
+            if exceso > 0:
+                # Se descartan las mas antiguas ya terminadas: descartar una en curso dejaria ejecutar dos veces
+                # a un duplicado concurrente (si todas estan en curso se supera max_keys por un momento)
+                terminadas = (k for k, e in self._entradas.items() if e.evento.is_set())
+                for vieja in list(islice(terminadas, exceso)):
+                    del self._entradas[vieja]
+            return entrada, True
+
+    def ejecutar(self, clave: Hashable, huella: str, funcion: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecutar funcion una sola vez por clave y devolver el mismo resultado a los reintentos
+
+        Args:
+            clave: Clave de idempotencia (incluir el endpoint si el almacen es compartido)
+            huella: Huella del contenido del request (ver huella_payload)
+            funcion: Operacion a ejecutar si la clave es nueva
+
+        Returns:
+            Tupla (resultado, True si es una respuesta repetida)
+
+        Raises:
+            ConflictError: Si la clave se uso con otro contenido o la ejecucion original sigue en curso
+            AppException: El error 4xx guardado de la ejecucion original, o el error de la ejecucion actual
+        """
+        while True:
+            entrada, propia = self._reclamar(clave, huella)
+            if propia:
+                break
+            # Esperamos a que termine la ejecucion original
+            if not entrada.evento.wait(self.wait_timeout):
+                raise ConflictError("Hay una solicitud con la misma Idempotency-Key en curso, intente nuevamente")
+            if entrada.liberada:
+                # La original fallo sin guardar resultado: la reintentamos nosotros
+                continue
+            with self._lock:
+                self._replays += 1
+            if entrada.error is not None:
+                status_code, message, details = entrada.error
+                raise AppException(message, status_code=status_code, details=details)
+            return entrada.resultado, True
+
+        with self._lock:
+            self._ejecuciones += 1
+        try:
+            entrada.resultado = funcion()
+        except AppException as e:
+            if e.status_code < 500:
+                entrada.error = (e.status_code, e.message, e.details)
+            else:
+                entrada.liberada = True
+            raise
+        except BaseException:
+            entrada.liberada = True
+            raise
+        finally:
+            entrada.evento.set()
+        return entrada.resultado, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del almacen para monitoreo"""
+        with self._lock:
+            return {
+                'size': len(self._entradas),
+                'max_keys': self.max_keys,
+                'executions': self._ejecuciones,
+                'replays': self._replays
+            }
+
+
+class IdempotencyStoreCompartido:
+    """
+    Resultados por clave de idempotencia guardados en la base de datos (mismas reglas que IdempotencyStore)
+
+    - La clave se reclama con un INSERT sobre la clave primaria: entre todos los procesos ejecuta uno solo
+    - Los duplicados concurrentes consultan la clave cada intervalo segundos hasta que hay resultado
+    - Una ejecucion en curso reserva la clave por lease segundos: si el proceso muere sin terminarla, la clave
+      vence y se puede volver a ejecutar
+    - El resultado y los errores 4xx se guardan como JSON (el resultado tiene que ser serializable)
+    """
+
+    # Cada cuantas ejecuciones se borran claves vencidas de la tabla
+    PURGAR_CADA = 1000
+
+    def __init__(self, repositorio: Any, ttl: float = 3600.0, lease: float = 60.0, wait_timeout: float = 10.0,
+                 intervalo: float = 0.05):
+        """
+        Args:
+            repositorio: Objeto con reclamar, completar, liberar y purgar_vencidas
+                (ver app.repositories.idempotencia_repository.IdempotenciaRepository)
+        """
+        self.repositorio = repositorio
+        self.ttl = ttl
+        self.lease = lease
+        self.wait_timeout = wait_timeout
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._replays = 0
+        self._ejecuciones = 0
+
+    @staticmethod
+    def _segundos(valor: float) -> int:
+        return max(1, math.ceil(valor))
+
+    def _respuesta(self, fila: Dict[str, Any]) -> Any:
+        """Resultado guardado (o el error 4xx guardado como excepcion)"""
+        with self._lock:
+            self._replays += 1
+        respuesta = json.loads(fila['Respuesta'])
+        if fila['StatusCode'] >= 400:
+            raise AppException(respuesta['message'], status_code=fila['StatusCode'], details=respuesta['details'])
+        return respuesta
+
+    def ejecutar(self, clave: str, huella: str, funcion: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecutar funcion una sola vez por clave (en todos los procesos) y devolver el mismo resultado a los reintentos
+
+        Returns:
+            Tupla (resultado, True si es una respuesta repetida)
+
+        Raises:
+            ConflictError: Si la clave se uso con otro contenido o la ejecucion original sigue en curso
+            AppException: El error 4xx guardado de la ejecucion original, o el error de la ejecucion actual
+        """
+        limite = time.monotonic() + self.wait_timeout
+        while True:
+            fila = self.repositorio.reclamar(clave, huella, self._segundos(self.lease))
+            if fila is None:
+                break
+            if fila['Huella'] != huella:
+                raise ConflictError("La Idempotency-Key ya fue usada con un contenido distinto")
+            if fila['Respuesta'] is not None:
+                return self._respuesta(fila), True
+            # Ejecucion original en curso (en este u otro proceso): esperamos su resultado
+            if time.monotonic() >= limite:
+                raise ConflictError("Hay una solicitud con la misma Idempotency-Key en curso, intente nuevamente")
+            time.sleep(self.intervalo)
+
+        with self._lock:
+            self._ejecuciones += 1
+            purgar = self._ejecuciones % self.PURGAR_CADA == 0
+        try:
+            resultado = funcion()
+        except AppException as e:
+            if e.status_code < 500:
+                self._guardar(clave, e.status_code, {'message': e.message, 'details': e.details})
+            else:
+                self._liberar(clave)
+            raise
+        except BaseException:
+            self._liberar(clave)
+            raise
+        self._guardar(clave, 200, resultado)
+        if purgar:
+            self._purgar()
+        return resultado, False
+
+    def _guardar(self, clave: str, status_code: int, respuesta: Any) -> None:
+        # Si no se puede guardar, la operacion ya se ejecuto: se responde igual y la clave vence con el lease
+        try:
+            self.repositorio.completar(
+                clave, status_code, json.dumps(respuesta, default=str), self._segundos(self.ttl)
+            )
+        except Exception as e:
+            logger.warning("No se pudo guardar el resultado de la Idempotency-Key %s: %s", clave, e)
+
+    def _liberar(self, clave: str) -> None:
+        try:
+            self.repositorio.liberar(clave)
+        except Exception as e:
+            logger.warning("No se pudo liberar la Idempotency-Key %s (vence con el lease): %s", clave, e)
+
+    def _purgar(self) -> None:
+        try:
+            self.repositorio.purgar_vencidas()
+        except Exception as e:
+            logger.warning("No se pudieron borrar las Idempotency-Key vencidas: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del proceso para monitoreo (las claves guardadas estan en la base)"""
+        with self._lock:
+            return {
+                'executions': self._ejecuciones,
+                'replays': self._replays
+            }
@@ -0,0 +1,417 @@
+"""
+Metricas en memoria con exposicion en el formato de texto de Prometheus
+Nos permite medir la aplicacion (requests, stored procedures, pool de conexiones) sin dependencias externas:
+- Contador, Gauge e Histograma con etiquetas; cada combinacion de etiquetas es una serie con su propio lock
+- MetricaCallback: valores que se leen recien al exponer (ej: estado del pool), sin costo por request
+- RegistroMetricas arma el texto de /metrics (text/plain; version=0.0.4)
+- AlmacenCompartido: con varios workers de gunicorn, /metrics suma las metricas de todos los procesos
+  a traves de un directorio compartido (si no se activa, cada proceso expone solo las suyas)
+"""
+import json
+import math
+import os
+import threading
+import uuid
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites (en segundos) de los histogramas de latencia
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Muestra = Tuple[str, Dict[str, str], float]
+
+
+def _escapar(valor: str) -> str:
+    """Escapar el valor de una etiqueta (barra invertida, comillas y saltos de linea)"""
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == math.inf:
+        return '+Inf'
+    if isinstance(valor, int) or valor.is_integer():
+        return str(int(valor))
+    return repr(valor)
+
+
+def _formatear_muestra(nombre: str, etiquetas: Dict[str, str], valor: float) -> str:
+    if not etiquetas:
+        return f"{nombre} {_formatear_numero(valor)}"
+    pares = ','.join(f'{clave}="{_escapar(str(dato))}"' for clave, dato in etiquetas.items())
+    return f"{nombre}{{{pares}}} {_formatear_numero(valor)}"
+
+
+class _Familia:
+    """Metrica con nombre, ayuda y etiquetas; las series se crean la primera vez que se usan"""
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _nueva_serie(self):
+        raise NotImplementedError
+
+    def reiniciar(self) -> None:
+        """Descartar todas las series (ej: las heredadas del master de gunicorn al forkear)"""
+        with self._lock:
+            self._series.clear()
+
+    def labels(self, *valores: str):
+        """Serie de la combinacion de etiquetas (se crea si no existe)"""
+        serie = self._series.get(valores)
+        if serie is None:
+            if len(valores) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+            with self._lock:
+                serie = self._series.setdefault(valores, self._nueva_serie())
+        return serie
+
+    def muestras(self) -> List[Muestra]:
+        """(nombre, etiquetas, valor) de todas las series"""
+        with self._lock:
+            series = list(self._series.items())
+        muestras: List[Muestra] = []
+        for valores, serie in series:
+            muestras.extend(serie.muestras(self.nombre, dict(zip(self.etiquetas, valores))))
+        return muestras
+
+
+class _SerieValor:
+    __slots__ = ('valor', '_lock')
+
+    def __init__(self):
+        self.valor = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1) -> None:
+        with self._lock:
+            self.valor += cantidad
+
+    def dec(self, cantidad: float = 1) -> None:
+        with self._lock:
+            self.valor -= cantidad
+
+    def set(self, valor: float) -> None:
+        self.valor = valor
+
+    def muestras(self, nombre: str, etiquetas: Dict[str, str]) -> List[Muestra]:
+        return [(nombre, etiquetas, self.valor)]
+
+
+class Contador(_Familia):
+    """Valor que solo crece (ej: cantidad de requests, de errores o de filas leidas)"""
+    tipo = 'counter'
+
+    def _nueva_serie(self):
+        return _SerieValor()
+
+    def inc(self, cantidad: float = 1) -> None:
+        """Incrementar la serie sin etiquetas"""
+        self.labels().inc(cantidad)
+
+
+class Gauge(_Familia):
+    """Valor que sube y baja (ej: requests en curso)"""
+    tipo = 'gauge'
+
+    def _nueva_serie(self):
+        return _SerieValor()
+
+    def inc(self, cantidad: float = 1) -> None:
+        self.labels().inc(cantidad)
+
+    def dec(self, cantidad: float = 1) -> None:
+        self.labels().dec(cantidad)
+
+    def set(self, valor: float) -> None:
+        self.labels().set(valor)
+
+
+class _SerieHistograma:
+    __slots__ = ('limites', 'cuentas', 'suma', '_lock')
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        # Cuenta por bucket (no acumulada); el ultimo es +Inf
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, valor: float) -> None:
+        indice = bisect_left(self.limites, valor)
+        with self._lock:
+            self.cuentas[indice] += 1
+            self.suma += valor
+
+    def muestras(self, nombre: str, etiquetas: Dict[str, str]) -> List[Muestra]:
+        with self._lock:
+            cuentas = list(self.cuentas)
+            suma = self.suma
+        muestras: List[Muestra] = []
+        acumulado = 0
+        for limite, cuenta in zip(self.limites + (math.inf,), cuentas):
+            acumulado += cuenta
+            muestras.append((f"{nombre}_bucket", dict(etiquetas, le=_formatear_numero(limite)), acumulado))
+        muestras.append((f"{nombre}_sum", etiquetas, suma))
+        muestras.append((f"{nombre}_count", etiquetas, acumulado))
+        return muestras
+
+
+class Histograma(_Familia):
+    """Distribucion de valores en buckets acumulados (ej: latencias); _count da tambien la cantidad"""
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def _nueva_serie(self):
+        return _SerieHistograma(self.buckets)
+
+    def observe(self, valor: float) -> None:
+        self.labels().observe(valor)
+
+
+class MetricaCallback:
+    """Metrica cuyo valor se calcula al exponer: funcion() -> [(etiquetas, valor), ...]"""
+
+    def __init__(self, nombre: str, ayuda: str, tipo: str,
+                 funcion: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self._funcion = funcion
+
+    def muestras(self) -> List[Muestra]:
+        return [(self.nombre, etiquetas, valor) for etiquetas, valor in self._funcion()]
+
+    def reiniciar(self) -> None:
+        """Los valores se leen al exponer: no hay nada que descartar"""
+
+
+def _texto(metricas: Iterable[Tuple[str, str, str, List[Muestra]]]) -> str:
+    """Texto de exposicion de Prometheus de (nombre, ayuda, tipo, muestras) de cada metrica"""
+    lineas = []
+    for nombre, ayuda, tipo, muestras in metricas:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        lineas.extend(_formatear_muestra(*muestra) for muestra in muestras)
+    return '\n'.join(lineas) + '\n'
+
+
+def _proceso_vivo(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AlmacenCompartido:
+    """
+    Metricas de todos los procesos (workers de gunicorn) que comparten un directorio
+
+    - Cada proceso guarda una foto de sus muestras en <directorio>/<pid>-<id>.json cada intervalo segundos,
+      antes de exponer y al terminar (las de los otros workers pueden tener hasta intervalo segundos de atraso)
+    - exponer() suma las fotos: contadores e histogramas de todos los procesos, incluidos los que terminaron
+      (reciclar un worker no hace retroceder los totales); gauges solo de los procesos vivos
+    - Al terminar, un proceso suma sus contadores e histogramas a terminados.json y borra su foto para que el
+      directorio no crezca con cada reciclado; un lock de archivo evita que un scrape vea esa mudanza a medias
+    """
+
+    ARCHIVO_TERMINADOS = 'terminados.json'
+    ARCHIVO_LOCK = '.lock'
+
+    def __init__(self, directorio: str, intervalo: float):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._pid = os.getpid()
+        # El id evita pisar la foto de un worker anterior que tuvo el mismo pid
+        self._archivo = os.path.join(directorio, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self, registro: 'RegistroMetricas') -> None:
+        """Empezar a guardar fotos periodicas del registro (en un hilo daemon)"""
+        def guardar_periodicamente():
+            while not self._detener.wait(self.intervalo):
+                try:
+                    self.guardar(registro)
+                except OSError:
+                    pass
+        self.guardar(registro)
+        self._hilo = threading.Thread(target=guardar_periodicamente, name='metricas-compartidas', daemon=True)
+        self._hilo.start()
+
+    def guardar(self, registro: 'RegistroMetricas') -> None:
+        """Escribir la foto actual de este proceso (reemplazo atomico del archivo)"""
+        foto = {'pid': self._pid, 'vivo': True, 'metricas': registro.muestras()}
+        with self._lock:
+            self._escribir(self._archivo, foto)
+
+    def exponer(self, registro: 'RegistroMetricas') -> str:
+        """Texto de las metricas sumadas de todos los procesos"""
+        self.guardar(registro)
+        with self._lock_archivo(compartido=True):
+            fotos = self._leer_fotos()
+        return _texto(self._sumar(fotos))
+
+    def terminar(self, registro: 'RegistroMetricas') -> None:
+        """Pasar los contadores e histogramas de este proceso a terminados.json y borrar su foto"""
+        self._detener.set()
+        foto = {'pid': self._pid, 'vivo': False, 'metricas': registro.muestras()}
+        terminados = os.path.join(self.directorio, self.ARCHIVO_TERMINADOS)
+        with self._lock, self._lock_archivo(compartido=False):
+            fotos = [foto]
+            try:
+                with open(terminados, encoding='utf-8') as archivo:
+                    fotos.append(json.load(archivo))
+            except FileNotFoundError:
+                pass
+            self._escribir(terminados, {'pid': None, 'vivo': False, 'metricas': self._sumar(fotos)})
+            try:
+                os.remove(self._archivo)
+            except FileNotFoundError:
+                pass
+
+    def _leer_fotos(self) -> List[Dict[str, Any]]:
+        """Fotos del directorio; la de este proceso primero para conservar el orden de sus metricas"""
+        nombres = sorted(nombre for nombre in os.listdir(self.directorio) if nombre.endswith('.json'))
+        rutas = [self._archivo] + [os.path.join(self.directorio, nombre) for nombre in nombres]
+        fotos = []
+        for ruta in dict.fromkeys(rutas):
+            try:
+                with open(ruta, encoding='utf-8') as archivo:
+                    fotos.append(json.load(archivo))
+            except (FileNotFoundError, ValueError):
+                # Un worker que termino entre listdir y open, o un archivo ajeno al almacen
+                continue
+        return fotos
+
+    @staticmethod
+    def _sumar(fotos: List[Dict[str, Any]]) -> List[Tuple[str, str, str, List[Muestra]]]:
+        """Sumar las muestras de igual nombre y etiquetas (los gauges solo de procesos vivos)"""
+        familias: Dict[str, Tuple[str, str, Dict[Tuple[str, Tuple], float]]] = {}
+        for foto in fotos:
+            vivo = foto['vivo'] and _proceso_vivo(foto['pid'])
+            for nombre, ayuda, tipo, muestras in foto['metricas']:
+                if tipo == 'gauge' and not vivo:
+                    continue
+                valores = familias.setdefault(nombre, (ayuda, tipo, {}))[2]
+                for nombre_muestra, etiquetas, valor in muestras:
+                    clave = (nombre_muestra, tuple(etiquetas.items()))
+                    valores[clave] = valores.get(clave, 0) + valor
+        return [
+            (nombre, ayuda, tipo,
+             [(muestra, dict(etiquetas), valor) for (muestra, etiquetas), valor in valores.items()])
+            for nombre, (ayuda, tipo, valores) in familias.items()
+        ]
+
+    @staticmethod
+    def _escribir(ruta: str, contenido: Dict[str, Any]) -> None:
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(contenido, archivo)
+        os.replace(temporal, ruta)
+
+    def _lock_archivo(self, compartido: bool):
+        """Lock entre procesos: compartido para leer las fotos, exclusivo para mudar un proceso a terminados"""
+        return _LockArchivo(os.path.join(self.directorio, self.ARCHIVO_LOCK), compartido)
+
+
+class _LockArchivo:
+    """flock sobre un archivo del directorio compartido (solo Unix, como gunicorn)"""
+
+    def __init__(self, ruta: str, compartido: bool):
+        self.ruta = ruta
+        self.compartido = compartido
+        self._archivo = None
+
+    def __enter__(self):
+        import fcntl
+        self._archivo = open(self.ruta, 'a')
+        fcntl.flock(self._archivo, fcntl.LOCK_SH if self.compartido else fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        # Cerrar el archivo libera el flock
+        self._archivo.close()
+
+
+class RegistroMetricas:
+    """Conjunto de metricas del proceso que se exponen juntas"""
+
+    def __init__(self):
+        self._metricas: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._almacen: Optional[AlmacenCompartido] = None
+
+    def registrar(self, metrica):
+        """Registrar una metrica (si ya hay una con el mismo nombre se devuelve la existente)"""
+        with self._lock:
+            return self._metricas.setdefault(metrica.nombre, metrica)
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self.registrar(Contador(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Gauge:
+        return self.registrar(Gauge(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+        return self.registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def callback(self, nombre: str, ayuda: str, tipo: str,
+                 funcion: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> MetricaCallback:
+        return self.registrar(MetricaCallback(nombre, ayuda, tipo, funcion))
+
+    def obtener(self, nombre: str) -> Optional[Any]:
+        return self._metricas.get(nombre)
+
+    def muestras(self) -> List[Tuple[str, str, str, List[Muestra]]]:
+        """(nombre, ayuda, tipo, muestras) de cada metrica del proceso"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return [(metrica.nombre, metrica.ayuda, metrica.tipo, metrica.muestras()) for metrica in metricas]
+
+    def exponer(self) -> str:
+        """Texto de todas las metricas (de todos los procesos si se llamo a compartir) en el formato de Prometheus"""
+        if self._almacen is not None:
+            return self._almacen.exponer(self)
+        return _texto(self.muestras())
+
+    def compartir(self, directorio: str, intervalo: float) -> None:
+        """
+        Sumar las metricas de todos los procesos que comparten directorio (se llama en cada worker al forkear)
+
+        Descarta los valores heredados del proceso padre (ej: requests del precalentamiento del master)
+        para que no se cuenten una vez por worker
+        """
+        with self._lock:
+            metricas = list(self._metricas.values())
+        for metrica in metricas:
+            metrica.reiniciar()
+        self._almacen = AlmacenCompartido(directorio, intervalo)
+        self._almacen.iniciar(self)
+
+    def terminar_proceso(self) -> None:
+        """Conservar los contadores del proceso en el directorio compartido antes de que termine"""
+        if self._almacen is not None:
+            self._almacen.terminar(self)
+            self._almacen = None
+
+
+# Registro compartido por toda la aplicacion
+registro = RegistroMetricas()
@@ -3,8 +3,23 @@ Utilidad para paginacion de resultados de la aplicacion
 Nos permite paginar los resultados de las consultas a la base de datos
 De manera uniforme y facil de usar en todos los controladores
 """
-from typing import List, Any, Dict
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Any, Awaitable, Callable, Dict, Optional
 from math import ceil
+from app.utils.exceptions import ValidationError
+
+# Cantidad de elementos por pagina por defecto y maxima
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+
+# Formas de calcular el total en las consultas paginadas en la base de datos
+TOTAL_EXACT = 'exact'
+TOTAL_ESTIMATE = 'estimate'
+TOTAL_NONE = 'none'
+TOTAL_MODES = (TOTAL_EXACT, TOTAL_ESTIMATE, TOTAL_NONE)
 
 
 def paginate(
@@ -60,3 +75,221 @@ def paginate(
         }
     }
 
+
+def validate_total_mode(total: str) -> None:
+    """
+    Validar el parametro total de una consulta paginada
+
+    Raises:
+        ValidationError: Si no es 'exact', 'estimate' ni 'none'
+    """
+    if total not in TOTAL_MODES:
+        raise ValidationError(f"El parametro total debe ser uno de: {', '.join(TOTAL_MODES)}")
+
+
+def normalize_per_page(per_page: int) -> int:
+    """Aplicar a per_page los mismos limites que paginate (default 10, maximo 100)"""
+    if per_page < 1:
+        return DEFAULT_PER_PAGE
+    return min(per_page, MAX_PER_PAGE)
+
+
+def encode_cursor(valores: Dict[str, Any]) -> str:
+    """
+    Codificar la posicion de la ultima fila de una pagina como un cursor opaco (base64url de un JSON)
+
+    Los datetime se guardan en formato ISO y se recuperan con decode_cursor
+    """
+    payload = {
+        clave: {'dt': valor.isoformat()} if isinstance(valor, datetime) else valor
+        for clave, valor in valores.items()
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _valor_cursor(valor: Any, tipo: type) -> Any:
+    """Convertir un valor del cursor al tipo esperado (ValueError si no corresponde)"""
+    if tipo is datetime:
+        if not isinstance(valor, dict) or not isinstance(valor.get('dt'), str):
+            raise ValueError(valor)
+        return datetime.fromisoformat(valor['dt'])
+    # bool es subclase de int: no lo aceptamos como ID
+    if type(valor) is not tipo:
+        raise ValueError(valor)
+    return valor
+
+
+def decode_cursor(cursor: str, claves: Dict[str, type]) -> Dict[str, Any]:
+    """
+    Decodificar un cursor generado por encode_cursor
+
+    Args:
+        cursor: Cursor recibido del cliente
+        claves: Claves que debe contener el cursor y el tipo de cada valor (ej: {'id_reserva': int})
+
+    Raises:
+        ValidationError: Si el cursor no es valido o algun valor no tiene el tipo esperado
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return {clave: _valor_cursor(payload[clave], tipo) for clave, tipo in claves.items()}
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValidationError("Cursor de paginacion invalido")
+
+
+def build_page(
+    data: List[Any],
+    per_page: int,
+    has_next: bool,
+    page: Optional[int] = None,
+    total: Optional[int] = None,
+    next_cursor: Optional[str] = None,
+    has_prev: bool = False
+) -> Dict[str, Any]:
+    """
+    Armar la respuesta paginada de una pagina ya resuelta en la base de datos
+
+    Mismo formato que paginate; total y total_pages son None si no se calculo el total
+    """
+    total_pages = None
+    if total is not None:
+        total_pages = ceil(total / per_page) if total > 0 else 1
+    return {
+        'data': data,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': total_pages,
+            'has_next': has_next,
+            'has_prev': has_prev,
+            'next_cursor': next_cursor
+        }
+    }
+
+
+def paginate_query(
+    fetch_page: Callable[[int, int, Optional[Dict[str, Any]]], List[Dict[str, Any]]],
+    cursor_from_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+    cursor_keys: Dict[str, type],
+    page: int = 1,
+    per_page: int = DEFAULT_PER_PAGE,
+    cursor: Optional[str] = None,
+    total: str = TOTAL_EXACT,
+    count: Optional[Callable[[], int]] = None,
+    estimate: Optional[Callable[[], int]] = None
+) -> Dict[str, Any]:
+    """
+    Paginar una consulta en la base de datos por numero de pagina (LIMIT/OFFSET) o por cursor (keyset)
+
+    Esta funcion es la que usaremos en los servicios cuando la lista completa es demasiado grande para paginate
+    Args:
+        fetch_page: Funcion (limit, offset, despues_de) que devuelve las filas; despues_de son los valores
+            del cursor (o None) y la consulta debe filtrar las filas posteriores a esa posicion
+        cursor_from_row: Funcion que arma los valores del cursor a partir de la ultima fila de una pagina
+        cursor_keys: Claves que debe tener un cursor valido y el tipo de cada valor
+        page: Numero de pagina (se ignora si se indica cursor)
+        per_page: Elementos por pagina
+        cursor: Cursor opaco devuelto en next_cursor de la pagina anterior
+        total: 'exact' (usa count), 'estimate' (usa estimate) o 'none'
+        count: Funcion que devuelve el total exacto
+        estimate: Funcion que devuelve el total estimado
+
+    Returns:
+        Diccionario con datos paginados y metadata (mismo formato que paginate, con next_cursor)
+
+    Raises:
+        ValidationError: Si el cursor o el modo de total son invalidos
+    """
+    validate_total_mode(total)
+    per_page = normalize_per_page(per_page)
+
+    if cursor:
+        page = None
+        rows = fetch_page(per_page + 1, 0, decode_cursor(cursor, cursor_keys))
+    else:
+        page = max(page, 1)
+        rows = fetch_page(per_page + 1, (page - 1) * per_page, None)
+
+    total_value = None
+    if total == TOTAL_EXACT and count is not None:
+        total_value = count()
+        # Igual que paginate: una pagina mayor a la ultima devuelve la ultima pagina
+        last_page = max(ceil(total_value / per_page), 1)
+        if page is not None and page > last_page:
+            page = last_page
+            rows = fetch_page(per_page + 1, (page - 1) * per_page, None)
+    elif total == TOTAL_ESTIMATE and estimate is not None:
+        total_value = estimate()
+
+    return _pagina_de_filas(rows, cursor_from_row, per_page, page, cursor, total_value)
+
+
+async def paginate_query_async(
+    fetch_page: Callable[[int, int, Optional[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+    cursor_from_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+    cursor_keys: Dict[str, type],
+    page: int = 1,
+    per_page: int = DEFAULT_PER_PAGE,
+    cursor: Optional[str] = None,
+    total: str = TOTAL_EXACT,
+    count: Optional[Callable[[], Awaitable[int]]] = None,
+    estimate: Optional[Callable[[], Awaitable[int]]] = None
+) -> Dict[str, Any]:
+    """
+    Variante asincronica de paginate_query (fetch_page, count y estimate son corrutinas)
+
+    Returns:
+        Diccionario con datos paginados y metadata (mismo formato que paginate_query)
+
+    Raises:
+        ValidationError: Si el cursor o el modo de total son invalidos
+    """
+    validate_total_mode(total)
+    per_page = normalize_per_page(per_page)
+
+    if cursor:
+        page = None
+        rows = await fetch_page(per_page + 1, 0, decode_cursor(cursor, cursor_keys))
+    else:
+        page = max(page, 1)
+        rows = await fetch_page(per_page + 1, (page - 1) * per_page, None)
+
+    total_value = None
+    if total == TOTAL_EXACT and count is not None:
+        total_value = await count()
+        last_page = max(ceil(total_value / per_page), 1)
+        if page is not None and page > last_page:
+            page = last_page
+            rows = await fetch_page(per_page + 1, (page - 1) * per_page, None)
+    elif total == TOTAL_ESTIMATE and estimate is not None:
+        total_value = await estimate()
+
+    return _pagina_de_filas(rows, cursor_from_row, per_page, page, cursor, total_value)
+
+
+def _pagina_de_filas(
+    rows: List[Dict[str, Any]],
+    cursor_from_row: Callable[[Dict[str, Any]], Dict[str, Any]],
+    per_page: int,
+    page: Optional[int],
+    cursor: Optional[str],
+    total_value: Optional[int]
+) -> Dict[str, Any]:
+    """Armar la pagina de paginate_query a partir de las filas leidas (per_page + 1 como maximo)"""
+    # Pedimos una fila de mas para saber si hay pagina siguiente sin contar
+    has_next = len(rows) > per_page
+    data = rows[:per_page]
+    next_cursor = encode_cursor(cursor_from_row(data[-1])) if has_next else None
+
+    return build_page(
+        data,
+        per_page,
+        has_next=has_next,
+        page=page,
+        total=total_value,
+        next_cursor=next_cursor,
+        has_prev=bool(cursor) or (page or 1) > 1
+    )
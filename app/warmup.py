@@ -0,0 +1,48 @@
+"""
+Precalentamiento de la aplicacion para el servidor de produccion
+Nos permite hacer el trabajo costoso de la primera request antes de aceptar trafico:
+- En el proceso master (antes del fork): compilar las rutas y generar el esquema Swagger una sola vez
+- En cada worker (despues del fork): abrir las conexiones minimas del pool
+"""
+import time
+from flask import Flask
+from app.database import get_pool, close_pool
+
+
+def warmup_master(app: Flask) -> float:
+    """
+    Precalentar la aplicacion en el proceso master (se comparte con los workers por copy-on-write)
+
+    Args:
+        app: Aplicacion Flask ya creada con create_app
+
+    Returns:
+        Segundos que demoro el precalentamiento
+    """
+    start = time.perf_counter()
+    # Compilamos el matcher de rutas de werkzeug (se construye de forma perezosa en la primera request)
+    app.url_map.update()
+    adapter = app.url_map.bind('localhost')
+    specs_urls = []
+    for rule in app.url_map.iter_rules():
+        path = adapter.build(rule.endpoint, {arg: 1 for arg in rule.arguments})
+        adapter.match(path, method=next(iter(rule.methods)))
+        if rule.endpoint.endswith('specs'):
+            specs_urls.append(path)
+    # Generamos el esquema Swagger (flask-restx lo cachea tras la primera request a swagger.json)
+    with app.test_client() as client:
+        for url in specs_urls:
+            client.get(url)
+    # El master no atiende requests: cerramos la conexion que abrio init_db para no heredarla a los workers
+    close_pool()
+    return time.perf_counter() - start
+
+
+def warmup_worker() -> int:
+    """
+    Precalentar un worker recien forkeado abriendo las conexiones minimas del pool
+
+    Returns:
+        Cantidad de conexiones abiertas
+    """
+    return get_pool().prime()
@@ -0,0 +1,12 @@
+"""
+Punto de entrada ASGI de la aplicacion (endpoints asincronicos)
+Ejecutar con: uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 2
+"""
+from dotenv import load_dotenv
+from app.asgi import create_asgi_app
+
+# Nos permite cargar las variables de entorno desde el archivo .env
+load_dotenv()
+
+# Asi creamos la aplicacion ASGI que comparte servicios y schemas con la app Flask
+app = create_asgi_app()
@@ -0,0 +1,4 @@
+"""
+Benchmarks de la aplicacion
+Scripts independientes que se ejecutan desde la raiz del proyecto con `python -m benchmarks.<modulo>`
+"""
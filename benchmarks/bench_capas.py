@@ -0,0 +1,326 @@
+"""
+Benchmark por capas del camino de una request (no usa la base de datos: conexiones simuladas de benchmarks/fakes.py)
+Mide cada capa por separado y guarda los resultados en un JSON para comparar corridas y detectar regresiones:
+- utilidades: paginate, map_sp_message_to_exception y la validacion de ReservaCreate
+- serializacion: marshal de flask-restx y la proyeccion precompilada (+ encoder) de reserva_list_model y
+  reporte_response_model con 10, 1.000 y 100.000 filas
+- acceso a datos: costo propio de los helpers call_* / execute_query / stream_query de app/database.py
+  (pool, metricas y trazas) comparado con las mismas operaciones directas sobre el cursor simulado
+- requests: una request completa con el test client de Flask por endpoint (controller -> service -> repository)
+
+Uso:
+    python -m benchmarks.bench_capas
+    python -m benchmarks.bench_capas --capas utilidades,requests --output antes.json
+    python -m benchmarks.bench_capas --output despues.json --comparar antes.json --umbral 1.10
+
+Los caches (precios, reporte, mapas de butacas) y las demas opciones se toman del .env / entorno como en la
+aplicacion, y se guardan en el JSON; para medir sin caches: PRECIO_CACHE_ENABLED=false REPORTE_CACHE_ENABLED=false
+Con --comparar, el proceso termina con codigo 1 si algun caso es mas lento que el anterior por encima del umbral.
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from flask_restx import marshal
+from pydantic import ValidationError as PydanticValidationError
+
+import app as aplicacion
+from app import database
+from app.config import Config
+from app.controllers.reporte_controller import reporte_response_model
+from app.controllers.reserva_controller import reserva_list_model
+from app.schemas.reserva import ReservaCreate
+from app.utils import fast_json
+from app.utils.exceptions import SP_ERROR_MAPPINGS, map_sp_message_to_exception
+from app.utils.pagination import paginate
+from benchmarks.fakes import EscenarioCine, FakeConnection, filas_reporte, filas_reservas
+
+config = Config()
+
+CAPAS = ('utilidades', 'serializacion', 'datos', 'requests')
+
+# Opciones de la configuracion que cambian el camino medido (se guardan en el JSON de resultados)
+OPCIONES_CONFIG = (
+    'JSON_FAST_PATH_ENABLED', 'COMPRESSION_ENABLED', 'ETAGS_ENABLED', 'METRICS_ENABLED', 'SQL_TRACE_ENABLED',
+    'PRECIO_CACHE_ENABLED', 'REPORTE_CACHE_ENABLED', 'RESERVA_ADMISION_ENABLED', 'RESERVA_GROUP_COMMIT_ENABLED',
+    'DATABASE_SP_SINGLE_ROUND_TRIP'
+)
+
+
+def _medir(funcion: Callable[[], Any], min_tiempo: float, rondas: int = 3) -> Dict[str, Any]:
+    """
+    Segundos por llamada: se calibra la cantidad de llamadas por ronda para que dure al menos min_tiempo
+    y se toma la mejor ronda (las llamadas de mas de 1 s se miden una sola vez)
+    """
+    repeticiones = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        duracion = time.perf_counter() - inicio
+        if duracion >= min_tiempo or duracion / repeticiones >= 1.0:
+            break
+        repeticiones *= max(2, min(10, int(min_tiempo / max(duracion, 1e-9))))
+    tiempos = [duracion / repeticiones]
+    if tiempos[0] < 1.0:
+        for _ in range(rondas - 1):
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                funcion()
+            tiempos.append((time.perf_counter() - inicio) / repeticiones)
+    return {
+        'segundos': min(tiempos),
+        'mediana': statistics.median(tiempos),
+        'repeticiones': repeticiones,
+        'rondas': len(tiempos)
+    }
+
+
+class Suite:
+    """Resultados de una corrida (un caso por capa y nombre)"""
+
+    def __init__(self, min_tiempo: float):
+        self.min_tiempo = min_tiempo
+        self.resultados: List[Dict[str, Any]] = []
+
+    def caso(self, capa: str, nombre: str, funcion: Callable[[], Any], **extra: Any) -> Dict[str, Any]:
+        resultado = {'capa': capa, 'caso': nombre, **_medir(funcion, self.min_tiempo), **extra}
+        self.resultados.append(resultado)
+        print(f"{capa:13s} {nombre:60s} {_formato(resultado['segundos']):>10s}")
+        return resultado
+
+
+def _formato(segundos: float) -> str:
+    if segundos >= 1:
+        return f"{segundos:.2f} s"
+    if segundos >= 1e-3:
+        return f"{segundos * 1e3:.2f} ms"
+    if segundos >= 1e-6:
+        return f"{segundos * 1e6:.2f} us"
+    return f"{segundos * 1e9:.0f} ns"
+
+
+def _pagina(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'data': data,
+        'pagination': {'page': 1, 'per_page': len(data), 'total': len(data), 'total_pages': 1,
+                       'has_next': False, 'has_prev': False, 'next_cursor': None}
+    }
+
+
+def bench_utilidades(suite: Suite, tamanos: List[int]) -> None:
+    for tamano in tamanos:
+        items = list(range(tamano))
+        suite.caso('utilidades', f"paginate {tamano} items (pagina del medio)",
+                   lambda: paginate(items, page=max(1, tamano // 20), per_page=10))
+
+    mensajes = ['OK'] + list(SP_ERROR_MAPPINGS) + ['Error desconocido del stored procedure']
+    for mensaje in mensajes:
+        suite.caso('utilidades', f"map_sp_message_to_exception '{mensaje[:30]}'",
+                   lambda: map_sp_message_to_exception(mensaje))
+
+    valida = {'id_funcion': 1, 'id_butaca': 5, 'dni': '12345678'}
+    invalida = {'id_funcion': 0, 'id_butaca': 5, 'dni': '123'}
+
+    def validar_invalida():
+        try:
+            ReservaCreate(**invalida)
+        except PydanticValidationError:
+            pass
+
+    suite.caso('utilidades', "ReservaCreate valida", lambda: ReservaCreate(**valida))
+    suite.caso('utilidades', "ReservaCreate invalida (2 errores)", validar_invalida)
+
+
+def bench_serializacion(suite: Suite, tamanos: List[int]) -> None:
+    casos = [
+        ('reserva_list_model', reserva_list_model, lambda filas: _pagina(filas_reservas(filas))),
+        ('reporte_response_model', reporte_response_model,
+         lambda filas: _pagina(filas_reporte(filas, date(2030, 1, 1), date(2030, 12, 31))))
+    ]
+    for nombre, modelo, generar in casos:
+        proyeccion = fast_json.compilar_modelo(modelo)
+        for tamano in tamanos:
+            data = generar(tamano)
+            suite.caso('serializacion', f"marshal {nombre} {tamano} filas", lambda: marshal(data, modelo),
+                       filas=tamano)
+            suite.caso('serializacion', f"proyeccion {nombre} {tamano} filas", lambda: proyeccion(data),
+                       filas=tamano)
+            suite.caso('serializacion', f"proyeccion + encoder {nombre} {tamano} filas",
+                       lambda: fast_json.dumps(proyeccion(data)), filas=tamano)
+
+
+def bench_datos(suite: Suite, filas: int) -> None:
+    """Helpers de app/database.py contra las mismas operaciones directas sobre una conexion simulada"""
+    escenario = EscenarioCine(filas=filas)
+    database.set_connection_creator(FakeConnection.creator(escenario))
+    conexion = FakeConnection(escenario)
+    query = "SELECT COUNT(*) AS Total FROM Reservas WHERE DNI = %s"
+
+    def directo_sp():
+        with conexion.cursor() as cursor:
+            cursor.callproc('SP_ReservasPorDNI', ('12345678',))
+            cursor.fetchall()
+            while cursor.nextset():
+                cursor.fetchall()
+        conexion.commit()
+
+    def directo_query():
+        with conexion.cursor() as cursor:
+            cursor.execute(query, ('12345678',))
+            cursor.fetchall()
+        conexion.commit()
+
+    def directo_out():
+        with conexion.cursor() as cursor:
+            cursor.execute("CALL SP_DeterminarPrecioEntrada(%s, @_SP_DeterminarPrecioEntrada_1, "
+                           "@_SP_DeterminarPrecioEntrada_2); SELECT @_SP_DeterminarPrecioEntrada_1, "
+                           "@_SP_DeterminarPrecioEntrada_2", (1,))
+            while True:
+                if cursor.description:
+                    cursor.fetchall()
+                if not cursor.nextset():
+                    break
+        conexion.commit()
+
+    def stream():
+        for _ in database.stream_query(
+            "SELECT f.IdPelicula, f.IdFuncion FROM Funciones f WHERE f.FechaInicio >= %s AND f.FechaInicio < %s",
+            (datetime(2030, 1, 1), datetime(2030, 2, 1)), batch_size=500
+        ):
+            pass
+
+    pares = [
+        ('call_stored_procedure (SP_ReservasPorDNI)', directo_sp,
+         lambda: database.call_stored_procedure('SP_ReservasPorDNI', ('12345678',))),
+        ('execute_query (COUNT)', directo_query, lambda: database.execute_query(query, ('12345678',))),
+        ('call_sp_with_out_params_single_trip (precio)', directo_out,
+         lambda: database.call_sp_with_out_params_single_trip('SP_DeterminarPrecioEntrada', (1,), 2)),
+    ]
+    try:
+        for nombre, directo, helper in pares:
+            base = suite.caso('datos', f"cursor directo: {nombre}", directo)
+            medido = suite.caso('datos', nombre, helper)
+            medido['overhead_segundos'] = medido['segundos'] - base['segundos']
+        suite.caso('datos', 'call_sp_with_out_params (precio, 3 viajes)',
+                   lambda: database.call_sp_with_out_params('SP_DeterminarPrecioEntrada', (1,), 2))
+        suite.caso('datos', 'call_function', lambda: database.call_function('FN_Prueba', (1,)))
+        suite.caso('datos', f"stream_query {filas} filas", stream, filas=filas)
+    finally:
+        database.set_connection_creator(None)
+
+
+def bench_requests(suite: Suite, filas: int) -> None:
+    """Una request completa por endpoint con el test client (sin red ni servidor WSGI)"""
+    escenario = EscenarioCine(filas=filas)
+    database.set_connection_creator(FakeConnection.creator(escenario))
+    # La aplicacion verifica la base al iniciar; con conexiones simuladas no hace falta
+    init_db, aplicacion.init_db = aplicacion.init_db, lambda: None
+    try:
+        cliente = aplicacion.create_app().test_client()
+        # Butacas distintas en cada POST (la admision rechaza en memoria las ya reservadas)
+        butacas = itertools.count(1)
+        periodo = 'fechaInicio=2030-01-01&fechaFin=2030-01-31'
+        endpoints = [
+            ('GET /precios/{id}', 200, lambda: cliente.get('/api/v1/precios/1')),
+            ('GET /precios?ids=1..10', 200, lambda: cliente.get('/api/v1/precios?ids=1,2,3,4,5,6,7,8,9,10')),
+            ('GET /reservas/{dni}', 200, lambda: cliente.get('/api/v1/reservas/12345678?per_page=100')),
+            ('POST /reservas', 201, lambda: cliente.post('/api/v1/reservas', json={
+                'id_funcion': 1, 'id_butaca': next(butacas), 'dni': '12345678'})),
+            ('POST /reservas/lote (4 butacas)', 201, lambda: cliente.post('/api/v1/reservas/lote', json={
+                'id_funcion': 1, 'ids_butaca': [next(butacas) for _ in range(4)], 'dni': '12345678'})),
+            ('GET /reporte/ocupacion (1 pelicula)', 200,
+             lambda: cliente.get(f"/api/v1/reporte/ocupacion?idPelicula=1&{periodo}&per_page=100")),
+            ('GET /reporte/ocupacion (5 peliculas)', 200,
+             lambda: cliente.get(f"/api/v1/reporte/ocupacion?idPelicula=1,2,3,4,5&{periodo}&per_page=100")),
+            ('GET /reporte/ocupacion/export (csv)', 200,
+             lambda: cliente.get(f"/api/v1/reporte/ocupacion/export?idPelicula=1&{periodo}").get_data()),
+            ('GET /funciones/{id}/butacas', 200, lambda: cliente.get('/api/v1/funciones/1/butacas')),
+        ]
+        for nombre, esperado, request in endpoints:
+            respuesta = request()
+            estado = getattr(respuesta, 'status_code', esperado)
+            if estado != esperado:
+                raise SystemExit(f"{nombre}: se esperaba {esperado} y se obtuvo {estado}: {respuesta.get_data()[:300]}")
+            suite.caso('requests', nombre, request, filas=filas)
+    finally:
+        aplicacion.init_db = init_db
+        database.set_connection_creator(None)
+
+
+def comparar(actuales: List[Dict[str, Any]], archivo: str, umbral: float) -> int:
+    """Imprimir la relacion con una corrida anterior y devolver la cantidad de regresiones"""
+    with open(archivo, encoding='utf-8') as entrada:
+        anteriores = {(r['capa'], r['caso']): r for r in json.load(entrada)['resultados']}
+    regresiones = 0
+    print(f"\nComparacion con {archivo} (regresion: mas de {umbral:.2f}x)")
+    for resultado in actuales:
+        anterior = anteriores.get((resultado['capa'], resultado['caso']))
+        if anterior is None:
+            continue
+        relacion = resultado['segundos'] / anterior['segundos'] if anterior['segundos'] else float('inf')
+        marca = ''
+        if relacion > umbral:
+            regresiones += 1
+            marca = '  REGRESION'
+        print(f"{resultado['capa']:13s} {resultado['caso']:60s} {_formato(anterior['segundos']):>10s} -> "
+              f"{_formato(resultado['segundos']):>10s}  {relacion:5.2f}x{marca}")
+    return regresiones
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capas', default=','.join(CAPAS), help=f"Capas a medir ({', '.join(CAPAS)})")
+    parser.add_argument('--tamanos', default='10,1000,100000', help='Filas / items de paginate y serializacion')
+    parser.add_argument('--filas', type=int, default=100, help='Filas de cada respuesta simulada (datos y requests)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Segundos minimos por ronda de cada caso')
+    parser.add_argument('--output', default='bench_capas.json', help='Archivo JSON de resultados')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para detectar regresiones')
+    parser.add_argument('--umbral', type=float, default=1.10, help='Relacion actual/anterior considerada regresion')
+    args = parser.parse_args(argv)
+
+    capas = [capa.strip() for capa in args.capas.split(',') if capa.strip()]
+    desconocidas = set(capas) - set(CAPAS)
+    if desconocidas:
+        parser.error(f"capas desconocidas: {', '.join(sorted(desconocidas))}")
+    tamanos = [int(tamano) for tamano in args.tamanos.split(',')]
+
+    suite = Suite(args.min_time)
+    if 'utilidades' in capas:
+        bench_utilidades(suite, tamanos)
+    if 'serializacion' in capas:
+        bench_serializacion(suite, tamanos)
+    if 'datos' in capas:
+        bench_datos(suite, args.filas)
+    if 'requests' in capas:
+        bench_requests(suite, args.filas)
+
+    corrida = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'encoder': 'orjson' if fast_json.orjson is not None else 'json',
+        'config': {opcion: getattr(config, opcion) for opcion in OPCIONES_CONFIG},
+        'parametros': {'tamanos': tamanos, 'filas': args.filas, 'min_time': args.min_time},
+        'resultados': suite.resultados
+    }
+    with open(args.output, 'w', encoding='utf-8') as salida:
+        json.dump(corrida, salida, indent=2)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.comparar:
+        regresiones = comparar(suite.resultados, args.comparar, args.umbral)
+        if regresiones:
+            print(f"{regresiones} caso(s) con regresion")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Benchmark de contencion de butacas y verificacion de invariantes de las reservas
+Lanza N hilos que hacen POST /api/v1/reservas a la vez (arrancan juntos con una barrera) en tres escenarios:
+- butaca-caliente: todas las requests piden las mismas --butacas butacas libres de una funcion, con DNIs distintos
+  (deberia haber como mucho una reserva OK por butaca)
+- dni-caliente: un mismo DNI nuevo pide butacas libres distintas de una funcion (deberia haber como mucho
+  LIMITE_RESERVAS_DNI_POR_FECHA reservas OK)
+- uniforme: butacas libres al azar de --funciones con DNIs de un pool de --dnis (carga mixta)
+
+Reporta requests/s, latencias p50/p99, el resultado de cada request (OK, butaca ocupada, limite de DNI, deadlock,
+lock wait timeout, pool agotado), las esperas de bloqueo de la base y las invariantes rotas durante el escenario:
+butacas con mas de una reserva activa y DNIs sobre el limite por fecha.
+
+Uso:
+    python -m benchmarks.bench_contencion --concurrency 100 --requests 200
+    DATABASE_BACKEND=memory DATABASE_MEMORY_LATENCY_MS=2 python -m benchmarks.bench_contencion --sin-admision
+    python -m benchmarks.bench_contencion --url http://127.0.0.1:5000 --escenarios butaca-caliente
+
+Por defecto la aplicacion corre en el proceso (test client de Flask) contra la base configurada en .env; con --url se
+usa un servidor en ejecucion y las invariantes se consultan igual en la base de .env (con el motor en memoria los datos
+son de cada proceso y la verificacion se omite).
+
+ATENCION: con MySQL inserta reservas reales. Los DNIs usan el prefijo --dni-prefix (distinto en cada corrida) y al
+terminar se borran las reservas con ese prefijo, salvo con --conservar.
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app import database, memory_db
+from app.repositories.reserva_repository import (
+    LIMITE_RESERVAS_DNI_POR_FECHA, MSG_BUTACA_RESERVADA, MSG_LIMITE_DNI, ReservaRepository
+)
+from app.services import reserva_service
+
+ESCENARIOS = ('butaca-caliente', 'dni-caliente', 'uniforme')
+
+# Longitud maxima del DNI aceptada por ReservaCreate
+DNI_MAX = 11
+
+# (id_funcion, id_butaca, dni) de cada request
+Pedido = Tuple[int, int, str]
+# Enviar una request: (metodo, path, cuerpo) -> (status, texto de la respuesta)
+Enviar = Callable[[str, str, Optional[Dict[str, Any]]], Tuple[int, str]]
+
+
+def _clasificar(status: int, texto: str) -> str:
+    """Resultado de un POST /reservas segun el status y el mensaje de la respuesta"""
+    if status == 201:
+        return 'ok'
+    if status == 409 and MSG_BUTACA_RESERVADA in texto:
+        return 'butaca_ocupada'
+    if status == 409 and MSG_LIMITE_DNI in texto:
+        return 'limite_dni'
+    if status == 503:
+        return 'no_disponible'
+    if status < 500:
+        return 'rechazadas'
+    # Los errores del driver llegan como 500 con el codigo de MySQL en el mensaje
+    if '1213' in texto or 'Deadlock' in texto:
+        return 'deadlocks'
+    if '1205' in texto or 'Lock wait timeout' in texto:
+        return 'lock_timeouts'
+    return 'errores'
+
+
+RESULTADOS = ('ok', 'butaca_ocupada', 'limite_dni', 'rechazadas', 'deadlocks', 'lock_timeouts', 'no_disponible',
+              'errores')
+
+
+def _cliente_local(aplicacion) -> Enviar:
+    """Cliente sobre el test client de Flask (uno por hilo)"""
+    cliente = aplicacion.test_client()
+
+    def enviar(metodo: str, path: str, cuerpo: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        respuesta = cliente.open(path, method=metodo, json=cuerpo)
+        return respuesta.status_code, respuesta.get_data(as_text=True)
+    return enviar
+
+
+def _cliente_http(url: str) -> Enviar:
+    """Cliente HTTP con una conexion keep-alive (uno por hilo)"""
+    partes = urlsplit(url)
+    base = partes.path.rstrip('/')
+    estado = {'conexion': http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=60)}
+
+    def enviar(metodo: str, path: str, cuerpo: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        datos = json.dumps(cuerpo) if cuerpo is not None else None
+        headers = {'Content-Type': 'application/json'} if datos is not None else {}
+        try:
+            estado['conexion'].request(metodo, base + path, body=datos, headers=headers)
+            respuesta = estado['conexion'].getresponse()
+            texto = respuesta.read().decode('utf-8', errors='replace')
+        except (OSError, http.client.HTTPException) as e:
+            estado['conexion'].close()
+            estado['conexion'] = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=60)
+            return 599, f"{type(e).__name__}: {e}"
+        if respuesta.getheader('Connection', '').lower() == 'close':
+            estado['conexion'].close()
+        return respuesta.status, texto
+    return enviar
+
+
+def _butacas_libres(enviar: Enviar, id_funcion: int) -> List[int]:
+    """IDs de las butacas libres de la funcion segun GET /funciones/<id>/butacas"""
+    status, texto = enviar('GET', f"/api/v1/funciones/{id_funcion}/butacas", None)
+    if status != 200:
+        raise SystemExit(f"No se pudo obtener el mapa de la funcion {id_funcion}: {status} {texto[:200]}")
+    mapa = json.loads(texto)
+    if not mapa.get('reservable'):
+        raise SystemExit(f"La funcion {id_funcion} no admite reservas (inactiva o finalizada)")
+    return [butaca['IdButaca'] for butaca in mapa['butacas'] if not butaca['Ocupada']]
+
+
+class Dnis:
+    """DNIs unicos de la corrida: prefijo + secuencia con ceros hasta DNI_MAX caracteres"""
+
+    def __init__(self, prefijo: str):
+        self.prefijo = prefijo
+        self.digitos = DNI_MAX - len(prefijo)
+        self._siguiente = 0
+
+    def nuevo(self) -> str:
+        if self._siguiente >= 10 ** self.digitos:
+            raise SystemExit(f"Se agotaron los DNIs con el prefijo {self.prefijo} (usar un prefijo mas corto)")
+        self._siguiente += 1
+        return f"{self.prefijo}{self._siguiente:0{self.digitos}d}"
+
+
+def _pedidos(
+    escenario: str, args, enviar: Enviar, dnis: Dnis, azar: random.Random
+) -> Tuple[List[Pedido], Optional[int]]:
+    """Requests del escenario y maximo de reservas OK esperables (None = sin cota)"""
+    if escenario == 'butaca-caliente':
+        butacas = _butacas_libres(enviar, args.id_funcion)[:args.butacas]
+        if not butacas:
+            raise SystemExit(f"La funcion {args.id_funcion} no tiene butacas libres")
+        return [(args.id_funcion, butacas[i % len(butacas)], dnis.nuevo()) for i in range(args.requests)], len(butacas)
+
+    if escenario == 'dni-caliente':
+        # Una butaca distinta por request: los rechazos solo pueden venir del limite de DNI
+        butacas = _butacas_libres(enviar, args.id_funcion)[:args.requests]
+        if len(butacas) <= LIMITE_RESERVAS_DNI_POR_FECHA:
+            raise SystemExit(f"La funcion {args.id_funcion} no tiene suficientes butacas libres para dni-caliente")
+        dni = dnis.nuevo()
+        return [(args.id_funcion, id_butaca, dni) for id_butaca in butacas], LIMITE_RESERVAS_DNI_POR_FECHA
+
+    libres = [(id_funcion, id_butaca) for id_funcion in args.funciones
+              for id_butaca in _butacas_libres(enviar, id_funcion)]
+    if not libres:
+        raise SystemExit("Las funciones de --funciones no tienen butacas libres")
+    pool = [dnis.nuevo() for _ in range(args.dnis)]
+    return [(*azar.choice(libres), azar.choice(pool)) for _ in range(args.requests)], None
+
+
+def _ejecutar(pedidos: List[Pedido], clientes: List[Enviar]) -> Dict[str, Any]:
+    """Enviar los pedidos repartidos en un hilo por cliente, arrancando todos a la vez"""
+    resultados = dict.fromkeys(RESULTADOS, 0)
+    latencias: List[float] = []
+    lock = threading.Lock()
+    siguiente = iter(pedidos)
+    barrera = threading.Barrier(len(clientes) + 1)
+
+    def worker(enviar: Enviar):
+        local = []
+        barrera.wait()
+        while True:
+            with lock:
+                pedido = next(siguiente, None)
+            if pedido is None:
+                break
+            id_funcion, id_butaca, dni = pedido
+            inicio = time.perf_counter()
+            status, texto = enviar('POST', '/api/v1/reservas',
+                                   {'id_funcion': id_funcion, 'id_butaca': id_butaca, 'dni': dni})
+            local.append((time.perf_counter() - inicio) * 1000)
+            clave = _clasificar(status, texto)
+            with lock:
+                resultados[clave] += 1
+        with lock:
+            latencias.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(enviar,)) for enviar in clientes]
+    for thread in threads:
+        thread.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'requests': len(pedidos),
+        'segundos': round(elapsed, 3),
+        'requests_s': round(len(pedidos) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencias), 3),
+        'p99_ms': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))], 3),
+        **resultados
+    }
+
+
+def _bloqueos() -> Optional[Dict[str, int]]:
+    """Contadores acumulados de bloqueos de la base (None si no se pueden leer)"""
+    if database.config.DATABASE_BACKEND == 'memory':
+        estadisticas = memory_db.get_motor().estadisticas()
+        return {clave: estadisticas[clave] for clave in ('esperas_bloqueo', 'timeouts_bloqueo')}
+    try:
+        filas = database.execute_query("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%'") or []
+        estado = {fila['Variable_name']: int(fila['Value']) for fila in filas}
+        contadores = {
+            'esperas_bloqueo': estado['Innodb_row_lock_waits'],
+            'espera_bloqueo_ms': estado['Innodb_row_lock_time']
+        }
+        # lock_deadlocks y lock_timeouts estan habilitados por defecto en INNODB_METRICS (MySQL 8)
+        filas = database.execute_query(
+            "SELECT NAME, COUNT FROM information_schema.INNODB_METRICS "
+            "WHERE NAME IN ('lock_deadlocks', 'lock_timeouts')"
+        ) or []
+        contadores.update({f"innodb_{fila['NAME']}": int(fila['COUNT']) for fila in filas})
+        return contadores
+    except Exception as e:
+        print(f"  (no se pudieron leer los contadores de bloqueo: {e})")
+        return None
+
+
+def _invariantes() -> Dict[Tuple, int]:
+    """Violaciones actuales: ('butaca', funcion, butaca) y ('dni', dni, fecha) -> reservas activas"""
+    violaciones: Dict[Tuple, int] = {}
+    for fila in ReservaRepository.get_butacas_duplicadas():
+        violaciones[('butaca', fila['IdFuncion'], fila['IdButaca'])] = fila['Reservas']
+    for fila in ReservaRepository.get_dnis_sobre_limite():
+        violaciones[('dni', fila['DNI'], str(fila['Fecha']))] = fila['Reservas']
+    return violaciones
+
+
+def _nuevas_violaciones(antes: Dict[Tuple, int], despues: Dict[Tuple, int]) -> Dict[str, List[Dict[str, Any]]]:
+    """Violaciones que aparecieron (o empeoraron) durante el escenario"""
+    nuevas: Dict[str, List[Dict[str, Any]]] = {'butacas_duplicadas': [], 'dnis_sobre_limite': []}
+    for clave, reservas in sorted(despues.items(), key=str):
+        if reservas <= antes.get(clave, 0):
+            continue
+        if clave[0] == 'butaca':
+            nuevas['butacas_duplicadas'].append({'id_funcion': clave[1], 'id_butaca': clave[2], 'reservas': reservas})
+        else:
+            nuevas['dnis_sobre_limite'].append({'dni': clave[1], 'fecha': clave[2], 'reservas': reservas})
+    return nuevas
+
+
+def _limpiar(dni_prefix: str) -> None:
+    """Borrar las reservas creadas por el benchmark"""
+    database.execute_query("DELETE FROM Reservas WHERE DNI LIKE %s", (f"{dni_prefix}%",), fetch=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escenarios', default=','.join(ESCENARIOS), help=f"Escenarios ({', '.join(ESCENARIOS)})")
+    parser.add_argument('--requests', type=int, default=200, help='Requests por escenario')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--id-funcion', type=int, default=1, help='Funcion de butaca-caliente y dni-caliente')
+    parser.add_argument('--butacas', type=int, default=1, help='Butacas disputadas en butaca-caliente')
+    parser.add_argument('--funciones', default='1,2,3,4', help='Funciones del escenario uniforme')
+    parser.add_argument('--dnis', type=int, default=50, help='DNIs distintos del escenario uniforme')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='URL base de un servidor en ejecucion (ej: http://127.0.0.1:5000)')
+    parser.add_argument('--sin-admision', action='store_true',
+                        help='Desactivar la admision en memoria (RESERVA_ADMISION_ENABLED) para que todo llegue al SP')
+    parser.add_argument('--group-commit', action='store_true', help='Activar RESERVA_GROUP_COMMIT_ENABLED')
+    parser.add_argument('--dni-prefix', default=f"C{int(time.time()) % 100000:05d}",
+                        help='Prefijo de los DNIs (por defecto distinto en cada corrida)')
+    parser.add_argument('--conservar', action='store_true', help='No borrar las reservas creadas al terminar')
+    parser.add_argument('--output', help='Archivo JSON de resultados')
+    parser.add_argument('--estricto', action='store_true', help='Terminar con codigo 1 si se rompe alguna invariante')
+    args = parser.parse_args(argv)
+
+    escenarios = [escenario.strip() for escenario in args.escenarios.split(',') if escenario.strip()]
+    desconocidos = set(escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+    args.funciones = [int(id_funcion) for id_funcion in args.funciones.split(',')]
+    if len(args.dni_prefix) >= DNI_MAX - 2:
+        parser.error(f"--dni-prefix debe tener como mucho {DNI_MAX - 3} caracteres")
+
+    backend = database.config.DATABASE_BACKEND
+    # Con --url y el motor en memoria las reservas quedan en el proceso del servidor: no hay nada que verificar aca
+    verificar = not (args.url and backend == 'memory')
+    # Estas opciones se leen en cada request: cambiarlas aca solo afecta a la aplicacion en este proceso
+    reserva_service.config.RESERVA_ADMISION_ENABLED = not args.sin_admision
+    reserva_service.config.RESERVA_GROUP_COMMIT_ENABLED = args.group_commit
+
+    if args.url:
+        clientes = [_cliente_http(args.url) for _ in range(args.concurrency)]
+    else:
+        from app import create_app
+        aplicacion = create_app()
+        clientes = [_cliente_local(aplicacion) for _ in range(args.concurrency)]
+
+    print(f"backend {backend}{' (servidor ' + args.url + ')' if args.url else ''}, concurrencia {args.concurrency}, "
+          f"admision {'no' if args.sin_admision else 'si'}, group commit {'si' if args.group_commit else 'no'}, "
+          f"prefijo DNI {args.dni_prefix}")
+    if not verificar:
+        print("  (invariantes sin verificar: el motor en memoria del servidor no es accesible desde este proceso)")
+
+    dnis = Dnis(args.dni_prefix)
+    azar = random.Random(args.seed)
+    resultados: Dict[str, Any] = {}
+    violaciones_totales = 0
+    try:
+        for escenario in escenarios:
+            pedidos, maximo_ok = _pedidos(escenario, args, clientes[0], dnis, azar)
+            antes = _invariantes() if verificar else {}
+            bloqueos_antes = _bloqueos()
+            r = _ejecutar(pedidos, clientes)
+            bloqueos_despues = _bloqueos()
+            if bloqueos_antes is not None and bloqueos_despues is not None:
+                r['bloqueos'] = {clave: bloqueos_despues[clave] - bloqueos_antes.get(clave, 0)
+                                 for clave in bloqueos_despues}
+            r['maximo_ok'] = maximo_ok
+            if verificar:
+                r['violaciones'] = _nuevas_violaciones(antes, _invariantes())
+                violaciones_totales += sum(len(lista) for lista in r['violaciones'].values())
+            resultados[escenario] = r
+
+            print(f"{escenario:16s} requests/s={r['requests_s']:8.1f}  p50={r['p50_ms']:.2f}ms  "
+                  f"p99={r['p99_ms']:.2f}ms  ok={r['ok']}"
+                  f"{'' if maximo_ok is None else f' (maximo {maximo_ok})'}  butaca_ocupada={r['butaca_ocupada']}  "
+                  f"limite_dni={r['limite_dni']}  deadlocks={r['deadlocks']}  lock_timeouts={r['lock_timeouts']}  "
+                  f"no_disponible={r['no_disponible']}  rechazadas={r['rechazadas']}  errores={r['errores']}")
+            if 'bloqueos' in r:
+                print(f"{'':16s} bloqueos: " + '  '.join(f"{clave}={valor}" for clave, valor in r['bloqueos'].items()))
+            if verificar:
+                duplicadas = r['violaciones']['butacas_duplicadas']
+                sobre_limite = r['violaciones']['dnis_sobre_limite']
+                marca = '  <-- VIOLADAS' if duplicadas or sobre_limite else ''
+                print(f"{'':16s} invariantes: butacas duplicadas={len(duplicadas)}  "
+                      f"DNIs sobre el limite={len(sobre_limite)}{marca}")
+    finally:
+        if args.group_commit:
+            reserva_service.reservas_group_commit.cerrar()
+        if backend != 'memory' and not args.conservar:
+            _limpiar(args.dni_prefix)
+
+    if args.output:
+        corrida = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'backend': backend,
+            'url': args.url,
+            'config': {
+                'concurrency': args.concurrency,
+                'requests': args.requests,
+                'admision': not args.sin_admision,
+                'group_commit': args.group_commit,
+                'dni_prefix': args.dni_prefix
+            },
+            'resultados': resultados
+        }
+        with open(args.output, 'w', encoding='utf-8') as salida:
+            json.dump(corrida, salida, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.estricto and violaciones_totales:
+        print(f"{violaciones_totales} invariante(s) violada(s)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
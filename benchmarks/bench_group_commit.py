@@ -0,0 +1,133 @@
+"""
+Benchmark de commits por segundo: reservas individuales (SP por request) vs group commit
+Lanza N hilos que reservan butacas distintas de una funcion contra el MySQL configurado en .env
+y reporta reservas/s, commits/s, reservas por commit y latencias de cada modo
+
+Uso:
+    python -m benchmarks.bench_group_commit --id-funcion 1 --concurrency 64
+
+ATENCION: inserta reservas reales. Se usan DNIs con el prefijo --dni-prefix (uno por request, para no
+chocar con el limite de 4 por fecha) y al terminar cada modo se borran las reservas con ese prefijo.
+"""
+import argparse
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+from pymysql.connections import Connection
+
+from app import database
+from app.services import reserva_service
+from app.services.reserva_service import ReservaService
+from app.utils.exceptions import AppException
+
+# Contador global de commits enviados al servidor
+_commits = 0
+_commits_lock = threading.Lock()
+_original_commit = Connection.commit
+
+
+def _counting_commit(self):
+    global _commits
+    with _commits_lock:
+        _commits += 1
+    return _original_commit(self)
+
+
+def _butacas_de_funcion(id_funcion: int) -> List[int]:
+    """IDs de las butacas de la sala de la funcion"""
+    filas = database.execute_query(
+        "SELECT b.IdButaca FROM Butacas b JOIN Funciones f ON f.IdSala = b.IdSala WHERE f.IdFuncion = %s",
+        (id_funcion,),
+        fetch=True
+    )
+    return [fila['IdButaca'] for fila in filas or []]
+
+
+def _limpiar(dni_prefix: str) -> None:
+    """Borrar las reservas creadas por el benchmark"""
+    database.execute_query("DELETE FROM Reservas WHERE DNI LIKE %s", (f"{dni_prefix}%",), fetch=False)
+
+
+def _run(id_funcion: int, butacas: List[int], requests: int, concurrency: int, dni_prefix: str) -> Dict[str, float]:
+    """Ejecutar requests reservas repartidas en concurrency hilos"""
+    global _commits
+    service = ReservaService()
+    latencies: List[float] = []
+    resultados = {'ok': 0, 'rechazadas': 0, 'errores': 0}
+    lock = threading.Lock()
+    siguiente = iter(range(requests))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                i = next(siguiente, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            clave = 'ok'
+            try:
+                service.crear_reserva(id_funcion, butacas[i % len(butacas)], f"{dni_prefix}{i:06d}")
+            except AppException as e:
+                clave = 'rechazadas' if e.status_code < 500 else 'errores'
+            local.append((time.perf_counter() - start) * 1000)
+            with lock:
+                resultados[clave] += 1
+        with lock:
+            latencies.extend(local)
+
+    _commits = 0
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    commits = _commits
+
+    latencies.sort()
+    return {
+        **resultados,
+        'reservas_s': resultados['ok'] / elapsed,
+        'commits_s': commits / elapsed,
+        'reservas_por_commit': resultados['ok'] / commits if commits else 0.0,
+        'p50_ms': statistics.median(latencies),
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--id-funcion', type=int, default=1, help='Funcion activa donde reservar')
+    parser.add_argument('--requests', type=int, default=0,
+                        help='Reservas por modo (0 = una por butaca; si hay mas requests que butacas se repiten)')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--dni-prefix', default='BENCH', help='Prefijo de los DNIs del benchmark (se borran al final)')
+    args = parser.parse_args()
+
+    butacas = _butacas_de_funcion(args.id_funcion)
+    if not butacas:
+        raise SystemExit(f"La funcion {args.id_funcion} no existe o su sala no tiene butacas")
+    requests = args.requests or len(butacas)
+    Connection.commit = _counting_commit
+    # Desactivamos el rechazo en memoria para medir solo el costo de escritura en la base
+    reserva_service.config.RESERVA_ADMISION_ENABLED = False
+
+    modos = [('individual (SP por request)', False), ('group commit', True)]
+    print(f"funcion {args.id_funcion}: {len(butacas)} butacas, {requests} requests, concurrencia {args.concurrency}")
+    for nombre, group_commit in modos:
+        _limpiar(args.dni_prefix)
+        reserva_service.config.RESERVA_GROUP_COMMIT_ENABLED = group_commit
+        r = _run(args.id_funcion, butacas, requests, args.concurrency, args.dni_prefix)
+        print(f"{nombre:28s} reservas/s={r['reservas_s']:8.1f}  commits/s={r['commits_s']:8.1f}  "
+              f"reservas/commit={r['reservas_por_commit']:5.1f}  p50={r['p50_ms']:.2f}ms  p99={r['p99_ms']:.2f}ms  "
+              f"(ok={r['ok']} rechazadas={r['rechazadas']} errores={r['errores']})")
+    reserva_service.reservas_group_commit.cerrar()
+    _limpiar(args.dni_prefix)
+
+
+if __name__ == '__main__':
+    main()
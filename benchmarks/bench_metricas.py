@@ -0,0 +1,116 @@
+"""
+Benchmark del costo de las metricas (GET /metrics)
+Mide cuanto agregan por request y por llamada a la base (no usa la base de datos):
+- observe de un histograma con etiquetas, con 1 hilo y con varios hilos compitiendo por la misma serie
+- el decorador de app/database.py alrededor de una funcion de acceso a datos que no hace nada
+- una request a un endpoint flask-restx minimo, con y sin los hooks de app/metrics.py
+
+Uso:
+    python -m benchmarks.bench_metricas
+    python -m benchmarks.bench_metricas --requests 20000 --threads 8
+"""
+import argparse
+import threading
+import time
+from typing import Callable
+
+from flask import Flask
+from flask_restx import Api, Resource
+
+from app.database import _medido
+from app.metrics import register_metrics
+from app.utils.metrics import Histograma
+
+
+def _medir(funcion: Callable[[], None], repeat: int) -> float:
+    """Segundos por llamada (mejor de 3 corridas)"""
+    mejor = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - start) / repeat)
+    return mejor
+
+
+def _observe_concurrente(histograma: Histograma, hilos: int, repeat: int) -> float:
+    """Segundos por observe con varios hilos observando la misma serie a la vez"""
+    barrera = threading.Barrier(hilos + 1)
+
+    def trabajar():
+        serie_labels = histograma.labels
+        barrera.wait()
+        for _ in range(repeat):
+            serie_labels('GET', '/api/v1/reservas/<string:dni>', '200').observe(0.003)
+
+    workers = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for worker in workers:
+        worker.start()
+    barrera.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (hilos * repeat)
+
+
+def _app(con_metricas: bool) -> Flask:
+    """Aplicacion minima con un endpoint que no hace nada (el costo es solo el de Flask + metricas)"""
+    app = Flask(__name__)
+    if con_metricas:
+        register_metrics(app)
+    api = Api(app, prefix='/api/v1', doc=False)
+
+    @api.route('/ping/<int:id_funcion>')
+    class Ping(Resource):
+        def get(self, id_funcion):
+            return {'id_funcion': id_funcion}
+
+    return app
+
+
+def _requests(apps, cantidad: int, rondas: int = 5):
+    """Segundos por request de cada aplicacion (mejor corrida; se alternan para que el ruido afecte a todas igual)"""
+    clientes = [app.test_client() for app in apps]
+    mejores = [float('inf')] * len(apps)
+    for _ in range(rondas):
+        for indice, cliente in enumerate(clientes):
+            start = time.perf_counter()
+            for _ in range(cantidad):
+                cliente.get('/api/v1/ping/1')
+            mejores[indice] = min(mejores[indice], (time.perf_counter() - start) / cantidad)
+    return mejores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200000, help='Observaciones por corrida')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=5000, help='Requests por corrida (5 corridas alternadas)')
+    args = parser.parse_args()
+
+    histograma = Histograma('bench_seconds', 'bench', ('method', 'route', 'status'))
+    serie = histograma.labels('GET', '/api/v1/reservas/<string:dni>', '200')
+    observe = _medir(lambda: serie.observe(0.003), args.repeat)
+    labels_observe = _medir(
+        lambda: histograma.labels('GET', '/api/v1/reservas/<string:dni>', '200').observe(0.003), args.repeat
+    )
+    concurrente = _observe_concurrente(histograma, args.threads, args.repeat // args.threads)
+    print(f"observe:                {observe * 1e9:8.0f} ns")
+    print(f"labels + observe:       {labels_observe * 1e9:8.0f} ns")
+    print(f"labels + observe ({args.threads} hilos): {concurrente * 1e9:8.0f} ns por observacion")
+
+    def consulta(query):
+        return None
+
+    medida = _medido('query', por_nombre=False)(consulta)
+    sin = _medir(lambda: consulta('SELECT 1'), args.repeat)
+    con = _medir(lambda: medida('SELECT 1'), args.repeat)
+    print(f"acceso a datos:         {(con - sin) * 1e9:8.0f} ns por llamada medida")
+
+    sin, con = _requests([_app(False), _app(True)], args.requests)
+    print(f"request sin metricas:   {sin * 1e6:8.1f} us")
+    print(f"request con metricas:   {con * 1e6:8.1f} us  (+{(con - sin) * 1e6:.1f} us, {(con / sin - 1) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark de serializacion de respuestas: marshal de flask-restx + json vs proyeccion precompilada + encoder rapido
+Mide el costo por fila de armar el cuerpo JSON de las respuestas de lista (reservas por DNI y reporte de ocupacion)
+con filas sinteticas (no usa la base de datos) y verifica que ambos caminos produzcan el mismo JSON
+
+Uso:
+    python -m benchmarks.bench_serializacion
+    python -m benchmarks.bench_serializacion --rows 100 --repeat 2000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+from flask_restx import marshal
+
+from app.controllers.reporte_controller import reporte_response_model
+from app.controllers.reserva_controller import reserva_list_model
+from app.utils import fast_json
+
+
+def _pagina(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'data': data,
+        'pagination': {'page': 1, 'per_page': len(data), 'total': len(data), 'total_pages': 1,
+                       'has_next': False, 'has_prev': False, 'next_cursor': None}
+    }
+
+
+def _reservas(rows: int) -> Dict[str, Any]:
+    inicio = datetime(2025, 1, 1, 20, 0)
+    return _pagina([
+        {'IdReserva': i, 'DNI': '12345678', 'IdFuncion': i % 50, 'FechaInicio': inicio + timedelta(days=i),
+         'Pelicula': 'Inception', 'Sala': 'Sala VIP', 'EstaPagada': 'S',
+         'FechaAlta': inicio - timedelta(days=1), 'FechaBaja': None}
+        for i in range(rows)
+    ])
+
+
+def _reporte(rows: int) -> Dict[str, Any]:
+    inicio = datetime(2025, 1, 1, 20, 0)
+    return _pagina([
+        {'IdFuncion': i, 'FechaInicio': inicio + timedelta(hours=i), 'IdSala': 1, 'Sala': 'Sala VIP',
+         'TotalButacasVendidas': i % 120, 'TotalIngresosRecaudados': Decimal('115.50') * (i % 120)}
+        for i in range(rows)
+    ])
+
+
+def _restx(data: Any, modelo: Any) -> bytes:
+    """Camino anterior: marshal_with + output_json de flask-restx (json de la libreria estandar)"""
+    return (json.dumps(marshal(data, modelo)) + "\n").encode('utf-8')
+
+
+def _rapido(data: Any, modelo: Any) -> bytes:
+    """Camino nuevo: proyeccion precompilada + encoder rapido"""
+    return fast_json.dumps(fast_json.compilar_modelo(modelo)(data)) + b"\n"
+
+
+def _medir(funcion: Callable[[], bytes], repeat: int) -> float:
+    """Segundos por llamada (mejor de 3 corridas)"""
+    mejor = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - start) / repeat)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100, help='Filas por respuesta (per_page maximo: 100)')
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if fast_json.orjson is not None else 'json (orjson no instalado)'}, "
+          f"{args.rows} filas por respuesta")
+    casos = [('reservas por DNI', _reservas(args.rows), reserva_list_model),
+             ('reporte de ocupacion', _reporte(args.rows), reporte_response_model)]
+    for nombre, data, modelo in casos:
+        if json.loads(_restx(data, modelo)) != json.loads(_rapido(data, modelo)):
+            raise SystemExit(f"{nombre}: los dos caminos no producen el mismo JSON")
+        restx = _medir(lambda: _restx(data, modelo), args.repeat)
+        rapido = _medir(lambda: _rapido(data, modelo), args.repeat)
+        print(f"{nombre:22s} marshal+json={restx / args.rows * 1e6:7.2f} us/fila  "
+              f"proyeccion+encoder={rapido / args.rows * 1e6:7.2f} us/fila  ({restx / rapido:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
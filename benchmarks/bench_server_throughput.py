@@ -0,0 +1,84 @@
+"""
+Benchmark de throughput HTTP contra un servidor en ejecucion
+Lanza N clientes concurrentes con conexiones keep-alive durante un tiempo fijo y reporta req/s y latencias
+
+Uso (comparacion servidor de desarrollo vs gunicorn):
+    python app.py                                   # servidor de desarrollo en :5000
+    python -m benchmarks.bench_server_throughput --url http://127.0.0.1:5000/api/v1/precios/1
+
+    gunicorn -c gunicorn.conf.py                    # servidor de produccion en :5000
+    python -m benchmarks.bench_server_throughput --url http://127.0.0.1:5000/api/v1/precios/1
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from typing import List
+from urllib.parse import urlsplit
+
+
+def _client(url: str, deadline: float, latencies: List[float], errors: List[int], lock: threading.Lock):
+    """Cliente que repite GETs sobre una conexion keep-alive hasta el deadline"""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else '')
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                local_errors += 1
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        local_latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos de medicion')
+    args = parser.parse_args()
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=_client, args=(args.url, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"url:          {args.url}")
+    print(f"concurrencia: {args.concurrency}")
+    print(f"requests:     {total} en {elapsed:.1f}s ({sum(errors)} errores)")
+    print(f"throughput:   {total / elapsed:.1f} req/s")
+    if total:
+        print(f"p50:          {statistics.median(latencies):.2f} ms")
+        print(f"p99:          {latencies[min(total - 1, int(total * 0.99))]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
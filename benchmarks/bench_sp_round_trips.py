@@ -0,0 +1,83 @@
+"""
+Benchmark de viajes de red por request para los SPs con parametros OUT
+Compara call_sp_with_out_params (SET + CALL + SELECT) contra call_sp_with_out_params_single_trip (CALL; SELECT)
+contando los comandos enviados al servidor MySQL configurado en .env
+
+Uso:
+    python -m benchmarks.bench_sp_round_trips --iterations 200 --id-funcion 1
+
+Por defecto la reserva se prueba contra una funcion inexistente para no insertar filas:
+el SP recorre el mismo camino de viajes de red y devuelve 'Funcion no encontrada'.
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from pymysql.connections import Connection
+
+from app import database
+
+# Contador global de comandos enviados al servidor (cada comando es un viaje de red ida y vuelta)
+_round_trips = 0
+_original_execute_command = Connection._execute_command
+
+
+def _counting_execute_command(self, command, sql):
+    global _round_trips
+    _round_trips += 1
+    return _original_execute_command(self, command, sql)
+
+
+def _measure(fn: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Ejecutar fn varias veces y devolver viajes de red por llamada y latencias"""
+    global _round_trips
+    fn()  # Calentamos el pool para no contar el handshake inicial
+    _round_trips = 0
+    latencies: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'round_trips': _round_trips / iterations,
+        'p50_ms': statistics.median(latencies),
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--id-funcion', type=int, default=1, help='Funcion para SP_DeterminarPrecioEntrada')
+    parser.add_argument('--id-funcion-reserva', type=int, default=999999,
+                        help='Funcion para SP_ReservarButacaConValidacionDNI (inexistente = sin escrituras)')
+    args = parser.parse_args()
+
+    if not database.config.DATABASE_SP_SINGLE_ROUND_TRIP:
+        raise SystemExit("DATABASE_SP_SINGLE_ROUND_TRIP debe estar habilitado (el lote requiere MULTI_STATEMENTS)")
+
+    Connection._execute_command = _counting_execute_command
+
+    casos = {
+        'SP_DeterminarPrecioEntrada': ((args.id_funcion,), 2),
+        'SP_ReservarButacaConValidacionDNI': ((args.id_funcion_reserva, 1, '12345678'), 1),
+    }
+    modos = {
+        'antes (callproc + SELECT)': database.call_sp_with_out_params,
+        'despues (lote unico)': database.call_sp_with_out_params_single_trip,
+    }
+
+    print(f"{'procedimiento':<36} {'modo':<28} {'viajes/req':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for procedure_name, (in_params, out_count) in casos.items():
+        for modo, helper in modos.items():
+            result = _measure(lambda: helper(procedure_name, in_params, out_count), args.iterations)
+            print(
+                f"{procedure_name:<36} {modo:<28} {result['round_trips']:>10.1f} "
+                f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Verificacion del plan de ejecucion del reporte de ocupacion
+Ejecuta EXPLAIN de la pagina del reporte y del conteo de funciones contra el MySQL configurado en .env
+y falla (exit 1) si alguna de las tablas que crecen (Funciones, Reservas, ResumenOcupacionFunciones) se recorre completa (type ALL)
+o si Funciones no usa IDX_Funciones_IdPelicula_Estado_FechaInicio
+
+Uso (rango de varios anios por defecto):
+    python -m benchmarks.explain_reporte_ocupacion --id-pelicula 1
+    python -m benchmarks.explain_reporte_ocupacion --id-pelicula 1 --fecha-inicio 2020-01-01 --fecha-fin 2029-12-31
+"""
+import argparse
+import sys
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from app import database
+from app.repositories.reporte_repository import (
+    SQL_CONTAR_FUNCIONES_PERIODO,
+    SQL_FILTRO_FUNCIONES_PERIODO,
+    SQL_OCUPACION_POR_PELICULA,
+    rango_periodo
+)
+
+# Tablas que no se pueden recorrer completas y el indice esperado para Funciones
+TABLAS_CONTROLADAS = ('Funciones', 'Reservas', 'ResumenOcupacionFunciones')
+INDICE_FUNCIONES = 'IDX_Funciones_IdPelicula_Estado_FechaInicio'
+
+
+def _explain(query: str, params: Tuple) -> List[Dict[str, Any]]:
+    """Plan de ejecucion de una consulta"""
+    return database.execute_query(f"EXPLAIN {query}", params) or []
+
+
+def _tabla_real(fila: Dict[str, Any], alias: Dict[str, str]) -> str:
+    """Nombre de la tabla de una fila del plan (EXPLAIN muestra el alias)"""
+    return alias.get(fila.get('table') or '', fila.get('table') or '')
+
+
+def _verificar(nombre: str, plan: List[Dict[str, Any]], alias: Dict[str, str]) -> List[str]:
+    """Imprimir el plan y devolver los problemas encontrados"""
+    print(f"\n{nombre}")
+    print(f"  {'table':12s} {'type':8s} {'key':45s} {'rows':>8s}  Extra")
+    problemas = []
+    for fila in plan:
+        tabla = _tabla_real(fila, alias)
+        print(f"  {tabla:12s} {str(fila.get('type')):8s} {str(fila.get('key')):45s} "
+              f"{str(fila.get('rows')):>8s}  {fila.get('Extra') or ''}")
+        if tabla in TABLAS_CONTROLADAS and fila.get('type') == 'ALL':
+            problemas.append(f"{nombre}: recorrido completo de {tabla}")
+        if tabla == 'Funciones' and fila.get('key') != INDICE_FUNCIONES:
+            problemas.append(f"{nombre}: Funciones usa {fila.get('key')} en lugar de {INDICE_FUNCIONES}")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--id-pelicula', type=int, default=1)
+    parser.add_argument('--fecha-inicio', type=date.fromisoformat, default=date(2020, 1, 1))
+    parser.add_argument('--fecha-fin', type=date.fromisoformat, default=date(2029, 12, 31))
+    parser.add_argument('--per-page', type=int, default=100)
+    args = parser.parse_args()
+
+    alias = {'f': 'Funciones', 'r': 'Reservas', 's': 'Salas', 'ro': 'ResumenOcupacionFunciones'}
+    filtro = (args.id_pelicula,) + rango_periodo(args.fecha_inicio, args.fecha_fin)
+    pagina = SQL_OCUPACION_POR_PELICULA.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO, despues_de='')
+    conteo = SQL_CONTAR_FUNCIONES_PERIODO.format(filtro=SQL_FILTRO_FUNCIONES_PERIODO)
+
+    print(f"pelicula {args.id_pelicula}, periodo {args.fecha_inicio} a {args.fecha_fin}")
+    problemas = _verificar("pagina del reporte", _explain(pagina, filtro + (args.per_page, 0)), alias)
+    problemas += _verificar("conteo de funciones", _explain(conteo, filtro), alias)
+
+    if problemas:
+        print("\nFALLO:")
+        for problema in problemas:
+            print(f"  - {problema}")
+        sys.exit(1)
+    print("\nOK: sin recorridos completos de Funciones ni Reservas")
+
+
+if __name__ == '__main__':
+    main()
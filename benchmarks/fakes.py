@@ -0,0 +1,296 @@
+"""
+Conexiones y cursores simulados para los benchmarks (no usan MySQL)
+Imitan lo que app/database.py usa de pymysql con DictCursor: callproc, execute con varios statements (CALL + SELECT
+de las variables OUT), nextset, fetchall/fetchone/fetchmany, commit y rollback. Las respuestas las da un escenario:
+- procedimiento(nombre, params) -> (result sets del SP, valores OUT)
+- consulta(sql, params) -> filas (None = statement sin result set, ej: INSERT)
+
+Uso:
+    from app import database
+    from benchmarks.fakes import EscenarioCine, FakeConnection
+    database.set_connection_creator(FakeConnection.creator(EscenarioCine(filas=100)))
+"""
+import re
+import threading
+import time
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ResultSet = Optional[List[Dict[str, Any]]]
+
+_NOMBRE_CALL = re.compile(r'CALL\s+(\w+)\s*\(')
+_VARIABLES = re.compile(r'@\w+')
+
+
+class FakeCursor:
+    """Cursor de diccionarios sobre result sets en memoria (tambien sirve como SSDictCursor)"""
+
+    def __init__(self, connection: 'FakeConnection'):
+        self.connection = connection
+        self._result_sets: List[ResultSet] = []
+        self._actual: ResultSet = None
+        self._posicion = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._result_sets = []
+        self._actual = None
+
+    def _cargar(self, result_sets: List[ResultSet]) -> int:
+        self._result_sets = list(result_sets) or [None]
+        self._avanzar()
+        return self.rowcount
+
+    def _avanzar(self) -> None:
+        self._actual = self._result_sets.pop(0)
+        self._posicion = 0
+        if self._actual is None:
+            self.description = None
+            self.rowcount = 0
+        else:
+            columnas = self._actual[0].keys() if self._actual else ('?',)
+            self.description = tuple((columna, None, None, None, None, None, True) for columna in columnas)
+            self.rowcount = len(self._actual)
+
+    def execute(self, query: str, args: Any = None) -> int:
+        self.connection.esperar()
+        self.connection.statements += 1
+        escenario = self.connection.escenario
+        partes = [parte.strip() for parte in query.split(';') if parte.strip()]
+        result_sets: List[ResultSet] = []
+        for parte in partes:
+            if parte.upper().startswith('CALL'):
+                nombre = _NOMBRE_CALL.match(parte).group(1)
+                in_params = tuple(args or ())
+                sets, outs = escenario.procedimiento(nombre, in_params)
+                self.connection.guardar_outs(nombre, len(in_params), outs)
+                # Como MySQL: los result sets del SP y luego el estado del CALL
+                result_sets.extend(sets)
+                result_sets.append(None)
+            elif parte.upper().startswith('SELECT @'):
+                result_sets.append([{variable: self.connection.variables.get(variable)
+                                     for variable in _VARIABLES.findall(parte)}])
+            else:
+                result_sets.append(escenario.consulta(parte, tuple(args) if args is not None else None))
+        return self._cargar(result_sets)
+
+    def executemany(self, query: str, args: Sequence[Any]) -> int:
+        total = 0
+        for params in args:
+            self.execute(query, params)
+            total += max(self.rowcount, 1)
+        self.rowcount = total
+        return total
+
+    def callproc(self, procname: str, args: Sequence[Any] = ()) -> Sequence[Any]:
+        self.connection.esperar()
+        self.connection.statements += 1
+        # pymysql recibe los parametros OUT al final de args (como None)
+        in_params = tuple(args)[:len(args) - self.connection.escenario.cantidad_outs(procname)]
+        sets, outs = self.connection.escenario.procedimiento(procname, in_params)
+        self.connection.guardar_outs(procname, len(in_params), outs)
+        self._cargar(list(sets) + [None])
+        return args
+
+    def nextset(self) -> Optional[bool]:
+        if not self._result_sets:
+            return None
+        self._avanzar()
+        return True
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        if self._actual is None:
+            return []
+        filas = self._actual[self._posicion:]
+        self._posicion = len(self._actual)
+        return filas
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        if self._actual is None or self._posicion >= len(self._actual):
+            return None
+        self._posicion += 1
+        return self._actual[self._posicion - 1]
+
+    def fetchmany(self, size: int = 1) -> List[Dict[str, Any]]:
+        if self._actual is None:
+            return []
+        filas = self._actual[self._posicion:self._posicion + size]
+        self._posicion += len(filas)
+        return filas
+
+
+class FakeConnection:
+    """Conexion DB-API simulada: cuenta statements y commits y puede agregar una latencia fija por viaje"""
+
+    def __init__(self, escenario: Any, latencia: float = 0.0):
+        self.escenario = escenario
+        self.latencia = latencia
+        self.variables: Dict[str, Any] = {}
+        self.statements = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.open = True
+
+    @classmethod
+    def creator(cls, escenario: Any, latencia: float = 0.0) -> Callable[[], 'FakeConnection']:
+        """Funcion para database.set_connection_creator / ConnectionPool(creator=...)"""
+        return lambda: cls(escenario, latencia)
+
+    def esperar(self) -> None:
+        """Simular el viaje de red al servidor"""
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def guardar_outs(self, nombre: str, posicion: int, outs: Tuple) -> None:
+        """Dejar los valores OUT en las variables @_<sp>_<n>, como pymysql"""
+        for indice, valor in enumerate(outs, start=posicion):
+            self.variables[f"@_{nombre}_{indice}"] = valor
+
+    def cursor(self, cursorclass: Any = None) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.esperar()
+        self.commits += 1
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+    def ping(self, reconnect: bool = False) -> None:
+        self.esperar()
+
+    def close(self) -> None:
+        self.open = False
+
+
+def filas_reservas(cantidad: int, desde: int = 0) -> List[Dict[str, Any]]:
+    """Filas con las columnas de SP_ReservasPorDNI (copias: el llamador las puede modificar)"""
+    return [dict(fila) for fila in _filas_reservas(cantidad, desde)]
+
+
+@lru_cache(maxsize=64)
+def _filas_reservas(cantidad: int, desde: int) -> Tuple[Dict[str, Any], ...]:
+    inicio = datetime(2030, 1, 1, 20, 0)
+    return tuple(
+        {'IdReserva': i + 1, 'DNI': '12345678', 'IdFuncion': i % 50 + 1, 'FechaInicio': inicio + timedelta(days=i),
+         'Pelicula': 'Inception', 'Sala': 'Sala VIP', 'EstaPagada': 'S',
+         'FechaAlta': inicio - timedelta(days=1), 'FechaBaja': None}
+        for i in range(desde, desde + cantidad)
+    )
+
+
+def filas_reporte(cantidad: int, fecha_inicio: date, fecha_fin: date, desde: int = 0) -> List[Dict[str, Any]]:
+    """Filas con las columnas de SP_ReporteOcupacionPorPelicula repartidas en los dias del periodo (copias)"""
+    return [dict(fila) for fila in _filas_reporte(cantidad, fecha_inicio, fecha_fin, desde)]
+
+
+@lru_cache(maxsize=256)
+def _filas_reporte(cantidad: int, fecha_inicio: date, fecha_fin: date, desde: int) -> Tuple[Dict[str, Any], ...]:
+    dias = (fecha_fin - fecha_inicio).days + 1
+    base = datetime.combine(fecha_inicio, datetime.min.time()) + timedelta(hours=10)
+    filas = [
+        {'IdFuncion': i + 1, 'FechaInicio': base + timedelta(days=i % dias, seconds=i // dias), 'IdSala': i % 5 + 1,
+         'Sala': f"Sala {i % 5 + 1}", 'TotalButacasVendidas': i % 120,
+         'TotalIngresosRecaudados': Decimal('115.50') * (i % 120)}
+        for i in range(desde, desde + cantidad)
+    ]
+    filas.sort(key=lambda fila: (fila['FechaInicio'], fila['IdFuncion']))
+    return tuple(filas)
+
+
+def _fecha(valor: Any) -> date:
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+class EscenarioCine:
+    """
+    Respuestas sinteticas a todos los stored procedures y consultas de los repositorios
+
+    Todas las funciones existen y estan activas, todas las butacas estan libres y cada DNI / pelicula tiene
+    `filas` reservas / funciones; las consultas que no reconoce fallan para que un cambio en los repositorios
+    no pase desapercibido en los benchmarks
+    """
+
+    OUTS = {'SP_DeterminarPrecioEntrada': 2, 'SP_ReservarButacaConValidacionDNI': 1}
+
+    def __init__(self, filas: int = 100, butacas_por_sala: int = 100):
+        self.filas = filas
+        self.butacas_por_sala = butacas_por_sala
+        self._lock = threading.Lock()
+        self.reservas_insertadas = 0
+
+    def cantidad_outs(self, nombre: str) -> int:
+        return self.OUTS.get(nombre, 0)
+
+    def procedimiento(self, nombre: str, params: Tuple) -> Tuple[List[ResultSet], Tuple]:
+        if nombre == 'SP_DeterminarPrecioEntrada':
+            return [], (Decimal('115.50'), 'OK')
+        if nombre == 'SP_ReservarButacaConValidacionDNI':
+            with self._lock:
+                self.reservas_insertadas += 1
+            return [], ('OK',)
+        if nombre == 'SP_ReservasPorDNI':
+            return [filas_reservas(self.filas)], ()
+        if nombre == 'SP_ReporteOcupacionPorPelicula':
+            return [filas_reporte(self.filas, _fecha(params[1]), _fecha(params[2]))], ()
+        if nombre == 'SP_VerificarResumenOcupacion':
+            return [[]], ()
+        if nombre == 'SP_ReconstruirResumenOcupacion':
+            return [[{'FuncionesResumidas': self.filas}]], ()
+        raise NotImplementedError(f"Stored procedure no simulado: {nombre}")
+
+    def consulta(self, sql: str, params: Optional[Tuple]) -> ResultSet:
+        texto = ' '.join(sql.split())
+        params = params or ()
+        if texto.startswith('INSERT INTO Reservas'):
+            with self._lock:
+                self.reservas_insertadas += 1
+            return None
+        if texto.startswith('EXPLAIN'):
+            return [{'id': 1, 'select_type': 'SIMPLE', 'rows': self.filas}]
+        if 'AS result' in texto:
+            return [{'result': 1}]
+        if 'FOR UPDATE' in texto:
+            return [{'IdFuncion': id_funcion, 'IdSala': 1, 'IdPelicula': 1, 'FechaInicio': datetime(2030, 1, 1, 20, 0),
+                     'Estado': 'A', 'FechaFin': None} for id_funcion in params]
+        if texto.startswith('SELECT IdButaca, IdSala FROM Butacas'):
+            return [{'IdButaca': id_butaca, 'IdSala': 1} for id_butaca in params]
+        if texto.startswith('SELECT IdFuncion, IdButaca FROM Reservas') or 'GROUP BY r.DNI' in texto:
+            return []
+        if 'NroButaca' in texto:
+            return [{'IdFuncion': params[0], 'IdSala': 1, 'Estado': 'A', 'FechaFin': None, 'IdButaca': i + 1,
+                     'NroButaca': i % 10 + 1, 'Fila': i // 10 + 1, 'Columna': i % 10 + 1, 'Ocupada': 0}
+                    for i in range(self.butacas_por_sala)]
+        if 'PrecioFinal' in texto:
+            return [{'IdFuncion': id_funcion, 'Estado': 'A', 'FechaFin': None, 'PrecioFinal': Decimal('115.50')}
+                    for id_funcion in params]
+        if 'VersionCatalogo' in texto:
+            return [{'Total': self.filas, 'Version': 123456789, 'VersionCatalogo': 987654321}]
+        if 'COUNT(*) AS Total' in texto:
+            return [{'Total': self.filas}]
+        if 'FROM Reservas r' in texto:
+            limit, offset = params[-2:]
+            return filas_reservas(max(0, min(limit, self.filas - offset)), offset)
+        if 'FROM Peliculas' in texto:
+            ids = params or range(1, 6)
+            return [{'IdPelicula': id_pelicula, 'Pelicula': f"Pelicula {id_pelicula}"} for id_pelicula in ids]
+        if 'pf.IdFuncion' in texto:
+            limit, offset = params[-2:]
+            # params: (IdPelicula, desde, hasta exclusivo, [despues_de], limit, offset)
+            fecha_fin = _fecha(params[2]) - timedelta(days=1)
+            return filas_reporte(max(0, min(limit, self.filas - offset)), _fecha(params[1]), fecha_fin, offset)
+        if texto.startswith('SELECT f.IdPelicula, f.IdFuncion'):
+            desde, hasta = params[-2:]
+            filas = filas_reporte(self.filas, _fecha(desde), _fecha(hasta) - timedelta(days=1))
+            return [dict(fila, IdPelicula=1) for fila in filas]
+        raise NotImplementedError(f"Consulta no simulada: {texto[:120]}")
@@ -0,0 +1,106 @@
+"""
+Configuracion de gunicorn para el servidor de produccion (pre-fork, multi-worker)
+Los valores se toman de app.config.Config (variables SERVER_* del .env)
+
+Ejecutar con: gunicorn -c gunicorn.conf.py
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+from app.config import Config
+
+# (no usar el nombre "config": gunicorn lo interpreta como una opcion propia)
+app_config = Config()
+
+# Aplicacion WSGI (wsgi.py crea la aplicacion con create_app; app.py queda para el servidor de desarrollo)
+wsgi_app = 'wsgi:app'
+
+# Socket y cola de conexiones pendientes
+bind = f"{app_config.SERVER_HOST}:{app_config.FLASK_PORT}"
+backlog = app_config.SERVER_BACKLOG
+
+# Workers: procesos forkeados con hilos (gthread) para solapar la espera de MySQL
+workers = app_config.SERVER_WORKERS or multiprocessing.cpu_count() * 2 + 1
+worker_class = 'gthread'
+threads = app_config.SERVER_THREADS
+keepalive = app_config.SERVER_KEEPALIVE
+timeout = app_config.SERVER_TIMEOUT
+
+# Importamos y construimos la aplicacion una sola vez en el master, antes de forkear
+preload_app = True
+
+# Reciclado gradual de workers (el jitter evita que todos se reinicien a la vez)
+max_requests = app_config.SERVER_MAX_REQUESTS
+max_requests_jitter = app_config.SERVER_MAX_REQUESTS_JITTER
+graceful_timeout = app_config.SERVER_GRACEFUL_TIMEOUT
+
+accesslog = '-'
+errorlog = '-'
+
+# Directorio donde los workers dejan sus metricas para que /metrics las sume (se define en on_starting)
+metricas_dir = None
+metricas_dir_temporal = False
+
+
+def on_starting(server):
+    """Se ejecuta en el master al arrancar: preparar el directorio de metricas compartidas"""
+    global metricas_dir, metricas_dir_temporal
+    if not app_config.METRICS_ENABLED:
+        return
+    if app_config.METRICS_MULTIPROC_DIR:
+        metricas_dir = app_config.METRICS_MULTIPROC_DIR
+        os.makedirs(metricas_dir, exist_ok=True)
+        # Las metricas de una ejecucion anterior no deben sumarse a las nuevas
+        for archivo in glob.glob(os.path.join(metricas_dir, '*.json')):
+            os.remove(archivo)
+    else:
+        metricas_dir = tempfile.mkdtemp(prefix='metricas-')
+        metricas_dir_temporal = True
+    server.log.info("Metricas compartidas por los workers en %s", metricas_dir)
+
+
+def on_exit(server):
+    """Se ejecuta en el master al apagarse"""
+    if metricas_dir_temporal:
+        shutil.rmtree(metricas_dir, ignore_errors=True)
+
+
+def when_ready(server):
+    """Se ejecuta en el master con la aplicacion precargada, antes de forkear los workers"""
+    if not app_config.SERVER_WARMUP:
+        return
+    from app.warmup import warmup_master
+    app = server.app.wsgi()
+    elapsed = warmup_master(app)
+    server.log.info("Precalentamiento del master completado en %.3fs", elapsed)
+
+
+def post_fork(server, worker):
+    """Se ejecuta en cada worker antes de que empiece a aceptar conexiones"""
+    if metricas_dir is not None:
+        from app.utils.metrics import registro
+        registro.compartir(metricas_dir, app_config.METRICS_MULTIPROC_INTERVAL)
+    if not app_config.SERVER_WARMUP:
+        return
+    from app.warmup import warmup_worker
+    try:
+        created = warmup_worker()
+        server.log.info("Worker %s: pool precalentado con %s conexiones", worker.pid, created)
+    except Exception as e:
+        # El worker igual puede arrancar: el pool abrira conexiones a demanda
+        server.log.warning("Worker %s: no se pudo precalentar el pool: %s", worker.pid, e)
+
+
+def worker_exit(server, worker):
+    """Aplicar las reservas encoladas, guardar las metricas y cerrar el pool al terminar un worker (reciclado o apagado)"""
+    from app.database import close_pool
+    from app.services.reserva_service import reservas_group_commit
+    from app.services.reporte_service import reportes_fanout
+    from app.utils.metrics import registro
+    reservas_group_commit.cerrar()
+    reportes_fanout.cerrar()
+    # Antes de cerrar el pool: sus contadores (db_pool_*) se leen del pool abierto
+    registro.terminar_proceso()
+    close_pool()
@@ -135,6 +135,54 @@ CREATE TABLE IF NOT EXISTS Reservas (
         ON UPDATE RESTRICT ON DELETE RESTRICT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+/* Resumen de ocupación por función: butacas vendidas (reservas activas y pagadas)
+   Lo mantienen los triggers de Reservas; los ingresos se calculan al leer con el precio actual de la función
+   Version sube con cada cambio de la fila (ETag de GET /reporte/ocupacion) */
+CREATE TABLE IF NOT EXISTS ResumenOcupacionFunciones (
+    IdFuncion           INT       NOT NULL,
+    ButacasVendidas     INT       NOT NULL DEFAULT 0,
+    FechaActualizacion  DATETIME  NOT NULL,
+    Version             BIGINT    NOT NULL DEFAULT 1,
+    CONSTRAINT PK_ResumenOcupacionFunciones PRIMARY KEY (IdFuncion),
+    CONSTRAINT FK_ResumenOcupacionFunciones_Funciones
+        FOREIGN KEY (IdFuncion)
+        REFERENCES Funciones (IdFuncion)
+        ON UPDATE RESTRICT ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+/* Versión de las reservas de cada DNI (ETag de GET /reservas/{dni}): la suben los triggers de Reservas
+   con cada alta, cambio o baja, así la versión se lee por clave primaria sin recorrer las reservas */
+CREATE TABLE IF NOT EXISTS VersionesReservasDNI (
+    DNI      VARCHAR(11)  NOT NULL,
+    Version  BIGINT       NOT NULL,
+    CONSTRAINT PK_VersionesReservasDNI PRIMARY KEY (DNI)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+/* Versión del catálogo (una sola fila): la suben los triggers de Peliculas, Salas y Funciones y la
+   reconstrucción del resumen; entra en los ETag porque los listados muestran película, sala, fecha y precio */
+CREATE TABLE IF NOT EXISTS VersionCatalogo (
+    IdVersion  TINYINT  NOT NULL,
+    Version    BIGINT   NOT NULL,
+    CONSTRAINT PK_VersionCatalogo PRIMARY KEY (IdVersion),
+    CONSTRAINT CHK_VersionCatalogo_IdVersion CHECK (IdVersion = 1)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO VersionCatalogo (IdVersion, Version) VALUES (1, 0);
+
+/* Resultados de POST /reservas por Idempotency-Key, compartidos por todos los procesos de la aplicación
+   Estado: P = en curso (la clave vence con el lease si el proceso muere), C = completada (Respuesta en JSON) */
+CREATE TABLE IF NOT EXISTS ClavesIdempotencia (
+    Clave       VARCHAR(255)  NOT NULL,
+    Huella      CHAR(64)      NOT NULL,
+    Estado      CHAR(1)       NOT NULL,
+    StatusCode  SMALLINT      NULL,
+    Respuesta   TEXT          NULL,
+    FechaAlta   DATETIME(6)   NOT NULL,
+    FechaVence  DATETIME(6)   NOT NULL,
+    CONSTRAINT PK_ClavesIdempotencia PRIMARY KEY (Clave),
+    CONSTRAINT CHK_ClavesIdempotencia_Estado CHECK (Estado IN ('P','C'))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 /* =========================================================
    2) Índices
    ========================================================= */
@@ -142,6 +190,8 @@ CREATE TABLE IF NOT EXISTS Reservas (
 -- Crear índices
 -- Nota: Como hacemos DROP DATABASE antes, los índices no existen, así que podemos crearlos directamente
 CREATE INDEX IDX_Funciones_FechaInicio ON Funciones (FechaInicio);
+-- Reporte de ocupación: funciones activas de una película en un rango de FechaInicio, ya ordenadas por fecha
+CREATE INDEX IDX_Funciones_IdPelicula_Estado_FechaInicio ON Funciones (IdPelicula, Estado, FechaInicio);
 CREATE INDEX IDX_Butacas_IdSala_NroButaca ON Butacas (IdSala, NroButaca);
 CREATE INDEX IDX_Reservas_IdFuncion_IdButaca ON Reservas (IdFuncion, IdButaca);
 
@@ -149,6 +199,8 @@ CREATE INDEX IDX_Reservas_IdFuncion_IdButaca ON Reservas (IdFuncion, IdButaca);
 CREATE INDEX IDX_Reservas_DNI ON Reservas (DNI);
 CREATE INDEX IDX_Reservas_IdPelicula ON Reservas (IdPelicula);
 CREATE INDEX IDX_Reservas_IdSala ON Reservas (IdSala);
+-- Purga de claves de idempotencia vencidas
+CREATE INDEX IDX_ClavesIdempotencia_FechaVence ON ClavesIdempotencia (FechaVence);
 
 
 /* =========================================================
@@ -224,23 +276,22 @@ CREATE PROCEDURE SP_ReporteOcupacionPorPelicula (
     IN pFechaFin    DATE
 )
 BEGIN
+    /* Las butacas vendidas salen del resumen mantenido por triggers (no se agregan las Reservas) */
     SELECT
         f.IdFuncion,
         f.FechaInicio,
         f.IdSala,
         s.Sala,
-        COUNT(r.IdReserva) AS TotalButacasVendidas,
-        COUNT(r.IdReserva) * f.Precio AS TotalIngresosRecaudados
+        COALESCE(ro.ButacasVendidas, 0) AS TotalButacasVendidas,
+        COALESCE(ro.ButacasVendidas, 0) * f.Precio AS TotalIngresosRecaudados
     FROM Funciones f
-    JOIN Salas s     ON s.IdSala = f.IdSala
-    LEFT JOIN Reservas r
-           ON r.IdFuncion = f.IdFuncion
-          AND r.FechaBaja IS NULL
-          AND r.EstaPagada = 'S'
+    JOIN Salas s ON s.IdSala = f.IdSala
+    LEFT JOIN ResumenOcupacionFunciones ro ON ro.IdFuncion = f.IdFuncion
     WHERE f.IdPelicula = pIdPelicula
       AND f.Estado = 'A'
-      AND DATE(f.FechaInicio) BETWEEN pFechaInicio AND pFechaFin
-    GROUP BY f.IdFuncion, f.FechaInicio, f.IdSala, s.Sala, f.Precio
+      /* Rango semiabierto sobre la columna (sin DATE()) para poder usar el índice */
+      AND f.FechaInicio >= pFechaInicio
+      AND f.FechaInicio <  pFechaFin + INTERVAL 1 DAY
     ORDER BY f.FechaInicio;
 END$$
 
@@ -356,4 +407,177 @@ BEGIN
     ORDER BY f.FechaInicio;
 END$$
 
+/* 2.5 – Resumen de ocupación: reconstrucción y verificación */
+
+/* Recalcular el resumen completo desde Reservas (ejecutar dentro de una transacción) */
+DROP PROCEDURE IF EXISTS SP_ReconstruirResumenOcupacion$$
+CREATE PROCEDURE SP_ReconstruirResumenOcupacion ()
+BEGIN
+    DELETE FROM ResumenOcupacionFunciones;
+
+    INSERT INTO ResumenOcupacionFunciones (IdFuncion, ButacasVendidas, FechaActualizacion)
+    SELECT r.IdFuncion, COUNT(*), NOW()
+    FROM Reservas r
+    WHERE r.FechaBaja IS NULL
+      AND r.EstaPagada = 'S'
+    GROUP BY r.IdFuncion;
+
+    -- Las filas recreadas vuelven a Version = 1: se invalidan los ETag del reporte con la versión del catálogo
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1;
+
+    SELECT COUNT(*) AS FuncionesResumidas FROM ResumenOcupacionFunciones;
+END$$
+
+/* Funciones cuyo resumen no coincide con las reservas activas y pagadas (vacío = sin desvíos) */
+DROP PROCEDURE IF EXISTS SP_VerificarResumenOcupacion$$
+CREATE PROCEDURE SP_VerificarResumenOcupacion ()
+BEGIN
+    SELECT
+        f.IdFuncion,
+        COALESCE(ro.ButacasVendidas, 0) AS ButacasResumen,
+        COALESCE(rr.ButacasVendidas, 0) AS ButacasReales
+    FROM Funciones f
+    LEFT JOIN ResumenOcupacionFunciones ro ON ro.IdFuncion = f.IdFuncion
+    LEFT JOIN (
+        SELECT IdFuncion, COUNT(*) AS ButacasVendidas
+        FROM Reservas
+        WHERE FechaBaja IS NULL
+          AND EstaPagada = 'S'
+        GROUP BY IdFuncion
+    ) rr ON rr.IdFuncion = f.IdFuncion
+    WHERE COALESCE(ro.ButacasVendidas, 0) <> COALESCE(rr.ButacasVendidas, 0)
+    ORDER BY f.IdFuncion;
+END$$
+
+
+/* =========================================================
+   4) Triggers – mantenimiento incremental del resumen de ocupación
+   Una reserva cuenta como vendida si está activa (FechaBaja IS NULL) y pagada (EstaPagada = 'S')
+   ========================================================= */
+
+CREATE TRIGGER TRG_Reservas_AI_ResumenOcupacion
+AFTER INSERT ON Reservas
+FOR EACH ROW
+BEGIN
+    IF NEW.FechaBaja IS NULL AND NEW.EstaPagada = 'S' THEN
+        INSERT INTO ResumenOcupacionFunciones (IdFuncion, ButacasVendidas, FechaActualizacion)
+        VALUES (NEW.IdFuncion, 1, NOW())
+        ON DUPLICATE KEY UPDATE
+            ButacasVendidas = ButacasVendidas + 1,
+            FechaActualizacion = NOW(),
+            Version = Version + 1;
+    END IF;
+END$$
+
+/* Cancelación (FechaBaja), cambio de pago o de función */
+CREATE TRIGGER TRG_Reservas_AU_ResumenOcupacion
+AFTER UPDATE ON Reservas
+FOR EACH ROW
+BEGIN
+    DECLARE vContabaAntes BOOL DEFAULT FALSE;
+    DECLARE vContaAhora   BOOL DEFAULT FALSE;
+
+    SET vContabaAntes = (OLD.FechaBaja IS NULL AND OLD.EstaPagada = 'S');
+    SET vContaAhora   = (NEW.FechaBaja IS NULL AND NEW.EstaPagada = 'S');
+
+    IF vContabaAntes AND NOT (vContaAhora AND NEW.IdFuncion = OLD.IdFuncion) THEN
+        UPDATE ResumenOcupacionFunciones
+           SET ButacasVendidas = ButacasVendidas - 1,
+               FechaActualizacion = NOW(),
+               Version = Version + 1
+         WHERE IdFuncion = OLD.IdFuncion;
+    END IF;
+
+    IF vContaAhora AND NOT (vContabaAntes AND NEW.IdFuncion = OLD.IdFuncion) THEN
+        INSERT INTO ResumenOcupacionFunciones (IdFuncion, ButacasVendidas, FechaActualizacion)
+        VALUES (NEW.IdFuncion, 1, NOW())
+        ON DUPLICATE KEY UPDATE
+            ButacasVendidas = ButacasVendidas + 1,
+            FechaActualizacion = NOW(),
+            Version = Version + 1;
+    END IF;
+END$$
+
+CREATE TRIGGER TRG_Reservas_AD_ResumenOcupacion
+AFTER DELETE ON Reservas
+FOR EACH ROW
+BEGIN
+    IF OLD.FechaBaja IS NULL AND OLD.EstaPagada = 'S' THEN
+        UPDATE ResumenOcupacionFunciones
+           SET ButacasVendidas = ButacasVendidas - 1,
+               FechaActualizacion = NOW(),
+               Version = Version + 1
+         WHERE IdFuncion = OLD.IdFuncion;
+    END IF;
+END$$
+
+
+/* =========================================================
+   5) Triggers – versiones para los ETag
+   ========================================================= */
+
+CREATE TRIGGER TRG_Reservas_AI_VersionDNI
+AFTER INSERT ON Reservas
+FOR EACH ROW
+BEGIN
+    INSERT INTO VersionesReservasDNI (DNI, Version) VALUES (NEW.DNI, 1)
+    ON DUPLICATE KEY UPDATE Version = Version + 1;
+END$$
+
+CREATE TRIGGER TRG_Reservas_AU_VersionDNI
+AFTER UPDATE ON Reservas
+FOR EACH ROW
+BEGIN
+    INSERT INTO VersionesReservasDNI (DNI, Version) VALUES (NEW.DNI, 1)
+    ON DUPLICATE KEY UPDATE Version = Version + 1;
+
+    IF NEW.DNI <> OLD.DNI THEN
+        INSERT INTO VersionesReservasDNI (DNI, Version) VALUES (OLD.DNI, 1)
+        ON DUPLICATE KEY UPDATE Version = Version + 1;
+    END IF;
+END$$
+
+CREATE TRIGGER TRG_Reservas_AD_VersionDNI
+AFTER DELETE ON Reservas
+FOR EACH ROW
+BEGIN
+    INSERT INTO VersionesReservasDNI (DNI, Version) VALUES (OLD.DNI, 1)
+    ON DUPLICATE KEY UPDATE Version = Version + 1;
+END$$
+
+CREATE TRIGGER TRG_Peliculas_AI_VersionCatalogo
+AFTER INSERT ON Peliculas
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
+CREATE TRIGGER TRG_Peliculas_AU_VersionCatalogo
+AFTER UPDATE ON Peliculas
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
+CREATE TRIGGER TRG_Peliculas_AD_VersionCatalogo
+AFTER DELETE ON Peliculas
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
+CREATE TRIGGER TRG_Salas_AU_VersionCatalogo
+AFTER UPDATE ON Salas
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
+CREATE TRIGGER TRG_Funciones_AI_VersionCatalogo
+AFTER INSERT ON Funciones
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
+CREATE TRIGGER TRG_Funciones_AU_VersionCatalogo
+AFTER UPDATE ON Funciones
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
+CREATE TRIGGER TRG_Funciones_AD_VersionCatalogo
+AFTER DELETE ON Funciones
+FOR EACH ROW
+    UPDATE VersionCatalogo SET Version = Version + 1 WHERE IdVersion = 1$$
+
 DELIMITER ;
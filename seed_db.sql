@@ -26,6 +26,8 @@ USE cine_db;
 
 SET FOREIGN_KEY_CHECKS = 0;
 
+-- TRUNCATE no dispara triggers: vaciamos el resumen de ocupación junto con Reservas
+TRUNCATE TABLE ResumenOcupacionFunciones;
 TRUNCATE TABLE Reservas;
 TRUNCATE TABLE Funciones;
 TRUNCATE TABLE Butacas;
@@ -0,0 +1,15 @@
+"""
+Punto de entrada WSGI para el servidor de produccion (gunicorn)
+Se importa una sola vez en el proceso master (preload_app) antes de forkear los workers
+
+Ejecutar con: gunicorn -c gunicorn.conf.py
+"""
+from dotenv import load_dotenv
+from app import create_app
+from app.config import Config
+
+# Nos permite cargar las variables de entorno desde el archivo .env
+load_dotenv()
+
+# Asi creamos la aplicacion FLASK que compartiran todos los workers
+app = create_app(Config)